@@ -0,0 +1,356 @@
+"""
+A pool of long lived agent processes for the kaggle-environments wrappers in main.py
+
+The wrappers used to start a process per agent slot and keep it until the interpreter exits, so every match paid
+for starting node or the JVM again. AgentProcessPool instead hands each match a warm process. Agents that
+understand the new match handshake are reused: a D_NEW_MATCH line is sent before the first updates of the next
+match and the agent reads its id and the map size again. Agents that do not are still replaced, but by a standby
+process started ahead of time so that its startup overlaps the current match. The wrappers start no standby
+process, since a kaggle submission only ever plays one match; local runs of many matches can ask for one.
+
+Each turn is read with a deadline through a selector (POSIX only, like kaggle), so a hung agent fails its turn
+instead of stalling the environment. What agents write to stderr is kept in a bounded log and forwarded after
+each turn, and the latency of every turn is recorded per process.
+
+This file is shared by the js, ts, java, cpp and kotlin kits. The wrappers import it from kits/ in a checkout
+of the repository and package_all_kits.sh (pack.sh for kotlin) adds it to each kit's archive
+"""
+from collections import deque
+from itertools import islice
+from subprocess import Popen, PIPE
+from threading import Lock
+
+import atexit
+import os
+import selectors
+import sys
+import time
+import weakref
+
+NEW_MATCH = "D_NEW_MATCH"
+FINISH = "D_FINISH"
+# seconds an agent has to answer a turn, the engine's default timeout.max of 3000ms. On kaggle the
+# configuration's actTimeout and the remaining overage time of the agent are used instead
+TURN_TIMEOUT = 3.0
+# seconds to start an agent and play its first turn, kaggle's agentTimeout
+STARTUP_TIMEOUT = 60.0
+STDERR_LINES = 1000
+LATENCY_TURNS = 10000
+
+
+class StderrLog:
+    """
+    a ring buffer of the last max_lines lines an agent wrote to standard error. Lines are split in bulk, so an
+    agent flooding stderr costs a few calls per read rather than one per line
+    """
+    def __init__(self, max_lines=STDERR_LINES):
+        self.lines = deque(maxlen=max_lines)
+        self.partial = b""
+        self.written = 0
+        self.forwarded = 0
+
+    def write(self, data):
+        *lines, self.partial = (self.partial + data).split(b"\n")
+        self.lines.extend(lines)
+        self.written += len(lines)
+
+    def unforwarded(self):
+        """
+        returns the number of lines that were dropped from the buffer before being forwarded and the lines since
+        the last call
+        """
+        new = self.written - self.forwarded
+        kept = min(new, len(self.lines))
+        self.forwarded = self.written
+        return new - kept, list(islice(self.lines, len(self.lines) - kept, None))
+
+
+class AgentProcess:
+    """
+    one running agent. Its stdout and stderr are read through a selector, so a turn never waits past its deadline
+    and stderr is collected in a StderrLog. latencies holds (match, turn, seconds) of the last turns it played
+    """
+    def __init__(self, command, cwd):
+        self.cwd = cwd
+        self.process = Popen(command, stdin=PIPE, stdout=PIPE, stderr=PIPE, cwd=cwd)
+        self.matches = 0
+        self.turn = 0
+        self.stderr = StderrLog()
+        self.latencies = deque(maxlen=LATENCY_TURNS)
+        self.stdout_buffer = b""
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            os.set_blocking(stream.fileno(), False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.process.stdout, selectors.EVENT_READ)
+        self.selector.register(self.process.stderr, selectors.EVENT_READ)
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def act(self, lines, timeout=TURN_TIMEOUT):
+        """
+        sends the lines of a turn and returns the actions the agent replied with. Raises TimeoutError if the agent
+        did not finish the turn within timeout seconds and BrokenPipeError if it exited
+        """
+        start = time.perf_counter()
+        deadline = start + timeout
+        pending = ("\n".join(lines) + "\n").encode()
+        stdin = self.process.stdin
+        replies = []
+        try:
+            while True:
+                newline = self.stdout_buffer.find(b"\n")
+                if newline >= 0:
+                    line = self.stdout_buffer[:newline].decode().rstrip("\r")
+                    self.stdout_buffer = self.stdout_buffer[newline + 1:]
+                    if line == FINISH:
+                        break
+                    replies.append(line)
+                    continue
+                if pending:
+                    try:
+                        pending = pending[os.write(stdin.fileno(), pending):]
+                    except BlockingIOError:
+                        pass
+                    if pending:
+                        self.selector.register(stdin, selectors.EVENT_WRITE)
+                remaining = deadline - time.perf_counter()
+                events = self.selector.select(remaining) if remaining > 0 else []
+                if pending:
+                    self.selector.unregister(stdin)
+                if not events:
+                    raise TimeoutError("agent in {} did not finish turn {} within {}s".format(
+                        self.cwd, self.turn, timeout))
+                for key, _ in events:
+                    if key.fileobj is self.process.stderr:
+                        self.read_stderr()
+                    elif key.fileobj is self.process.stdout:
+                        data = os.read(key.fd, 65536)
+                        if not data:
+                            raise BrokenPipeError()
+                        self.stdout_buffer += data
+        except BrokenPipeError:
+            self.forward_stderr()
+            raise BrokenPipeError("agent in {} exited with code {}".format(self.cwd, self.process.wait()))
+        self.latencies.append((self.matches, self.turn, time.perf_counter() - start))
+        self.turn += 1
+        self.forward_stderr()
+        return [cmd for cmd in (replies[0].split(",") if replies else []) if cmd != ""]
+
+    def read_stderr(self):
+        """
+        moves whatever is waiting on the agent's stderr into the log without blocking
+        """
+        selector_map = self.selector.get_map()
+        if selector_map is None or self.process.stderr not in selector_map:
+            return
+        while True:
+            try:
+                data = os.read(self.process.stderr.fileno(), 65536)
+            except BlockingIOError:
+                return
+            if not data:
+                self.selector.unregister(self.process.stderr)
+                return
+            self.stderr.write(data)
+
+    def forward_stderr(self):
+        """
+        prints what the agent wrote to stderr since the last call, as the wrappers always did
+        """
+        self.read_stderr()
+        dropped, lines = self.stderr.unforwarded()
+        if dropped:
+            print("[{} lines of stderr dropped]".format(dropped), file=sys.stderr)
+        for line in lines:
+            # standard error output received, print it out
+            print(line.decode(errors="replace"), file=sys.stderr)
+
+    def latency_stats(self):
+        """
+        returns the number of turns recorded and the mean and max seconds they took
+        """
+        seconds = [latency for _, _, latency in self.latencies]
+        if not seconds:
+            return {"turns": 0, "mean": 0.0, "max": 0.0}
+        return {"turns": len(seconds), "mean": sum(seconds) / len(seconds), "max": max(seconds)}
+
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+            self.process.wait()
+        self.forward_stderr()
+        self.selector.close()
+
+
+class _Session:
+    """
+    the process playing one side of one match, with the first two lines of the match to restart it
+    """
+    def __init__(self, agent_process, header):
+        self.agent_process = agent_process
+        self.header = header
+
+
+class AgentProcessPool:
+    """
+    runs the agent started by command for any number of matches and environments at once. Call act from the
+    wrapper with the arguments kaggle-environments gives it and the directory of the agent. Matches are told apart
+    by their configuration object and the player, so several environments may use the same pool, also from
+    different threads.
+
+    reusable - the agent handles the new match handshake and its process is kept for the next match
+    standby - how many started processes to keep waiting for a match
+    max_matches - replace a reusable process after this many matches, None to never replace it
+    turn_timeout - seconds an agent has to answer a turn, None to follow the configuration like kaggle does
+
+    An agent that misses its deadline is stopped and the turn raises TimeoutError. Like one that exited, it is
+    restarted on the next turn
+    """
+    def __init__(self, command, reusable=False, standby=1, max_matches=None, turn_timeout=None):
+        self.command = command
+        self.turn_timeout = turn_timeout
+        self.reusable = reusable
+        self.standby = standby
+        self.max_matches = max_matches
+        self.idle = []
+        self.sessions = {}
+        self.watched = set()
+        self.lock = Lock()
+        atexit.register(self.close)
+
+    def act(self, observation, configuration, cwd):
+        key = (id(configuration), observation.player)
+        if observation.step == 0:
+            # fixes bug where updates array is shared, but the first update is agent dependent actually
+            observation["updates"][0] = f"{observation.player}"
+            self.end_match(observation, configuration)
+            session = _Session(self.acquire(cwd), observation["updates"][:2])
+            with self.lock:
+                self.sessions[key] = session
+            self._watch(configuration)
+            lines = observation["updates"]
+            if session.agent_process.matches > 0:
+                lines = [NEW_MATCH] + lines
+            session.agent_process.matches += 1
+            session.agent_process.turn = 0
+        else:
+            with self.lock:
+                session = self.sessions.get(key)
+            if session is None:
+                raise RuntimeError("no agent process for player {}, the match did not start at step 0".format(
+                    observation.player))
+            lines = observation["updates"]
+
+        timeout = self._timeout(observation, configuration)
+        if not session.agent_process.alive():
+            # every turn sends the whole state, so a new process can pick the match up from here on
+            print("agent in {} exited with code {}, restarting it".format(
+                session.agent_process.cwd, session.agent_process.process.returncode), file=sys.stderr)
+            session.agent_process.kill()
+            session.agent_process = self._start(session.agent_process.cwd)
+            session.agent_process.matches += 1
+            session.agent_process.turn = observation.step
+            timeout = self._startup_timeout(configuration)
+            if observation.step > 0:
+                lines = session.header + lines
+            elif lines[0] == NEW_MATCH:
+                lines = lines[1:]
+        try:
+            return session.agent_process.act(lines, timeout)
+        except TimeoutError:
+            # the late reply would be read as the answer to the next turn
+            session.agent_process.kill()
+            raise
+
+    def end_match(self, observation, configuration):
+        """
+        gives the process of a side back to the pool. This happens when that side starts its next match, or when
+        the configuration of its environment is garbage collected
+        """
+        with self.lock:
+            session = self.sessions.pop((id(configuration), observation.player), None)
+        if session is not None:
+            self.release(session.agent_process)
+
+    def acquire(self, cwd) -> AgentProcess:
+        """
+        returns a healthy idle process started in cwd, or a new one, and tops the standby processes back up
+        """
+        agent_process = None
+        with self.lock:
+            for candidate in list(self.idle):
+                if candidate.alive() and candidate.cwd == cwd and agent_process is None:
+                    agent_process = candidate
+                    self.idle.remove(candidate)
+                elif not candidate.alive():
+                    candidate.kill()
+                    self.idle.remove(candidate)
+            waiting = sum(1 for candidate in self.idle if candidate.cwd == cwd)
+        if agent_process is None:
+            agent_process = self._start(cwd)
+        for _ in range(self.standby - waiting):
+            standby_process = self._start(cwd)
+            with self.lock:
+                self.idle.append(standby_process)
+        return agent_process
+
+    def release(self, agent_process):
+        """
+        keeps a reusable process for the next match, anything else is stopped
+        """
+        reuse = (
+            self.reusable and agent_process.alive()
+            and (self.max_matches is None or agent_process.matches < self.max_matches)
+        )
+        if reuse:
+            with self.lock:
+                self.idle.append(agent_process)
+        else:
+            agent_process.kill()
+
+    def close(self):
+        with self.lock:
+            agent_processes = self.idle + [session.agent_process for session in self.sessions.values()]
+            self.idle = []
+            self.sessions = {}
+        for agent_process in agent_processes:
+            agent_process.kill()
+
+    def _start(self, cwd) -> AgentProcess:
+        return AgentProcess(self.command, cwd)
+
+    def _timeout(self, observation, configuration):
+        if self.turn_timeout is not None:
+            return self.turn_timeout
+        if observation.step == 0:
+            # the first turn also waits for the agent to start
+            return self._startup_timeout(configuration)
+        timeout = configuration.get("actTimeout", TURN_TIMEOUT) if configuration is not None else TURN_TIMEOUT
+        return timeout + observation.get("remainingOverageTime", 0)
+
+    def _startup_timeout(self, configuration):
+        if self.turn_timeout is not None:
+            return self.turn_timeout
+        if configuration is not None:
+            return configuration.get("agentTimeout", STARTUP_TIMEOUT)
+        return STARTUP_TIMEOUT
+
+    def _watch(self, configuration):
+        # an environment that is thrown away never starts another match, free its processes with it
+        with self.lock:
+            if id(configuration) in self.watched:
+                return
+            self.watched.add(id(configuration))
+        try:
+            weakref.finalize(configuration, self._forget, id(configuration))
+        except TypeError:
+            pass
+
+    def _forget(self, configuration_id):
+        with self.lock:
+            self.watched.discard(configuration_id)
+            keys = [key for key in self.sessions if key[0] == configuration_id]
+            sessions = [self.sessions.pop(key) for key in keys]
+        for session in sessions:
+            self.release(session.agent_process)
@@ -102,6 +102,14 @@ namespace kit
                 {
                     break;
                 }
+                if (updateInfo == INPUT_CONSTANTS::NEW_MATCH)
+                {
+                    // the process is reused for another match, start over from its id and map size
+                    initialize();
+                    this->turn = 0;
+                    resetPlayerStates();
+                    continue;
+                }
                 vector<string> updates = kit::tokenize(updateInfo, " ");
                 string input_identifier = updates[0];
                 if (input_identifier == INPUT_CONSTANTS::RESEARCH_POINTS)
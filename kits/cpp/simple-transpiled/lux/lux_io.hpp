@@ -10,6 +10,7 @@ namespace kit
   {
   public:
     static string DONE;
+    static string NEW_MATCH;
     static string RESOURCES;
     static string RESEARCH_POINTS;
     static string UNITS;
@@ -6,6 +6,7 @@ namespace kit
 {
   using namespace std;
   string INPUT_CONSTANTS::DONE = "D_DONE";
+  string INPUT_CONSTANTS::NEW_MATCH = "D_NEW_MATCH";
   string INPUT_CONSTANTS::RESOURCES = "r";
   string INPUT_CONSTANTS::RESEARCH_POINTS = "rp";
   string INPUT_CONSTANTS::UNITS = "u";
@@ -45,6 +45,13 @@ public class Agent {
         if (updateInfo.equals(IOConstants.DONE.str)) {
           break;
         }
+        if (updateInfo.equals(IOConstants.NEW_MATCH.str)) {
+          // the process is reused for another match, start over from its id and map size
+          gameState = new GameState();
+          initialize();
+          gameState.turn += 1;
+          continue;
+        }
         String[] updates = updateInfo.split(" ");
         String inputIdentifier = updates[0];
         if (inputIdentifier.equals(IOConstants.RESEARCH_POINTS.str)) {
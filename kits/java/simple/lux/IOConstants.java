@@ -1,7 +1,7 @@
 package lux;
 
 public enum IOConstants {
-    DONE("D_DONE"), RESEARCH_POINTS("rp"), RESOURCES("r"), UNITS("u"), CITY("c"), CITY_TILES("ct"), ROADS("ccd");
+    DONE("D_DONE"), NEW_MATCH("D_NEW_MATCH"), RESEARCH_POINTS("rp"), RESOURCES("r"), UNITS("u"), CITY("c"), CITY_TILES("ct"), ROADS("ccd");
     public String str;
 
     IOConstants(final String s) {
@@ -118,6 +118,12 @@ class Agent {
       if (update.str === INPUT_CONSTANTS.DONE) {
         break;
       }
+      if (update.str === INPUT_CONSTANTS.NEW_MATCH) {
+        // the process is reused for another match, start over from its id and map size
+        await this.initialize();
+        this.gameState.turn = 0;
+        continue;
+      }
       const inputIdentifier = update.nextStr();
       switch (inputIdentifier) {
         case INPUT_CONSTANTS.RESEARCH_POINTS: {
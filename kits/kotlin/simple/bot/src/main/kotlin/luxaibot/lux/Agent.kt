@@ -38,6 +38,13 @@ class Agent {
             if (updateInfo == IOConstants.DONE.str) {
                 break
             }
+            if (updateInfo == IOConstants.NEW_MATCH.str) {
+                // the process is reused for another match, start over from its id and map size
+                gameState = GameState()
+                initialize()
+                gameState.turn += 1
+                continue
+            }
             val updates = updateInfo.split(" ").toTypedArray()
             val inputIdentifier = updates[0]
             if (inputIdentifier == IOConstants.RESEARCH_POINTS.str) {
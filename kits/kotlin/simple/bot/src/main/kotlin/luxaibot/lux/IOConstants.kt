@@ -1,7 +1,7 @@
 package luxaibot.lux
 
 enum class IOConstants(val str: String) {
-    DONE("D_DONE"), RESEARCH_POINTS("rp"), RESOURCES("r"), UNITS("u"), CITY("c"), CITY_TILES("ct"), ROADS("ccd");
+    DONE("D_DONE"), NEW_MATCH("D_NEW_MATCH"), RESEARCH_POINTS("rp"), RESOURCES("r"), UNITS("u"), CITY("c"), CITY_TILES("ct"), ROADS("ccd");
 
     override fun toString(): String {
         return str
@@ -0,0 +1,58 @@
+"""
+Compares keeping the resource clusters of lux/clusters.py from turn to turn, through the delta of an incremental
+Game or by comparing the map with the last turn, with searching them from scratch every turn, on every turn of
+matches played with lux.sim by the policy of bench_suite.py
+
+usage: python bench_clusters.py [--sizes 12 16 ...] [--seed SEED] [--number N]
+"""
+import argparse
+import os
+import sys
+import time
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+sys.path.insert(0, KIT_PATH)
+
+from bench_survival import play
+from lux.clusters import ClusterIndex
+
+
+def run(states, incremental, keep):
+    """
+    seconds spent updating the clusters over all turns, with one index kept across turns when keep is set
+    """
+    game = states[0].to_game(0, incremental=incremental)
+    index = ClusterIndex().update(game)
+    elapsed = 0.0
+    for state in states[1:]:
+        game._update_from_state(state)
+        start = time.perf_counter()
+        if keep:
+            index.update(game)
+        else:
+            ClusterIndex().update(game)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[12, 16, 24, 32])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--number", type=int, default=3)
+    args = parser.parse_args()
+
+    methods = (
+        ("from scratch", False, False),
+        ("compared with last turn", False, True),
+        ("incremental delta", True, True),
+    )
+    for size in args.sizes:
+        states = play(size, args.seed)
+        for name, incremental, keep in methods:
+            best = min(run(states, incremental, keep) for _ in range(args.number))
+            print("{0}x{0} {1:<24} {2:8.1f}us per turn".format(size, name, best / (len(states) - 1) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
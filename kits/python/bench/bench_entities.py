@@ -0,0 +1,204 @@
+"""
+Compares the memory and allocations of the __slots__ entity model of lux/game_map.py and lux/game_objects.py
+with the dict-backed classes the kit used before, by building the state of every turn of recorded matches
+and keeping it as a history
+
+usage: python bench_entities.py [replay.json[.gz] ...] [--number N]
+"""
+import argparse
+import gc
+import glob
+import gzip
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+REPLAYS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "replays")
+sys.path.insert(0, KIT_PATH)
+
+from lux import game_map, game_objects
+from lux.parser import parse_updates
+
+
+class DictPosition:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def translate(self, direction, units):
+        if direction == "n":
+            return DictPosition(self.x, self.y - units)
+        elif direction == "e":
+            return DictPosition(self.x + units, self.y)
+        elif direction == "s":
+            return DictPosition(self.x, self.y + units)
+        elif direction == "w":
+            return DictPosition(self.x - units, self.y)
+        return DictPosition(self.x, self.y)
+
+
+class DictResource:
+    def __init__(self, r_type, amount):
+        self.type = r_type
+        self.amount = amount
+
+
+class DictCell:
+    def __init__(self, x, y):
+        self.pos = DictPosition(x, y)
+        self.resource = None
+        self.citytile = None
+        self.road = 0
+
+
+class DictCargo:
+    def __init__(self):
+        self.wood = 0
+        self.coal = 0
+        self.uranium = 0
+
+
+class DictUnit:
+    def __init__(self, teamid, u_type, unitid, x, y, cooldown, wood, coal, uranium):
+        self.pos = DictPosition(x, y)
+        self.team = teamid
+        self.id = unitid
+        self.type = u_type
+        self.cooldown = cooldown
+        self.cargo = DictCargo()
+        self.cargo.wood = wood
+        self.cargo.coal = coal
+        self.cargo.uranium = uranium
+
+
+class DictCity:
+    def __init__(self, teamid, cityid, fuel, light_upkeep):
+        self.cityid = cityid
+        self.team = teamid
+        self.fuel = fuel
+        self.citytiles = []
+        self.light_upkeep = light_upkeep
+
+
+class DictCityTile:
+    def __init__(self, teamid, cityid, x, y, cooldown):
+        self.cityid = cityid
+        self.team = teamid
+        self.pos = DictPosition(x, y)
+        self.cooldown = cooldown
+
+
+class DictPlayer:
+    def __init__(self, team):
+        self.team = team
+        self.research_points = 0
+        self.units = []
+        self.cities = {}
+        self.city_tile_count = 0
+
+
+# the classes of each model, in the order build_state takes them
+MODELS = {
+    "dict": (DictCell, DictResource, DictUnit, DictCity, DictCityTile, DictPlayer, DictPosition),
+    "slots": (
+        game_map.Cell, game_map.Resource, game_objects.Unit, game_objects.City, game_objects.CityTile,
+        game_objects.Player, game_map.get_position,
+    ),
+}
+
+
+def build_state(model, width, height, updates):
+    """
+    builds the cells, players, units and cities of one turn the way Game._update does
+    """
+    cell_class, resource_class, unit_class, city_class, citytile_class, player_class, _ = model
+    cells = [[cell_class(x, y) for x in range(width)] for y in range(height)]
+    players = [player_class(0), player_class(1)]
+    for team, points in updates.research_points.rows():
+        players[team].research_points = points
+    for r_type, x, y, amt in updates.resources.rows():
+        cells[y][x].resource = resource_class(r_type, amt)
+    for unittype, team, unitid, x, y, cooldown, wood, coal, uranium in updates.units.rows():
+        players[team].units.append(unit_class(team, unittype, unitid, x, y, cooldown, wood, coal, uranium))
+    for team, cityid, fuel, lightupkeep in updates.cities.rows():
+        players[team].cities[cityid] = city_class(team, cityid, fuel, lightupkeep)
+    for team, cityid, x, y, cooldown in updates.citytiles.rows():
+        citytile = citytile_class(team, cityid, x, y, cooldown)
+        players[team].cities[cityid].citytiles.append(citytile)
+        cells[y][x].citytile = citytile
+        players[team].city_tile_count += 1
+    for x, y, road in updates.roads.rows():
+        cells[y][x].road = road
+    return cells, players
+
+
+def load_turns(replay_path):
+    opener = gzip.open if replay_path.endswith(".gz") else open
+    with opener(replay_path, "rt") as f:
+        steps = json.load(f)["steps"]
+    width, height = map(int, steps[0][0]["observation"]["updates"][1].split(" "))
+    turns = []
+    for step in steps:
+        updates = step[0]["observation"]["updates"]
+        turns.append(parse_updates(updates[2:] if step is steps[0] else updates))
+    return width, height, turns
+
+
+def measure_history(model, width, height, turns):
+    """
+    returns the bytes and blocks still allocated after building and keeping the state of every turn
+    """
+    gc.collect()
+    tracemalloc.start()
+    history = [build_state(model, width, height, updates) for updates in turns]
+    size, _ = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    del history
+    return size, blocks
+
+
+def measure_build(model, width, height, turns, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        for updates in turns:
+            build_state(model, width, height, updates)
+    return (time.perf_counter() - start) / (number * len(turns))
+
+
+def measure_translate(model, width, height, number):
+    """
+    returns the seconds per call of translate over every cell and direction
+    """
+    position = model[-1]
+    positions = [position(x, y) for y in range(height) for x in range(width)]
+    start = time.perf_counter()
+    for _ in range(number):
+        for pos in positions:
+            for direction in "nesw":
+                pos.translate(direction, 1)
+    return (time.perf_counter() - start) / (number * len(positions) * 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("replays", nargs="*", default=sorted(glob.glob(os.path.join(REPLAYS_PATH, "*.json.gz"))))
+    parser.add_argument("--number", type=int, default=3)
+    args = parser.parse_args()
+
+    for replay_path in args.replays:
+        width, height, turns = load_turns(replay_path)
+        print(f"{os.path.basename(replay_path)} {width}x{height}, {len(turns)} turns")
+        for name, model in MODELS.items():
+            size, blocks = measure_history(model, width, height, turns)
+            build = measure_build(model, width, height, turns, args.number)
+            translate = measure_translate(model, width, height, args.number)
+            print(f"  {name:<6} history {size / 2 ** 20:8.2f} MiB {blocks / len(turns):9.0f} blocks/turn "
+                  f"{build * 1e6:9.1f} us/turn build {translate * 1e9:7.1f} ns/translate")
+
+
+if __name__ == "__main__":
+    main()
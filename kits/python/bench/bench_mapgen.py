@@ -0,0 +1,41 @@
+"""
+Compares the maps per second of lux.mapgen.generate_map with the batched generator of lux/mapgen_vec.py
+
+usage: python bench_mapgen.py [--maps N] [--batch-size B] [--processes P] [--size S]
+"""
+import argparse
+import os
+import sys
+import time
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+sys.path.insert(0, KIT_PATH)
+
+from lux.mapgen import generate_map
+from lux.mapgen_vec import BATCH_SIZE, generate_maps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--maps", type=int, default=1024)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--size", type=int, default=None, help="map size, drawn from the seed by default")
+    args = parser.parse_args()
+
+    seeds = range(args.maps)
+    reference_maps = min(args.maps, 200)
+    start = time.perf_counter()
+    for seed in range(reference_maps):
+        generate_map(seed, args.size, args.size)
+    reference = reference_maps / (time.perf_counter() - start)
+    print(f"generate_map  {reference:8.1f} maps/s")
+
+    start = time.perf_counter()
+    generate_maps(seeds, args.size, args.size, processes=args.processes, batch_size=args.batch_size)
+    batched = args.maps / (time.perf_counter() - start)
+    print(f"generate_maps {batched:8.1f} maps/s ({batched / reference:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
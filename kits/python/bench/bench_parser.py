@@ -0,0 +1,157 @@
+"""
+Compares the bulk update parser in lux/parser.py with the original per-line parser on recorded observations
+
+usage: python bench_parser.py [replay.json] [--number N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+REPLAY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "analysis", "replay.json")
+sys.path.insert(0, KIT_PATH)
+
+from lux.game import Game
+from lux.game_map import GameMap
+from lux.game_objects import Unit, City
+from lux.parser import parse_updates
+
+
+def per_line_parse(messages):
+    """
+    the original parser of Game._update, decoding each field of each line one at a time
+    """
+    parsed = []
+    for update in messages:
+        if update == "D_DONE":
+            break
+        strs = update.split(" ")
+        input_identifier = strs[0]
+        if input_identifier == "rp":
+            parsed.append((int(strs[1]), int(strs[2])))
+        elif input_identifier == "r":
+            parsed.append((strs[1], int(strs[2]), int(strs[3]), int(float(strs[4]))))
+        elif input_identifier == "u":
+            parsed.append((
+                int(strs[1]), int(strs[2]), strs[3], int(strs[4]), int(strs[5]), float(strs[6]),
+                int(strs[7]), int(strs[8]), int(strs[9]),
+            ))
+        elif input_identifier == "c":
+            parsed.append((int(strs[1]), strs[2], float(strs[3]), float(strs[4])))
+        elif input_identifier == "ct":
+            parsed.append((int(strs[1]), strs[2], int(strs[3]), int(strs[4]), float(strs[5])))
+        elif input_identifier == "ccd":
+            parsed.append((int(strs[1]), int(strs[2]), float(strs[3])))
+    return parsed
+
+
+def per_line_update(game, messages):
+    """
+    the original Game._update, building the game state straight from the per-line parse
+    """
+    game.map = GameMap(game.map_width, game.map_height)
+    game.turn += 1
+    game._reset_player_states()
+    for update in messages:
+        if update == "D_DONE":
+            break
+        strs = update.split(" ")
+        input_identifier = strs[0]
+        if input_identifier == "rp":
+            game.players[int(strs[1])].research_points = int(strs[2])
+        elif input_identifier == "r":
+            game.map._setResource(strs[1], int(strs[2]), int(strs[3]), int(float(strs[4])))
+        elif input_identifier == "u":
+            team = int(strs[2])
+            game.players[team].units.append(Unit(
+                team, int(strs[1]), strs[3], int(strs[4]), int(strs[5]), float(strs[6]),
+                int(strs[7]), int(strs[8]), int(strs[9]),
+            ))
+        elif input_identifier == "c":
+            team = int(strs[1])
+            game.players[team].cities[strs[2]] = City(team, strs[2], float(strs[3]), float(strs[4]))
+        elif input_identifier == "ct":
+            team = int(strs[1])
+            x, y = int(strs[3]), int(strs[4])
+            citytile = game.players[team].cities[strs[2]]._add_city_tile(x, y, float(strs[5]))
+            game.map.get_cell(x, y).citytile = citytile
+            game.players[team].city_tile_count += 1
+        elif input_identifier == "ccd":
+            game.map.get_cell(int(strs[1]), int(strs[2])).road = float(strs[3])
+
+
+def load_observations(replay_path):
+    with open(replay_path) as f:
+        replay = json.load(f)
+    observations = [step[0]["observation"]["updates"] for step in replay["steps"]]
+    # the first observation also carries the player id and map size
+    return observations[0][:2], [observations[0][2:]] + observations[1:]
+
+
+def synthetic_observation(size=32, units=400, cities=60, citytiles=300, seed=0):
+    """
+    a late game sized turn on a size x size map, for comparing the parsers on thousands of lines
+    """
+    rng = random.Random(seed)
+    cells = [(x, y) for y in range(size) for x in range(size)]
+    rng.shuffle(cells)
+    lines = ["rp 0 57", "rp 1 213"]
+    for x, y in cells[:size * size // 3]:
+        r_type = rng.choice(["wood", "coal", "uranium"])
+        lines.append(f"r {r_type} {x} {y} {rng.randint(1, 800)}")
+    for i in range(units):
+        x, y = rng.choice(cells)
+        lines.append(
+            f"u {rng.randint(0, 1)} {i % 2} u_{i + 1} {x} {y} {rng.choice([0, 1, 2, 3.5])} "
+            f"{rng.randint(0, 100)} {rng.randint(0, 50)} {rng.randint(0, 20)}"
+        )
+    for i in range(cities):
+        lines.append(f"c {i % 2} c_{i + 1} {rng.randint(0, 5000)} {rng.randint(10, 400)}")
+    city_cells = cells[size * size // 3:size * size // 3 + citytiles]
+    for i, (x, y) in enumerate(city_cells):
+        lines.append(f"ct {i % cities % 2} c_{i % cities + 1} {x} {y} {rng.randint(0, 10)}")
+    for x, y in city_cells:
+        lines.append(f"ccd {x} {y} 6")
+    lines.append("D_DONE")
+    return ["0", f"{size} {size}"], [lines]
+
+
+def run(label, fn, observations, number):
+    total = timeit.timeit(lambda: [fn(messages) for messages in observations], number=number)
+    per_turn = total / (number * len(observations)) * 1e6
+    print(f"{label:<32} {per_turn:10.1f} us/turn")
+    return per_turn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("replay", nargs="?", default=REPLAY_PATH)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--synthetic", action="store_true", help="use a synthetic late game 32x32 turn instead")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        header, observations = synthetic_observation()
+        args.replay = "a synthetic late game turn"
+    else:
+        header, observations = load_observations(args.replay)
+    print(f"{len(observations)} turns, {sum(map(len, observations))} lines from {args.replay}")
+
+    old = run("per-line parse", per_line_parse, observations, args.number)
+    new = run("bulk parse", parse_updates, observations, args.number)
+    print(f"{'speedup':<32} {old / new:10.2f}x")
+
+    old_game = Game()
+    old_game._initialize(header)
+    old = run("per-line Game._update", lambda messages: per_line_update(old_game, messages), observations, args.number)
+    new_game = Game()
+    new_game._initialize(header)
+    new = run("Game._update", new_game._update, observations, args.number)
+    print(f"{'speedup':<32} {old / new:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
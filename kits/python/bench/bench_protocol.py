@@ -0,0 +1,110 @@
+"""
+Compares the per turn cost of the engine protocol as main.py used to speak it, an input() call per line and two
+prints per turn, with lux/protocol.py's StdioTransport, which reads a turn in one block and writes the actions in
+one write. Both read the turns of a replay from memory, and both answer them through a pipe from an agent
+process that sends no actions, the round trip of a turn in local self-play
+
+usage: python bench_protocol.py [replay.json[.gz]] [--number N]
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import time
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+REPLAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "replays", "seed23_32x32.json.gz")
+sys.path.insert(0, KIT_PATH)
+
+from lux.protocol import StdioTransport
+from lux.replay import Replay
+
+LINE_LOOP = """
+import sys
+updates = []
+while True:
+    try:
+        line = input()
+    except EOFError:
+        break
+    updates.append(line)
+    if line == "D_DONE":
+        print("")
+        print("D_FINISH", flush=True)
+        updates = []
+"""
+TRANSPORT_LOOP = """
+import sys
+sys.path.insert(0, {kit_path!r})
+from lux.protocol import StdioTransport
+transport = StdioTransport()
+while transport.read_turn() is not None:
+    transport.write_actions([])
+"""
+
+
+def read_lines(data, turns):
+    stdin = io.TextIOWrapper(io.BytesIO(data))
+    stdout = io.TextIOWrapper(io.BytesIO())
+    for _ in range(turns):
+        updates = []
+        while True:
+            line = stdin.readline().rstrip("\n")
+            updates.append(line)
+            if line == "D_DONE":
+                break
+        print("", file=stdout)
+        print("D_FINISH", file=stdout, flush=True)
+
+
+def read_blocks(data, turns):
+    transport = StdioTransport(io.BytesIO(data), io.BytesIO())
+    for _ in range(turns):
+        transport.read_turn()
+        transport.write_actions([])
+
+
+def _timed(read, data, turns):
+    start = time.perf_counter()
+    read(data, turns)
+    return time.perf_counter() - start
+
+
+def round_trips(script, turns):
+    """
+    seconds per turn sent to script through a pipe and answered with D_FINISH
+    """
+    process = subprocess.Popen([sys.executable, "-c", script], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    start = time.perf_counter()
+    for turn in turns:
+        process.stdin.write(turn)
+        process.stdin.flush()
+        while process.stdout.readline() != b"D_FINISH\n":
+            pass
+    elapsed = time.perf_counter() - start
+    process.stdin.close()
+    process.wait()
+    return elapsed / len(turns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("replay", nargs="?", default=REPLAY)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    with Replay(args.replay, index_path=False) as replay:
+        turns = [("\n".join(replay.updates(step)) + "\n").encode() for step in range(len(replay))]
+    data = b"".join(turns)
+
+    for name, read in (("input() per line", read_lines), ("StdioTransport", read_blocks)):
+        best = min(_timed(read, data, len(turns)) for _ in range(args.number))
+        print("{:<20} in memory  {:8.1f}us per turn".format(name, best / len(turns) * 1e6))
+    for name, script in (("input() per line", LINE_LOOP), ("StdioTransport", TRANSPORT_LOOP)):
+        best = min(round_trips(script.format(kit_path=KIT_PATH), turns) for _ in range(args.number))
+        print("{:<20} round trip {:8.1f}us per turn".format(name, best * 1e6))
+
+
+if __name__ == "__main__":
+    main()
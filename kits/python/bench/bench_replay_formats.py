@@ -0,0 +1,131 @@
+"""
+Compares the columnar replay format of lux/columnar.py with the Kaggle JSON replays it is converted from: the
+size on disk, the time to read every turn of a match and the time to read turns in random order
+
+usage: python bench_replay_formats.py [replay.json[.gz] ...] [--number N] [--keyframe-interval K]
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+REPLAYS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "replays")
+sys.path.insert(0, KIT_PATH)
+
+from lux.columnar import KEYFRAME_INTERVAL, TABLES, ColumnarReplay, convert_replay
+from lux.parser import parse_updates
+from lux.replay import Replay
+
+
+def scan_json(json_path, steps):
+    """
+    json.load the whole replay and parse the updates of the given steps
+    """
+    with open(json_path, "rb") as f:
+        replay_steps = json.load(f)["steps"]
+    for step in steps:
+        parse_updates(replay_steps[step][0]["observation"]["updates"])
+
+
+def scan_replay(json_path, steps):
+    """
+    the lazy reader of lux/replay.py with its index already saved
+    """
+    with Replay(json_path, index_path=True) as replay:
+        for step in steps:
+            parse_updates(replay.updates(step))
+
+
+def scan_columnar(columnar_path, steps):
+    with ColumnarReplay(columnar_path) as replay:
+        for step in steps:
+            replay.state(step)
+
+
+def scan_columnar_history(columnar_path, steps):
+    """
+    every table over the whole range of steps in one call each, the way to mine many matches
+    """
+    with ColumnarReplay(columnar_path) as replay:
+        for name in TABLES:
+            replay.history(name, min(steps), max(steps) + 1)
+
+
+def scan_columnar_lines(columnar_path, steps):
+    """
+    the columnar reader rebuilding the update lines, for code that wants the engine's strings
+    """
+    with ColumnarReplay(columnar_path) as replay:
+        for step in steps:
+            replay.updates(step)
+
+
+def measure(scan, file_path, steps, number):
+    best = float("inf")
+    for _ in range(number):
+        start = time.perf_counter()
+        scan(file_path, steps)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("replays", nargs="*", default=sorted(glob.glob(os.path.join(REPLAYS_PATH, "*.json.gz"))))
+    parser.add_argument("--number", type=int, default=5)
+    parser.add_argument("--keyframe-interval", type=int, default=KEYFRAME_INTERVAL)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for replay_path in args.replays:
+            name = os.path.basename(replay_path)
+            json_path = os.path.join(tmp, "replay.json")
+            opener = gzip.open if replay_path.endswith(".gz") else open
+            with opener(replay_path, "rb") as src, open(json_path, "wb") as dst:
+                dst.write(src.read())
+            gz_path = json_path + ".gz"
+            with open(json_path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+                dst.write(src.read())
+            columnar_path = os.path.join(tmp, "replay.npz")
+            start = time.perf_counter()
+            convert_replay(json_path, columnar_path, keyframe_interval=args.keyframe_interval)
+            convert = time.perf_counter() - start
+            compressed_path = os.path.join(tmp, "replay_compressed.npz")
+            convert_replay(json_path, compressed_path, keyframe_interval=args.keyframe_interval, compressed=True)
+            # save the index of the lazy reader before timing it
+            Replay(json_path, index_path=True).close()
+
+            with Replay(json_path) as replay:
+                turns = len(replay)
+            print(f"{name}, {turns} turns, converted in {convert * 1e3:.0f} ms")
+            for label, file_path in (
+                ("json", json_path), ("json.gz", gz_path), ("npz", columnar_path), ("npz compressed", compressed_path),
+            ):
+                print(f"  {label:<16} {os.path.getsize(file_path) / 1024:9.1f} KiB")
+
+            sequential = list(range(turns))
+            shuffled = random.Random(0).sample(sequential, 50)
+            for label, scan, file_path in (
+                ("json.load", scan_json, json_path),
+                ("Replay", scan_replay, json_path),
+                ("columnar", scan_columnar, columnar_path),
+                ("columnar lines", scan_columnar_lines, columnar_path),
+                ("columnar history", scan_columnar_history, columnar_path),
+            ):
+                full = measure(scan, file_path, sequential, args.number)
+                if scan is scan_columnar_history:
+                    print(f"  {label:<16} {full * 1e3:8.1f} ms every turn")
+                    continue
+                sample = measure(scan, file_path, shuffled, args.number)
+                print(f"  {label:<16} {full * 1e3:8.1f} ms every turn {sample * 1e3:8.1f} ms 50 random turns")
+            os.remove(json_path + ".idx")
+
+
+if __name__ == "__main__":
+    main()
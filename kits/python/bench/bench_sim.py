@@ -0,0 +1,57 @@
+"""
+Measures how many turns per second lux/sim.py steps by replaying the actions of recorded matches
+
+usage: python bench_sim.py [replay.json[.gz] ...] [--number N]
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import sys
+import time
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+REPLAYS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "replays")
+sys.path.insert(0, KIT_PATH)
+
+from lux.game import Game
+from lux.sim import SimGame
+
+
+def load_replay(replay_path):
+    """
+    returns the SimGame of the first turn of a kaggle-environments replay and the actions of every later turn
+    """
+    opener = gzip.open if replay_path.endswith(".gz") else open
+    with opener(replay_path, "rt") as f:
+        steps = json.load(f)["steps"]
+    observation = steps[0][0]["observation"]
+    game = Game()
+    game._initialize(observation["updates"])
+    game._update(observation["updates"][2:])
+    sim = SimGame.from_game(game, observation["globalUnitIDCount"], observation["globalCityIDCount"])
+    actions = [[step[team]["action"] or [] for team in (0, 1)] for step in steps[1:]]
+    return sim, actions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("replays", nargs="*", default=sorted(glob.glob(os.path.join(REPLAYS_PATH, "*.json.gz"))))
+    parser.add_argument("--number", type=int, default=10)
+    args = parser.parse_args()
+
+    for replay_path in args.replays:
+        sim, actions = load_replay(replay_path)
+        start = time.perf_counter()
+        for _ in range(args.number):
+            rollout = sim.copy()
+            for turn_actions in actions:
+                rollout.step(turn_actions)
+        elapsed = time.perf_counter() - start
+        turns = args.number * len(actions)
+        print(f"{os.path.basename(replay_path):<32} {sim.width}x{sim.height} {turns / elapsed:10.0f} turns/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Measures the time from starting main.py to reading the actions of its first turn, the cold start every match
+pays on its first step: the interpreter, the imports of agent.py and the lux package, and the first turn itself.
+main.py runs as it is, from a copy of the kit without any bytecode cache and with Python not allowed to write
+one (a submission unpacked where Python cannot write __pycache__), and from a copy precompiled by
+tools/freeze_kit.py --compile. The start of an interpreter that does nothing is shown for comparison.
+
+usage: python bench_startup.py [replay.json[.gz]] [--number N]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+TOOLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools")
+REPLAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "replays", "seed23_32x32.json.gz")
+sys.path.insert(0, KIT_PATH)
+sys.path.insert(0, TOOLS_PATH)
+
+from freeze_kit import compile_kit
+from lux.replay import Replay
+
+
+def time_to_first_action(command, cwd, stdin, env):
+    """
+    seconds from starting command to reading the D_FINISH of its first turn
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, text=True, env=env)
+    process.stdin.write(stdin)
+    process.stdin.close()
+    for line in process.stdout:
+        if line.strip() == "D_FINISH":
+            break
+    else:
+        raise RuntimeError("{} sent no actions".format(" ".join(command)))
+    elapsed = time.perf_counter() - start
+    process.stdout.close()
+    process.wait()
+    return elapsed
+
+
+def copy_kit(directory):
+    """
+    a copy of the kit in directory, without its bytecode cache
+    """
+    kit_path = os.path.join(directory, "simple")
+    shutil.copytree(KIT_PATH, kit_path, ignore=shutil.ignore_patterns("__pycache__"))
+    return kit_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("replay", nargs="?", default=REPLAY)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    with Replay(args.replay, index_path=False) as replay:
+        stdin = "\n".join(replay.updates(0)) + "\n"
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+
+    with tempfile.TemporaryDirectory() as directory:
+        cold_path = copy_kit(os.path.join(directory, "cold"))
+        precompiled_path = copy_kit(os.path.join(directory, "precompiled"))
+        compile_kit(precompiled_path)
+        cases = [
+            ("interpreter only", [sys.executable, "-c", "print('D_FINISH')"], KIT_PATH),
+            ("main.py", [sys.executable, "main.py"], KIT_PATH),
+            ("main.py, no bytecode", [sys.executable, "-B", "main.py"], cold_path),
+            ("main.py, precompiled", [sys.executable, "-B", "main.py"], precompiled_path),
+        ]
+        # a first run fills the bytecode cache of the kit itself
+        time_to_first_action([sys.executable, "main.py"], KIT_PATH, stdin, env)
+        for name, command, cwd in cases:
+            times = [time_to_first_action(command, cwd, stdin, env) for _ in range(args.number)]
+            print("{:<24} {:8.1f}ms median {:8.1f}ms best".format(
+                name, statistics.median(times) * 1e3, min(times) * 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compares building the Game of every turn of recorded matches from update lines, written by lux.sim and parsed
+by Game._update as in kaggle-environments, with building it straight from the SimGame and from the engine's
+SerializedState with lux/state.py
+
+usage: python bench_state.py [replay.json[.gz] ...] [--number N]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+REPLAYS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "replays")
+sys.path.insert(0, KIT_PATH)
+
+from bench_sim import load_replay
+from lux.game import Game
+
+
+def turns(replay_path):
+    """
+    the SimGame and SerializedState of every turn of a replay
+    """
+    sim, actions = load_replay(replay_path)
+    states = [(sim.copy(), sim.to_state())]
+    for turn_actions in actions:
+        sim.step(turn_actions)
+        states.append((sim.copy(), sim.to_state()))
+    return states
+
+
+def play(states, update):
+    game = Game()
+    game._initialize(["0", "{} {}".format(states[0][0].width, states[0][0].height)])
+    for sim, state in states:
+        update(game, sim, state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("replays", nargs="*", default=sorted(glob.glob(os.path.join(REPLAYS_PATH, "*.json.gz"))))
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    sources = (
+        ("update lines", lambda game, sim, state: game._update(sim.to_updates() + ["D_DONE"])),
+        ("SimGame", lambda game, sim, state: game._update_from_state(sim)),
+        ("SerializedState", lambda game, sim, state: game._update_from_state(state)),
+    )
+    for replay_path in args.replays:
+        states = turns(replay_path)
+        for name, update in sources:
+            best = float("inf")
+            for _ in range(args.number):
+                start = time.perf_counter()
+                play(states, update)
+                best = min(best, time.perf_counter() - start)
+            print("{:<32} {:<16} {:8.1f}us per turn".format(
+                os.path.basename(replay_path), name, best / len(states) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
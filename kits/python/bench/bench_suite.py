@@ -0,0 +1,360 @@
+"""
+Times the hot paths of the kit on realistic game states of every map size: Game._update (full and incremental),
+building a GameMap, Position.direction_to, the nearest-target loops of agent.py and a whole main.py turn. The
+states are early, mid and late turns of the replays in tests/replays and analysis/replay.json, matches played
+on 16x16 and 24x24 maps with lux.sim, and stress states with hundreds of units.
+
+The results are written as JSON, with the commit they were measured on, so runs on two commits can be
+compared: --compare old.json prints the change of every timing and exits with 1 when one got slower by more
+than --threshold
+
+usage: python bench_suite.py [--output results.json] [--compare old.json] [--threshold 0.1] [--sizes 12 16 ...]
+                             [--benchmarks update agent ...] [--repeat N] [--min-time SECONDS]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+REPLAYS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tests", "replays")
+ANALYSIS_REPLAY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "analysis",
+                               "replay.json")
+sys.path.insert(0, KIT_PATH)
+
+import agent as sample_agent
+from lux.game import Game
+from lux.game_map import GameMap, Position
+from lux.mapgen import generate_map
+from lux.replay import Replay
+
+SIZES = (12, 16, 24, 32)
+BENCHMARKS = ("update", "update_incremental", "game_map", "direction_to", "agent", "agent_loops", "main_turn")
+# the early, mid and late turns of every match
+TURNS = (10, 180, 340)
+REPLAYS = (
+    (os.path.join(REPLAYS_PATH, "seed13_12x12.json.gz"), "seed13"),
+    (os.path.join(REPLAYS_PATH, "seed23_32x32.json.gz"), "seed23"),
+)
+SIMULATED = ((16, 7), (24, 11))
+# (map size, units and city tiles of each team)
+STRESS = ((24, 150, 60), (32, 300, 120))
+# turns main.py plays per run
+MAIN_TURNS = 20
+
+
+class Fixture:
+    """
+    the update lines of one turn as the engine sends them to player 0, D_DONE included
+    """
+    def __init__(self, name, size, turn, updates):
+        self.name = name
+        self.size = size
+        self.turn = turn
+        self.updates = updates
+        game = self.game()
+        self.units = sum(len(player.units) for player in game.players)
+        self.citytiles = sum(player.city_tile_count for player in game.players)
+
+    def header(self):
+        return ["0", "{} {}".format(self.size, self.size)]
+
+    def game(self, **game_options) -> Game:
+        game = Game(**game_options)
+        game._initialize(self.header())
+        game.turn = self.turn - 1
+        game._update(self.updates)
+        return game
+
+
+class Observation(dict):
+    def __init__(self, player, step, updates):
+        super().__init__(step=step, updates=updates)
+        self.player = player
+
+
+def replay_fixtures(path, name, turns):
+    with Replay(path, index_path=False) as replay:
+        width, _ = replay.map_size()
+        for turn in turns:
+            if turn < len(replay):
+                updates = replay.updates(turn)
+                yield Fixture("{}_{}x{}_t{}".format(name, width, width, turn), width, turn,
+                              updates[2:] if turn == 0 else updates)
+
+
+def policy(game, team):
+    """
+    a simple agent for the played matches: workers mine the closest resource they can and, once full, bring it
+    to a city short of fuel for the night or build a city tile on the closest free cell, while city tiles build
+    workers up to their own number and research
+    """
+    player = game.players[team]
+    game_map = game.map
+    resources = []
+    free = []
+    for row in game_map.map:
+        for cell in row:
+            if cell.has_resource():
+                if ((cell.resource.type != "coal" or player.researched_coal())
+                        and (cell.resource.type != "uranium" or player.researched_uranium())):
+                    resources.append(cell.pos)
+            elif cell.citytile is None:
+                free.append(cell.pos)
+    citytiles = [citytile for city in player.cities.values() for citytile in city.citytiles]
+    hungry = [
+        citytile.pos for city in player.cities.values() if city.fuel < city.light_upkeep * 10
+        for citytile in city.citytiles
+    ]
+    actions = []
+    units = len(player.units)
+    for citytile in citytiles:
+        if citytile.can_act():
+            if units < len(citytiles):
+                actions.append(citytile.build_worker())
+                units += 1
+            else:
+                actions.append(citytile.research())
+    # cells units will stand on after this turn, city tiles holding any number of them
+    occupied = {unit.pos for team_player in game.players for unit in team_player.units}
+    occupied.difference_update(citytile.pos for citytile in citytiles)
+    for unit in player.units:
+        if not unit.can_act():
+            continue
+        if unit.get_cargo_space_left() > 0:
+            targets = resources
+        elif hungry:
+            targets = hungry
+        elif unit.can_build(game_map):
+            actions.append(unit.build_city())
+            continue
+        else:
+            targets = free
+        if not targets:
+            continue
+        target = min(targets, key=unit.pos.distance_to)
+        distance = target.distance_to(unit.pos)
+        # workers mine the cells next to them
+        if targets is resources and distance <= 1:
+            continue
+        # the first free cell that gets closer to the target
+        for direction in sorted("nesw", key=lambda d: target.distance_to(unit.pos.translate(d, 1))):
+            pos = unit.pos.translate(direction, 1)
+            if target.distance_to(pos) >= distance:
+                break
+            citytile = game_map.get_cell(pos.x, pos.y).citytile
+            if pos not in occupied and (citytile is None or citytile.team == team):
+                occupied.discard(unit.pos)
+                if citytile is None:
+                    occupied.add(pos)
+                actions.append(unit.move(direction))
+                break
+    return actions
+
+
+def simulated_fixtures(size, seed, turns):
+    sim = generate_map(seed, size, size)
+    for turn in range(max(turns) + 1):
+        if turn in turns:
+            yield Fixture("sim{}_{}x{}_t{}".format(seed, size, size, turn), size, turn,
+                          sim.to_updates() + ["D_DONE"])
+        sim.step([policy(sim.to_game(team), team) for team in (0, 1)])
+
+
+def stress_fixture(size, units, citytiles, seed=0):
+    """
+    a mid game map crowded with units and city tiles, more than a real match would hold
+    """
+    rng = random.Random(seed)
+    sim = generate_map(seed, size, size)
+    sim.turn = 180
+    for team in (0, 1):
+        for unitid in list(sim.units[team]):
+            sim.destroy_unit(team, unitid)
+    for cityid in list(sim.cities):
+        sim.destroy_city(cityid)
+    free = [(x, y) for y in range(size) for x in range(size) if not sim.has_resource(x, y)]
+    rng.shuffle(free)
+    for index in range(2 * citytiles):
+        x, y = free.pop()
+        sim.spawn_city_tile(index % 2, x, y)
+    for index in range(2 * units):
+        unit = sim.spawn_worker(index % 2, rng.randrange(size), rng.randrange(size))
+        unit.cargo["wood"] = rng.randrange(0, 101, 10)
+    for city in sim.cities.values():
+        city.fuel = rng.randrange(1000)
+    return Fixture("stress_{}x{}_{}units".format(size, size, 2 * units), size, sim.turn,
+                   sim.to_updates() + ["D_DONE"])
+
+
+def fixtures(sizes):
+    for path, name in REPLAYS:
+        with Replay(path, index_path=False) as replay:
+            size = replay.map_size()[0]
+        if size in sizes:
+            yield from replay_fixtures(path, name, TURNS)
+    if os.path.exists(ANALYSIS_REPLAY):
+        with Replay(ANALYSIS_REPLAY, index_path=False) as replay:
+            size, last = replay.map_size()[0], len(replay) - 1
+        if size in sizes:
+            yield from replay_fixtures(ANALYSIS_REPLAY, "analysis", (last,))
+    for size, seed in SIMULATED:
+        if size in sizes:
+            yield from simulated_fixtures(size, seed, TURNS)
+    for size, units, citytiles in STRESS:
+        if size in sizes:
+            yield stress_fixture(size, units, citytiles)
+
+
+def measure(func, repeat, min_time):
+    """
+    returns (number, times) with the seconds per call of each of repeat runs, each run calling func number
+    times, number being doubled until a run takes min_time
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return number, [seconds / number for seconds in timer.repeat(repeat, number)]
+
+
+def bench_main_turn(fixture, repeat):
+    """
+    the median seconds of a turn of main.py in each of repeat runs of MAIN_TURNS turns, from main.py's own
+    LUX_TIMING summary so the start up of the process is left out
+    """
+    stdin = "\n".join(fixture.header() + fixture.updates) + "\n"
+    stdin += ("\n".join(fixture.updates) + "\n") * (MAIN_TURNS - 1)
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        summary_path = os.path.join(directory, "timing.json")
+        for _ in range(repeat):
+            result = subprocess.run(
+                [sys.executable, "main.py"], cwd=KIT_PATH, input=stdin, capture_output=True, text=True,
+                env={"PATH": os.environ.get("PATH", ""), "LUX_TIMING": summary_path},
+            )
+            if result.stdout.count("D_FINISH") != MAIN_TURNS:
+                raise RuntimeError("main.py failed on {}:\n{}".format(fixture.name, result.stderr))
+            with open(summary_path) as f:
+                times.append(json.load(f)["turn"]["p50"])
+    return MAIN_TURNS, times
+
+
+def benchmark(name, fixture, repeat, min_time):
+    """
+    returns (calls, number, times) where calls counts the operations each timed call makes
+    """
+    updates = fixture.updates
+    if name in ("update", "update_incremental"):
+        game = fixture.game(incremental=name == "update_incremental")
+        return (1,) + measure(lambda: game._update(updates), repeat, min_time)
+    if name == "game_map":
+        return (1,) + measure(lambda: GameMap(fixture.size, fixture.size), repeat, min_time)
+    if name == "direction_to":
+        game = fixture.game()
+        units = [unit.pos for player in game.players for unit in player.units]
+        size = fixture.size
+        targets = [Position(x, y) for x, y in ((0, 0), (size - 1, size // 2), (size // 3, 2))]
+        pairs = [(pos, target) for pos in units for target in targets]
+
+        def direction_to():
+            for pos, target in pairs:
+                pos.direction_to(target)
+        return (len(pairs),) + measure(direction_to, repeat, min_time)
+    if name in ("agent", "agent_loops"):
+        sample_agent.agent(Observation(0, 0, fixture.header() + updates), None)
+        if name == "agent_loops":
+            # only the loops: the state of the first call is kept instead of being parsed again
+            sample_agent.game_state._update = lambda messages: None
+        observation = Observation(0, fixture.turn, updates)
+        return (1,) + measure(lambda: sample_agent.agent(observation, None), repeat, min_time)
+    if name == "main_turn":
+        return (1,) + bench_main_turn(fixture, repeat)
+    raise ValueError("unknown benchmark {}".format(name))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=KIT_PATH, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, old_path, threshold):
+    """
+    prints how the best time of every timing changed since the results in old_path, the median being too
+    noisy on a busy machine, and returns the regressions
+    """
+    with open(old_path) as f:
+        old = {(row["fixture"], row["benchmark"]): row for row in json.load(f)["results"]}
+    regressions = []
+    for row in results:
+        before = old.get((row["fixture"], row["benchmark"]))
+        if before is None:
+            continue
+        ratio = row["best"] / before["best"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  slower"
+            regressions.append(row)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print("{:<32} {:<20} {:10.1f}us -> {:10.1f}us {:+7.1%}{}".format(
+            row["fixture"], row["benchmark"], before["best"] * 1e6, row["best"] * 1e6, ratio - 1, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_suite.json")
+    parser.add_argument("--compare")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--benchmarks", nargs="+", default=BENCHMARKS, choices=BENCHMARKS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    args = parser.parse_args()
+
+    results = []
+    print("{:<32} {:>5} {:>6} {:<20} {:>12} {:>12}".format("fixture", "units", "tiles", "benchmark", "best",
+                                                         "median"))
+    for fixture in fixtures(args.sizes):
+        for name in args.benchmarks:
+            calls, number, times = benchmark(name, fixture, args.repeat, args.min_time)
+            row = {
+                "fixture": fixture.name, "size": fixture.size, "turn": fixture.turn, "units": fixture.units,
+                "citytiles": fixture.citytiles, "benchmark": name, "calls": calls, "number": number,
+                "best": min(times), "median": statistics.median(times), "times": times,
+            }
+            results.append(row)
+            print("{:<32} {:>5} {:>6} {:<20} {:>10.1f}us {:>10.1f}us".format(
+                fixture.name, fixture.units, fixture.citytiles, name, row["best"] * 1e6, row["median"] * 1e6))
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": args.repeat,
+            "results": results,
+        }, f, indent=2)
+    print("results written to {}".format(args.output))
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print("{} timings slower by more than {:.0%}".format(len(regressions), args.threshold))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Compares forecasting how long every city and unit of both players lasts through the nights with lux/survival.py,
+updated through the delta of an incremental Game, with the per city and per unit Python loops agents write,
+which play the nights ahead one turn at a time. The turns are those of matches played with lux.sim by the policy
+of bench_suite.py, which stay small, and a night cycle of the crowded stress states of bench_suite.py
+
+usage: python bench_survival.py [--sizes 12 16 ...] [--seed SEED] [--number N]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+sys.path.insert(0, KIT_PATH)
+
+from bench_suite import STRESS, policy, stress_fixture
+from lux.game_constants import GAME_CONSTANTS
+from lux.mapgen import generate_map
+from lux.sim import SimGame
+from lux.survival import SurvivalForecast
+
+PARAMETERS = GAME_CONSTANTS["PARAMETERS"]
+DAY_LENGTH = PARAMETERS["DAY_LENGTH"]
+CYCLE_LENGTH = DAY_LENGTH + PARAMETERS["NIGHT_LENGTH"]
+MAX_DAYS = PARAMETERS["MAX_DAYS"]
+FUEL_RATES = PARAMETERS["RESOURCE_TO_FUEL_RATE"]
+
+
+def loop_forecast(game, team):
+    """
+    turns to death, fuel short of the next dawn and of the end of the game of every city, and turns to death of
+    every unit, found by playing the nights ahead
+    """
+    cities = {}
+    dawn = min((game.turn // CYCLE_LENGTH + 1) * CYCLE_LENGTH, MAX_DAYS)
+    for city in game.players[team].cities.values():
+        fuel = city.fuel
+        death = math.inf
+        dawn_deficit = end_deficit = 0
+        for turn in range(game.turn, MAX_DAYS):
+            if turn % CYCLE_LENGTH < DAY_LENGTH:
+                continue
+            fuel -= city.light_upkeep
+            if fuel < 0:
+                if death == math.inf:
+                    death = turn - game.turn
+                if turn < dawn:
+                    dawn_deficit = -fuel
+                end_deficit = -fuel
+        cities[city.cityid] = (death, dawn_deficit, end_deficit)
+    units = {}
+    for unit in game.players[team].units:
+        if game.map.get_cell_by_pos(unit.pos).citytile is not None:
+            units[unit.id] = math.inf
+            continue
+        cargo = [unit.cargo.wood, unit.cargo.coal, unit.cargo.uranium]
+        upkeep = PARAMETERS["LIGHT_UPKEEP"]["WORKER" if unit.is_worker() else "CART"]
+        death = math.inf
+        for turn in range(game.turn, MAX_DAYS):
+            if turn % CYCLE_LENGTH < DAY_LENGTH:
+                continue
+            needed = upkeep
+            for n, rate in enumerate((FUEL_RATES["WOOD"], FUEL_RATES["COAL"], FUEL_RATES["URANIUM"])):
+                used = min(cargo[n], math.ceil(needed / rate))
+                cargo[n] -= used
+                needed -= used * rate
+                if needed <= 0:
+                    break
+            if needed > 0:
+                death = turn - game.turn
+                break
+        units[unit.id] = death
+    return cities, units
+
+
+def play(size, seed):
+    """
+    the SimGame of every turn of a match between two copies of the policy
+    """
+    sim = generate_map(seed, size, size)
+    states = [sim.copy()]
+    while not sim.step([policy(sim.to_game(team), team) for team in (0, 1)]):
+        states.append(sim.copy())
+    return states
+
+
+def crowded(size, units, citytiles):
+    """
+    the SimGame of every turn of a night cycle from a stress state, with no actions
+    """
+    sim = SimGame.from_game(stress_fixture(size, units, citytiles).game())
+    states = [sim.copy()]
+    for _ in range(CYCLE_LENGTH):
+        sim.step([[], []])
+        states.append(sim.copy())
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[12, 16, 24, 32])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--number", type=int, default=3)
+    args = parser.parse_args()
+
+    matches = [("{0}x{0} match".format(size), play(size, args.seed)) for size in args.sizes]
+    stress = [("{0}x{0} stress".format(size), crowded(size, units, citytiles)) for size, units, citytiles in STRESS]
+    for label, states in matches + stress:
+        player = states[len(states) // 2].to_game(0).players[0]
+        name = "{} ({} cities, {} units)".format(label, len(player.cities), len(player.units))
+
+        def run_loops():
+            played = states[0].to_game(0, incremental=True)
+            elapsed = 0.0
+            for state in states[1:]:
+                played._update_from_state(state)
+                start = time.perf_counter()
+                for team in (0, 1):
+                    loop_forecast(played, team)
+                elapsed += time.perf_counter() - start
+            return elapsed
+
+        def run_forecast():
+            played = states[0].to_game(0, incremental=True)
+            forecasts = [SurvivalForecast(team) for team in (0, 1)]
+            elapsed = 0.0
+            for state in states[1:]:
+                played._update_from_state(state)
+                start = time.perf_counter()
+                for forecast in forecasts:
+                    forecast.update(played)
+                    forecast.city_turns_to_death()
+                    forecast.city_dawn_deficit()
+                    forecast.city_end_deficit()
+                    forecast.unit_turns_to_death()
+                elapsed += time.perf_counter() - start
+            return elapsed
+
+        for method, run in (("python loops", run_loops), ("SurvivalForecast", run_forecast)):
+            best = min(run() for _ in range(args.number))
+            print("{:<40} {:<18} {:8.1f}us per turn".format(name, method, best / (len(states) - 1) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Measures the throughput of lux/vec_env.py for a range of batch sizes, with every unit moving in a random direction
+
+usage: python bench_vec_env.py [--batch-sizes 1 8 64] [--turns N] [--size S]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+sys.path.insert(0, KIT_PATH)
+
+from lux.vec_env import VecEnv
+
+
+def random_actions(env, rng):
+    actions_batch = []
+    for game in env.games:
+        actions = [[], []]
+        for team in (0, 1):
+            for unit in game.units[team].values():
+                actions[team].append("m {} {}".format(unit.id, rng.choice("nsewc")))
+            for city in game.cities.values():
+                if city.team == team:
+                    for citytile in city.citycells:
+                        actions[team].append("r {} {}".format(citytile.x, citytile.y))
+        actions_batch.append(actions)
+    return actions_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--size", type=int, default=16)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for batch_size in args.batch_sizes:
+        env = VecEnv(batch_size, map_size=args.size)
+        env.reset(range(batch_size), width=args.size, height=args.size)
+        stepping = 0.0
+        start = time.perf_counter()
+        for _ in range(args.turns):
+            actions_batch = random_actions(env, rng)
+            step_start = time.perf_counter()
+            env.step(actions_batch)
+            stepping += time.perf_counter() - step_start
+        elapsed = time.perf_counter() - start
+        turns = batch_size * args.turns
+        print(f"batch {batch_size:<5} {turns / stepping:10.0f} match turns/s stepping, "
+              f"{turns / elapsed:10.0f} with action generation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+The Lux AI kit. Submodules are imported the first time they are used, so importing lux or lux.game stays cheap
+and lux.sim, lux.replay and the others can be reached as attributes of the package after a plain import lux
+"""
+_SUBMODULES = frozenset((
+    "action_masks", "annotate", "anytime", "array_map", "clusters", "columnar", "constants", "features",
+    "frozen_constants", "game", "game_constants", "game_map", "game_objects", "keyframes", "mapgen", "mapgen_vec",
+    "parser", "pathfinding", "protocol", "replay", "sim", "spatial", "state", "survival", "timing", "vec_env",
+))
+
+
+def __getattr__(name):
+    if name not in _SUBMODULES:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    __import__(__name__ + "." + name)
+    return globals()[name]
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES)
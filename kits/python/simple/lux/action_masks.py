@@ -0,0 +1,148 @@
+"""
+Legal actions of all of a player's units and city tiles as arrays, for policies that pick one action index per
+unit and per city tile, and the commands of the chosen indices in one call (requires numpy)
+"""
+import numpy as np
+
+from .constants import Constants
+from .game_constants import GAME_CONSTANTS
+
+DIRECTIONS = Constants.DIRECTIONS
+UNIT_TYPES = Constants.UNIT_TYPES
+
+# the actions of a unit and of a city tile, in the order of the columns of the masks. "none" sends no command
+# and is always legal. Transfers name a second unit and are left to the agent
+UNIT_ACTIONS = ("none", "move_north", "move_east", "move_south", "move_west", "build_city", "pillage")
+CITYTILE_ACTIONS = ("none", "research", "build_worker", "build_cart")
+(NONE, MOVE_NORTH, MOVE_EAST, MOVE_SOUTH, MOVE_WEST, BUILD_CITY, PILLAGE) = range(len(UNIT_ACTIONS))
+(RESEARCH, BUILD_WORKER, BUILD_CART) = range(1, len(CITYTILE_ACTIONS))
+
+_MOVES = (
+    (MOVE_NORTH, DIRECTIONS.NORTH, 0, -1),
+    (MOVE_EAST, DIRECTIONS.EAST, 1, 0),
+    (MOVE_SOUTH, DIRECTIONS.SOUTH, 0, 1),
+    (MOVE_WEST, DIRECTIONS.WEST, -1, 0),
+)
+# the command of each action, formatted with the unit id or the city tile's x and y
+_UNIT_COMMANDS = (None,) + tuple("m {} " + direction for _, direction, _, _ in _MOVES) + ("bcity {}", "p {}")
+_CITYTILE_COMMANDS = (None, "r {} {}", "bw {} {}", "bc {} {}")
+_CITY_BUILD_COST = GAME_CONSTANTS["PARAMETERS"]["CITY_BUILD_COST"]
+
+
+class ActionMasks:
+    """
+    the legal actions of a player at one turn. units and citytiles list the player's units and city tiles, in
+    the order of the rows of unit_mask, a bool [len(units), len(UNIT_ACTIONS)] array, and of citytile_mask, a
+    bool [len(citytiles), len(CITYTILE_ACTIONS)] array. unit_xy and citytile_xy hold their (x, y), e.g. to
+    gather the outputs of a policy over the map at each of them.
+
+    An action is legal when the engine accepts it and it does something: a unit or city tile must be off
+    cooldown, moves stay on the map and off opponent city tiles, only workers build cities (on an empty cell
+    with enough cargo) and pillage (a road outside a city), and units are only built below the unit cap
+    """
+    def __init__(self, units, citytiles, unit_mask, citytile_mask, unit_xy, citytile_xy, units_left):
+        self.units = units
+        self.citytiles = citytiles
+        self.unit_mask = unit_mask
+        self.citytile_mask = citytile_mask
+        self.unit_xy = unit_xy
+        self.citytile_xy = citytile_xy
+        # units the player can still build this turn before reaching the cap
+        self.units_left = units_left
+
+    def commands(self, unit_actions=None, citytile_actions=None):
+        """
+        the commands of the chosen action of each unit and each city tile, indices into UNIT_ACTIONS and
+        CITYTILE_ACTIONS in the order of units and citytiles. Raises ValueError for an illegal choice.
+
+        Each city tile can build a unit on its own, but not all of them together once the cap is near: builds
+        past the cap are dropped, in the order of citytiles
+        """
+        commands = []
+        if unit_actions is not None:
+            unit_actions = self._check(unit_actions, self.unit_mask, "unit")
+            commands.extend([
+                _UNIT_COMMANDS[action].format(unit.id)
+                for unit, action in zip(self.units, unit_actions) if action != NONE
+            ])
+        if citytile_actions is not None:
+            citytile_actions = self._check(citytile_actions, self.citytile_mask, "city tile")
+            units_left = self.units_left
+            for citytile, action in zip(self.citytiles, citytile_actions):
+                if action == NONE:
+                    continue
+                if action != RESEARCH:
+                    if units_left <= 0:
+                        continue
+                    units_left -= 1
+                commands.append(_CITYTILE_COMMANDS[action].format(citytile.pos.x, citytile.pos.y))
+        return commands
+
+    @staticmethod
+    def _check(actions, mask, name):
+        actions = np.asarray(actions, dtype=np.intp)
+        if actions.shape != (len(mask),):
+            raise ValueError("got {} actions for {} {}s".format(len(actions), len(mask), name))
+        if len(actions) and (actions.min() < 0 or actions.max() >= mask.shape[1]):
+            raise ValueError("{} action out of range: {}".format(name, actions))
+        illegal = np.flatnonzero(~mask[np.arange(len(actions)), actions])
+        if len(illegal):
+            raise ValueError("illegal {} actions at {}".format(name, illegal.tolist()))
+        return actions.tolist()
+
+
+def action_masks(game, player=None) -> ActionMasks:
+    """
+    the legal actions of the units and city tiles of player, by default the player the Game belongs to
+    """
+    if player is None:
+        player = game.id
+    own = game.players[player]
+    opponent = game.players[1 - player]
+    game_map = game.map
+    width, height = game.map_width, game.map_height
+
+    # opponent city tiles and the cells around the map, padded by a cell so every move looks up a cell
+    blocked = np.ones((height + 2, width + 2), dtype=bool)
+    blocked[1:-1, 1:-1] = False
+    for city in opponent.cities.values():
+        for citytile in city.citytiles:
+            blocked[citytile.pos.y + 1, citytile.pos.x + 1] = True
+
+    units = own.units
+    count = len(units)
+    # per unit: x, y, is a worker, can act, cargo, cell has a resource, cell has a road, cell has a city tile
+    values = np.zeros((count, 8), dtype=np.float64)
+    for n, unit in enumerate(units):
+        cell = game_map.get_cell(unit.pos.x, unit.pos.y)
+        cargo = unit.cargo
+        values[n] = (
+            unit.pos.x, unit.pos.y, unit.type == UNIT_TYPES.WORKER, unit.cooldown < 1,
+            cargo.wood + cargo.coal + cargo.uranium, cell.has_resource(), cell.road > 0, cell.citytile is not None,
+        )
+    xs = values[:, 0].astype(np.intp)
+    ys = values[:, 1].astype(np.intp)
+    is_worker = values[:, 2] > 0
+    can_act = values[:, 3] > 0
+    on_resource = values[:, 5] > 0
+    on_road = values[:, 6] > 0
+    on_citytile = values[:, 7] > 0
+    unit_mask = np.zeros((count, len(UNIT_ACTIONS)), dtype=bool)
+    unit_mask[:, NONE] = True
+    for action, _, dx, dy in _MOVES:
+        unit_mask[:, action] = can_act & ~blocked[ys + 1 + dy, xs + 1 + dx]
+    worker_acts = can_act & is_worker
+    unit_mask[:, BUILD_CITY] = worker_acts & ~on_citytile & ~on_resource & (values[:, 4] >= _CITY_BUILD_COST)
+    unit_mask[:, PILLAGE] = worker_acts & on_road & ~on_citytile
+
+    citytiles = [citytile for city in own.cities.values() for citytile in city.citytiles]
+    citytile_xy = np.array([(citytile.pos.x, citytile.pos.y) for citytile in citytiles], dtype=np.intp).reshape(-1, 2)
+    citytile_can_act = np.array([citytile.cooldown < 1 for citytile in citytiles], dtype=bool)
+    units_left = len(citytiles) - count
+    citytile_mask = np.zeros((len(citytiles), len(CITYTILE_ACTIONS)), dtype=bool)
+    citytile_mask[:, NONE] = True
+    citytile_mask[:, RESEARCH] = citytile_can_act
+    citytile_mask[:, BUILD_WORKER] = citytile_can_act & (units_left > 0)
+    citytile_mask[:, BUILD_CART] = citytile_mask[:, BUILD_WORKER]
+    return ActionMasks(units, citytiles, unit_mask, citytile_mask, np.stack([xs, ys], axis=1), citytile_xy,
+                       units_left)
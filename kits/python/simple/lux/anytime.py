@@ -0,0 +1,194 @@
+"""
+Anytime agents for main.py. An agent written as a generator yields better and better action lists while it
+searches, and AnytimeRunner sends the last one it got once the turn's deadline comes, or safe fallback actions
+(research, and no unit moving) if the agent has not yielded any yet. The deadline is kept even when the agent is
+in the middle of a long step: a watchdog thread sends the actions and the agent is stopped at its next yield.
+
+    def agent(observation, configuration):
+        ...update the game state as usual...
+        actions = quick_plan(game_state)
+        yield actions
+        for depth in range(2, 10):
+            actions = deeper_plan(game_state, depth)
+            yield actions
+"""
+import os
+import sys
+import time
+
+from .timing import ACT_TIMEOUT, OVERAGE_TIME, get_timer
+
+# seconds kept back from the turn's budget for the actions to reach the engine
+SAFETY_MARGIN = 0.3
+# the code flag of generator functions, see inspect.isgeneratorfunction
+_CO_GENERATOR = 0x20
+
+
+def is_anytime_agent(agent) -> bool:
+    """
+    whether agent is written as a generator, like inspect.isgeneratorfunction without the cost of importing
+    inspect on the first turn
+    """
+    code = getattr(agent, "__code__", None)
+    return code is not None and bool(code.co_flags & _CO_GENERATOR)
+
+
+def fallback_actions(observation):
+    """
+    research with every city tile of the player that can act and leave the units where they are, read straight
+    from the update lines as the game state may be half updated
+    """
+    player = observation.player
+    actions = []
+    for line in observation["updates"]:
+        if line.startswith("ct "):
+            _, team, _, x, y, cooldown = line.split(" ")
+            if int(team) == player and float(cooldown) < 1:
+                actions.append("r {} {}".format(x, y))
+    return actions
+
+
+class AnytimeRunner:
+    """
+    runs a turn of agent and hands the actions to send to emit(actions), exactly once per turn. Agents that
+    return a list are called as usual.
+
+    Each turn may last act_timeout seconds, less safety_margin, plus overage_share of the time bank left (its
+    estimate from the turns played so far). Turns that overrun are logged with the phase they were in: the phase
+    of the lux.timing timer when LUX_TIMING is on, otherwise whether the agent had yielded actions yet.
+
+    The engine sends the next turn once it has the actions, so after an overrun the next turn's input may come
+    in while the agent is still running. input_ready(timeout), true once input is waiting, is polled meanwhile
+    and the next turn's deadline counts from when it came in. Without it the next turn is taken to start when
+    the late actions were sent, the earliest it can have
+    """
+    def __init__(self, agent, emit, act_timeout=ACT_TIMEOUT, safety_margin=SAFETY_MARGIN, overage_share=0.0,
+                 overage_time=OVERAGE_TIME, fallback=fallback_actions, log=sys.stderr, clock=time.perf_counter,
+                 input_ready=None):
+        self.agent = agent
+        self.emit = emit
+        self.act_timeout = act_timeout
+        self.safety_margin = safety_margin
+        self.overage_share = overage_share
+        self.overage_time = overage_time
+        self.remaining_overage = overage_time
+        self.fallback = fallback
+        self.log = log
+        self.clock = clock
+        self.input_ready = input_ready
+        self.overruns = 0
+        # when the input of the next turn came in, if it did while the agent ran past the last deadline
+        self._next_turn_start = None
+
+    @classmethod
+    def from_environment(cls, agent, emit, environ=None, input_ready=None):
+        """
+        a runner with the budget set by LUX_ACT_TIMEOUT, LUX_SAFETY_MARGIN and LUX_OVERAGE_SHARE where given
+        """
+        environ = os.environ if environ is None else environ
+        return cls(
+            agent, emit,
+            act_timeout=float(environ.get("LUX_ACT_TIMEOUT", ACT_TIMEOUT)),
+            safety_margin=float(environ.get("LUX_SAFETY_MARGIN", SAFETY_MARGIN)),
+            overage_share=float(environ.get("LUX_OVERAGE_SHARE", 0.0)),
+            input_ready=input_ready,
+        )
+
+    def new_match(self):
+        """
+        starts the time bank over, for a process kept for another match
+        """
+        self.remaining_overage = self.overage_time
+        self._next_turn_start = None
+
+    def deadline(self, turn_start) -> float:
+        """
+        when the actions of a turn that started at turn_start are sent at the latest
+        """
+        return turn_start + self.act_timeout - self.safety_margin + self.overage_share * self.remaining_overage
+
+    def run(self, observation, configuration, turn_start=None):
+        """
+        plays one turn, started at turn_start (now by default), and returns the actions that were sent
+        """
+        # imported here, when an anytime agent plays its first turn, rather than by every main.py
+        import threading
+        if turn_start is None:
+            turn_start = self.clock()
+        if self._next_turn_start is not None:
+            # the input of this turn came in while the agent was still running the last one
+            turn_start = min(turn_start, self._next_turn_start)
+            self._next_turn_start = None
+        deadline = self.deadline(turn_start)
+        lock = threading.Lock()
+        finished = threading.Event()
+        # the latest actions of the agent, how many it yielded, what was sent and when, whether it was late and
+        # when the next turn's input came in
+        turn = {"best": None, "yielded": 0, "sent": None, "sent_at": None, "late": False, "input_at": None}
+
+        def send(late):
+            with lock:
+                if turn["sent"] is not None:
+                    return
+                actions = turn["best"] if turn["best"] is not None else self.fallback(observation)
+                turn["sent"] = actions
+                self.emit(actions)
+                turn["sent_at"] = self.clock()
+            if late:
+                turn["late"] = True
+                self._log_overrun(observation, deadline - turn_start, turn["yielded"])
+                self._watch_input(finished, turn)
+
+        watchdog = threading.Timer(max(deadline - self.clock(), 0.0), send, args=(True,))
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            result = self.agent(observation, configuration)
+            if isinstance(result, list):
+                with lock:
+                    turn["best"] = result
+            else:
+                try:
+                    for actions in result:
+                        with lock:
+                            turn["best"] = list(actions)
+                            turn["yielded"] += 1
+                        if self.clock() >= deadline:
+                            break
+                finally:
+                    result.close()
+        finally:
+            finished.set()
+            watchdog.cancel()
+            watchdog.join()
+            send(False)
+        spent = turn["sent_at"] - turn_start
+        if spent > self.act_timeout:
+            self.remaining_overage = max(self.remaining_overage - (spent - self.act_timeout), 0.0)
+        if turn["late"]:
+            self._next_turn_start = turn["input_at"] if self.input_ready is not None else turn["sent_at"]
+        return turn["sent"]
+
+    def _watch_input(self, finished, turn):
+        """
+        notes when the next turn's input comes in, until the agent is done with this one
+        """
+        if self.input_ready is None:
+            return
+        while not finished.is_set():
+            if self.input_ready(0.01):
+                turn["input_at"] = self.clock()
+                return
+
+    def _log_overrun(self, observation, budget, yielded):
+        self.overruns += 1
+        timer = get_timer()
+        if timer is not None and timer.phase is not None:
+            phase = timer.phase
+        elif yielded:
+            phase = "agent, after {} action lists".format(yielded)
+        else:
+            phase = "agent, before its first actions"
+        sent = "its last actions" if yielded else "fallback actions"
+        print("step {}: ran past the {:.2f}s deadline in {}, sent {}".format(
+            observation["step"], budget, phase, sent), file=self.log)
@@ -0,0 +1,201 @@
+import numpy as np
+
+from .constants import Constants
+from .game_map import GameMap, Position, get_position
+from .game_constants import GAME_CONSTANTS
+
+RESOURCE_TYPES = Constants.RESOURCE_TYPES
+
+# integer codes used in the resource type layer, NO_RESOURCE marks cells without a resource
+NO_RESOURCE = -1
+RESOURCE_TYPE_CODES = {
+    RESOURCE_TYPES.WOOD: 0,
+    RESOURCE_TYPES.COAL: 1,
+    RESOURCE_TYPES.URANIUM: 2,
+}
+RESOURCE_CODE_TYPES = [RESOURCE_TYPES.WOOD, RESOURCE_TYPES.COAL, RESOURCE_TYPES.URANIUM]
+# fuel per unit of resource, indexed by resource type code
+FUEL_RATES = np.array([
+    GAME_CONSTANTS["PARAMETERS"]["RESOURCE_TO_FUEL_RATE"]["WOOD"],
+    GAME_CONSTANTS["PARAMETERS"]["RESOURCE_TO_FUEL_RATE"]["COAL"],
+    GAME_CONSTANTS["PARAMETERS"]["RESOURCE_TO_FUEL_RATE"]["URANIUM"],
+], dtype=np.float64)
+
+
+class ResourceView:
+    """
+    Resource backed by the layers of an ArrayGameMap. Writing amount writes through to the map
+    """
+    __slots__ = ("_map", "_y", "_x")
+
+    def __init__(self, game_map, x, y):
+        self._map = game_map
+        self._x = x
+        self._y = y
+
+    @property
+    def type(self) -> str:
+        return RESOURCE_CODE_TYPES[self._map.resource_type[self._y, self._x]]
+
+    @property
+    def amount(self) -> int:
+        return int(self._map.resource_amount[self._y, self._x])
+
+    @amount.setter
+    def amount(self, amount):
+        self._map.resource_amount[self._y, self._x] = amount
+
+
+class CellView:
+    """
+    Cell backed by the layers of an ArrayGameMap. Has the same attributes and methods as Cell
+    """
+    __slots__ = ("_map", "_x", "_y")
+
+    def __init__(self, game_map, x, y):
+        self._map = game_map
+        self._x = x
+        self._y = y
+
+    @property
+    def pos(self) -> Position:
+        return get_position(self._x, self._y)
+
+    @property
+    def resource(self):
+        if self._map.resource_type[self._y, self._x] == NO_RESOURCE:
+            return None
+        return ResourceView(self._map, self._x, self._y)
+
+    @resource.setter
+    def resource(self, resource):
+        if resource is None:
+            self._map.resource_type[self._y, self._x] = NO_RESOURCE
+            self._map.resource_amount[self._y, self._x] = 0
+        else:
+            self._map._setResource(resource.type, self._x, self._y, resource.amount)
+
+    @property
+    def citytile(self):
+        return self._map._citytiles[self._y][self._x]
+
+    @citytile.setter
+    def citytile(self, citytile):
+        self._map._citytiles[self._y][self._x] = citytile
+        self._map.citytile_owner[self._y, self._x] = -1 if citytile is None else citytile.team
+
+    @property
+    def road(self) -> float:
+        return float(self._map.road[self._y, self._x])
+
+    @road.setter
+    def road(self, road):
+        self._map.road[self._y, self._x] = road
+
+    def has_resource(self):
+        return self._map.resource_type[self._y, self._x] != NO_RESOURCE and self._map.resource_amount[self._y, self._x] > 0
+
+
+class ArrayGameMap(GameMap):
+    """
+    GameMap that stores its state as NumPy layers indexed [y, x] instead of a grid of Cell objects.
+
+    resource_type - resource type code per cell, NO_RESOURCE where there is none
+    resource_amount - resource amount per cell
+    citytile_owner - team owning the city tile on each cell, -1 where there is none
+    road - road level per cell
+    unit_count - number of units of each team per cell, indexed [team, y, x]
+
+    get_cell and get_cell_by_pos return lazily created CellView objects that read and write these layers
+    """
+    def __init__(self, width, height):
+        self.height = height
+        self.width = width
+        self.resource_type = np.full((height, width), NO_RESOURCE, dtype=np.int8)
+        self.resource_amount = np.zeros((height, width), dtype=np.int32)
+        self.citytile_owner = np.full((height, width), -1, dtype=np.int8)
+        self.road = np.zeros((height, width), dtype=np.float32)
+        self.unit_count = np.zeros((2, height, width), dtype=np.int16)
+        self._citytiles = [[None] * width for _ in range(height)]
+        self._views = [None] * (width * height)
+
+    @property
+    def map(self):
+        return [[self.get_cell(x, y) for x in range(self.width)] for y in range(self.height)]
+
+    def get_cell_by_pos(self, pos) -> CellView:
+        return self.get_cell(pos.x, pos.y)
+
+    def get_cell(self, x, y) -> CellView:
+        idx = y * self.width + x
+        view = self._views[idx]
+        if view is None:
+            view = CellView(self, x, y)
+            self._views[idx] = view
+        return view
+
+    def _setResource(self, r_type, x, y, amount):
+        """
+        do not use this function, this is for internal tracking of state
+        """
+        self.resource_type[y, x] = RESOURCE_TYPE_CODES[r_type]
+        self.resource_amount[y, x] = amount
+
+    def _set_units(self, players):
+        """
+        do not use this function, this is for internal tracking of state
+        """
+        self.unit_count.fill(0)
+        for player in players:
+            if len(player.units) == 0:
+                continue
+            xs = np.fromiter((unit.pos.x for unit in player.units), dtype=np.intp, count=len(player.units))
+            ys = np.fromiter((unit.pos.y for unit in player.units), dtype=np.intp, count=len(player.units))
+            np.add.at(self.unit_count[player.team], (ys, xs), 1)
+
+    def resource_mask(self, r_type=None) -> np.ndarray:
+        """
+        boolean [y, x] mask of cells holding a non-depleted resource, optionally of a single type
+        """
+        mask = self.resource_amount > 0
+        if r_type is not None:
+            mask &= self.resource_type == RESOURCE_TYPE_CODES[r_type]
+        return mask
+
+    def mineable_mask(self, player) -> np.ndarray:
+        """
+        boolean [y, x] mask of cells holding a resource the given player has researched
+        """
+        mask = self.resource_mask(RESOURCE_TYPES.WOOD)
+        if player.researched_coal():
+            mask |= self.resource_mask(RESOURCE_TYPES.COAL)
+        if player.researched_uranium():
+            mask |= self.resource_mask(RESOURCE_TYPES.URANIUM)
+        return mask
+
+    def mineable_positions(self, player) -> np.ndarray:
+        """
+        (N, 2) array of the x, y coordinates of every cell in mineable_mask(player)
+        """
+        ys, xs = np.nonzero(self.mineable_mask(player))
+        return np.stack([xs, ys], axis=1)
+
+    def fuel_values(self, player=None) -> np.ndarray:
+        """
+        [y, x] array of the fuel each cell's remaining resource converts to. If player is given, cells
+        with resources the player has not researched are 0
+        """
+        has_resource = self.resource_type != NO_RESOURCE
+        rates = np.where(has_resource, FUEL_RATES[np.maximum(self.resource_type, 0)], 0.0)
+        fuel = rates * self.resource_amount
+        if player is not None:
+            fuel[~self.mineable_mask(player)] = 0
+        return fuel
+
+    def citytile_mask(self, team=None) -> np.ndarray:
+        """
+        boolean [y, x] mask of cells with a city tile, optionally only those of the given team
+        """
+        if team is None:
+            return self.citytile_owner >= 0
+        return self.citytile_owner == team
@@ -0,0 +1,279 @@
+"""
+Clusters of resource cells: the connected groups (orthogonally adjacent cells) of each resource type, with their
+total amount, the free cells around them where a city tile can be built and the city tiles of each team close to
+them. ClusterIndex.update(game) keeps them from one turn to the next. Only the cells that changed are looked at
+(game.delta of a Game(incremental=True), or a comparison with the last turn otherwise). A cluster is only
+searched again when one of its cells runs out, and then it may split
+
+    index = ClusterIndex()
+    index.update(game_state)                         # every turn
+    for cluster in index.clusters[Constants.RESOURCE_TYPES.WOOD].values():
+        cluster.amount, cluster.perimeter, cluster.citytiles[player.team]
+"""
+from .constants import Constants
+
+RESOURCE_TYPES = Constants.RESOURCE_TYPES
+# how far from a cluster the city tiles counted in Cluster.citytiles may be, in Manhattan distance
+PRESSURE_RADIUS = 2
+
+_NEIGHBOURS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+
+class Cluster:
+    """
+    a connected group of cells holding the same resource type. cells holds their (x, y) and amount the sum of
+    their resources. perimeter holds the cells next to the cluster where a city tile can be built: in the map,
+    with no resource and no city tile. citytiles[team] counts the city tiles of team within the pressure radius
+    of any of its cells
+    """
+    __slots__ = ("id", "type", "cells", "amount", "perimeter", "citytiles", "_halo")
+
+    def __init__(self, cluster_id, r_type, cells):
+        self.id = cluster_id
+        self.type = r_type
+        self.cells: "set[tuple[int, int]]" = cells
+        self.amount = 0
+        self.perimeter: "set[tuple[int, int]]" = set()
+        self.citytiles = [0, 0]
+        # the cells within the pressure radius, outside the cluster
+        self._halo = set()
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __repr__(self) -> str:
+        return "Cluster({}, {}, {} cells, amount {})".format(self.id, self.type, len(self.cells), self.amount)
+
+
+class ClusterIndex:
+    """
+    the resource clusters of a map by resource type: clusters[r_type] maps cluster ids to Clusters. A cluster
+    keeps its id from turn to turn, and when it splits its largest part keeps it while the others get new ones
+    """
+    def __init__(self, pressure_radius=PRESSURE_RADIUS):
+        self.pressure_radius = pressure_radius
+        self._offsets = [
+            (dx, dy) for dy in range(-pressure_radius, pressure_radius + 1)
+            for dx in range(-pressure_radius, pressure_radius + 1)
+            if 0 < abs(dx) + abs(dy) <= pressure_radius
+        ]
+        self._reset(0, 0)
+
+    def _reset(self, width, height):
+        self.clusters: "dict[str, dict[int, Cluster]]" = {
+            RESOURCE_TYPES.WOOD: {}, RESOURCE_TYPES.COAL: {}, RESOURCE_TYPES.URANIUM: {},
+        }
+        self.width = width
+        self.height = height
+        self.turn = None
+        self._game = None
+        self._next_id = 0
+        # (type, amount) of every cell holding a resource, the team of every city tile and the cluster of every
+        # resource cell
+        self._resources = {}
+        self._citytiles = {}
+        self._cell_clusters = {}
+        # the clusters whose halo holds a cell
+        self._near = {}
+
+    def cluster_at(self, x, y) -> Cluster:
+        """
+        the cluster of the cell, None when it holds no resource
+        """
+        return self._cell_clusters.get((x, y))
+
+    def all_clusters(self):
+        """
+        the clusters of every resource type
+        """
+        return [cluster for clusters in self.clusters.values() for cluster in clusters.values()]
+
+    def update(self, game):
+        """
+        takes in the map of the turn game is at. Incremental Games updated once since the last call are
+        followed through game.delta, any other Game is compared with the last turn cell by cell
+        """
+        if game.map_width != self.width or game.map_height != self.height:
+            self._reset(game.map_width, game.map_height)
+            changed = [(x, y) for y in range(self.height) for x in range(self.width)]
+        elif game.incremental and game.delta is not None and game is self._game and game.turn == self.turn + 1:
+            changed = game.delta.cells_changed
+        else:
+            changed = [(x, y) for y in range(self.height) for x in range(self.width)]
+        self._apply(game.map, changed)
+        self._game = game
+        self.turn = game.turn
+        return self
+
+    # keeping the clusters
+
+    def _apply(self, game_map, changed):
+        resources = self._resources
+        citytiles = self._citytiles
+        cell_clusters = self._cell_clusters
+        depleted = {}
+        appeared = []
+        # cells that became or stopped being a place to build a city tile
+        flipped = []
+        # city tiles ((x, y), team, +1 or -1) that came and went
+        citytile_changes = []
+        for key in changed:
+            cell = game_map.get_cell(key[0], key[1])
+            old = resources.get(key)
+            new = (cell.resource.type, cell.resource.amount) if cell.has_resource() else None
+            if new != old:
+                if old is not None and (new is None or new[0] != old[0]):
+                    cluster = cell_clusters.pop(key)
+                    cluster.amount -= old[1]
+                    cluster.cells.discard(key)
+                    depleted.setdefault(cluster.id, cluster)
+                    old = None
+                if new is None:
+                    del resources[key]
+                    flipped.append(key)
+                elif old is None:
+                    resources[key] = new
+                    appeared.append(key)
+                    flipped.append(key)
+                else:
+                    resources[key] = new
+                    cell_clusters[key].amount += new[1] - old[1]
+            citytile = cell.citytile
+            team = citytile.team if citytile is not None else None
+            old_team = citytiles.get(key)
+            if team != old_team:
+                if old_team is not None:
+                    del citytiles[key]
+                    citytile_changes.append((key, old_team, -1))
+                if team is not None:
+                    citytiles[key] = team
+                    citytile_changes.append((key, team, 1))
+                flipped.append(key)
+
+        recomputed = set()
+        for cluster in depleted.values():
+            recomputed.update(self._split(cluster))
+        for key in appeared:
+            if key in cell_clusters:
+                # already merged into the cluster of an earlier cell
+                continue
+            recomputed.add(self._merge(key))
+        for key, team, change in citytile_changes:
+            for cluster in self._near.get(key, ()):
+                if cluster not in recomputed:
+                    cluster.citytiles[team] += change
+        for key in flipped:
+            for cluster in self._near.get(key, ()):
+                if cluster not in recomputed and self._touches(cluster, key):
+                    if self._buildable(key):
+                        cluster.perimeter.add(key)
+                    else:
+                        cluster.perimeter.discard(key)
+
+    def _buildable(self, key) -> bool:
+        return key not in self._resources and key not in self._citytiles
+
+    @staticmethod
+    def _touches(cluster, key) -> bool:
+        x, y = key
+        cells = cluster.cells
+        return any((x + dx, y + dy) in cells for dx, dy in _NEIGHBOURS)
+
+    def _component(self, start, r_type, allowed=None):
+        """
+        the cells of r_type connected to start, only among allowed when given
+        """
+        resources = self._resources
+        width, height = self.width, self.height
+        cells = {start}
+        stack = [start]
+        while stack:
+            x, y = stack.pop()
+            for dx, dy in _NEIGHBOURS:
+                nx, ny = x + dx, y + dy
+                key = (nx, ny)
+                if key in cells or not (0 <= nx < width and 0 <= ny < height):
+                    continue
+                if allowed is not None:
+                    if key not in allowed:
+                        continue
+                else:
+                    resource = resources.get(key)
+                    if resource is None or resource[0] != r_type:
+                        continue
+                cells.add(key)
+                stack.append(key)
+        return cells
+
+    def _split(self, cluster):
+        """
+        searches a cluster again after some of its cells ran out, returning the clusters it became
+        """
+        self._forget(cluster)
+        remaining = set(cluster.cells)
+        parts = []
+        while remaining:
+            part = self._component(next(iter(remaining)), cluster.type, remaining)
+            remaining -= part
+            parts.append(part)
+        parts.sort(key=len, reverse=True)
+        clusters = self.clusters[cluster.type]
+        del clusters[cluster.id]
+        result = []
+        for n, part in enumerate(parts):
+            result.append(self._add(part, cluster.type, cluster.id if n == 0 else None))
+        return result
+
+    def _merge(self, key):
+        """
+        makes the cluster of a cell that got a resource, taking in the clusters next to it
+        """
+        r_type = self._resources[key][0]
+        cells = self._component(key, r_type)
+        kept = None
+        for other in {self._cell_clusters[cell] for cell in cells if cell in self._cell_clusters}:
+            if kept is None or len(other) > len(kept):
+                kept = other
+            self._forget(other)
+            del self.clusters[r_type][other.id]
+        return self._add(cells, r_type, kept.id if kept is not None else None)
+
+    def _add(self, cells, r_type, cluster_id=None) -> Cluster:
+        if cluster_id is None:
+            cluster_id = self._next_id
+            self._next_id += 1
+        cluster = Cluster(cluster_id, r_type, cells)
+        self.clusters[r_type][cluster_id] = cluster
+        resources = self._resources
+        cell_clusters = self._cell_clusters
+        width, height = self.width, self.height
+        amount = 0
+        halo = cluster._halo
+        for key in cells:
+            cell_clusters[key] = cluster
+            amount += resources[key][1]
+            x, y = key
+            for dx, dy in self._offsets:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height:
+                    halo.add((nx, ny))
+        cluster.amount = amount
+        halo -= cells
+        citytiles = self._citytiles
+        near = self._near
+        for key in halo:
+            near.setdefault(key, set()).add(cluster)
+            team = citytiles.get(key)
+            if team is not None:
+                cluster.citytiles[team] += 1
+            if self._buildable(key) and self._touches(cluster, key):
+                cluster.perimeter.add(key)
+        return cluster
+
+    def _forget(self, cluster):
+        near = self._near
+        for key in cluster._halo:
+            clusters = near[key]
+            clusters.discard(cluster)
+            if not clusters:
+                del near[key]
@@ -0,0 +1,400 @@
+"""
+A compact columnar replay format. Every table of the update lines (resources, units, cities, city tiles and
+roads) is stored as typed NumPy columns holding, for each turn, only the rows that changed since the turn
+before, with the whole table written out every keyframe_interval turns. The columns are stored uncompressed
+in an .npz file that ColumnarReplay maps into memory, so reading a turn copies nothing but the rows it needs
+(requires numpy)
+"""
+import io
+import json
+import mmap
+import struct
+import zipfile
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+from .game import Game
+from .parser import parse_updates
+from .replay import Replay, is_engine_replay, read_engine_replay
+from .sim import _format_number
+
+FORMAT_VERSION = 1
+KEYFRAME_INTERVAL = 32
+RESOURCE_TYPES = ("wood", "coal", "uranium")
+_RESOURCE_CODES = {name: code for code, name in enumerate(RESOURCE_TYPES)}
+
+# the value columns of each table and their types. Every table also has a key column identifying its rows
+# (the position of a resource, city tile or road, the number of a unit or city id) and a removed column
+# marking the rows of a turn that delete a key
+TABLES = {
+    "resources": (("type", np.int8), ("amount", np.int32)),
+    "units": (
+        ("team", np.int8), ("type", np.int8), ("x", np.int16), ("y", np.int16), ("cooldown", np.float64),
+        ("wood", np.int32), ("coal", np.int32), ("uranium", np.int32),
+    ),
+    "cities": (("team", np.int8), ("fuel", np.float64), ("light_upkeep", np.float64)),
+    # rank is the position of the tile in its city's list, which sets the order of the ct lines
+    "citytiles": (("team", np.int8), ("city", np.int32), ("rank", np.int32), ("cooldown", np.float64)),
+    "roads": (("road", np.float64),),
+}
+
+
+def _numeric_id(entity_id: str) -> int:
+    return int(entity_id.split("_")[1])
+
+
+def _table_rows(updates, width, height):
+    """
+    returns {table: {key: values}} for the parsed update lines of one turn
+    """
+    rows = {name: {} for name in TABLES}
+    resources = rows["resources"]
+    for r_type, x, y, amount in updates.resources.rows():
+        resources[x * height + y] = (_RESOURCE_CODES[r_type], amount)
+    units = rows["units"]
+    for u_type, team, unitid, x, y, cooldown, wood, coal, uranium in updates.units.rows():
+        units[_numeric_id(unitid)] = (team, u_type, x, y, cooldown, wood, coal, uranium)
+    cities = rows["cities"]
+    for team, cityid, fuel, light_upkeep in updates.cities.rows():
+        cities[_numeric_id(cityid)] = (team, fuel, light_upkeep)
+    citytiles = rows["citytiles"]
+    ranks = {}
+    for team, cityid, x, y, cooldown in updates.citytiles.rows():
+        city = _numeric_id(cityid)
+        rank = ranks[city] = ranks.get(city, -1) + 1
+        citytiles[y * width + x] = (team, city, rank, cooldown)
+    roads = rows["roads"]
+    for x, y, road in updates.roads.rows():
+        roads[y * width + x] = (road,)
+    return rows
+
+
+class _TableWriter:
+    """
+    collects the rows of one table turn by turn, keeping only the changes between keyframes
+    """
+    def __init__(self, name):
+        self.name = name
+        self.empty = tuple(0 for _ in TABLES[name])
+        self.previous = {}
+        self.keys = []
+        self.removed = []
+        self.values = []
+        self.offsets = [0]
+
+    def add(self, rows, keyframe):
+        previous = self.previous
+        for key in sorted(rows):
+            values = rows[key]
+            if keyframe or previous.get(key) != values:
+                self.keys.append(key)
+                self.removed.append(False)
+                self.values.append(values)
+        if not keyframe:
+            for key in sorted(previous.keys() - rows.keys()):
+                self.keys.append(key)
+                self.removed.append(True)
+                self.values.append(self.empty)
+        self.previous = rows
+        self.offsets.append(len(self.keys))
+
+    def arrays(self):
+        prefix = self.name + "/"
+        arrays = {
+            prefix + "offsets": np.array(self.offsets, dtype=np.int64),
+            prefix + "key": np.array(self.keys, dtype=np.int32),
+            prefix + "removed": np.array(self.removed, dtype=np.bool_),
+        }
+        columns = list(zip(*self.values)) if self.values else [()] * len(TABLES[self.name])
+        for (column, dtype), values in zip(TABLES[self.name], columns):
+            arrays[prefix + column] = np.array(values, dtype=dtype)
+        return arrays
+
+
+def _kaggle_turns(path):
+    """
+    yields (updates, actions) for each step of a Kaggle replay, actions being the commands each team sent in
+    response to those updates
+    """
+    with Replay(path, index_path=False) as replay:
+        header = replay.header
+        width, height = replay.map_size()
+        yield {"source": "kaggle", "width": width, "height": height, "info": header}
+        steps = replay.steps()
+        step = next(steps)
+        for next_step in steps:
+            yield step[0]["observation"]["updates"], [agent["action"] or [] for agent in next_step]
+            step = next_step
+        yield step[0]["observation"]["updates"], [[], []]
+
+
+def _engine_turns(path):
+    """
+    yields (updates, actions) for each turn of a replay written by the engine (src/Replay), by playing its
+    commands again in lux.sim
+    """
+    sim, commands, info = read_engine_replay(path)
+    yield {"source": "engine", "width": sim.width, "height": sim.height, "info": info}
+    for actions in commands:
+        yield sim.to_updates(), actions
+        if sim.step(actions):
+            break
+    yield sim.to_updates(), [[], []]
+
+
+def convert_replay(src, dst, keyframe_interval=KEYFRAME_INTERVAL, compressed=False):
+    """
+    converts the replay at src to the columnar format at dst, an .npz path. src is a Kaggle episode replay
+    (.json or .json.gz) or an engine replay (.json or .luxr). A compressed file is smaller for archiving but
+    is decompressed into memory when opened instead of being mapped
+    """
+    turns = _engine_turns(src) if is_engine_replay(src) else _kaggle_turns(src)
+    meta = next(turns)
+    width, height = meta["width"], meta["height"]
+    tables = {name: _TableWriter(name) for name in TABLES}
+    research_points = []
+    action_bytes = bytearray()
+    action_offsets = [0]
+    action_teams = []
+    action_step_offsets = [0]
+    step = 0
+    for step, (updates, actions) in enumerate(turns):
+        parsed = parse_updates(updates[2:] if step == 0 and meta["source"] == "kaggle" else updates)
+        points = [0, 0]
+        for team, value in parsed.research_points.rows():
+            points[team] = value
+        research_points.append(points)
+        keyframe = step % keyframe_interval == 0
+        for name, rows in _table_rows(parsed, width, height).items():
+            tables[name].add(rows, keyframe)
+        for team, commands in enumerate(actions):
+            for command in commands:
+                action_bytes += command.encode()
+                action_offsets.append(len(action_bytes))
+                action_teams.append(team)
+        action_step_offsets.append(len(action_teams))
+
+    meta.update(format=FORMAT_VERSION, steps=step + 1, keyframe_interval=keyframe_interval)
+    arrays = {
+        "meta": np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+        "research_points": np.array(research_points, dtype=np.int32).reshape(-1, 2),
+        "actions/bytes": np.frombuffer(bytes(action_bytes), dtype=np.uint8),
+        "actions/offsets": np.array(action_offsets, dtype=np.int64),
+        "actions/team": np.array(action_teams, dtype=np.int8),
+        "actions/step_offsets": np.array(action_step_offsets, dtype=np.int64),
+    }
+    for table in tables.values():
+        arrays.update(table.arrays())
+    with open(dst, "wb") as f:
+        (np.savez_compressed if compressed else np.savez)(f, **arrays)
+
+
+def _map_members(f, data):
+    """
+    returns {name: array} for the .npy members of the .npz file f, viewing the stored members in place in data,
+    the mapping of f
+    """
+    arrays = {}
+    with zipfile.ZipFile(f) as archive:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(io.BytesIO(archive.read(info)))
+                continue
+            # the data follows the local header, whose extra field may differ from the central directory's
+            name_length, extra_length = struct.unpack_from("<HH", data, info.header_offset + 26)
+            start = info.header_offset + 30 + name_length + extra_length
+            header = io.BytesIO(data[start:start + 12])
+            version = npy_format.read_magic(header)
+            header_length, = struct.unpack_from("<H" if version == (1, 0) else "<I", data, start + 8)
+            header = io.BytesIO(data[start:start + header_length + 12])
+            npy_format.read_magic(header)
+            if version == (1, 0):
+                shape, fortran_order, dtype = npy_format.read_array_header_1_0(header)
+            else:
+                shape, fortran_order, dtype = npy_format.read_array_header_2_0(header)
+            count = int(np.prod(shape, dtype=np.int64))
+            array = np.frombuffer(data, dtype=dtype, count=count, offset=start + header.tell())
+            arrays[name] = array.reshape(shape, order="F" if fortran_order else "C")
+    return arrays
+
+
+class ColumnarReplay:
+    """
+    A replay in the columnar format of convert_replay, mapped into memory. len(replay) is the number of turns,
+    replay.state(step) returns the tables of a turn as {table: {column: array}}, replay.updates(step) the update
+    lines agents were sent and replay.game(step, player) the Game agent.py held. replay.columns gives the raw
+    columns, read-only views of the file
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.columns = _map_members(self._file, self._data)
+            self.meta = json.loads(self.columns["meta"].tobytes())
+            if self.meta.get("format") != FORMAT_VERSION:
+                raise ValueError("unsupported columnar replay format {}".format(self.meta.get("format")))
+        except Exception:
+            self._file.close()
+            raise
+        self.width = self.meta["width"]
+        self.height = self.meta["height"]
+        self.keyframe_interval = self.meta["keyframe_interval"]
+
+    def __len__(self):
+        return self.meta["steps"]
+
+    def _check_step(self, step):
+        if step < 0:
+            step += len(self)
+        if not 0 <= step < len(self):
+            raise IndexError("step {} out of range for a replay of {} steps".format(step, len(self)))
+        return step
+
+    def table(self, name, step):
+        """
+        the rows of table name at step as {column: array}, sorted by key. Only the turns from the last keyframe
+        up to step are read
+        """
+        step = self._check_step(step)
+        columns = self.columns
+        offsets = columns[name + "/offsets"]
+        keyframe = step - step % self.keyframe_interval
+        start, end = offsets[keyframe], offsets[step + 1]
+        keys = columns[name + "/key"][start:end]
+        # the last row written for each key wins, so look for first occurrences in the reversed rows
+        unique_keys, last = np.unique(keys[::-1], return_index=True)
+        rows = start + len(keys) - 1 - last
+        live = ~columns[name + "/removed"][rows]
+        rows = rows[live]
+        table = {"key": unique_keys[live]}
+        for column, _ in TABLES[name]:
+            table[column] = columns[name + "/" + column][rows]
+        return table
+
+    def state(self, step):
+        """
+        every table at step, plus research_points as a (2,) array
+        """
+        state = {name: self.table(name, step) for name in TABLES}
+        state["research_points"] = self.columns["research_points"][self._check_step(step)]
+        return state
+
+    def history(self, name, start=0, stop=None):
+        """
+        the rows of table name at every step from start up to stop in one set of columns, with a step column
+        added. Rows are sorted by step, then key, so for a whole match this equals concatenating table(name, step)
+        for each step but costs a few array operations instead of a few per step
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        columns = self.columns
+        offsets = columns[name + "/offsets"]
+        keys = columns[name + "/key"]
+        row_steps = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(offsets))
+        # a row holds until its key is written again, or until the next keyframe, which writes every live key
+        ends = (row_steps // self.keyframe_interval + 1) * self.keyframe_interval
+        order = np.lexsort((np.arange(len(keys)), keys))
+        same_key = keys[order[1:]] == keys[order[:-1]]
+        rewritten = order[:-1][same_key]
+        ends[rewritten] = np.minimum(ends[rewritten], row_steps[order[1:][same_key]])
+        begins = np.maximum(row_steps, start)
+        ends = np.minimum(ends, stop)
+        live = np.flatnonzero(~columns[name + "/removed"] & (ends > begins))
+
+        # one copy of each row for every step it holds
+        counts = ends[live] - begins[live]
+        rows = np.repeat(live, counts)
+        firsts = np.cumsum(counts) - counts
+        steps = np.repeat(begins[live], counts) + np.arange(len(rows)) - np.repeat(firsts, counts)
+        order = np.lexsort((keys[rows], steps))
+        rows = rows[order]
+        history = {"step": steps[order], "key": keys[rows]}
+        for column, _ in TABLES[name]:
+            history[column] = columns[name + "/" + column][rows]
+        return history
+
+    def actions(self, step):
+        """
+        the commands each team sent in response to the updates of step
+        """
+        step = self._check_step(step)
+        columns = self.columns
+        first, last = columns["actions/step_offsets"][step:step + 2]
+        offsets = columns["actions/offsets"]
+        data = columns["actions/bytes"]
+        actions = [[], []]
+        for i, team in enumerate(columns["actions/team"][first:last].tolist(), first):
+            actions[team].append(data[offsets[i]:offsets[i + 1]].tobytes().decode())
+        return actions
+
+    def updates(self, step):
+        """
+        the update lines of step in the order the engine sends them, without the id and map size lines of
+        step 0 and without D_DONE
+        """
+        state = self.state(step)
+        width, height = self.width, self.height
+        lines = ["rp {} {}".format(team, points) for team, points in enumerate(state["research_points"].tolist())]
+
+        resources = state["resources"]
+        keys = resources["key"].tolist()
+        for key, r_type, amount in zip(keys, resources["type"].tolist(), resources["amount"].tolist()):
+            lines.append("r {} {} {} {}".format(RESOURCE_TYPES[r_type], key // height, key % height, amount))
+
+        units = state["units"]
+        order = np.argsort(units["team"], kind="stable")
+        for unitid, team, u_type, x, y, cooldown, wood, coal, uranium in zip(*(
+            units[column][order].tolist() for column in ("key", "team", "type", "x", "y", "cooldown", "wood",
+                                                        "coal", "uranium")
+        )):
+            lines.append("u {} {} u_{} {} {} {} {} {} {}".format(
+                u_type, team, unitid, x, y, _format_number(cooldown), wood, coal, uranium))
+
+        cities = state["cities"]
+        for cityid, team, fuel, light_upkeep in zip(*(
+            cities[column].tolist() for column in ("key", "team", "fuel", "light_upkeep")
+        )):
+            lines.append("c {} c_{} {} {}".format(team, cityid, _format_number(fuel), _format_number(light_upkeep)))
+
+        citytiles = state["citytiles"]
+        order = np.lexsort((citytiles["rank"], citytiles["city"]))
+        for key, team, cityid, cooldown in zip(*(
+            citytiles[column][order].tolist() for column in ("key", "team", "city", "cooldown")
+        )):
+            lines.append("ct {} c_{} {} {} {}".format(
+                team, cityid, key % width, key // width, _format_number(cooldown)))
+
+        roads = state["roads"]
+        for key, road in zip(roads["key"].tolist(), roads["road"].tolist()):
+            lines.append("ccd {} {} {}".format(key % width, key // width, _format_number(road)))
+        return lines
+
+    def game(self, step, player=0, **game_options) -> Game:
+        """
+        returns the Game player's agent.py holds at step
+        """
+        step = self._check_step(step)
+        game = Game(**game_options)
+        game._initialize([str(player), "{} {}".format(self.width, self.height)])
+        game.turn = step - 1
+        game._update(self.updates(step))
+        game.id = player
+        return game
+
+    def close(self):
+        # the columns view the mapping, so drop them before closing it
+        self.columns = None
+        try:
+            self._data.close()
+        except BufferError:
+            # arrays handed out still view the file, the mapping is freed with the last of them
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,203 @@
+"""
+Feature planes of a turn for learning agents. FeatureEncoder(layers) writes the chosen layers of a Game, seen by
+the player it belongs to, into a float32 [len(layers), map_size, map_size] buffer that is kept from one turn to
+the next, and encode_batch fills [N, len(layers), map_size, map_size] from many games at once (requires numpy)
+"""
+import numpy as np
+
+from .constants import Constants
+from .game_constants import GAME_CONSTANTS
+
+RESOURCE_TYPES = Constants.RESOURCE_TYPES
+UNIT_TYPES = Constants.UNIT_TYPES
+
+MAP_LAYERS = ("wood", "coal", "uranium", "road", "in_map")
+# the layers of each team, prefixed with own_ for the player's team and opponent_ for the other one. Units on
+# the same cell (inside a city) add up, except unit_cooldown which is the highest of them
+TEAM_LAYERS = (
+    "worker", "cart", "unit_cooldown", "cargo_wood", "cargo_coal", "cargo_uranium",
+    "citytile", "city_fuel", "city_upkeep", "citytile_cooldown", "research_points",
+)
+# the same value on every cell of the map: the turn, 1 at night and how far into the day and night cycle it is
+TURN_LAYERS = ("turn", "night", "cycle_phase")
+LAYERS = MAP_LAYERS + tuple(prefix + layer for prefix in ("own_", "opponent_") for layer in TEAM_LAYERS) + TURN_LAYERS
+
+_RESOURCE_LAYERS = {RESOURCE_TYPES.WOOD: "wood", RESOURCE_TYPES.COAL: "coal", RESOURCE_TYPES.URANIUM: "uranium"}
+_RESOURCE_CODES = (RESOURCE_TYPES.WOOD, RESOURCE_TYPES.COAL, RESOURCE_TYPES.URANIUM)
+
+
+class FeatureEncoder:
+    """
+    writes the layers of a Game, in the order given, as planes indexed [layer, y, x]. Cells outside a map
+    smaller than map_size are 0 in every layer.
+
+    encode(game) and encode_batch(games) write into out when it is given and otherwise into a buffer of the
+    encoder, which the next call reuses, so nothing is allocated from one turn to the next. Maps stored as
+    NumPy arrays (Game(array_map=True)) are copied as arrays instead of cell by cell
+    """
+    def __init__(self, layers=LAYERS, map_size=32, parameters=None):
+        unknown = [layer for layer in layers if layer not in LAYERS]
+        if unknown:
+            raise ValueError("unknown layers {}, expected some of {}".format(unknown, LAYERS))
+        self.layers = tuple(layers)
+        self.map_size = map_size
+        parameters = parameters if parameters is not None else GAME_CONSTANTS["PARAMETERS"]
+        self._day_length = parameters["DAY_LENGTH"]
+        self._cycle_length = parameters["DAY_LENGTH"] + parameters["NIGHT_LENGTH"]
+        channels = {layer: channel for channel, layer in enumerate(self.layers)}
+        self._channels = channels
+        # the channel of each layer, None for those not written, looked up once instead of per cell
+        self._resource_channels = {r_type: channels.get(layer) for r_type, layer in _RESOURCE_LAYERS.items()}
+        self._resource_code_channels = [channels.get(_RESOURCE_LAYERS[r_type]) for r_type in _RESOURCE_CODES]
+        self._team_channels = [
+            [channels.get(prefix + layer) for layer in TEAM_LAYERS] for prefix in ("own_", "opponent_")
+        ]
+        self._planes = None
+        self._buffer = None
+
+    @property
+    def shape(self):
+        return len(self.layers), self.map_size, self.map_size
+
+    def new_buffer(self, batch_size=None) -> np.ndarray:
+        """
+        a zeroed float32 array to encode into, [layer, y, x] or [batch_size, layer, y, x]
+        """
+        shape = self.shape if batch_size is None else (batch_size,) + self.shape
+        return np.zeros(shape, dtype=np.float32)
+
+    def encode(self, game, out=None, player=None) -> np.ndarray:
+        """
+        the layers of game seen by player, by default the player the Game belongs to
+        """
+        if out is None:
+            if self._planes is None:
+                self._planes = self.new_buffer()
+            out = self._planes
+        self.encode_batch([game], out[None], None if player is None else [player])
+        return out
+
+    def encode_batch(self, games, out=None, players=None) -> np.ndarray:
+        """
+        the layers of each of games, [len(games), layer, y, x], each seen by players[i] or by the player its Game
+        belongs to
+        """
+        if out is None:
+            out = self._reuse_buffer(len(games))
+        if out.shape != (len(games),) + self.shape:
+            raise ValueError("out has shape {}, expected {}".format(out.shape, (len(games),) + self.shape))
+        if not out.flags.c_contiguous:
+            raise ValueError("out must be C contiguous")
+        out.fill(0)
+        # cells written once, cells units add to and the unit cooldowns, as flat indices into out
+        set_cells = []
+        set_values = []
+        add_cells = []
+        add_values = []
+        max_cells = []
+        max_values = []
+        for n, game in enumerate(games):
+            if game.map_width > self.map_size or game.map_height > self.map_size:
+                raise ValueError("a {}x{} map does not fit map_size {}".format(
+                    game.map_width, game.map_height, self.map_size))
+            player = game.id if players is None else players[n]
+            plane = n * len(self.layers)
+            self._write_map(game, out[n], plane, set_cells, set_values)
+            self._write_teams(game, player, out[n], plane, set_cells, set_values, add_cells, add_values,
+                              max_cells, max_values)
+            self._write_turn(game, out[n])
+        flat = out.reshape(-1)
+        if set_cells:
+            flat[set_cells] = set_values
+        if add_cells:
+            np.add.at(flat, add_cells, add_values)
+        if max_cells:
+            np.maximum.at(flat, max_cells, max_values)
+        return out
+
+    def _reuse_buffer(self, batch_size):
+        if self._buffer is None or len(self._buffer) != batch_size:
+            self._buffer = self.new_buffer(batch_size)
+        return self._buffer
+
+    def _write_map(self, game, planes, plane, cells, values):
+        channels = self._channels
+        game_map = game.map
+        width, height = game.map_width, game.map_height
+        road_channel = channels.get("road")
+        if channels.get("in_map") is not None:
+            planes[channels["in_map"], :height, :width] = 1
+
+        if hasattr(game_map, "resource_type"):
+            # an ArrayGameMap, whose layers are copied whole
+            for code, channel in enumerate(self._resource_code_channels):
+                if channel is not None:
+                    planes[channel, :height, :width] = np.where(
+                        game_map.resource_type == code, game_map.resource_amount, 0)
+            if road_channel is not None:
+                planes[road_channel, :height, :width] = game_map.road
+            return
+
+        resource_channels = self._resource_channels
+        size = self.map_size
+        road_cell = None if road_channel is None else (plane + road_channel) * size * size
+        for y, row in enumerate(game_map.map):
+            for x, cell in enumerate(row):
+                resource = cell.resource
+                if resource is not None:
+                    channel = resource_channels[resource.type]
+                    if channel is not None:
+                        cells.append(((plane + channel) * size + y) * size + x)
+                        values.append(resource.amount)
+                if road_cell is not None and cell.road:
+                    cells.append(road_cell + y * size + x)
+                    values.append(cell.road)
+
+    def _write_teams(self, game, player, planes, plane, set_cells, set_values, add_cells, add_values, max_cells,
+                     max_values):
+        size = self.map_size
+        area = size * size
+        height, width = game.map_height, game.map_width
+        for team, channels in zip((player, 1 - player), self._team_channels):
+            (worker, cart, unit_cooldown, cargo_wood, cargo_coal, cargo_uranium,
+             citytile_channel, city_fuel, city_upkeep, citytile_cooldown, research_points) = [
+                None if channel is None else (plane + channel) * area for channel in channels
+            ]
+            game_player = game.players[team]
+            for unit in game_player.units:
+                cell = unit.pos.y * size + unit.pos.x
+                unit_type = worker if unit.type == UNIT_TYPES.WORKER else cart
+                if unit_type is not None:
+                    add_cells.append(unit_type + cell)
+                    add_values.append(1)
+                if unit_cooldown is not None:
+                    max_cells.append(unit_cooldown + cell)
+                    max_values.append(unit.cooldown)
+                cargo = unit.cargo
+                for channel, amount in ((cargo_wood, cargo.wood), (cargo_coal, cargo.coal),
+                                        (cargo_uranium, cargo.uranium)):
+                    if channel is not None and amount:
+                        add_cells.append(channel + cell)
+                        add_values.append(amount)
+            for city in game_player.cities.values():
+                for citytile in city.citytiles:
+                    cell = citytile.pos.y * size + citytile.pos.x
+                    for channel, value in ((citytile_channel, 1), (city_fuel, city.fuel),
+                                           (city_upkeep, city.light_upkeep), (citytile_cooldown, citytile.cooldown)):
+                        if channel is not None:
+                            set_cells.append(channel + cell)
+                            set_values.append(value)
+            if research_points is not None:
+                planes[channels[-1], :height, :width] = game_player.research_points
+
+    def _write_turn(self, game, planes):
+        channels = self._channels
+        height, width = game.map_height, game.map_width
+        cycle_turn = game.turn % self._cycle_length
+        for layer, value in (
+            ("turn", game.turn), ("night", cycle_turn >= self._day_length),
+            ("cycle_phase", cycle_turn / self._cycle_length),
+        ):
+            channel = channels.get(layer)
+            if channel is not None:
+                planes[channel, :height, :width] = value
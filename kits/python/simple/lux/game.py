@@ -1,3 +1,5 @@
+import sys
+
 from .constants import Constants
 from .game_map import GameMap
 from .game_objects import Player, Unit, City, CityTile
@@ -5,7 +7,59 @@ from .game_objects import Player, Unit, City, CityTile
 INPUT_CONSTANTS = Constants.INPUT_CONSTANTS
 
 
+def _get_timer():
+    """
+    the TurnTimer installed by main.py, see lux/timing.py. A timer can only be installed once lux.timing has been
+    imported, so Games used without one never import it
+    """
+    timing = sys.modules.get(__package__ + ".timing")
+    return timing.get_timer() if timing is not None else None
+
+
+class GameDelta:
+    """
+    What changed during the last incremental update. Cells and city tiles are keyed by (x, y),
+    units by unit id and cities by city id
+    """
+    def __init__(self):
+        self.cells_changed = set()
+        self.units_added = set()
+        self.units_changed = set()
+        self.units_removed = set()
+        self.cities_added = set()
+        self.cities_changed = set()
+        self.cities_removed = set()
+        self.citytiles_added = set()
+        self.citytiles_changed = set()
+        self.citytiles_removed = set()
+
+    def is_empty(self) -> bool:
+        return not (
+            self.cells_changed
+            or self.units_added or self.units_changed or self.units_removed
+            or self.cities_added or self.cities_changed or self.cities_removed
+            or self.citytiles_added or self.citytiles_changed or self.citytiles_removed
+        )
+
+
 class Game:
+    def __init__(self, incremental=False, array_map=False):
+        """
+        if incremental is True, _update patches the existing map, units and cities in place instead of
+        rebuilding them every turn and records what changed in self.delta
+
+        if array_map is True, the map is an ArrayGameMap backed by NumPy arrays (requires numpy)
+        """
+        self.incremental = incremental
+        self.array_map = array_map
+        self.delta: GameDelta = None
+
+    def _new_map(self):
+        if self.array_map:
+            from .array_map import ArrayGameMap
+            return ArrayGameMap(self.map_width, self.map_height)
+        return GameMap(self.map_width, self.map_height)
+
     def _initialize(self, messages):
         """
         initialize state
@@ -16,8 +70,13 @@ class Game:
         mapInfo = messages[1].split(" ")
         self.map_width = int(mapInfo[0])
         self.map_height = int(mapInfo[1])
-        self.map = GameMap(self.map_width, self.map_height)
+        self.map = self._new_map()
         self.players = [Player(0), Player(1)]
+        # entities and cells tracked across turns by the incremental update
+        self._units = {}
+        self._citytiles = {}
+        self._resource_cells = set()
+        self._road_cells = set()
 
     def _end_turn(self):
         print("D_FINISH")
@@ -34,53 +93,167 @@ class Game:
         """
         update state
         """
-        self.map = GameMap(self.map_width, self.map_height)
+        from .parser import parse_updates
+        timer = _get_timer()
+        if timer is None:
+            self._apply_updates(parse_updates(messages))
+            return
+        previous = timer.begin("update")
+        self._apply_updates(parse_updates(messages))
+        timer.begin(previous)
+
+    def _update_from_state(self, state):
+        """
+        update state from the engine's SerializedState or a lux.sim SimGame instead of the update lines of the
+        turn, with the same result (see lux/state.py)
+        """
+        from .state import state_updates
+        timer = _get_timer()
+        if timer is None:
+            self._apply_updates(state_updates(state))
+            return
+        previous = timer.begin("update")
+        self._apply_updates(state_updates(state))
+        timer.begin(previous)
+
+    def _apply_updates(self, updates: "ParsedUpdates"):
+        """
+        update state from the parsed update lines of a turn
+        """
+        if self.incremental:
+            self._apply_updates_incremental(updates)
+            return
+        self.map = self._new_map()
         self.turn += 1
         self._reset_player_states()
+        players = self.players
+        game_map = self.map
+
+        for team, points in updates.research_points.rows():
+            players[team].research_points = points
+        for r_type, x, y, amt in updates.resources.rows():
+            game_map._setResource(r_type, x, y, amt)
+        for unittype, team, unitid, x, y, cooldown, wood, coal, uranium in updates.units.rows():
+            players[team].units.append(Unit(team, unittype, unitid, x, y, cooldown, wood, coal, uranium))
+        for team, cityid, fuel, lightupkeep in updates.cities.rows():
+            players[team].cities[cityid] = City(team, cityid, fuel, lightupkeep)
+        for team, cityid, x, y, cooldown in updates.citytiles.rows():
+            city = players[team].cities[cityid]
+            citytile = city._add_city_tile(x, y, cooldown)
+            game_map.get_cell(x, y).citytile = citytile
+            players[team].city_tile_count += 1
+        for x, y, road in updates.roads.rows():
+            game_map.get_cell(x, y).road = road
+        if self.array_map:
+            game_map._set_units(players)
 
-        for update in messages:
-            if update == "D_DONE":
-                break
-            strs = update.split(" ")
-            input_identifier = strs[0]
-            if input_identifier == INPUT_CONSTANTS.RESEARCH_POINTS:
-                team = int(strs[1])
-                self.players[team].research_points = int(strs[2])
-            elif input_identifier == INPUT_CONSTANTS.RESOURCES:
-                r_type = strs[1]
-                x = int(strs[2])
-                y = int(strs[3])
-                amt = int(float(strs[4]))
-                self.map._setResource(r_type, x, y, amt)
-            elif input_identifier == INPUT_CONSTANTS.UNITS:
-                unittype = int(strs[1])
-                team = int(strs[2])
-                unitid = strs[3]
-                x = int(strs[4])
-                y = int(strs[5])
-                cooldown = float(strs[6])
-                wood = int(strs[7])
-                coal = int(strs[8])
-                uranium = int(strs[9])
-                self.players[team].units.append(Unit(team, unittype, unitid, x, y, cooldown, wood, coal, uranium))
-            elif input_identifier == INPUT_CONSTANTS.CITY:
-                team = int(strs[1])
-                cityid = strs[2]
-                fuel = float(strs[3])
-                lightupkeep = float(strs[4])
-                self.players[team].cities[cityid] = City(team, cityid, fuel, lightupkeep)
-            elif input_identifier == INPUT_CONSTANTS.CITY_TILES:
-                team = int(strs[1])
-                cityid = strs[2]
-                x = int(strs[3])
-                y = int(strs[4])
-                cooldown = float(strs[5])
-                city = self.players[team].cities[cityid]
+    def _apply_updates_incremental(self, updates: "ParsedUpdates"):
+        """
+        update state in place, reusing the map, units, cities and city tiles of the previous turn
+        """
+        self.turn += 1
+        delta = GameDelta()
+        players = self.players
+        game_map = self.map
+        seen_resources = set()
+        seen_roads = set()
+        seen_units = set()
+        seen_cities = set()
+        seen_citytiles = set()
+        for player in players:
+            player.units = []
+            player.city_tile_count = 0
+
+        for team, points in updates.research_points.rows():
+            players[team].research_points = points
+        for r_type, x, y, amt in updates.resources.rows():
+            key = (x, y)
+            seen_resources.add(key)
+            resource = game_map.get_cell(x, y).resource
+            if resource is None or resource.type != r_type:
+                game_map._setResource(r_type, x, y, amt)
+                delta.cells_changed.add(key)
+            elif resource.amount != amt:
+                resource.amount = amt
+                delta.cells_changed.add(key)
+        for unittype, team, unitid, x, y, cooldown, wood, coal, uranium in updates.units.rows():
+            unit = self._units.get(unitid)
+            if unit is None:
+                unit = Unit(team, unittype, unitid, x, y, cooldown, wood, coal, uranium)
+                self._units[unitid] = unit
+                delta.units_added.add(unitid)
+            elif unit._update(x, y, cooldown, wood, coal, uranium):
+                delta.units_changed.add(unitid)
+            seen_units.add(unitid)
+            players[team].units.append(unit)
+        for team, cityid, fuel, lightupkeep in updates.cities.rows():
+            cities = players[team].cities
+            city = cities.get(cityid)
+            if city is None:
+                cities[cityid] = City(team, cityid, fuel, lightupkeep)
+                delta.cities_added.add(cityid)
+            else:
+                if city.fuel != fuel or city.light_upkeep != lightupkeep:
+                    city.fuel = fuel
+                    city.light_upkeep = lightupkeep
+                    delta.cities_changed.add(cityid)
+                city.citytiles = []
+            seen_cities.add(cityid)
+        for team, cityid, x, y, cooldown in updates.citytiles.rows():
+            key = (x, y)
+            city = players[team].cities[cityid]
+            citytile = self._citytiles.get(key)
+            if citytile is None or citytile.team != team:
                 citytile = city._add_city_tile(x, y, cooldown)
-                self.map.get_cell(x, y).citytile = citytile
-                self.players[team].city_tile_count += 1;
-            elif input_identifier == INPUT_CONSTANTS.ROADS:
-                x = int(strs[1])
-                y = int(strs[2])
-                road = float(strs[3])
-                self.map.get_cell(x, y).road = road
+                self._citytiles[key] = citytile
+                game_map.get_cell(x, y).citytile = citytile
+                delta.citytiles_added.add(key)
+                delta.cells_changed.add(key)
+                delta.cities_changed.add(cityid)
+            else:
+                if citytile.cityid != cityid:
+                    # cities merged, both the absorbed and the absorbing city changed
+                    delta.cities_changed.add(citytile.cityid)
+                    delta.cities_changed.add(cityid)
+                    citytile.cityid = cityid
+                if citytile.cooldown != cooldown:
+                    citytile.cooldown = cooldown
+                    delta.citytiles_changed.add(key)
+                city.citytiles.append(citytile)
+            seen_citytiles.add(key)
+            players[team].city_tile_count += 1
+        for x, y, road in updates.roads.rows():
+            key = (x, y)
+            seen_roads.add(key)
+            cell = game_map.get_cell(x, y)
+            if cell.road != road:
+                cell.road = road
+                delta.cells_changed.add(key)
+
+        # anything not sent this turn no longer exists
+        for x, y in self._resource_cells - seen_resources:
+            game_map.get_cell(x, y).resource = None
+            delta.cells_changed.add((x, y))
+        for x, y in self._road_cells - seen_roads:
+            game_map.get_cell(x, y).road = 0
+            delta.cells_changed.add((x, y))
+        for key in self._citytiles.keys() - seen_citytiles:
+            del self._citytiles[key]
+            game_map.get_cell(key[0], key[1]).citytile = None
+            delta.citytiles_removed.add(key)
+            delta.cells_changed.add(key)
+        for unitid in self._units.keys() - seen_units:
+            del self._units[unitid]
+            delta.units_removed.add(unitid)
+        for player in players:
+            for cityid in player.cities.keys() - seen_cities:
+                del player.cities[cityid]
+                delta.cities_removed.add(cityid)
+        delta.cities_changed -= delta.cities_added
+        delta.cities_changed -= delta.cities_removed
+
+        self._resource_cells = seen_resources
+        self._road_cells = seen_roads
+        self.delta = delta
+        if self.array_map:
+            game_map._set_units(players)
@@ -1,6 +1,14 @@
-import json
-from os import path
-dir_path = path.dirname(__file__)
-constants_path = path.abspath(path.join(dir_path, "game_constants.json"))
-with open(constants_path) as f:
-    GAME_CONSTANTS = json.load(f)
\ No newline at end of file
+"""
+GAME_CONSTANTS, the contents of game_constants.json. They come from lux/frozen_constants.py, generated from the
+JSON by tools/freeze_kit.py, so that starting an agent does not read and parse JSON. The JSON is still read if
+the frozen module is missing
+"""
+try:
+    from .frozen_constants import GAME_CONSTANTS
+except ImportError:
+    import json
+    from os import path
+    dir_path = path.dirname(__file__)
+    constants_path = path.abspath(path.join(dir_path, "game_constants.json"))
+    with open(constants_path) as f:
+        GAME_CONSTANTS = json.load(f)
@@ -1,21 +1,28 @@
 import math
-from typing import List
 
 from .constants import Constants
 
 DIRECTIONS = Constants.DIRECTIONS
 RESOURCE_TYPES = Constants.RESOURCE_TYPES
 
+# get_position interns the positions of every cell of the largest map and one step beyond its edges
+_INTERN_MIN = -1
+_INTERN_SIZE = 32 + 2
+
 
 class Resource:
+    __slots__ = ("type", "amount")
+
     def __init__(self, r_type: str, amount: int):
         self.type = r_type
         self.amount = amount
 
 
 class Cell:
+    __slots__ = ("pos", "resource", "citytile", "road")
+
     def __init__(self, x, y):
-        self.pos = Position(x, y)
+        self.pos = get_position(x, y)
         self.resource: Resource = None
         self.citytile = None
         self.road = 0
@@ -27,7 +34,7 @@ class GameMap:
     def __init__(self, width, height):
         self.height = height
         self.width = width
-        self.map: List[List[Cell]] = [None] * height
+        self.map: "list[list[Cell]]" = [None] * height
         for y in range(0, self.height):
             self.map[y] = [None] * width
             for x in range(0, self.width):
@@ -39,6 +46,29 @@ class GameMap:
     def get_cell(self, x, y) -> Cell:
         return self.map[y][x]
 
+    def resource_index(self, player=None, r_type=None) -> "SpatialIndex":
+        """
+        returns a SpatialIndex of the cells holding a resource, limited to the resources the given player has
+        researched and/or to a single resource type. Build it once per turn and query it for every unit
+        """
+        from .spatial import SpatialIndex
+        index = SpatialIndex(self.width, self.height)
+        for y in range(self.height):
+            for x in range(self.width):
+                cell = self.get_cell(x, y)
+                if not cell.has_resource():
+                    continue
+                resource_type = cell.resource.type
+                if r_type is not None and resource_type != r_type:
+                    continue
+                if player is not None:
+                    if resource_type == RESOURCE_TYPES.COAL and not player.researched_coal():
+                        continue
+                    if resource_type == RESOURCE_TYPES.URANIUM and not player.researched_uranium():
+                        continue
+                index.add(x, y, cell)
+        return index
+
     def _setResource(self, r_type, x, y, amount):
         """
         do not use this function, this is for internal tracking of state
@@ -48,9 +78,26 @@ class GameMap:
 
 
 class Position:
+    """
+    a map coordinate. Positions compare and hash by value, so they can be used as dict keys and in sets.
+    The kit shares one Position per coordinate (see get_position), so they are immutable: use translate or
+    get_position for another coordinate
+    """
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y):
-        self.x = x
-        self.y = y
+        object.__setattr__(self, "x", x)
+        object.__setattr__(self, "y", y)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Position is immutable, it may be shared by other cells and units")
+
+    def __delattr__(self, name):
+        raise AttributeError("Position is immutable, it may be shared by other cells and units")
+
+    def __reduce__(self):
+        # copy and pickle would otherwise restore the slots through __setattr__
+        return Position, (self.x, self.y)
 
     def __sub__(self, pos) -> int:
         return abs(pos.x - self.x) + abs(pos.y - self.y)
@@ -65,36 +112,35 @@ class Position:
         return (self - pos) <= 1
 
     def __eq__(self, pos) -> bool:
+        if not isinstance(pos, Position):
+            return NotImplemented
         return self.x == pos.x and self.y == pos.y
 
+    def __hash__(self) -> int:
+        return hash((self.x, self.y))
+
     def equals(self, pos):
         return self == pos
 
     def translate(self, direction, units) -> 'Position':
         if direction == DIRECTIONS.NORTH:
-            return Position(self.x, self.y - units)
+            return get_position(self.x, self.y - units)
         elif direction == DIRECTIONS.EAST:
-            return Position(self.x + units, self.y)
+            return get_position(self.x + units, self.y)
         elif direction == DIRECTIONS.SOUTH:
-            return Position(self.x, self.y + units)
+            return get_position(self.x, self.y + units)
         elif direction == DIRECTIONS.WEST:
-            return Position(self.x - units, self.y)
+            return get_position(self.x - units, self.y)
         elif direction == DIRECTIONS.CENTER:
-            return Position(self.x, self.y)
+            return get_position(self.x, self.y)
 
     def direction_to(self, target_pos: 'Position') -> DIRECTIONS:
         """
         Return closest position to target_pos from this position
         """
-        check_dirs = [
-            DIRECTIONS.NORTH,
-            DIRECTIONS.EAST,
-            DIRECTIONS.SOUTH,
-            DIRECTIONS.WEST,
-        ]
         closest_dist = self.distance_to(target_pos)
         closest_dir = DIRECTIONS.CENTER
-        for direction in check_dirs:
+        for direction in _CHECK_DIRS:
             newpos = self.translate(direction, 1)
             dist = target_pos.distance_to(newpos)
             if dist < closest_dist:
@@ -104,3 +150,22 @@ class Position:
 
     def __str__(self) -> str:
         return f"({self.x}, {self.y})"
+
+
+_CHECK_DIRS = (DIRECTIONS.NORTH, DIRECTIONS.EAST, DIRECTIONS.SOUTH, DIRECTIONS.WEST)
+_POSITIONS = [
+    Position(x, y)
+    for y in range(_INTERN_MIN, _INTERN_MIN + _INTERN_SIZE) for x in range(_INTERN_MIN, _INTERN_MIN + _INTERN_SIZE)
+]
+
+
+def get_position(x, y) -> Position:
+    """
+    returns the shared Position of (x, y). Cells, units, city tiles and translate all use these, so a turn does
+    not allocate a new Position per coordinate. Coordinates far outside the map get a new Position
+    """
+    i = x - _INTERN_MIN
+    j = y - _INTERN_MIN
+    if 0 <= i < _INTERN_SIZE and 0 <= j < _INTERN_SIZE:
+        return _POSITIONS[j * _INTERN_SIZE + i]
+    return Position(x, y)
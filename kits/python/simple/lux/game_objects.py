@@ -1,26 +1,55 @@
-from typing import Dict
-
 from .constants import Constants
-from .game_map import Position
+from .game_map import get_position
 from .game_constants import GAME_CONSTANTS
 
 UNIT_TYPES = Constants.UNIT_TYPES
 
+# looked up once instead of on every call of the accessors below
+_PARAMETERS = GAME_CONSTANTS["PARAMETERS"]
+_COAL_RESEARCH = _PARAMETERS["RESEARCH_REQUIREMENTS"]["COAL"]
+_URANIUM_RESEARCH = _PARAMETERS["RESEARCH_REQUIREMENTS"]["URANIUM"]
+_WORKER_CAPACITY = _PARAMETERS["RESOURCE_CAPACITY"]["WORKER"]
+_CART_CAPACITY = _PARAMETERS["RESOURCE_CAPACITY"]["CART"]
+_CITY_BUILD_COST = _PARAMETERS["CITY_BUILD_COST"]
+
 
 class Player:
+    __slots__ = ("team", "research_points", "units", "cities", "city_tile_count")
+
     def __init__(self, team):
         self.team = team
         self.research_points = 0
         self.units: list[Unit] = []
-        self.cities: Dict[str, City] = {}
+        self.cities: "dict[str, City]" = {}
         self.city_tile_count = 0
     def researched_coal(self) -> bool:
-        return self.research_points >= GAME_CONSTANTS["PARAMETERS"]["RESEARCH_REQUIREMENTS"]["COAL"]
+        return self.research_points >= _COAL_RESEARCH
     def researched_uranium(self) -> bool:
-        return self.research_points >= GAME_CONSTANTS["PARAMETERS"]["RESEARCH_REQUIREMENTS"]["URANIUM"]
+        return self.research_points >= _URANIUM_RESEARCH
+    def citytile_index(self, game_map) -> "SpatialIndex":
+        """
+        returns a SpatialIndex of this player's city tiles
+        """
+        from .spatial import SpatialIndex
+        index = SpatialIndex(game_map.width, game_map.height)
+        for city in self.cities.values():
+            for citytile in city.citytiles:
+                index.add(citytile.pos.x, citytile.pos.y, citytile)
+        return index
+    def unit_index(self, game_map) -> "SpatialIndex":
+        """
+        returns a SpatialIndex of this player's units
+        """
+        from .spatial import SpatialIndex
+        index = SpatialIndex(game_map.width, game_map.height)
+        for unit in self.units:
+            index.add(unit.pos.x, unit.pos.y, unit)
+        return index
 
 
 class City:
+    __slots__ = ("cityid", "team", "fuel", "citytiles", "light_upkeep")
+
     def __init__(self, teamid, cityid, fuel, light_upkeep):
         self.cityid = cityid
         self.team = teamid
@@ -36,10 +65,12 @@ class City:
 
 
 class CityTile:
+    __slots__ = ("cityid", "team", "pos", "cooldown")
+
     def __init__(self, teamid, cityid, x, y, cooldown):
         self.cityid = cityid
         self.team = teamid
-        self.pos = Position(x, y)
+        self.pos = get_position(x, y)
         self.cooldown = cooldown
     def can_act(self) -> bool:
         """
@@ -64,26 +95,45 @@ class CityTile:
 
 
 class Cargo:
-    def __init__(self):
-        self.wood = 0
-        self.coal = 0
-        self.uranium = 0
+    __slots__ = ("wood", "coal", "uranium")
+
+    def __init__(self, wood=0, coal=0, uranium=0):
+        self.wood = wood
+        self.coal = coal
+        self.uranium = uranium
 
     def __str__(self) -> str:
         return f"Cargo | Wood: {self.wood}, Coal: {self.coal}, Uranium: {self.uranium}"
 
 
 class Unit:
+    __slots__ = ("pos", "team", "id", "type", "cooldown", "cargo")
+
     def __init__(self, teamid, u_type, unitid, x, y, cooldown, wood, coal, uranium):
-        self.pos = Position(x, y)
+        self.pos = get_position(x, y)
         self.team = teamid
         self.id = unitid
         self.type = u_type
         self.cooldown = cooldown
-        self.cargo = Cargo()
-        self.cargo.wood = wood
-        self.cargo.coal = coal
-        self.cargo.uranium = uranium
+        self.cargo = Cargo(wood, coal, uranium)
+    def _update(self, x, y, cooldown, wood, coal, uranium) -> bool:
+        """
+        do not use this function, this is for internal tracking of state. Returns whether anything changed
+        """
+        cargo = self.cargo
+        if (
+            self.pos.x == x and self.pos.y == y and self.cooldown == cooldown
+            and cargo.wood == wood and cargo.coal == coal and cargo.uranium == uranium
+        ):
+            return False
+        if self.pos.x != x or self.pos.y != y:
+            self.pos = get_position(x, y)
+        self.cooldown = cooldown
+        cargo.wood = wood
+        cargo.coal = coal
+        cargo.uranium = uranium
+        return True
+
     def is_worker(self) -> bool:
         return self.type == UNIT_TYPES.WORKER
 
@@ -94,18 +144,20 @@ class Unit:
         """
         get cargo space left in this unit
         """
-        spaceused = self.cargo.wood + self.cargo.coal + self.cargo.uranium
+        cargo = self.cargo
+        spaceused = cargo.wood + cargo.coal + cargo.uranium
         if self.type == UNIT_TYPES.WORKER:
-            return GAME_CONSTANTS["PARAMETERS"]["RESOURCE_CAPACITY"]["WORKER"] - spaceused
+            return _WORKER_CAPACITY - spaceused
         else:
-            return GAME_CONSTANTS["PARAMETERS"]["RESOURCE_CAPACITY"]["CART"] - spaceused
+            return _CART_CAPACITY - spaceused
     
     def can_build(self, game_map) -> bool:
         """
         whether or not the unit can build where it is right now
         """
         cell = game_map.get_cell_by_pos(self.pos)
-        if not cell.has_resource() and self.can_act() and (self.cargo.wood + self.cargo.coal + self.cargo.uranium) >= GAME_CONSTANTS["PARAMETERS"]["CITY_BUILD_COST"]:
+        cargo = self.cargo
+        if not cell.has_resource() and self.can_act() and (cargo.wood + cargo.coal + cargo.uranium) >= _CITY_BUILD_COST:
             return True
         return False
 
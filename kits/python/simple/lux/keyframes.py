@@ -0,0 +1,160 @@
+"""
+Seeking to any turn of a match recorded as its seed and the commands of each turn, the way the engine's
+replays and src/bin/converter.ts work, without playing the whole match again. The SimGame of every
+keyframe_interval-th turn is kept, in memory with an LRU and optionally on disk, so reaching a turn costs at
+most keyframe_interval - 1 steps of lux.sim once the keyframes before it exist
+"""
+import hashlib
+import json
+import os
+import pickle
+from collections import OrderedDict
+
+from .game import Game
+from .mapgen import generate_map
+from .replay import Replay, read_engine_replay
+from .sim import SimGame
+
+KEYFRAME_INTERVAL = 32
+CACHE_SIZE = 16
+
+
+class KeyframeIndex:
+    """
+    The states of a match, reachable in any order. len(index) is the number of turns, index.sim(step) returns a
+    SimGame of the turn (a copy the caller may change), index.game(step, player) the Game player's agent.py
+    held and index.updates(step) the update lines.
+
+    commands[t] holds the commands of each team in response to turn t. Up to cache_size keyframes are kept in
+    memory; with cache_dir set every keyframe is also pickled there and reused by later indexes of the same match
+    """
+    def __init__(self, initial: SimGame, commands, keyframe_interval=KEYFRAME_INTERVAL, cache_size=CACHE_SIZE,
+                 cache_dir=None):
+        self.initial = initial.copy()
+        self.commands = [[list(team_commands) for team_commands in turn] for turn in commands]
+        self.keyframe_interval = keyframe_interval
+        self.cache_size = cache_size
+        self.cache_dir = cache_dir
+        self.keyframes = OrderedDict()
+        # steps of lux.sim run so far, to see what seeking costs
+        self.steps_simulated = 0
+        # the state last returned, so scrubbing forward a few turns continues from it
+        self._cursor = None
+        self._key = None
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            fingerprint = json.dumps([
+                initial.width, initial.height, initial.to_updates(), initial.global_unit_id_count,
+                initial.global_city_id_count, self.commands,
+            ])
+            self._key = hashlib.sha1(fingerprint.encode()).hexdigest()[:16]
+
+    @classmethod
+    def from_engine_replay(cls, path, **options):
+        """
+        an index over a replay written by the engine (.json or .luxr)
+        """
+        initial, commands, _ = read_engine_replay(path)
+        return cls(initial, commands, **options)
+
+    @classmethod
+    def from_kaggle_replay(cls, path, **options):
+        """
+        an index over a Kaggle replay, played again from its seed and actions. The replay already holds the
+        updates of every turn (see lux.replay), this gives the full SimGame of any turn
+        """
+        with Replay(path, index_path=False) as replay:
+            configuration = replay.header["configuration"]
+            width, height = replay.map_size()
+            initial = generate_map(configuration["seed"], width, height)
+            commands = [replay.actions(step) for step in range(1, len(replay))]
+        return cls(initial, commands, **options)
+
+    def __len__(self):
+        return len(self.commands) + 1
+
+    def _keyframe_path(self, step):
+        return os.path.join(self.cache_dir, "{}_{}.pickle".format(self._key, step))
+
+    def _cached_keyframe(self, step):
+        if step == 0:
+            return self.initial
+        sim = self.keyframes.get(step)
+        if sim is not None:
+            self.keyframes.move_to_end(step)
+            return sim
+        if self.cache_dir is not None:
+            try:
+                with open(self._keyframe_path(step), "rb") as f:
+                    sim = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                return None
+            self._remember(step, sim, save=False)
+        return sim
+
+    def _remember(self, step, sim, save=True):
+        self.keyframes[step] = sim
+        self.keyframes.move_to_end(step)
+        while len(self.keyframes) > self.cache_size:
+            self.keyframes.popitem(last=False)
+        path = self._keyframe_path(step) if save and self.cache_dir is not None else None
+        if path is not None and not os.path.exists(path):
+            # written whole under a temporary name so an interrupted write is never read back
+            with open(path + ".tmp", "wb") as f:
+                pickle.dump(sim, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + ".tmp", path)
+
+    def _advance(self, sim, start, stop):
+        """
+        steps sim from turn start to turn stop, keeping the keyframes it passes
+        """
+        for step in range(start, stop):
+            sim.step(self.commands[step])
+            self.steps_simulated += 1
+            if (step + 1) % self.keyframe_interval == 0 and step + 1 not in self.keyframes:
+                self._remember(step + 1, sim.copy())
+        return sim
+
+    def _state(self, step):
+        """
+        the state of step, shared with the index: callers copy it before handing it out
+        """
+        if step < 0:
+            step += len(self)
+        if not 0 <= step < len(self):
+            raise IndexError("step {} out of range for a match of {} turns".format(step, len(self)))
+        keyframe = step - step % self.keyframe_interval
+        cursor = self._cursor
+        if cursor is not None and keyframe <= cursor[0] <= step:
+            start, sim = cursor
+        else:
+            # the nearest keyframe at or before step that exists, keyframe 0 being the initial state
+            start = keyframe
+            sim = self._cached_keyframe(start)
+            while sim is None:
+                start -= self.keyframe_interval
+                sim = self._cached_keyframe(start)
+            sim = sim.copy()
+        self._cursor = (step, self._advance(sim, start, step))
+        return sim
+
+    def sim(self, step) -> SimGame:
+        return self._state(step).copy()
+
+    def updates(self, step):
+        """
+        the update lines of step, without the id and map size lines of step 0 and without D_DONE
+        """
+        return self._state(step).to_updates()
+
+    def game(self, step, player=0, **game_options) -> Game:
+        """
+        returns the Game player's agent.py holds at step
+        """
+        return self._state(step).to_game(player, **game_options)
+
+    def warm(self):
+        """
+        plays the whole match once so every keyframe exists, after which any turn is a short seek away
+        """
+        self._state(len(self) - 1)
@@ -0,0 +1,311 @@
+"""
+A port of the engine's random map generation (src/Game/gen.ts) together with the seedrandom ARC4 generator it
+draws from, so generate_map(seed) lays out the same resources, workers and city tiles as a match started with
+that seed
+"""
+import math
+
+from .constants import Constants
+from .sim import SimGame
+
+RESOURCE_TYPES = Constants.RESOURCE_TYPES
+
+MAP_SIZES = (12, 16, 24, 32)
+# the neighbourhood walked by the cellular automaton, the perturbation and the wood placed around spawns
+MOVE_DELTAS = ((0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (1, 1))
+HORIZONTAL = 0
+VERTICAL = 1
+
+_WIDTH = 256
+_MASK = 255
+_START_DENOM = float(2 ** 48)
+_SIGNIFICANCE = float(2 ** 52)
+_OVERFLOW = float(2 ** 53)
+
+
+def _js_sign(value):
+    return (value > 0) - (value < 0)
+
+
+def _mix_key(seed: str):
+    """
+    the ARC4 key seedrandom derives from a string seed
+    """
+    key = []
+    smear = 0
+    for j, char in enumerate(seed):
+        if (j & _MASK) < len(key):
+            smear ^= key[j & _MASK] * 19
+            key[j & _MASK] = _MASK & (smear + ord(char))
+        else:
+            key.append(_MASK & (smear + ord(char)))
+    return key or [0]
+
+
+class SeedRandom:
+    """
+    the ARC4 based generator of the seedrandom npm package. Calling it returns a float in [0, 1) and the
+    sequence for a given string seed is the same as seedrandom(seed)() in JavaScript
+    """
+    def __init__(self, seed: str):
+        key = _mix_key(seed)
+        s = list(range(_WIDTH))
+        j = 0
+        for i in range(_WIDTH):
+            t = s[i]
+            j = _MASK & (j + key[i % len(key)] + t)
+            s[i] = s[j]
+            s[j] = t
+        self.S = s
+        self.i = 0
+        self.j = 0
+        # seedrandom discards the first 256 bytes of the key stream
+        self.g(_WIDTH)
+
+    def g(self, count):
+        s = self.S
+        i = self.i
+        j = self.j
+        r = 0
+        for _ in range(count):
+            i = _MASK & (i + 1)
+            t = s[i]
+            j = _MASK & (j + t)
+            s[i] = s[j]
+            s[j] = t
+            r = r * _WIDTH + s[_MASK & (s[i] + t)]
+        self.i = i
+        self.j = j
+        return r
+
+    def __call__(self) -> float:
+        n = float(self.g(6))
+        d = _START_DENOM
+        x = 0
+        while n < _SIGNIFICANCE:
+            n = (n + x) * _WIDTH
+            d *= _WIDTH
+            x = self.g(1)
+        while n >= _OVERFLOW:
+            n /= 2
+            d /= 2
+            x >>= 1
+        return (n + x) / d
+
+
+def generate_map(seed, width=None, height=None, parameters=None) -> SimGame:
+    """
+    returns the SimGame of turn 0 of a match with the given seed. The map size is drawn from the seed unless
+    width and height are given, like the width and height options of the engine
+    """
+    rng = SeedRandom("gen_{}".format(seed))
+    size = MAP_SIZES[math.floor(rng() * len(MAP_SIZES))]
+    width = size if width is None else width
+    height = size if height is None else height
+    sim = SimGame(width, height, parameters)
+
+    symmetry = HORIZONTAL
+    half_width = width
+    half_height = height
+    if rng() < 0.5:
+        symmetry = VERTICAL
+        half_width = width / 2
+    else:
+        half_height = height / 2
+    resources_map = _generate_all_resources(rng, symmetry, width, height, half_width, half_height)
+    while not _validate_resources_map(resources_map):
+        resources_map = _generate_all_resources(rng, symmetry, width, height, half_width, half_height)
+    for y, row in enumerate(resources_map):
+        for x, resource in enumerate(row):
+            if resource is not None:
+                sim.add_resource(x, y, resource[0], resource[1])
+
+    spawn_x = math.floor(rng() * (half_width - 1)) + 1
+    spawn_y = math.floor(rng() * (half_height - 1)) + 1
+    while sim.has_resource(spawn_x, spawn_y):
+        spawn_x = math.floor(rng() * (half_width - 1)) + 1
+        spawn_y = math.floor(rng() * (half_height - 1)) + 1
+    if symmetry == HORIZONTAL:
+        mirror_x, mirror_y = spawn_x, height - spawn_y - 1
+    else:
+        mirror_x, mirror_y = width - spawn_x - 1, spawn_y
+    sim.spawn_worker(0, spawn_x, spawn_y)
+    sim.spawn_city_tile(0, spawn_x, spawn_y)
+    sim.spawn_worker(1, mirror_x, mirror_y)
+    sim.spawn_city_tile(1, mirror_x, mirror_y)
+
+    # at least three wood deposits next to each spawn
+    delta_index = math.floor(rng() * len(MOVE_DELTAS))
+    count = 0
+    for k in range(7):
+        dx, dy = MOVE_DELTAS[(delta_index + k) % len(MOVE_DELTAS)]
+        nx, ny = spawn_x + dx, spawn_y + dy
+        if symmetry == HORIZONTAL:
+            nx2, ny2 = nx, height - ny - 1
+        else:
+            nx2, ny2 = width - nx - 1, ny
+        if not sim.in_map(nx, ny) or not sim.in_map(nx2, ny2):
+            continue
+        for x, y in ((nx, ny), (nx2, ny2)):
+            if not sim.has_resource(x, y) and sim.citytiles[y][x] is None:
+                count += 1
+                sim.add_resource(x, y, RESOURCE_TYPES.WOOD, 800)
+        if count == 6:
+            break
+
+    # the engine sorts map.resources before the first turn
+    sim.resources.sort()
+    return sim
+
+
+def _validate_resources_map(resources_map) -> bool:
+    totals = {RESOURCE_TYPES.WOOD: 0, RESOURCE_TYPES.COAL: 0, RESOURCE_TYPES.URANIUM: 0}
+    for row in resources_map:
+        for resource in row:
+            if resource is not None:
+                totals[resource[0]] += resource[1]
+    return (
+        totals[RESOURCE_TYPES.WOOD] >= 2000
+        and totals[RESOURCE_TYPES.COAL] >= 1500
+        and totals[RESOURCE_TYPES.URANIUM] >= 300
+    )
+
+
+def _wood_amount(rng):
+    return min(300 + math.floor(rng() * 100), 500)
+
+
+def _coal_amount(rng):
+    return 350 + math.floor(rng() * 75)
+
+
+def _uranium_amount(rng):
+    return 300 + math.floor(rng() * 50)
+
+
+def _generate_all_resources(rng, symmetry, width, height, half_width, half_height):
+    """
+    returns a height x width grid of [type, amount] lists (None where empty). Like gen.ts the lists are shared
+    between a cell and its mirror
+    """
+    resources_map = [[None] * width for _ in range(height)]
+    layers = (
+        (RESOURCE_TYPES.WOOD, 0.21, 0.01, 2, 4, _wood_amount),
+        (RESOURCE_TYPES.COAL, 0.11, 0.02, 2, 4, _coal_amount),
+        (RESOURCE_TYPES.URANIUM, 0.055, 0.04, 1, 6, _uranium_amount),
+    )
+    for r_type, density, density_range, death_limit, birth_limit, amount in layers:
+        layer = _generate_resource_map(rng, density, density_range, half_width, half_height, death_limit, birth_limit)
+        for y, row in enumerate(layer):
+            for x, alive in enumerate(row):
+                if alive:
+                    resources_map[y][x] = [r_type, amount(rng)]
+
+    for _ in range(10):
+        resources_map = _gravitate_resources(resources_map)
+
+    # perturb resources. gen.ts compares x with the half height and y with the half width, kept as is
+    amounts = {
+        RESOURCE_TYPES.WOOD: _wood_amount, RESOURCE_TYPES.COAL: _coal_amount, RESOURCE_TYPES.URANIUM: _uranium_amount,
+    }
+    for y in range(math.ceil(half_height)):
+        for x in range(math.ceil(half_width)):
+            resource = resources_map[y][x]
+            if resource is None:
+                continue
+            for dx, dy in MOVE_DELTAS:
+                nx, ny = x + dx, y + dy
+                if nx < 0 or ny < 0 or nx >= half_height or ny >= half_width:
+                    continue
+                if rng() < 0.05:
+                    if resource[0] == RESOURCE_TYPES.URANIUM:
+                        amt = _uranium_amount(rng)
+                    else:
+                        # gen.ts always draws the uranium amount first
+                        rng()
+                        amt = amounts[resource[0]](rng)
+                    resources_map[ny][nx] = [resource[0], amt]
+
+    for y in range(math.ceil(half_height)):
+        for x in range(math.ceil(half_width)):
+            resource = resources_map[y][x]
+            if symmetry == VERTICAL:
+                resources_map[y][width - x - 1] = resource
+            else:
+                resources_map[height - y - 1][x] = resource
+    return resources_map
+
+
+def _generate_resource_map(rng, density, density_range, width, height, death_limit, birth_limit):
+    density = density - density_range / 2 + density_range * rng()
+    arr = [[1 if rng() < density else 0 for _ in range(math.ceil(width))] for _ in range(math.ceil(height))]
+    for _ in range(2):
+        _simulate_gol(arr, death_limit, birth_limit)
+    return arr
+
+
+def _simulate_gol(arr, death_limit, birth_limit):
+    """
+    one in-place round of the cellular automaton that grows the random noise of a layer into clusters
+    """
+    for i in range(1, len(arr) - 1):
+        for j in range(1, len(arr[0]) - 1):
+            alive = 0
+            for dx, dy in MOVE_DELTAS:
+                if arr[i + dy][j + dx] == 1:
+                    alive += 1
+            if arr[i][j] == 1:
+                arr[i][j] = 0 if alive < death_limit else 1
+            else:
+                arr[i][j] = 1 if alive > birth_limit else 0
+
+
+def _kernel_force(resources_map, rx, ry):
+    force = [0.0, 0.0]
+    r_type = resources_map[ry][rx][0]
+    map_height = len(resources_map)
+    map_width = len(resources_map[0])
+    for y in range(ry - 5, ry + 5):
+        for x in range(rx - 5, rx + 5):
+            if x < 0 or y < 0 or x >= map_width or y >= map_height:
+                continue
+            other = resources_map[y][x]
+            if other is None:
+                continue
+            dx = rx - x
+            dy = ry - y
+            mdist = abs(dx) + abs(dy)
+            # like resources attract, different ones repel
+            sign = 1 if other[0] != r_type else -1
+            if dx != 0:
+                force[0] += sign * (dx / mdist) ** 2 * _js_sign(dx)
+            if dy != 0:
+                force[1] += sign * (dy / mdist) ** 2 * _js_sign(dy)
+    return force
+
+
+def _gravitate_resources(resources_map):
+    """
+    moves every resource one step along the force of its neighbours, leaving it in place if the target is taken
+    """
+    map_height = len(resources_map)
+    map_width = len(resources_map[0])
+    forces = {}
+    for y in range(map_height):
+        for x in range(map_width):
+            if resources_map[y][x] is not None:
+                forces[(x, y)] = _kernel_force(resources_map, x, y)
+    new_map = [[None] * map_width for _ in range(map_height)]
+    for y in range(map_height):
+        for x in range(map_width):
+            resource = resources_map[y][x]
+            if resource is None:
+                continue
+            force = forces[(x, y)]
+            nx = min(max(x + _js_sign(force[0]), 0), map_width - 1)
+            ny = min(max(y + _js_sign(force[1]), 0), map_height - 1)
+            if new_map[ny][nx] is None:
+                new_map[ny][nx] = resource
+            else:
+                new_map[y][x] = resource
+    return new_map
@@ -0,0 +1,546 @@
+"""
+Bulk map generation for map statistics and training set curation. generate_maps(seeds) lays out the same maps
+as lux.mapgen.generate_map, cell for cell, but draws the ARC4 key streams of a whole batch of seeds at once
+with NumPy and computes the gravitation passes of gen.ts as array operations. Batches can be spread over a
+process pool and maps cached on disk by (seed, size) (requires numpy)
+"""
+import math
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+from .mapgen import (
+    HORIZONTAL, MAP_SIZES, MOVE_DELTAS, VERTICAL, _coal_amount, _mix_key, _uranium_amount, _wood_amount,
+)
+from .sim import SimGame
+
+RESOURCE_TYPES = ("wood", "coal", "uranium")
+_WOOD, _COAL, _URANIUM = range(len(RESOURCE_TYPES))
+NO_RESOURCE = -1
+# the minimum total amount of each resource a map must hold, otherwise gen.ts generates the resources again
+_MINIMUM_TOTALS = (2000, 1500, 300)
+# density, density range, death limit, birth limit and amount of each layer, in the order gen.ts draws them
+_LAYERS = (
+    (0.21, 0.01, 2, 4, _wood_amount),
+    (0.11, 0.02, 2, 4, _coal_amount),
+    (0.055, 0.04, 1, 6, _uranium_amount),
+)
+_AMOUNTS = (_wood_amount, _coal_amount, _uranium_amount)
+_SPAWN_WOOD = 800
+# key stream bytes generated per batch whenever a map runs out
+_CHUNK = 2048
+_BIT_LENGTHS = np.array([value.bit_length() for value in range(256)], dtype=np.int64)
+BATCH_SIZE = 512
+
+
+class _KeyStreams:
+    """
+    the seedrandom ARC4 generators of many seeds, stepped together. Each byte of the key stream is a handful of
+    array operations over all the generators still in use instead of a Python loop per generator
+    """
+    def __init__(self, seeds):
+        count = len(seeds)
+        keys = [_mix_key(seed) for seed in seeds]
+        key_array = np.zeros((count, max(len(key) for key in keys)), dtype=np.int64)
+        for n, key in enumerate(keys):
+            key_array[n, :len(key)] = key
+        lengths = np.array([len(key) for key in keys], dtype=np.int64)
+        rows = np.arange(count)
+        self.base = rows * 256
+        # the states of all generators, flattened so one take reaches a byte of each
+        state = np.tile(np.arange(256, dtype=np.int64), count)
+        j = np.zeros(count, dtype=np.int64)
+        for i in range(256):
+            t = state[self.base + i]
+            j = (j + key_array[rows, i % lengths] + t) & 255
+            state[self.base + i] = state[self.base + j]
+            state[self.base + j] = t
+        self.state = state
+        self.i = np.zeros(count, dtype=np.int64)
+        self.j = np.zeros(count, dtype=np.int64)
+        self.active = np.ones(count, dtype=bool)
+        self.pending = [[] for _ in range(count)]
+        # chunks generated so far for each generator
+        self.chunks = np.zeros(count, dtype=np.int64)
+        # seedrandom discards the first 256 bytes of the key stream
+        self._generate(np.arange(count), 256)
+
+    def _generate(self, rows, length):
+        """
+        steps the generators of rows length bytes and returns their output as a [len(rows), length] array
+        """
+        state = self.state
+        base = self.base[rows]
+        i = self.i[rows]
+        j = self.j[rows]
+        out = np.empty((length, len(rows)), dtype=np.uint8)
+        for k in range(length):
+            i = (i + 1) & 255
+            at_i = base + i
+            t = state[at_i]
+            j = (j + t) & 255
+            at_j = base + j
+            state[at_i] = state[at_j]
+            state[at_j] = t
+            out[k] = state[base + ((state[at_i] + t) & 255)]
+        self.i[rows] = i
+        self.j[rows] = j
+        return out.T
+
+    def more(self, row) -> bytes:
+        """
+        the next chunk of the key stream of row. Every generator in use that is no further along gets one too,
+        as maps of a batch need about as many bytes as each other
+        """
+        if not self.pending[row]:
+            rows = np.flatnonzero(self.active & (self.chunks <= self.chunks[row]))
+            for other, chunk in zip(rows.tolist(), self._generate(rows, _CHUNK)):
+                self.pending[other].append(chunk.tobytes())
+            self.chunks[rows] += 1
+        return self.pending[row].pop(0)
+
+    def finish(self, row):
+        self.active[row] = False
+        self.pending[row] = []
+
+
+class _StreamRandom:
+    """
+    seedrandom's rng() over one generator of _KeyStreams, returning the same floats as lux.mapgen.SeedRandom
+    """
+    def __init__(self, streams, row):
+        self.streams = streams
+        self.row = row
+        self.data = b""
+        self.position = 0
+
+    def _extend(self):
+        self.data = self.data[self.position:] + self.streams.more(self.row)
+        self.position = 0
+
+    def __call__(self) -> float:
+        if self.position + 16 > len(self.data):
+            self._extend()
+        data = self.data
+        start = self.position
+        # seedrandom reads 6 bytes and then one more at a time until there are 52 significant bits, keeping
+        # the last byte apart. Halving to 53 bits drops the low bits of that byte, which the shift does here
+        prefix = int.from_bytes(data[start:start + 6], "big")
+        end = start + 6
+        last = data[end]
+        end += 1
+        while prefix < 1 << 44:
+            if end + 1 >= len(data):
+                self._extend()
+                end -= start
+                start = 0
+                data = self.data
+            prefix = (prefix << 8) | last
+            last = data[end]
+            end += 1
+        value = (prefix << 8) | last
+        shift = max(value.bit_length() - 53, 0)
+        self.position = end
+        return math.ldexp(value >> shift, shift - 8 * (end - start))
+
+    def draws(self, count):
+        """
+        the next count values of rng() as a float64 array. A value takes 7 bytes of the key stream when its first
+        byte is at least 16 and 8 when it is smaller (rarely more), so only the walk from one value to the next is
+        done in Python and the values themselves are computed as arrays
+        """
+        size = 8 * count + 16
+        while self.position + size > len(self.data):
+            self._extend()
+        start = self.position
+        window = np.frombuffer(self.data, dtype=np.uint8, count=size, offset=start)
+        lengths = np.where(window < 16, 8, 7)
+        # 8 bytes only hold the value when the first two are not both small, otherwise leave it to __call__
+        lengths[:-1][(window[:-1] == 0) & (window[1:] < 16)] = 0
+        lengths = lengths.tolist()
+        positions = []
+        position = 0
+        for _ in range(count):
+            if position + 16 > size or not lengths[position]:
+                break
+            positions.append(position)
+            position += lengths[position]
+        self.position = start + position
+        if not positions:
+            return np.array([self() for _ in range(count)])
+
+        positions = np.array(positions)
+        words = np.lib.stride_tricks.sliding_window_view(window, 8)[positions].astype(np.uint64)
+        words = np.bitwise_or.reduce(words << np.arange(56, -8, -8, dtype=np.uint64), axis=1)
+        first = window[positions]
+        long = first < 16
+        words[~long] >>= np.uint64(8)
+        # the bit length of each value, from its first byte that is not 0
+        bits = np.where(long, np.where(first > 0, 56 + _BIT_LENGTHS[first], 48 + _BIT_LENGTHS[window[positions + 1]]),
+                        48 + _BIT_LENGTHS[first])
+        shifts = bits - 53
+        values = np.ldexp((words >> shifts.astype(np.uint64)).astype(np.float64), shifts - np.where(long, 64, 56))
+        if len(values) < count:
+            values = np.concatenate([values, [self() for _ in range(count - len(values))]])
+        return values
+
+
+class GeneratedMap:
+    """
+    the layout of a generated map. resource_type is an int8 [height, width] array of indices into
+    RESOURCE_TYPES, NO_RESOURCE where a cell is empty, and resource_amount the int32 amounts. spawns holds the
+    (x, y) of the worker and city tile of team 0 and of team 1
+    """
+    __slots__ = ("seed", "width", "height", "resource_type", "resource_amount", "spawns")
+
+    def __init__(self, seed, width, height, resource_type, resource_amount, spawns):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.resource_type = resource_type
+        self.resource_amount = resource_amount
+        self.spawns = spawns
+
+    def to_sim(self, parameters=None) -> SimGame:
+        """
+        returns the SimGame of turn 0, the same as generate_map(seed, width, height, parameters)
+        """
+        sim = SimGame(self.width, self.height, parameters)
+        for y, x in zip(*np.nonzero(self.resource_type != NO_RESOURCE)):
+            sim.add_resource(
+                int(x), int(y), RESOURCE_TYPES[self.resource_type[y, x]], int(self.resource_amount[y, x]))
+        for team, (x, y) in enumerate(self.spawns):
+            sim.spawn_worker(team, x, y)
+            sim.spawn_city_tile(team, x, y)
+        sim.resources.sort()
+        return sim
+
+    def to_array(self):
+        """
+        the map as one int32 array, the form it is cached in
+        """
+        header = [self.width, self.height] + [value for spawn in self.spawns for value in spawn]
+        return np.concatenate([
+            np.array(header, dtype=np.int32), self.resource_type.ravel(), self.resource_amount.ravel(),
+        ]).astype(np.int32)
+
+    @classmethod
+    def from_array(cls, seed, array):
+        width, height, x0, y0, x1, y1 = array[:6].tolist()
+        cells = width * height
+        return cls(
+            seed, width, height,
+            array[6:6 + cells].astype(np.int8).reshape(height, width),
+            array[6 + cells:6 + 2 * cells].reshape(height, width),
+            ((x0, y0), (x1, y1)),
+        )
+
+
+def _simulate_gol(arr, death_limit, birth_limit):
+    """
+    one in-place round of the cellular automaton of gen.ts. Cells are updated in order, so each sees the new
+    values of the cells above and to its left
+    """
+    for i in range(1, len(arr) - 1):
+        above, row, below = arr[i - 1], arr[i], arr[i + 1]
+        for j in range(1, len(row) - 1):
+            alive = (
+                above[j - 1] + above[j] + above[j + 1] + row[j - 1] + row[j + 1]
+                + below[j - 1] + below[j] + below[j + 1]
+            )
+            if row[j] == 1:
+                row[j] = 0 if alive < death_limit else 1
+            else:
+                row[j] = 1 if alive > birth_limit else 0
+
+
+def _pull(offset, like):
+    """
+    the force along one axis of a neighbour offset cells away on that axis, as gen.ts adds it
+    """
+    if offset[0] == 0:
+        return 0.0
+    distance = abs(offset[0]) + abs(offset[1])
+    return (1 if not like else -1) * (offset[0] / distance) ** 2 * (1 if offset[0] > 0 else -1)
+
+
+# the neighbours within reach of a resource, (x, y) relative to it in the order gen.ts visits them
+_NEIGHBOURS = [(x, y) for y in range(-5, 5) for x in range(-5, 5) if (x, y) != (0, 0)]
+# [neighbour, neighbour type + 1, resource type] pulls along x and y, nothing where there is no neighbour
+_PULLS_X, _PULLS_Y = (
+    np.array([
+        [[0.0] * len(RESOURCE_TYPES)] + [
+            [_pull(offset, other == r_type) for r_type in range(len(RESOURCE_TYPES))]
+            for other in range(len(RESOURCE_TYPES))
+        ]
+        for offset in offsets
+    ]).ravel()
+    for offsets in ([(-x, -y) for x, y in _NEIGHBOURS], [(-y, -x) for x, y in _NEIGHBOURS])
+)
+_PULL_ROWS = np.arange(len(_NEIGHBOURS)) * (len(RESOURCE_TYPES) + 1) * len(RESOURCE_TYPES)
+
+
+def _gravitate(types, amounts):
+    """
+    one gravitation pass of gen.ts over [map, height, width] arrays of maps of the same size. The forces on all
+    resources of all maps are computed at once, adding the pull of each neighbour in the same order as gen.ts so
+    the sums round the same way, and the moves are then applied in order like gen.ts does
+    """
+    count, height, width = types.shape
+    maps, ys, xs = np.nonzero(types != NO_RESOURCE)
+    if not len(maps):
+        return types, amounts
+    r_types = types[maps, ys, xs].astype(np.int64)
+    # the maps with a margin of empty cells, so every neighbour of a resource is a cell of its own map
+    padded = np.full((count, height + 10, width + 10), NO_RESOURCE, dtype=np.int64)
+    padded[:, 5:height + 5, 5:width + 5] = types
+    margin_cells = (maps * (height + 10) + ys + 5) * (width + 10) + xs + 5
+    offsets = np.array([y * (width + 10) + x for x, y in _NEIGHBOURS])
+    pulls = padded.ravel()[margin_cells[:, None] + offsets]
+    pulls += 1
+    pulls *= len(RESOURCE_TYPES)
+    pulls += r_types[:, None]
+    pulls += _PULL_ROWS
+    # cumsum adds along each row in order, unlike sum, so the forces round like the loops of gen.ts
+    force_x = np.cumsum(_PULLS_X.take(pulls), axis=1)[:, -1]
+    force_y = np.cumsum(_PULLS_Y.take(pulls), axis=1)[:, -1]
+    cells = (maps * height + ys) * width + xs
+    targets = cells + np.clip(xs + np.sign(force_x).astype(np.int64), 0, width - 1) - xs
+    targets += (np.clip(ys + np.sign(force_y).astype(np.int64), 0, height - 1) - ys) * width
+
+    # gen.ts moves a resource to its target unless a resource before it already is there, otherwise it stays
+    # (and takes the place of one that moved there). Whether a resource moved only depends on the resources
+    # before it, so starting from all moving, this settles on the same outcome within a few rounds
+    order = np.arange(len(cells))
+    never = len(cells)
+    moved = np.ones(len(cells), dtype=bool)
+    while True:
+        first_moved = np.full(types.size, never)
+        np.minimum.at(first_moved, targets[moved], order[moved])
+        first_stayed = np.full(types.size, never)
+        first_stayed[cells[~moved]] = order[~moved]
+        now_moved = (first_moved[targets] >= order) & (first_stayed[targets] > order)
+        if np.array_equal(now_moved, moved):
+            break
+        moved = now_moved
+    destinations = np.where(moved, targets, cells)
+    # a resource that stays overwrites one that moved to its cell before it, so the last one to land is kept
+    landed = len(destinations) - 1 - np.unique(destinations[::-1], return_index=True)[1]
+    new_types = np.full(types.size, NO_RESOURCE, dtype=np.int8)
+    new_amounts = np.zeros(types.size, dtype=np.int32)
+    new_types[destinations[landed]] = r_types[landed]
+    new_amounts[destinations[landed]] = amounts[maps, ys, xs][landed]
+    return new_types.reshape(types.shape), new_amounts.reshape(types.shape)
+
+
+def _draw_resources(rng, layer_width, layer_height, width, height):
+    """
+    the resource layers of gen.ts before they gravitate, as [height, width] arrays
+    """
+    types = [[NO_RESOURCE] * width for _ in range(height)]
+    amounts = [[0] * width for _ in range(height)]
+    for r_type, (density, density_range, death_limit, birth_limit, amount) in enumerate(_LAYERS):
+        density = density - density_range / 2 + density_range * rng()
+        layer = (rng.draws(layer_width * layer_height) < density).reshape(layer_height, layer_width)
+        layer = layer.astype(np.int64).tolist()
+        for _ in range(2):
+            _simulate_gol(layer, death_limit, birth_limit)
+        for y, row in enumerate(layer):
+            for x, alive in enumerate(row):
+                if alive:
+                    types[y][x] = r_type
+                    amounts[y][x] = amount(rng)
+    return types, amounts
+
+
+def _perturb_resources(rng, symmetry, types, amounts, half_width, half_height):
+    """
+    the rest of generating resources once they gravitated: the random spread and the mirrored half of the map
+    """
+    height, width = types.shape
+    layer_width = math.ceil(half_width)
+    layer_height = math.ceil(half_height)
+    # gen.ts compares x with the half height and y with the half width, kept as is
+    types = types.tolist()
+    amounts = amounts.tolist()
+    for y in range(layer_height):
+        for x in range(layer_width):
+            r_type = types[y][x]
+            if r_type == NO_RESOURCE:
+                continue
+            for dx, dy in MOVE_DELTAS:
+                nx, ny = x + dx, y + dy
+                if nx < 0 or ny < 0 or nx >= half_height or ny >= half_width:
+                    continue
+                if rng() < 0.05:
+                    if r_type == _URANIUM:
+                        amt = _uranium_amount(rng)
+                    else:
+                        # gen.ts always draws the uranium amount first
+                        rng()
+                        amt = _AMOUNTS[r_type](rng)
+                    types[ny][nx] = r_type
+                    amounts[ny][nx] = amt
+
+    types = np.array(types, dtype=np.int8)
+    amounts = np.array(amounts, dtype=np.int32)
+    if symmetry == VERTICAL:
+        types[:layer_height, width - layer_width:] = types[:layer_height, layer_width - 1::-1]
+        amounts[:layer_height, width - layer_width:] = amounts[:layer_height, layer_width - 1::-1]
+    else:
+        types[height - layer_height:, :layer_width] = types[layer_height - 1::-1, :layer_width]
+        amounts[height - layer_height:, :layer_width] = amounts[layer_height - 1::-1, :layer_width]
+    return types, amounts
+
+
+def _valid(types, amounts):
+    totals = np.bincount(types[types != NO_RESOURCE], weights=amounts[types != NO_RESOURCE], minlength=3)
+    return all(total >= minimum for total, minimum in zip(totals.tolist(), _MINIMUM_TOTALS))
+
+
+class _Layout:
+    """
+    a map of a batch while it is generated
+    """
+    __slots__ = ("seed", "rng", "symmetry", "half_width", "half_height")
+
+    def __init__(self, seed, rng, width, height):
+        self.seed = seed
+        self.rng = rng
+        self.symmetry = HORIZONTAL
+        self.half_width = width
+        self.half_height = height
+        if rng() < 0.5:
+            self.symmetry = VERTICAL
+            self.half_width = width / 2
+        else:
+            self.half_height = height / 2
+
+
+def _place_spawns(layout, types, amounts) -> GeneratedMap:
+    """
+    the rest of generate_map once the resources are valid
+    """
+    rng = layout.rng
+    symmetry = layout.symmetry
+    height, width = types.shape
+    spawn_x = math.floor(rng() * (layout.half_width - 1)) + 1
+    spawn_y = math.floor(rng() * (layout.half_height - 1)) + 1
+    while types[spawn_y, spawn_x] != NO_RESOURCE:
+        spawn_x = math.floor(rng() * (layout.half_width - 1)) + 1
+        spawn_y = math.floor(rng() * (layout.half_height - 1)) + 1
+    if symmetry == HORIZONTAL:
+        mirror_x, mirror_y = spawn_x, height - spawn_y - 1
+    else:
+        mirror_x, mirror_y = width - spawn_x - 1, spawn_y
+    spawns = ((spawn_x, spawn_y), (mirror_x, mirror_y))
+
+    # at least three wood deposits next to each spawn
+    delta_index = math.floor(rng() * len(MOVE_DELTAS))
+    count = 0
+    for k in range(7):
+        dx, dy = MOVE_DELTAS[(delta_index + k) % len(MOVE_DELTAS)]
+        nx, ny = spawn_x + dx, spawn_y + dy
+        if symmetry == HORIZONTAL:
+            nx2, ny2 = nx, height - ny - 1
+        else:
+            nx2, ny2 = width - nx - 1, ny
+        if not (0 <= nx < width and 0 <= ny < height and 0 <= nx2 < width and 0 <= ny2 < height):
+            continue
+        for x, y in ((nx, ny), (nx2, ny2)):
+            if types[y, x] == NO_RESOURCE and (x, y) not in spawns:
+                count += 1
+                types[y, x] = _WOOD
+                amounts[y, x] = _SPAWN_WOOD
+        if count == 6:
+            break
+    return GeneratedMap(layout.seed, width, height, types, amounts, spawns)
+
+
+def _generate_batch(seeds, width=None, height=None):
+    """
+    generates the maps of seeds together. The maps of each size go through every stage of gen.ts at the same
+    time, so the gravitation passes of all of them are one set of array operations. Each map draws from its own
+    key stream, which keeps its draws in the order of gen.ts whatever the other maps do
+    """
+    streams = _KeyStreams(["gen_{}".format(seed) for seed in seeds])
+    rngs = [_StreamRandom(streams, row) for row in range(len(seeds))]
+    sizes = {}
+    for row, rng in enumerate(rngs):
+        size = MAP_SIZES[math.floor(rng() * len(MAP_SIZES))]
+        size = (size if width is None else width, size if height is None else height)
+        sizes.setdefault(size, []).append(row)
+    maps = [None] * len(seeds)
+    # smallest maps first, so the chunks generated along the way mostly go to maps that still need them
+    for (map_width, map_height), rows in sorted(sizes.items()):
+        layouts = {row: _Layout(seeds[row], rngs[row], map_width, map_height) for row in rows}
+        while rows:
+            drawn = [
+                _draw_resources(
+                    rngs[row], math.ceil(layouts[row].half_width), math.ceil(layouts[row].half_height),
+                    map_width, map_height,
+                )
+                for row in rows
+            ]
+            types = np.array([r_types for r_types, _ in drawn], dtype=np.int8)
+            amounts = np.array([r_amounts for _, r_amounts in drawn], dtype=np.int32)
+            for _ in range(10):
+                types, amounts = _gravitate(types, amounts)
+            # maps without enough of a resource generate their resources again
+            retry = []
+            for row, r_types, r_amounts in zip(rows, types, amounts):
+                layout = layouts[row]
+                r_types, r_amounts = _perturb_resources(
+                    layout.rng, layout.symmetry, r_types, r_amounts, layout.half_width, layout.half_height)
+                if _valid(r_types, r_amounts):
+                    maps[row] = _place_spawns(layout, r_types, r_amounts)
+                    streams.finish(row)
+                else:
+                    retry.append(row)
+            rows = retry
+    return maps
+
+
+def _generate_batch_args(args):
+    return _generate_batch(*args)
+
+
+def _cache_path(cache_dir, seed, width, height):
+    size = "auto" if width is None and height is None else "{}x{}".format(width, height)
+    return os.path.join(cache_dir, "{}_{}.npy".format(seed, size))
+
+
+def generate_maps(seeds, width=None, height=None, processes=None, cache_dir=None, batch_size=BATCH_SIZE):
+    """
+    returns a GeneratedMap per seed, laid out like lux.mapgen.generate_map(seed, width, height). Batches of
+    batch_size seeds are generated in processes worker processes when it is more than 1. With cache_dir set,
+    maps found there are loaded instead of generated and new ones are saved to it
+    """
+    seeds = list(seeds)
+    maps = [None] * len(seeds)
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        for n, seed in enumerate(seeds):
+            path = _cache_path(cache_dir, seed, width, height)
+            if os.path.exists(path):
+                maps[n] = GeneratedMap.from_array(seed, np.load(path))
+    missing = [n for n, generated in enumerate(maps) if generated is None]
+    batches = [
+        ([seeds[n] for n in missing[start:start + batch_size]], width, height)
+        for start in range(0, len(missing), batch_size)
+    ]
+    if processes is not None and processes > 1 and len(batches) > 1:
+        with Pool(processes) as pool:
+            results = pool.map(_generate_batch_args, batches)
+    else:
+        results = [_generate_batch(*batch) for batch in batches]
+    generated = [generated_map for result in results for generated_map in result]
+    for n, generated_map in zip(missing, generated):
+        maps[n] = generated_map
+        if cache_dir is not None:
+            path = _cache_path(cache_dir, generated_map.seed, width, height)
+            # saved under a temporary name first so a concurrent reader never sees half a file
+            np.save(path + ".tmp.npy", generated_map.to_array())
+            os.replace(path + ".tmp.npy", path)
+    return maps
@@ -0,0 +1,149 @@
+from itertools import groupby
+from operator import itemgetter
+
+from .constants import Constants
+
+INPUT_CONSTANTS = Constants.INPUT_CONSTANTS
+
+
+class _DecodeTable(dict):
+    """
+    maps the string form of the small numbers that make up most update fields to their values, falling back
+    to decode for anything else. A dict lookup is several times cheaper than parsing the string again
+    """
+    def __init__(self, decode, size):
+        keys = [str(i) for i in range(size)]
+        super().__init__(zip(keys, map(decode, keys)))
+        self.decode = decode
+
+    def __missing__(self, key):
+        return self.decode(key)
+
+
+def _amount(value: str) -> int:
+    return int(float(value))
+
+
+_INTS = _DecodeTable(int, 1024)
+_FLOATS = _DecodeTable(float, 1024)
+_AMOUNTS = _DecodeTable(_amount, 1024)
+
+# column names and decoders of each update line, in the order they appear after the identifier.
+# a decoder of None keeps the column as strings
+UPDATE_SCHEMAS = {
+    INPUT_CONSTANTS.RESEARCH_POINTS: (("team", _INTS), ("points", _INTS)),
+    INPUT_CONSTANTS.RESOURCES: (("type", None), ("x", _INTS), ("y", _INTS), ("amount", _AMOUNTS)),
+    INPUT_CONSTANTS.UNITS: (
+        ("type", _INTS), ("team", _INTS), ("id", None), ("x", _INTS), ("y", _INTS), ("cooldown", _FLOATS),
+        ("wood", _INTS), ("coal", _INTS), ("uranium", _INTS),
+    ),
+    INPUT_CONSTANTS.CITY: (("team", _INTS), ("id", None), ("fuel", _FLOATS), ("light_upkeep", _FLOATS)),
+    INPUT_CONSTANTS.CITY_TILES: (("team", _INTS), ("cityid", None), ("x", _INTS), ("y", _INTS), ("cooldown", _FLOATS)),
+    INPUT_CONSTANTS.ROADS: (("x", _INTS), ("y", _INTS), ("road", _FLOATS)),
+}
+
+# the first two characters of a line are enough to tell its identifier apart
+_LINE_PREFIXES = {
+    INPUT_CONSTANTS.RESEARCH_POINTS: INPUT_CONSTANTS.RESEARCH_POINTS,
+    "r ": INPUT_CONSTANTS.RESOURCES,
+    "u ": INPUT_CONSTANTS.UNITS,
+    "c ": INPUT_CONSTANTS.CITY,
+    INPUT_CONSTANTS.CITY_TILES: INPUT_CONSTANTS.CITY_TILES,
+    INPUT_CONSTANTS.ROADS[:2]: INPUT_CONSTANTS.ROADS,
+}
+_line_prefix = itemgetter(slice(0, 2))
+
+
+class UpdateTable:
+    """
+    The decoded lines of one identifier, stored column by column. Each column is an attribute holding
+    a list with one value per line, e.g. table.x[i] is the x coordinate of the i-th line
+    """
+    def __init__(self, identifier, lines):
+        schema = UPDATE_SCHEMAS[identifier]
+        self.identifier = identifier
+        self.size = len(lines)
+        if not lines:
+            for name, _ in schema:
+                setattr(self, name, [])
+            return
+        width = len(schema) + 1
+        # decode every line of the group at once by splitting them as a single string
+        tokens = " ".join(lines).split(" ")
+        if len(tokens) != width * self.size:
+            raise ValueError(f"malformed '{identifier}' update lines")
+        for i, (name, decode) in enumerate(schema, 1):
+            column = tokens[i::width]
+            setattr(self, name, column if decode is None else list(map(decode.__getitem__, column)))
+
+    @classmethod
+    def from_columns(cls, identifier, columns):
+        """
+        a table of already decoded values, columns holding one list per column of the schema, in order. The
+        values must have the types the lines would decode to
+        """
+        table = cls.__new__(cls)
+        table.identifier = identifier
+        table.size = len(columns[0])
+        for (name, _), column in zip(UPDATE_SCHEMAS[identifier], columns):
+            setattr(table, name, column)
+        return table
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def columns(self):
+        return tuple(name for name, _ in UPDATE_SCHEMAS[self.identifier])
+
+    def rows(self):
+        """
+        iterate over the lines as tuples of decoded values, in column order
+        """
+        return zip(*(getattr(self, name) for name in self.columns))
+
+    def to_numpy(self):
+        """
+        return the table as a NumPy structured array with one field per column (requires numpy)
+        """
+        import numpy as np
+        dtype = []
+        for name, decode in UPDATE_SCHEMAS[self.identifier]:
+            if decode is None:
+                dtype.append((name, object))
+            elif decode is _FLOATS:
+                dtype.append((name, np.float64))
+            else:
+                dtype.append((name, np.int32))
+        array = np.empty(self.size, dtype=dtype)
+        for name, _ in dtype:
+            array[name] = getattr(self, name)
+        return array
+
+
+class ParsedUpdates:
+    """
+    The update lines of one turn, grouped by identifier and decoded in bulk into UpdateTables
+    """
+    def __init__(self, tables):
+        self.research_points: UpdateTable = tables[INPUT_CONSTANTS.RESEARCH_POINTS]
+        self.resources: UpdateTable = tables[INPUT_CONSTANTS.RESOURCES]
+        self.units: UpdateTable = tables[INPUT_CONSTANTS.UNITS]
+        self.cities: UpdateTable = tables[INPUT_CONSTANTS.CITY]
+        self.citytiles: UpdateTable = tables[INPUT_CONSTANTS.CITY_TILES]
+        self.roads: UpdateTable = tables[INPUT_CONSTANTS.ROADS]
+
+
+def parse_updates(messages) -> ParsedUpdates:
+    """
+    parse the update lines of a turn, up to D_DONE. Lines with an unknown identifier are ignored
+    """
+    groups = {identifier: [] for identifier in UPDATE_SCHEMAS}
+    # the engine sends each identifier as one contiguous run of lines, so this loops over a handful of runs
+    for prefix, lines in groupby(messages, _line_prefix):
+        if prefix == INPUT_CONSTANTS.DONE[:2]:
+            break
+        identifier = _LINE_PREFIXES.get(prefix)
+        if identifier is not None:
+            groups[identifier].extend(lines)
+    return ParsedUpdates({identifier: UpdateTable(identifier, lines) for identifier, lines in groups.items()})
@@ -0,0 +1,172 @@
+import heapq
+import math
+
+from .constants import Constants
+
+DIRECTIONS = Constants.DIRECTIONS
+
+# (dx, dy, direction a unit at (x + dx, y + dy) moves in to reach (x, y))
+_NEIGHBOURS = (
+    (0, 1, DIRECTIONS.NORTH),
+    (-1, 0, DIRECTIONS.EAST),
+    (0, -1, DIRECTIONS.SOUTH),
+    (1, 0, DIRECTIONS.WEST),
+)
+
+
+def blocked_cells(game, team, include_units=True) -> set:
+    """
+    returns the (x, y) cells a unit of the given team cannot move onto: the opponent's city tiles and, if
+    include_units is True, every cell holding a unit that is not one of the team's own city tiles
+    """
+    blocked = set()
+    own_citytiles = set()
+    for player in game.players:
+        for city in player.cities.values():
+            for citytile in city.citytiles:
+                if player.team == team:
+                    own_citytiles.add((citytile.pos.x, citytile.pos.y))
+                else:
+                    blocked.add((citytile.pos.x, citytile.pos.y))
+    if include_units:
+        for player in game.players:
+            for unit in player.units:
+                key = (unit.pos.x, unit.pos.y)
+                if key not in own_citytiles:
+                    blocked.add(key)
+    return blocked
+
+
+def move_turns(cooldown, road) -> int:
+    """
+    returns how many turns a unit with the given action cooldown spends moving onto a cell with the given
+    road level before it can act again, following the engine's cooldown rules
+    """
+    turns = 1
+    remaining = max(cooldown - road - 1, 0)
+    while remaining >= 1:
+        remaining = max(remaining - road - 1, 0)
+        turns += 1
+    return turns
+
+
+class DistanceField:
+    """
+    Distance from every cell to the closest of a set of target cells, along with the direction of the
+    first step towards it. Unreachable cells have distance math.inf and direction CENTER
+    """
+    def __init__(self, width, height, distances, directions):
+        self.width = width
+        self.height = height
+        self.distances = distances
+        self.directions = directions
+
+    def distance(self, pos) -> float:
+        return self.distances[pos.y * self.width + pos.x]
+
+    def next_direction(self, pos) -> str:
+        """
+        returns the direction to move in from pos to get closer to the nearest target
+        """
+        return self.directions[pos.y * self.width + pos.x]
+
+
+class Pathfinder:
+    """
+    Computes DistanceFields over a GameMap once per turn and caches them, so units heading to the same
+    targets share one search. blocked is a set of (x, y) cells units cannot move onto, see blocked_cells.
+    Blocked cells still get a distance, so a unit standing on one still finds its way out, but no path
+    goes through them
+    """
+    def __init__(self, game_map, blocked=None):
+        self.game_map = game_map
+        self.width = game_map.width
+        self.height = game_map.height
+        self.blocked = [False] * (self.width * self.height)
+        for x, y in blocked or ():
+            self.blocked[y * self.width + x] = True
+        self._cache = {}
+
+    def distance_field(self, targets, cooldown=None) -> DistanceField:
+        """
+        returns the DistanceField to the given target positions or (x, y) tuples. Distances count moves,
+        unless cooldown is given, in which case they count turns for a unit with that action cooldown,
+        taking road levels into account
+        """
+        sources = frozenset((t[0], t[1]) if isinstance(t, tuple) else (t.x, t.y) for t in targets)
+        key = (sources, cooldown)
+        field = self._cache.get(key)
+        if field is None:
+            if cooldown is None:
+                field = self._bfs(sources)
+            else:
+                field = self._dijkstra(sources, cooldown)
+            self._cache[key] = field
+        return field
+
+    def next_direction(self, pos, targets, cooldown=None) -> str:
+        """
+        returns the direction to move in from pos towards the closest of targets
+        """
+        return self.distance_field(targets, cooldown).next_direction(pos)
+
+    def _bfs(self, sources) -> DistanceField:
+        width, height, blocked = self.width, self.height, self.blocked
+        distances = [math.inf] * (width * height)
+        directions = [DIRECTIONS.CENTER] * (width * height)
+        frontier = []
+        for x, y in sources:
+            distances[y * width + x] = 0
+            frontier.append((x, y))
+        dist = 0
+        while frontier:
+            dist += 1
+            next_frontier = []
+            for x, y in frontier:
+                for dx, dy, direction in _NEIGHBOURS:
+                    nx, ny = x + dx, y + dy
+                    if nx < 0 or ny < 0 or nx >= width or ny >= height:
+                        continue
+                    idx = ny * width + nx
+                    if distances[idx] != math.inf:
+                        continue
+                    distances[idx] = dist
+                    directions[idx] = direction
+                    if not blocked[idx]:
+                        next_frontier.append((nx, ny))
+            frontier = next_frontier
+        return DistanceField(width, height, distances, directions)
+
+    def _dijkstra(self, sources, cooldown) -> DistanceField:
+        width, height, blocked = self.width, self.height, self.blocked
+        game_map = self.game_map
+        turns = {}
+        distances = [math.inf] * (width * height)
+        directions = [DIRECTIONS.CENTER] * (width * height)
+        heap = []
+        for x, y in sources:
+            distances[y * width + x] = 0
+            heap.append((0, x, y))
+        heapq.heapify(heap)
+        while heap:
+            dist, x, y = heapq.heappop(heap)
+            idx = y * width + x
+            if dist > distances[idx]:
+                continue
+            if blocked[idx] and (x, y) not in sources:
+                continue
+            # units reach (x, y) from a neighbour by moving onto it, which costs turns based on its road
+            road = game_map.get_cell(x, y).road
+            cost = turns.get(road)
+            if cost is None:
+                cost = turns[road] = move_turns(cooldown, road)
+            for dx, dy, direction in _NEIGHBOURS:
+                nx, ny = x + dx, y + dy
+                if nx < 0 or ny < 0 or nx >= width or ny >= height:
+                    continue
+                nidx = ny * width + nx
+                if dist + cost < distances[nidx]:
+                    distances[nidx] = dist + cost
+                    directions[nidx] = direction
+                    heapq.heappush(heap, (dist + cost, nx, ny))
+        return DistanceField(width, height, distances, directions)
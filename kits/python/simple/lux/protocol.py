@@ -0,0 +1,159 @@
+"""
+The engine's protocol as main.py speaks it. StdioTransport reads each turn as one block of bytes from stdin, up
+to its D_DONE line, and splits it into lines with a single decode, instead of a call of input() per line. It
+writes the actions and D_FINISH of a turn in one write and flush. InProcessTransport drives an agent() the same
+way within the calling process, for local harnesses that have the update lines at hand and need no pipes
+"""
+import sys
+import time
+
+DONE = b"D_DONE"
+FINISH = "D_FINISH"
+# sent by harnesses that reuse the agent process, before the first turn of the next match
+NEW_MATCH = "D_NEW_MATCH"
+# bytes asked for per read, more than a turn of the largest maps takes
+READ_SIZE = 1 << 16
+
+
+class Observation(dict):
+    """
+    what agent() gets each turn: the step, the update lines (D_DONE included) and remainingOverageTime when
+    known, with the player id as an attribute like kaggle-environments gives it
+    """
+    def __init__(self, player=0, step=0, updates=None):
+        super().__init__(step=step, updates=[] if updates is None else updates)
+        self.player = player
+
+
+def _find_done(buffer, start=0) -> int:
+    """
+    the offset just past the D_DONE line in buffer, newline included, or -1 if it has not come in whole
+    """
+    while True:
+        index = buffer.find(DONE, start)
+        if index < 0:
+            return -1
+        end = index + len(DONE)
+        if index == 0 or buffer[index - 1] == 0x0a:  # "\n"
+            if buffer[end:end + 1] == b"\n":
+                return end + 1
+            if buffer[end:end + 2] == b"\r\n":
+                return end + 2
+            if b"\r\n".startswith(buffer[end:end + 2]):
+                # the line ending has not come in yet
+                return -1
+        start = end
+
+
+def split_turn(block: bytes):
+    """
+    the lines of a turn from its block of bytes, without line endings
+    """
+    text = block.decode()
+    if "\r" in text:
+        text = text.replace("\r\n", "\n")
+    return text.rstrip("\n").split("\n")
+
+
+class StdioTransport:
+    """
+    reads turns from stdin and writes actions to stdout, both binary streams (sys.stdin.buffer and
+    sys.stdout.buffer by default). on_turn_start is called once per turn, when its first bytes come in, and
+    turn_start is the clock time of that moment
+    """
+    def __init__(self, stdin=None, stdout=None, on_turn_start=None, clock=time.perf_counter):
+        self._stdin = sys.stdin.buffer if stdin is None else stdin
+        self._stdout = sys.stdout.buffer if stdout is None else stdout
+        # text printed to sys.stdout by the agent is flushed first so it stays in order with the actions
+        self._text = sys.stdout if stdout is None else None
+        # read1 returns what has come in so far instead of waiting for READ_SIZE bytes
+        self._read = self._stdin.read1 if hasattr(self._stdin, "read1") else self._stdin.read
+        self._buffer = b""
+        self.on_turn_start = on_turn_start
+        self.clock = clock
+        self.turn_start = None
+
+    def _start_turn(self):
+        self.turn_start = self.clock()
+        if self.on_turn_start is not None:
+            self.on_turn_start()
+
+    def read_turn(self):
+        """
+        the lines of the next turn up to and including D_DONE, or None once stdin is closed. A turn cut short
+        by the end of the input is dropped
+        """
+        buffer = self._buffer
+        if buffer:
+            self._start_turn()
+        searched = 0
+        while True:
+            end = _find_done(buffer, searched)
+            if end >= 0:
+                break
+            # the D_DONE line may start in the bytes already searched
+            searched = max(len(buffer) - len(DONE) - 2, 0)
+            chunk = self._read(READ_SIZE)
+            if not chunk:
+                self._buffer = b""
+                # the last line of the input may have no newline
+                if _find_done(buffer + b"\n", searched) == len(buffer) + 1:
+                    return split_turn(buffer)
+                return None
+            if not buffer:
+                self._start_turn()
+            buffer += chunk
+        self._buffer = buffer[end:]
+        return split_turn(buffer[:end])
+
+    def input_ready(self, timeout) -> bool:
+        """
+        whether bytes of the next turn are waiting, waiting up to timeout seconds for them. Where stdin cannot
+        be polled (not a pipe or file on POSIX) it waits out timeout and returns False
+        """
+        if self._buffer:
+            return True
+        import select
+        try:
+            readable, _, _ = select.select([self._stdin], [], [], timeout)
+        except (OSError, ValueError):
+            time.sleep(timeout)
+            return False
+        return bool(readable)
+
+    def write_actions(self, actions):
+        """
+        sends the actions of a turn followed by D_FINISH, in one write
+        """
+        if self._text is not None:
+            self._text.flush()
+        self._stdout.write("{}\n{}\n".format(",".join(actions), FINISH).encode())
+        self._stdout.flush()
+
+
+class InProcessTransport:
+    """
+    plays the turns of one player with agent(observation, configuration) the way main.py does, called with the
+    update lines of each turn (the player id and map size lines first on step 0, D_DONE last) and returning the
+    agent's actions. Agents written as generators run to their end and their last actions are returned
+    """
+    def __init__(self, agent, configuration=None):
+        self.agent = agent
+        self.configuration = configuration
+        self.observation = Observation()
+
+    def turn(self, updates, remaining_overage_time=None):
+        observation = self.observation
+        if observation["step"] == 0:
+            observation.player = int(updates[0])
+        observation["updates"] = updates
+        if remaining_overage_time is not None:
+            observation["remainingOverageTime"] = remaining_overage_time
+        result = self.agent(observation, self.configuration)
+        if not isinstance(result, list):
+            actions = []
+            for actions in result:
+                pass
+            result = list(actions)
+        observation["step"] += 1
+        return result
@@ -0,0 +1,272 @@
+"""
+A lazy reader for Kaggle episode replays (the JSON kaggle-environments writes and the episodes downloaded from
+the competition). Opening a replay scans the file once for the byte range of each entry of its steps array, so
+replay[step] decodes only that step and a whole replay is never held in memory as Python objects
+"""
+import gzip
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+
+from .game import Game
+
+# strings (whole, so brackets inside them are skipped) and the brackets that open and close values
+_TOKENS = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]')
+# the next bracket outside of a string, skipping everything before it in one match. Runs of other bytes and
+# whole strings alternate, each run stopping at the quote that starts the next string, so a match can only be
+# made one way and nothing is tried again when there is no bracket left
+_BRACKETS = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}])')
+_WHITESPACE = b" \t\r\n"
+_INDEX_VERSION = 1
+
+
+class ReplayFormatError(ValueError):
+    """
+    raised when a file is not a JSON object with a steps array
+    """
+    pass
+
+
+def scan_steps(data):
+    """
+    returns (start, end, offsets) where data[start:end] is the steps array of the JSON object in data and
+    offsets lists the (start, end) byte range of each of its entries. data may be bytes or an mmap
+    """
+    # find the steps key of the top level object, looking at every string
+    depth = 0
+    position = None
+    for match in _TOKENS.finditer(data):
+        token = data[match.start()]
+        if token == 0x22:  # a string
+            if depth == 1 and match.group() == b'"steps"':
+                end = match.end()
+                while data[end] in _WHITESPACE:
+                    end += 1
+                if data[end] == 0x3a:  # ":", so this is the key and its value is the steps array
+                    position = end + 1
+                    break
+        elif token in (0x5b, 0x7b):  # "[" or "{"
+            depth += 1
+        else:
+            depth -= 1
+    if position is None:
+        raise ReplayFormatError("no steps array found")
+
+    # inside the array only the brackets matter, strings are skipped without a Python call each. The search
+    # stops at the last bracket of the file, so what a truncated file ends with is not searched over and over
+    end = max(data.rfind(b"]"), data.rfind(b"}")) + 1
+    depth = 0
+    steps_start = None
+    entry_start = None
+    offsets = []
+    for match in _BRACKETS.finditer(data, position, end):
+        if match.start() != position:
+            # bytes no match could take, such as a string that is never closed
+            raise ReplayFormatError("unexpected data at byte {}".format(position))
+        position = match.end()
+        token = data[match.start(1)]
+        if token in (0x5b, 0x7b):
+            if steps_start is None:
+                if token != 0x5b:
+                    raise ReplayFormatError("steps is not an array")
+                steps_start = match.start(1)
+            elif depth == 1:
+                entry_start = match.start(1)
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 1:
+                offsets.append((entry_start, match.end(1)))
+            elif depth == 0:
+                return steps_start, match.end(1), offsets
+    raise ReplayFormatError("the steps array is not closed")
+
+
+def is_engine_replay(path):
+    """
+    whether path holds a replay written by the engine (src/Replay) rather than a Kaggle episode replay
+    """
+    if path.endswith(".gz"):
+        return False
+    if zipfile.is_zipfile(path):
+        return True
+    # the engine writes allCommands right after the seed
+    with open(path, "rb") as f:
+        return b'"allCommands"' in f.read(4096)
+
+
+def read_engine_replay(path):
+    """
+    reads a replay written by the engine, a JSON object or a .luxr zip holding one, and returns (sim, commands,
+    info): the SimGame of turn 0 generated from its seed, the commands of each turn as a list per team and the
+    rest of the replay. The engine records nothing else, so later turns have to be played again with lux.sim
+    """
+    from .mapgen import generate_map
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            data = json.loads(archive.read(archive.namelist()[0]))
+    else:
+        with open(path, "rb") as f:
+            data = json.load(f)
+    # the width and height are only recorded when they were forced
+    width, height = data.get("width"), data.get("height")
+    sim = generate_map(
+        data["seed"],
+        width if width is not None and width > 0 else None,
+        height if height is not None and height > 0 else None,
+    )
+    commands = []
+    for turn_commands in data["allCommands"]:
+        turn = [[], []]
+        for command in turn_commands:
+            turn[command["agentID"]].append(command["command"])
+        commands.append(turn)
+    info = {key: value for key, value in data.items() if key not in ("allCommands", "stateful")}
+    return sim, commands, info
+
+
+class Replay:
+    """
+    A Kaggle episode replay read lazily. len(replay) is the number of steps, replay[step] decodes one step (the
+    list of the agents' {action, observation, reward, status, ...} dicts) and replay[start:stop] a range of them.
+    replay.header holds everything else in the file (configuration, rewards, statuses, ...).
+
+    The step offsets are kept in memory unless index_path is given: they are then saved there (index_path=True
+    for the replay path with .idx appended) and reused while the replay is unchanged. Gzipped replays are
+    decompressed to a temporary file for as long as the replay is open. A file that is not a whole replay, e.g.
+    one cut short, raises ReplayFormatError
+    """
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = path + ".idx" if index_path is True else index_path
+        self._tmp = None
+        if path.endswith(".gz"):
+            self._tmp = tempfile.TemporaryFile()
+            with gzip.open(path, "rb") as f:
+                shutil.copyfileobj(f, self._tmp)
+            self._tmp.flush()
+            self._file = self._tmp
+        else:
+            self._file = open(path, "rb")
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._steps_start, self._steps_end, self.offsets = self._load_index()
+        except Exception:
+            self._file.close()
+            raise
+        self._header = None
+
+    def _load_index(self):
+        stat = os.stat(self.path)
+        key = [_INDEX_VERSION, stat.st_size, stat.st_mtime_ns]
+        if self.index_path and os.path.exists(self.index_path):
+            try:
+                with open(self.index_path) as f:
+                    index = json.load(f)
+                if index["key"] == key:
+                    return index["steps_start"], index["steps_end"], [tuple(offset) for offset in index["offsets"]]
+            except (OSError, ValueError, KeyError):
+                pass
+        steps_start, steps_end, offsets = scan_steps(self._data)
+        if self.index_path:
+            try:
+                with open(self.index_path, "w") as f:
+                    json.dump({"key": key, "steps_start": steps_start, "steps_end": steps_end, "offsets": offsets}, f)
+            except OSError:
+                # a read-only directory only costs a rescan next time
+                pass
+        return steps_start, steps_end, offsets
+
+    @property
+    def header(self) -> dict:
+        """
+        the replay without its steps
+        """
+        if self._header is None:
+            data = self._data
+            self._header = json.loads(data[:self._steps_start] + b"[]" + data[self._steps_end:])
+            del self._header["steps"]
+        return self._header
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, step):
+        if isinstance(step, slice):
+            return [self._decode(i) for i in range(*step.indices(len(self)))]
+        if step < 0:
+            step += len(self)
+        if not 0 <= step < len(self):
+            raise IndexError("step {} out of range for a replay of {} steps".format(step, len(self)))
+        return self._decode(step)
+
+    def __iter__(self):
+        return self.steps()
+
+    def _decode(self, step):
+        start, end = self.offsets[step]
+        return json.loads(self._data[start:end])
+
+    def steps(self, start=0, stop=None):
+        """
+        yields the steps from start up to stop, one at a time
+        """
+        for step in range(*slice(start, stop).indices(len(self))):
+            yield self._decode(step)
+
+    def updates(self, step):
+        """
+        the update lines sent to the agents at step, including the id and map size lines at step 0
+        """
+        return self[step][0]["observation"]["updates"]
+
+    def actions(self, step):
+        """
+        the actions of each agent at step, [] for an agent that sent none
+        """
+        return [agent["action"] or [] for agent in self[step]]
+
+    def map_size(self):
+        width, height = self.updates(0)[1].split(" ")
+        return int(width), int(height)
+
+    def game(self, step, player=0, **game_options) -> Game:
+        """
+        returns the Game player's agent.py holds at step. Every turn sends the whole state, so this only
+        decodes step 0 and step
+        """
+        width, height = self.map_size()
+        game = Game(**game_options)
+        game._initialize([str(player), "{} {}".format(width, height)])
+        updates = self.updates(step)
+        game.turn = step - 1
+        game._update(updates[2:] if step == 0 else updates)
+        game.id = player
+        return game
+
+    def games(self, player=0, start=0, stop=None, **game_options):
+        """
+        yields the Game player's agent.py holds at each step from start up to stop. Like agent.py a single Game
+        is updated step by step, so keep what you need from one step before advancing to the next
+        """
+        game = None
+        for step in range(*slice(start, stop).indices(len(self))):
+            if game is None:
+                game = self.game(step, player, **game_options)
+            else:
+                game._update(self.updates(step))
+            yield game
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
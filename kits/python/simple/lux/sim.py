@@ -0,0 +1,898 @@
+"""
+A pure Python forward model of the Lux AI engine. SimGame mirrors the turn logic of src/logic.ts and
+src/Game/index.ts (command validation, movement collisions, city tile and unit turns, resource collection,
+deposits, nightfall, tree regrowth and cooldowns) so agents can roll games forward without the Node engine
+"""
+import math
+
+from .constants import Constants
+from .game import Game
+from .game_constants import GAME_CONSTANTS
+
+DIRECTIONS = Constants.DIRECTIONS
+RESOURCE_TYPES = Constants.RESOURCE_TYPES
+UNIT_TYPES = Constants.UNIT_TYPES
+
+TEAMS = (0, 1)
+# resources are mined in decreasing order of fuel efficiency
+MINING_ORDER = (RESOURCE_TYPES.URANIUM, RESOURCE_TYPES.COAL, RESOURCE_TYPES.WOOD)
+RESOURCE_ORDER = (RESOURCE_TYPES.WOOD, RESOURCE_TYPES.COAL, RESOURCE_TYPES.URANIUM)
+# the cells a worker mines from, in the order the engine looks at them
+MINING_DIRECTIONS = (DIRECTIONS.NORTH, DIRECTIONS.EAST, DIRECTIONS.SOUTH, DIRECTIONS.WEST, DIRECTIONS.CENTER)
+DIRECTION_DELTAS = {
+    DIRECTIONS.NORTH: (0, -1),
+    DIRECTIONS.EAST: (1, 0),
+    DIRECTIONS.SOUTH: (0, 1),
+    DIRECTIONS.WEST: (-1, 0),
+    DIRECTIONS.CENTER: (0, 0),
+}
+
+
+class InvalidCommand(Exception):
+    """
+    raised by SimGame.validate_command for a command the engine would reject with a warning
+    """
+    pass
+
+
+def _parse_int(value: str):
+    """
+    parses the leading integer of value like JavaScript's parseInt, returning None where it would give NaN
+    """
+    value = value.lstrip()
+    end = 1 if value[:1] in ("+", "-") else 0
+    while end < len(value) and value[end].isdigit():
+        end += 1
+    try:
+        return int(value[:end])
+    except ValueError:
+        return None
+
+
+def _format_number(value) -> str:
+    """
+    formats a number the way JavaScript prints it, so integral floats lose their trailing .0
+    """
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _numeric_id(entity_id: str) -> int:
+    return int(entity_id.split("_")[1])
+
+
+class SimUnit:
+    __slots__ = ("id", "team", "type", "x", "y", "cooldown", "cargo")
+
+    def __init__(self, team, u_type, unitid, x, y, cooldown=0, wood=0, coal=0, uranium=0):
+        self.id = unitid
+        self.team = team
+        self.type = u_type
+        self.x = x
+        self.y = y
+        self.cooldown = cooldown
+        self.cargo = {RESOURCE_TYPES.WOOD: wood, RESOURCE_TYPES.COAL: coal, RESOURCE_TYPES.URANIUM: uranium}
+
+    def is_worker(self) -> bool:
+        return self.type == UNIT_TYPES.WORKER
+
+    def can_act(self) -> bool:
+        return self.cooldown < 1
+
+    def copy(self):
+        cargo = self.cargo
+        return SimUnit(
+            self.team, self.type, self.id, self.x, self.y, self.cooldown,
+            cargo[RESOURCE_TYPES.WOOD], cargo[RESOURCE_TYPES.COAL], cargo[RESOURCE_TYPES.URANIUM],
+        )
+
+
+class SimCityTile:
+    __slots__ = ("team", "cityid", "x", "y", "cooldown", "adjacent_city_tiles")
+
+    def __init__(self, team, cityid, x, y, cooldown=0):
+        self.team = team
+        self.cityid = cityid
+        self.x = x
+        self.y = y
+        self.cooldown = cooldown
+        # number of same team city tiles orthogonally adjacent to this one
+        self.adjacent_city_tiles = 0
+
+    def can_act(self) -> bool:
+        return self.cooldown < 1
+
+    def tile_id(self) -> str:
+        return "{}_{}_{}".format(self.cityid, self.x, self.y)
+
+
+class SimCity:
+    __slots__ = ("id", "team", "fuel", "citycells")
+
+    def __init__(self, team, cityid, fuel=0):
+        self.id = cityid
+        self.team = team
+        self.fuel = fuel
+        self.citycells: list[SimCityTile] = []
+
+
+class SimAction:
+    """
+    a validated command, the equivalent of the engine's Action classes
+    """
+    __slots__ = ("action", "team", "unitid", "direction", "newcell", "x", "y", "dest_id", "resource_type", "amount")
+
+    def __init__(self, action, team, unitid=None, direction=None, newcell=None, x=None, y=None,
+                 dest_id=None, resource_type=None, amount=None):
+        self.action = action
+        self.team = team
+        self.unitid = unitid
+        self.direction = direction
+        self.newcell = newcell
+        self.x = x
+        self.y = y
+        self.dest_id = dest_id
+        self.resource_type = resource_type
+        self.amount = amount
+
+
+class SimGame:
+    """
+    mutable game state that can be stepped forward with the commands of both teams. Build one from the kit's
+    Game with SimGame.from_game, roll it forward with step and hand it back to an agent with to_game
+    """
+    def __init__(self, width, height, parameters=None):
+        self.width = width
+        self.height = height
+        self.parameters = parameters if parameters is not None else GAME_CONSTANTS["PARAMETERS"]
+        self.turn = 0
+        self.global_unit_id_count = 0
+        self.global_city_id_count = 0
+        self.research_points = [0, 0]
+        self.researched = [self._initial_research(), self._initial_research()]
+        self.units: list[dict] = [{}, {}]
+        self.cities: dict = {}
+        self.resource_type = [[None] * width for _ in range(height)]
+        self.resource_amount = [[0] * width for _ in range(height)]
+        self.road = [[0] * width for _ in range(height)]
+        self.citytiles = [[None] * width for _ in range(height)]
+        self.cell_units = [[{} for _ in range(width)] for _ in range(height)]
+        # cells holding a resource, the engine's map.resources
+        self.resources: list[tuple] = []
+        # warnings for the commands and moves rejected during the last step
+        self.warnings: list[str] = []
+
+    @staticmethod
+    def _initial_research():
+        return {RESOURCE_TYPES.WOOD: True, RESOURCE_TYPES.COAL: False, RESOURCE_TYPES.URANIUM: False}
+
+    @classmethod
+    def from_game(cls, game: Game, global_unit_id_count=None, global_city_id_count=None, parameters=None):
+        """
+        builds a SimGame from the kit's view of a turn. The agent is not told the id counters, so unless they
+        are given (e.g. from a replay) they default to the largest unit and city ids in play, which is exact
+        as long as the newest unit and city are still alive
+        """
+        game_map = game.map
+        sim = cls(game_map.width, game_map.height, parameters)
+        sim.turn = game.turn
+        for player in game.players:
+            sim._set_research_points(player.team, player.research_points)
+        resources = []
+        for y in range(game_map.height):
+            for x in range(game_map.width):
+                cell = game_map.get_cell(x, y)
+                if cell.resource is not None:
+                    resources.append((x, y, cell.resource.type, cell.resource.amount))
+                if cell.road:
+                    sim.road[y][x] = cell.road
+        resources.sort()
+        for x, y, r_type, amount in resources:
+            sim.add_resource(x, y, r_type, amount)
+        max_unit_id = 0
+        for player in game.players:
+            for unit in player.units:
+                sim._add_unit(SimUnit(
+                    unit.team, unit.type, unit.id, unit.pos.x, unit.pos.y, unit.cooldown,
+                    unit.cargo.wood, unit.cargo.coal, unit.cargo.uranium,
+                ))
+                max_unit_id = max(max_unit_id, _numeric_id(unit.id))
+        # the engine keeps cities in creation order, which is the order of their ids
+        cities = [city for player in game.players for city in player.cities.values()]
+        cities.sort(key=lambda city: _numeric_id(city.cityid))
+        max_city_id = 0
+        for city in cities:
+            sim_city = SimCity(city.team, city.cityid, city.fuel)
+            sim.cities[city.cityid] = sim_city
+            for citytile in city.citytiles:
+                sim_citytile = SimCityTile(city.team, city.cityid, citytile.pos.x, citytile.pos.y, citytile.cooldown)
+                sim.citytiles[citytile.pos.y][citytile.pos.x] = sim_citytile
+                sim_city.citycells.append(sim_citytile)
+            max_city_id = max(max_city_id, _numeric_id(city.cityid))
+        for city in sim.cities.values():
+            for citytile in city.citycells:
+                citytile.adjacent_city_tiles = sum(
+                    1 for cell in sim.adjacent_cells(citytile.x, citytile.y)
+                    if sim.citytiles[cell[1]][cell[0]] is not None
+                    and sim.citytiles[cell[1]][cell[0]].team == citytile.team
+                )
+        sim.global_unit_id_count = max_unit_id if global_unit_id_count is None else global_unit_id_count
+        sim.global_city_id_count = max_city_id if global_city_id_count is None else global_city_id_count
+        return sim
+
+    def copy(self):
+        """
+        returns an independent copy of this state, e.g. to roll out several futures from the same turn
+        """
+        sim = SimGame(self.width, self.height, self.parameters)
+        sim.turn = self.turn
+        sim.global_unit_id_count = self.global_unit_id_count
+        sim.global_city_id_count = self.global_city_id_count
+        sim.research_points = list(self.research_points)
+        sim.researched = [dict(researched) for researched in self.researched]
+        sim.resource_type = [list(row) for row in self.resource_type]
+        sim.resource_amount = [list(row) for row in self.resource_amount]
+        sim.road = [list(row) for row in self.road]
+        sim.resources = list(self.resources)
+        for team in TEAMS:
+            for unit in self.units[team].values():
+                sim._add_unit(unit.copy())
+        for city in self.cities.values():
+            sim_city = SimCity(city.team, city.id, city.fuel)
+            sim.cities[city.id] = sim_city
+            for citytile in city.citycells:
+                sim_citytile = SimCityTile(citytile.team, citytile.cityid, citytile.x, citytile.y, citytile.cooldown)
+                sim_citytile.adjacent_city_tiles = citytile.adjacent_city_tiles
+                sim.citytiles[citytile.y][citytile.x] = sim_citytile
+                sim_city.citycells.append(sim_citytile)
+        return sim
+
+    def _set_research_points(self, team, points):
+        self.research_points[team] = points
+        requirements = self.parameters["RESEARCH_REQUIREMENTS"]
+        researched = self.researched[team]
+        researched[RESOURCE_TYPES.COAL] = points >= requirements["COAL"]
+        researched[RESOURCE_TYPES.URANIUM] = points >= requirements["URANIUM"]
+
+    def _add_unit(self, unit: SimUnit):
+        self.units[unit.team][unit.id] = unit
+        self.cell_units[unit.y][unit.x][unit.id] = unit
+
+    # map helpers
+
+    def in_map(self, x, y) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def adjacent_cells(self, x, y):
+        """
+        the in-map cells orthogonally adjacent to (x, y)
+        """
+        return [
+            (x + dx, y + dy) for dx, dy in ((0, -1), (1, 0), (0, 1), (-1, 0))
+            if self.in_map(x + dx, y + dy)
+        ]
+
+    def has_resource(self, x, y) -> bool:
+        return self.resource_type[y][x] is not None and self.resource_amount[y][x] > 0
+
+    def get_road(self, x, y):
+        if self.citytiles[y][x] is not None:
+            return self.parameters["MAX_ROAD"]
+        return self.road[y][x]
+
+    def is_night(self) -> bool:
+        day_length = self.parameters["DAY_LENGTH"]
+        return self.turn % (day_length + self.parameters["NIGHT_LENGTH"]) >= day_length
+
+    def add_resource(self, x, y, r_type, amount):
+        if self.resource_type[y][x] is None:
+            self.resources.append((x, y))
+        self.resource_type[y][x] = r_type
+        self.resource_amount[y][x] = amount
+
+    def get_unit(self, team, unitid) -> SimUnit:
+        return self.units[team].get(unitid)
+
+    def cargo_space_left(self, unit: SimUnit):
+        capacity = self.parameters["RESOURCE_CAPACITY"]
+        space = capacity["WORKER"] if unit.type == UNIT_TYPES.WORKER else capacity["CART"]
+        cargo = unit.cargo
+        return space - cargo[RESOURCE_TYPES.WOOD] - cargo[RESOURCE_TYPES.COAL] - cargo[RESOURCE_TYPES.URANIUM]
+
+    def city_light_upkeep(self, city: SimCity):
+        bonus = sum(citytile.adjacent_city_tiles for citytile in city.citycells)
+        return (
+            len(city.citycells) * self.parameters["LIGHT_UPKEEP"]["CITY"]
+            - bonus * self.parameters["CITY_ADJACENCY_BONUS"]
+        )
+
+    def unit_light_upkeep(self, unit: SimUnit):
+        if unit.type == UNIT_TYPES.WORKER:
+            return self.parameters["LIGHT_UPKEEP"]["WORKER"]
+        return self.parameters["LIGHT_UPKEEP"]["CART"]
+
+    def city_tile_count(self, team) -> int:
+        return sum(len(city.citycells) for city in self.cities.values() if city.team == team)
+
+    def unit_cap_reached(self, team, offset=0) -> bool:
+        return len(self.units[team]) + offset >= self.city_tile_count(team)
+
+    # spawning and destruction
+
+    def spawn_worker(self, team, x, y, unitid=None) -> SimUnit:
+        return self._spawn_unit(team, UNIT_TYPES.WORKER, x, y, unitid)
+
+    def spawn_cart(self, team, x, y, unitid=None) -> SimUnit:
+        return self._spawn_unit(team, UNIT_TYPES.CART, x, y, unitid)
+
+    def _spawn_unit(self, team, u_type, x, y, unitid):
+        if unitid is None:
+            self.global_unit_id_count += 1
+            unitid = "u_{}".format(self.global_unit_id_count)
+        unit = SimUnit(team, u_type, unitid, x, y)
+        self._add_unit(unit)
+        return unit
+
+    def spawn_city_tile(self, team, x, y, cityid=None) -> SimCityTile:
+        """
+        places a city tile, merging it into (and merging together) the adjacent cities of the same team
+        """
+        adjacent = []
+        city_ids_found = []
+        for ax, ay in self.adjacent_cells(x, y):
+            citytile = self.citytiles[ay][ax]
+            if citytile is not None and citytile.team == team:
+                adjacent.append(citytile)
+                if citytile.cityid not in city_ids_found:
+                    city_ids_found.append(citytile.cityid)
+
+        if not adjacent:
+            if cityid is None:
+                self.global_city_id_count += 1
+                cityid = "c_{}".format(self.global_city_id_count)
+            city = SimCity(team, cityid)
+            citytile = SimCityTile(team, cityid, x, y)
+            self.citytiles[y][x] = citytile
+            city.citycells.append(citytile)
+            self.cities[cityid] = city
+            return citytile
+
+        cityid = adjacent[0].cityid
+        city = self.cities[cityid]
+        citytile = SimCityTile(team, cityid, x, y)
+        self.citytiles[y][x] = citytile
+        citytile.adjacent_city_tiles = len(adjacent)
+        for adjacent_citytile in adjacent:
+            adjacent_citytile.adjacent_city_tiles += 1
+        city.citycells.append(citytile)
+        for other_id in city_ids_found:
+            if other_id != cityid:
+                other = self.cities.pop(other_id)
+                for other_citytile in other.citycells:
+                    other_citytile.cityid = cityid
+                    city.citycells.append(other_citytile)
+                city.fuel += other.fuel
+        return citytile
+
+    def destroy_city(self, cityid):
+        city = self.cities.pop(cityid)
+        for citytile in city.citycells:
+            self.citytiles[citytile.y][citytile.x] = None
+            self.road[citytile.y][citytile.x] = self.parameters["MIN_ROAD"]
+
+    def destroy_unit(self, team, unitid):
+        unit = self.units[team].pop(unitid)
+        del self.cell_units[unit.y][unit.x][unitid]
+
+    # command validation
+
+    def validate_command(self, team, command, accumulated=None):
+        """
+        returns the SimAction for a command or None for debug annotations, raising InvalidCommand where the
+        engine would reject it. accumulated tracks the actions already placed this turn, see step
+        """
+        if accumulated is None:
+            accumulated = self._initial_accumulated_stats()
+        acc = accumulated[team]
+        action, *args = command.split(" ")
+        malformed = "Agent {} sent malformed command: {}".format(team, command)
+
+        def check(condition, message):
+            if condition:
+                raise InvalidCommand("{}; turn {}; cmd: {}".format(message, self.turn, command))
+
+        if action in ("dc", "dx", "dl", "dt", "dst"):
+            return None
+
+        if action in ("p", "bcity"):
+            if len(args) != 1:
+                raise InvalidCommand(malformed)
+            uid = args[0]
+            unit = self.get_unit(team, uid)
+            check(unit is None, "Agent {} tried to act with invalid/unowned unit id: {}".format(team, uid))
+            if action == "bcity":
+                check(self.citytiles[unit.y][unit.x] is not None,
+                      "Agent {} tried to build CityTile on existing CityTile".format(team))
+                check(self.has_resource(unit.x, unit.y),
+                      "Agent {} tried to build CityTile on non-empty resource tile".format(team))
+            check(not unit.can_act(), "Agent {} tried to act with cooldown: {}".format(team, unit.cooldown))
+            if action == "bcity":
+                check(sum(unit.cargo.values()) < self.parameters["CITY_BUILD_COST"],
+                      "Agent {} tried to build CityTile with insufficient materials".format(team))
+            check(uid in acc["actions_placed"],
+                  "Agent {} sent an extra command. Unit can perform only one action at a time".format(team))
+            acc["actions_placed"].add(uid)
+            return SimAction(action, team, unitid=uid)
+
+        if action in ("bw", "bc", "r"):
+            if len(args) != 2:
+                raise InvalidCommand(malformed)
+            x = _parse_int(args[0])
+            y = _parse_int(args[1])
+            check(x is None or y is None or not self.in_map(x, y),
+                  "Agent {} tried to act at invalid coordinates".format(team))
+            citytile = self.citytiles[y][x]
+            check(citytile is None or citytile.team != team,
+                  "Agent {} tried to act at tile ({}, {}) that it does not own".format(team, x, y))
+            if action == "r":
+                check(not citytile.can_act(),
+                      "Agent {} tried to run research at CityTile ({}, {}) but CityTile still on cooldown {}".format(
+                          team, x, y, citytile.cooldown))
+            check(citytile.tile_id() in acc["actions_placed"],
+                  "Agent {} sent an extra command. CityTile can perform only one action at a time".format(team))
+            if action != "r":
+                check(not citytile.can_act(),
+                      "Agent {} tried to build unit on tile ({}, {}) but CityTile still with cooldown of {}".format(
+                          team, x, y, citytile.cooldown))
+                check(self.unit_cap_reached(team, acc["units_built"]),
+                      "Agent {} tried to build unit on tile ({}, {}) but unit cap reached".format(team, x, y))
+                acc["units_built"] += 1
+            acc["actions_placed"].add(citytile.tile_id())
+            return SimAction(action, team, x=x, y=y)
+
+        if action == "m":
+            if len(args) != 2:
+                raise InvalidCommand(malformed)
+            uid, direction = args
+            unit = self.get_unit(team, uid)
+            check(unit is None, "Agent {} tried to move unit {} that it does not own".format(team, uid))
+            check(not unit.can_act(), "Agent {} tried to move unit {} with cooldown: {}".format(team, uid, unit.cooldown))
+            check(uid in acc["actions_placed"],
+                  "Agent {} sent an extra command. Unit can perform only one action at a time".format(team))
+            check(direction not in DIRECTION_DELTAS,
+                  "Agent {} tried to move unit {} in invalid direction {}".format(team, uid, direction))
+            dx, dy = DIRECTION_DELTAS[direction]
+            newcell = (unit.x + dx, unit.y + dy)
+            if direction != DIRECTIONS.CENTER:
+                check(not self.in_map(*newcell), "Agent {} tried to move unit {} off map".format(team, uid))
+                citytile = self.citytiles[newcell[1]][newcell[0]]
+                check(citytile is not None and citytile.team != team,
+                      "Agent {} tried to move unit {} onto opponent CityTile".format(team, uid))
+            acc["actions_placed"].add(uid)
+            return SimAction(action, team, unitid=uid, direction=direction, newcell=newcell)
+
+        if action == "t":
+            if len(args) != 4:
+                raise InvalidCommand(malformed)
+            src_id, dest_id, resource_type, amount = args
+            amount = _parse_int(amount)
+            units = self.units[team]
+            check(src_id not in units, "Agent {} does not own source unit: {} for transfer".format(team, src_id))
+            check(dest_id not in units, "Agent {} does not own destination unit: {} for transfer".format(team, dest_id))
+            src = units[src_id]
+            dest = units[dest_id]
+            check(not src.can_act(),
+                  "Agent {} tried to transfer resources with cooldown: {}".format(team, src.cooldown))
+            check(src_id in acc["actions_placed"],
+                  "Agent {} sent an extra command. Unit can perform only one action at a time".format(team))
+            check(src_id == dest_id, "Agent {} tried to transfer between the same unit {}".format(team, src_id))
+            check(abs(src.x - dest.x) + abs(src.y - dest.y) > 1,
+                  "Agent {} tried to transfer between non-adjacent units: {}, {}".format(team, src_id, dest_id))
+            check(amount is None or amount < 0, "Agent {} tried to transfer invalid amount: {}".format(team, amount))
+            check(resource_type not in RESOURCE_ORDER,
+                  "Agent {} tried to transfer invalid resource: {}".format(team, resource_type))
+            acc["actions_placed"].add(src_id)
+            return SimAction(action, team, unitid=src_id, dest_id=dest_id, resource_type=resource_type, amount=amount)
+
+        raise InvalidCommand(malformed)
+
+    @staticmethod
+    def _initial_accumulated_stats():
+        return [{"units_built": 0, "actions_placed": set()} for _ in TEAMS]
+
+    # turn logic
+
+    def step(self, actions) -> bool:
+        """
+        runs one turn with actions[team] being the list of commands sent by each team, returning whether
+        the match is over. Rejected commands and reverted moves are recorded in self.warnings
+        """
+        self.warnings = []
+        accumulated = self._initial_accumulated_stats()
+        validated = {action: [] for action in ("bcity", "bw", "bc", "p", "r", "t", "m")}
+        for team in TEAMS:
+            for command in actions[team]:
+                if command[:1] == "d":
+                    continue
+                try:
+                    action = self.validate_command(team, command, accumulated)
+                except InvalidCommand as err:
+                    self.warnings.append(str(err))
+                    continue
+                if action is not None:
+                    validated[action.action].append(action)
+
+        unit_actions = {}
+        citytile_actions = {}
+        for name in ("bcity", "bw", "bc", "p", "r", "t"):
+            for action in validated[name]:
+                if action.unitid is not None:
+                    unit_actions.setdefault(action.unitid, []).append(action)
+                else:
+                    citytile_actions.setdefault((action.x, action.y), []).append(action)
+        for action in self.handle_movement_actions(validated["m"]):
+            if action.direction != DIRECTIONS.CENTER:
+                unit_actions.setdefault(action.unitid, []).append(action)
+
+        for city in list(self.cities.values()):
+            for citytile in list(city.citycells):
+                self.handle_citytile_turn(citytile, citytile_actions.get((citytile.x, citytile.y)))
+        for team in TEAMS:
+            for unit in list(self.units[team].values()):
+                self.handle_unit_turn(unit, unit_actions.get(unit.id))
+
+        self.distribute_all_resources()
+        for team in TEAMS:
+            for unit in self.units[team].values():
+                self.handle_resource_deposit(unit)
+        if self.is_night():
+            self.handle_night()
+        self.resources = [(x, y) for x, y in self.resources if self.resource_amount[y][x] > 0]
+        self.regenerate_trees()
+
+        match_over = self.is_over()
+        self.turn += 1
+        self.run_cooldowns()
+        return match_over
+
+    def handle_movement_actions(self, actions):
+        """
+        returns the move actions that can all be executed without units bumping into each other
+        """
+        cells_to_actions = {}
+        moving_units = set()
+        for action in actions:
+            cells_to_actions.setdefault(action.newcell, []).append(action)
+            moving_units.add(action.unitid)
+
+        def revert(action):
+            self.warnings.append("turn {}; Unit {} collided when trying to move {} to ({}, {})".format(
+                self.turn, action.unitid, action.direction, action.newcell[0], action.newcell[1]))
+            unit = self.get_unit(action.team, action.unitid)
+            origcell = (unit.x, unit.y)
+            colliding = cells_to_actions.get(origcell)
+            if self.citytiles[unit.y][unit.x] is None:
+                cells_to_actions.pop(origcell, None)
+                if colliding:
+                    for colliding_action in colliding:
+                        revert(colliding_action)
+
+        for cell in list(cells_to_actions):
+            current = cells_to_actions.get(cell)
+            to_revert = []
+            if current is not None and self.citytiles[cell[1]][cell[0]] is None:
+                if len(current) > 1:
+                    # units of the same team may share a city tile, anywhere else they bump
+                    to_revert.extend(current)
+                elif len(current) == 1:
+                    units_there = self.cell_units[cell[1]][cell[0]]
+                    if len(units_there) == 1 and not any(unitid in moving_units for unitid in units_there):
+                        to_revert.append(current[0])
+            for action in to_revert:
+                revert(action)
+            for action in to_revert:
+                cells_to_actions.pop(action.newcell, None)
+
+        return [action for current in cells_to_actions.values() for action in current]
+
+    def move_unit(self, team, unitid, direction):
+        unit = self.get_unit(team, unitid)
+        del self.cell_units[unit.y][unit.x][unitid]
+        dx, dy = DIRECTION_DELTAS[direction]
+        unit.x += dx
+        unit.y += dy
+        self.cell_units[unit.y][unit.x][unitid] = unit
+
+    def transfer_resources(self, team, src_id, dest_id, resource_type, amount):
+        src = self.get_unit(team, src_id)
+        dest = self.get_unit(team, dest_id)
+        amount = min(amount, src.cargo[resource_type], self.cargo_space_left(dest))
+        src.cargo[resource_type] -= amount
+        dest.cargo[resource_type] += amount
+
+    def expend_resources_for_city(self, unit: SimUnit):
+        """
+        spends CITY_BUILD_COST worth of cargo, wood first, then coal, then uranium
+        """
+        cost = self.parameters["CITY_BUILD_COST"]
+        spent = 0
+        for r_type in RESOURCE_ORDER:
+            if spent + unit.cargo[r_type] > cost:
+                unit.cargo[r_type] -= cost - spent
+                break
+            spent += unit.cargo[r_type]
+            unit.cargo[r_type] = 0
+
+    def handle_citytile_turn(self, citytile: SimCityTile, actions):
+        if actions is not None and len(actions) == 1:
+            action = actions[0]
+            if action.action == "bc":
+                self.spawn_cart(action.team, action.x, action.y)
+            elif action.action == "bw":
+                self.spawn_worker(action.team, action.x, action.y)
+            else:
+                self._set_research_points(citytile.team, self.research_points[citytile.team] + 1)
+            citytile.cooldown = self.parameters["CITY_ACTION_COOLDOWN"]
+        if citytile.cooldown > 0:
+            citytile.cooldown -= 1
+
+    def handle_unit_turn(self, unit: SimUnit, actions):
+        cooldown_multiplier = 2 if self.is_night() else 1
+        if unit.type == UNIT_TYPES.WORKER:
+            if actions is not None and len(actions) == 1:
+                action = actions[0]
+                if action.action == "m":
+                    self.move_unit(action.team, action.unitid, action.direction)
+                elif action.action == "t":
+                    self.transfer_resources(action.team, action.unitid, action.dest_id, action.resource_type,
+                                            action.amount)
+                elif action.action == "bcity":
+                    self.spawn_city_tile(action.team, unit.x, unit.y)
+                    self.expend_resources_for_city(unit)
+                elif action.action == "p":
+                    self.road[unit.y][unit.x] = max(
+                        self.road[unit.y][unit.x] - self.parameters["PILLAGE_RATE"], self.parameters["MIN_ROAD"]
+                    )
+                unit.cooldown += self.parameters["UNIT_ACTION_COOLDOWN"]["WORKER"] * cooldown_multiplier
+            return
+
+        if actions is not None and len(actions) == 1:
+            action = actions[0]
+            if action.action == "m":
+                self.move_unit(action.team, action.unitid, action.direction)
+                unit.cooldown += self.parameters["UNIT_ACTION_COOLDOWN"]["CART"] * cooldown_multiplier
+            elif action.action == "t":
+                self.transfer_resources(action.team, action.unitid, action.dest_id, action.resource_type,
+                                        action.amount)
+                unit.cooldown += self.parameters["UNIT_ACTION_COOLDOWN"]["CART"] * cooldown_multiplier
+        # carts develop the road of the cell they end their turn on
+        max_road = self.parameters["MAX_ROAD"]
+        if self.get_road(unit.x, unit.y) < max_road:
+            self.road[unit.y][unit.x] = min(
+                self.road[unit.y][unit.x] + self.parameters["CART_ROAD_DEVELOPMENT_RATE"], max_road
+            )
+
+    def distribute_all_resources(self):
+        for r_type in MINING_ORDER:
+            self.resolve_resource_requests(r_type, self.create_resource_requests(r_type))
+
+    def create_resource_requests(self, r_type):
+        """
+        returns {(x, y): [(from_x, from_y, amount, worker, city)]} with the amount each worker (or the city
+        it stands on) asks of every cell of the given resource type it can mine
+        """
+        mining_rate = self.parameters["WORKER_COLLECTION_RATE"][r_type.upper()]
+        requests = {}
+        for team in TEAMS:
+            if not self.researched[team][r_type]:
+                continue
+            for unit in self.units[team].values():
+                if unit.type != UNIT_TYPES.WORKER:
+                    continue
+                minable = []
+                for direction in MINING_DIRECTIONS:
+                    dx, dy = DIRECTION_DELTAS[direction]
+                    x, y = unit.x + dx, unit.y + dy
+                    if self.in_map(x, y) and self.resource_type[y][x] == r_type and self.resource_amount[y][x] > 0:
+                        minable.append((x, y))
+                if not minable:
+                    continue
+                amount = min(math.ceil(self.cargo_space_left(unit) / len(minable)), mining_rate)
+                citytile = self.citytiles[unit.y][unit.x]
+                if citytile is not None:
+                    request = (unit.x, unit.y, amount, None, self.cities[citytile.cityid])
+                else:
+                    request = (unit.x, unit.y, amount, unit, None)
+                for cell in minable:
+                    cell_requests = requests.setdefault(cell, [])
+                    if request not in cell_requests:
+                        cell_requests.append(request)
+        return requests
+
+    def resolve_resource_requests(self, r_type, requests):
+        """
+        hands out the resource of each requested cell, filling the smallest request first and splitting
+        what is left evenly between the remaining requests
+        """
+        fuel_rate = self.parameters["RESOURCE_TO_FUEL_RATE"][r_type.upper()]
+        for (x, y), cell_requests in requests.items():
+            amount_left = self.resource_amount[y][x]
+            amounts = [[request[2], request] for request in cell_requests]
+            while amounts and sum(amount for amount, _ in amounts) > 0 and amount_left > 0:
+                to_fill = min(min(amount for amount, _ in amounts), amount_left // len(amounts))
+                for _, (_, _, _, worker, city) in amounts:
+                    if city is not None:
+                        city.fuel += to_fill * fuel_rate
+                    else:
+                        worker.cargo[r_type] += min(self.cargo_space_left(worker), to_fill)
+                for entry in amounts:
+                    entry[0] -= to_fill
+                amount_left -= to_fill * len(amounts)
+                if amount_left < len(amounts):
+                    amount_left = 0
+                amounts = [entry for entry in amounts if entry[0] > 0]
+            self.resource_amount[y][x] = amount_left
+
+    def handle_resource_deposit(self, unit: SimUnit):
+        citytile = self.citytiles[unit.y][unit.x]
+        if citytile is not None and citytile.team == unit.team:
+            fuel_rates = self.parameters["RESOURCE_TO_FUEL_RATE"]
+            cargo = unit.cargo
+            self.cities[citytile.cityid].fuel += (
+                cargo[RESOURCE_TYPES.WOOD] * fuel_rates["WOOD"]
+                + cargo[RESOURCE_TYPES.COAL] * fuel_rates["COAL"]
+                + cargo[RESOURCE_TYPES.URANIUM] * fuel_rates["URANIUM"]
+            )
+            for r_type in RESOURCE_ORDER:
+                cargo[r_type] = 0
+
+    def spend_fuel_to_survive(self, unit: SimUnit) -> bool:
+        """
+        burns wood, then coal, then uranium to cover a unit's upkeep for the night. Returns whether it survived
+        """
+        fuel_needed = self.unit_light_upkeep(unit)
+        fuel_rates = self.parameters["RESOURCE_TO_FUEL_RATE"]
+        for r_type in RESOURCE_ORDER:
+            rate = fuel_rates[r_type.upper()]
+            used = min(unit.cargo[r_type], math.ceil(fuel_needed / rate))
+            fuel_needed -= used * rate
+            unit.cargo[r_type] -= used
+            if fuel_needed <= 0:
+                return True
+        return False
+
+    def handle_night(self):
+        for city in list(self.cities.values()):
+            upkeep = self.city_light_upkeep(city)
+            if city.fuel < upkeep:
+                self.destroy_city(city.id)
+            else:
+                city.fuel -= upkeep
+        for team in TEAMS:
+            for unit in list(self.units[team].values()):
+                if self.citytiles[unit.y][unit.x] is None and not self.spend_fuel_to_survive(unit):
+                    self.destroy_unit(team, unit.id)
+
+    def regenerate_trees(self):
+        max_wood = self.parameters["MAX_WOOD_AMOUNT"]
+        growth_rate = self.parameters["WOOD_GROWTH_RATE"]
+        for x, y in self.resources:
+            amount = self.resource_amount[y][x]
+            if self.resource_type[y][x] == RESOURCE_TYPES.WOOD and amount < max_wood:
+                self.resource_amount[y][x] = math.ceil(min(amount * growth_rate, max_wood))
+
+    def run_cooldowns(self):
+        for team in TEAMS:
+            for unit in self.units[team].values():
+                unit.cooldown -= self.get_road(unit.x, unit.y)
+                unit.cooldown = max(unit.cooldown - 1, 0)
+
+    # results and output
+
+    def is_over(self) -> bool:
+        """
+        whether the turn being played is the last one, checked before the turn counter advances like the engine
+        """
+        if self.turn == self.parameters["MAX_DAYS"] - 1:
+            return True
+        city_count = [0, 0]
+        for city in self.cities.values():
+            city_count[city.team] += 1
+        return any(len(self.units[team]) + city_count[team] == 0 for team in TEAMS)
+
+    def get_results(self):
+        """
+        returns the ranks of both teams as [(rank, team), ...], winner first. Ties share rank 1
+        """
+        citytile_count = [self.city_tile_count(team) for team in TEAMS]
+        unit_count = [len(self.units[team]) for team in TEAMS]
+        for counts in (citytile_count, unit_count):
+            if counts[0] != counts[1]:
+                winner = 0 if counts[0] > counts[1] else 1
+                return [(1, winner), (2, 1 - winner)]
+        return [(1, 0), (1, 1)]
+
+    def to_updates(self):
+        """
+        returns the update lines the engine would send to the agents for the current state, D_DONE excluded
+        """
+        lines = ["rp {} {}".format(team, self.research_points[team]) for team in TEAMS]
+        for x, y in self.resources:
+            lines.append("r {} {} {} {}".format(self.resource_type[y][x], x, y, self.resource_amount[y][x]))
+        for team in TEAMS:
+            for unit in self.units[team].values():
+                cargo = unit.cargo
+                lines.append("u {} {} {} {} {} {} {} {} {}".format(
+                    unit.type, team, unit.id, unit.x, unit.y, _format_number(unit.cooldown),
+                    cargo[RESOURCE_TYPES.WOOD], cargo[RESOURCE_TYPES.COAL], cargo[RESOURCE_TYPES.URANIUM],
+                ))
+        for city in self.cities.values():
+            lines.append("c {} {} {} {}".format(
+                city.team, city.id, _format_number(city.fuel), _format_number(self.city_light_upkeep(city))))
+        for city in self.cities.values():
+            for citytile in city.citycells:
+                lines.append("ct {} {} {} {} {}".format(
+                    city.team, city.id, citytile.x, citytile.y, _format_number(citytile.cooldown)))
+        for y in range(self.height):
+            for x in range(self.width):
+                road = self.get_road(x, y)
+                if road != 0:
+                    lines.append("ccd {} {} {}".format(x, y, _format_number(road)))
+        return lines
+
+    def to_state(self):
+        """
+        returns the engine's SerializedState of the current state, the dict toStateObject() of src/Game/index.ts
+        gives, which lux.state turns into a Game without update lines
+        """
+        team_states = {}
+        for team in TEAMS:
+            team_states[team] = {
+                "researchPoints": self.research_points[team],
+                "units": {
+                    unit.id: {"cargo": dict(unit.cargo), "cooldown": unit.cooldown, "x": unit.x, "y": unit.y,
+                              "type": unit.type}
+                    for unit in self.units[team].values()
+                },
+                "researched": dict(self.researched[team]),
+            }
+        game_map = []
+        for y in range(self.height):
+            row = []
+            for x in range(self.width):
+                cell = {"road": self.get_road(x, y)}
+                if self.has_resource(x, y):
+                    cell["resource"] = {"type": self.resource_type[y][x], "amount": self.resource_amount[y][x]}
+                row.append(cell)
+            game_map.append(row)
+        cities = {}
+        for city in self.cities.values():
+            cities[city.id] = {
+                "id": city.id,
+                "fuel": city.fuel,
+                "lightupkeep": self.city_light_upkeep(city),
+                "team": city.team,
+                "cityCells": [
+                    {"x": citytile.x, "y": citytile.y, "cooldown": citytile.cooldown} for citytile in city.citycells
+                ],
+            }
+        return {
+            "turn": self.turn,
+            "globalCityIDCount": self.global_city_id_count,
+            "globalUnitIDCount": self.global_unit_id_count,
+            "teamStates": team_states,
+            "map": game_map,
+            "cities": cities,
+        }
+
+    def to_game(self, player_id=0, **game_options) -> Game:
+        """
+        returns the kit's Game as an agent playing player_id would see the current state
+        """
+        game = Game(**game_options)
+        game._initialize([str(player_id), "{} {}".format(self.width, self.height)])
+        game.turn = self.turn - 1
+        # straight from this state, the same as parsing self.to_updates()
+        game._update_from_state(self)
+        return game
@@ -0,0 +1,120 @@
+class SpatialIndex:
+    """
+    Bucketed grid index over items placed on map cells, answering nearest and within-radius queries in
+    Manhattan distance, the same metric as Position.distance_to.
+
+    Items at the same distance are returned in the order they were added, so a query picks the same item
+    as a linear scan over the items in insertion order that keeps the first strictly closer one.
+    """
+    def __init__(self, width, height, bucket_size=4):
+        self.width = width
+        self.height = height
+        self.bucket_size = bucket_size
+        self._cols = (width + bucket_size - 1) // bucket_size
+        self._rows = (height + bucket_size - 1) // bucket_size
+        self._buckets = [[[] for _ in range(self._cols)] for _ in range(self._rows)]
+        self._count = 0
+        self._order = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, x, y, item):
+        self._buckets[y // self.bucket_size][x // self.bucket_size].append((x, y, self._order, item))
+        self._order += 1
+        self._count += 1
+
+    def remove(self, x, y, item):
+        """
+        remove an item previously added at (x, y). Raises ValueError if it is not there
+        """
+        bucket = self._buckets[y // self.bucket_size][x // self.bucket_size]
+        for i, entry in enumerate(bucket):
+            if entry[3] is item and entry[0] == x and entry[1] == y:
+                del bucket[i]
+                self._count -= 1
+                return
+        raise ValueError(f"item not found at ({x}, {y})")
+
+    def move(self, x, y, new_x, new_y, item):
+        """
+        move an item from (x, y) to (new_x, new_y). It keeps its place in the tie breaking order
+        """
+        bucket = self._buckets[y // self.bucket_size][x // self.bucket_size]
+        for i, entry in enumerate(bucket):
+            if entry[3] is item and entry[0] == x and entry[1] == y:
+                del bucket[i]
+                self._buckets[new_y // self.bucket_size][new_x // self.bucket_size].append(
+                    (new_x, new_y, entry[2], item)
+                )
+                return
+        raise ValueError(f"item not found at ({x}, {y})")
+
+    def _ring(self, bx, by, ring):
+        """
+        yield the buckets at Chebyshev distance ring from bucket (bx, by)
+        """
+        buckets = self._buckets
+        top = by - ring
+        bottom = by + ring
+        left = max(bx - ring, 0)
+        right = min(bx + ring, self._cols - 1)
+        if ring == 0:
+            yield buckets[by][bx]
+            return
+        for row in (top, bottom):
+            if 0 <= row < self._rows:
+                yield from buckets[row][left:right + 1]
+        for row in range(max(top + 1, 0), min(bottom, self._rows)):
+            if bx - ring >= 0:
+                yield buckets[row][bx - ring]
+            if bx + ring < self._cols:
+                yield buckets[row][bx + ring]
+
+    def _search(self, pos, k, max_distance):
+        x, y = pos.x, pos.y
+        size = self.bucket_size
+        bx = min(max(x // size, 0), self._cols - 1)
+        by = min(max(y // size, 0), self._rows - 1)
+        max_ring = max(bx, self._cols - 1 - bx, by, self._rows - 1 - by)
+        found = []
+        for ring in range(max_ring + 1):
+            # every item in this ring or further out is at least this far away
+            lower_bound = (ring - 1) * size + 1 if ring > 0 else 0
+            if max_distance is not None and lower_bound > max_distance:
+                break
+            if k is not None and len(found) >= k and found[k - 1][0] < lower_bound:
+                break
+            for bucket in self._ring(bx, by, ring):
+                for ex, ey, order, item in bucket:
+                    dist = abs(ex - x) + abs(ey - y)
+                    if max_distance is None or dist <= max_distance:
+                        found.append((dist, order, item))
+            found.sort(key=_distance_and_order)
+            if k is not None:
+                del found[k:]
+        return [(dist, item) for dist, _, item in found]
+
+    def nearest(self, pos, k=1, max_distance=None):
+        """
+        return up to k (distance, item) pairs closest to pos, closest first. If max_distance is given,
+        items further away than it are ignored
+        """
+        return self._search(pos, k, max_distance)
+
+    def closest(self, pos, max_distance=None):
+        """
+        return the item closest to pos, or None if there is none (within max_distance)
+        """
+        found = self._search(pos, 1, max_distance)
+        return found[0][1] if found else None
+
+    def within(self, pos, radius):
+        """
+        return all (distance, item) pairs with distance to pos of at most radius, closest first
+        """
+        return self._search(pos, None, radius)
+
+
+def _distance_and_order(entry):
+    return entry[0], entry[1]
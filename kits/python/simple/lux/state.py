@@ -0,0 +1,175 @@
+"""
+Builds the kit's Game from structured game state instead of update lines. When the engine or lux.sim runs in
+the same process as the agents, writing the state out as update lines only for Game._update to split and parse
+them again is wasted work. state_updates(state) turns the engine's SerializedState (the toStateObject() of
+src/Game/index.ts, also the entries of stateful replays) or a SimGame straight into the ParsedUpdates that
+Game._update builds from the lines, so a Game updated from either source ends up the same, incremental and
+array maps included.
+
+    game_state = game_from_state(state, player)     # instead of _initialize and _update on step 0
+    game_state._update_from_state(state)            # instead of game_state._update(observation["updates"])
+"""
+from .constants import Constants
+from .game import Game
+from .game_constants import GAME_CONSTANTS
+from .parser import ParsedUpdates, UpdateTable
+
+INPUT_CONSTANTS = Constants.INPUT_CONSTANTS
+RESOURCE_TYPES = Constants.RESOURCE_TYPES
+TEAMS = (0, 1)
+
+
+def _tables(research_points, resources, units, cities, citytiles, roads) -> ParsedUpdates:
+    return ParsedUpdates({
+        INPUT_CONSTANTS.RESEARCH_POINTS: UpdateTable.from_columns(INPUT_CONSTANTS.RESEARCH_POINTS, research_points),
+        INPUT_CONSTANTS.RESOURCES: UpdateTable.from_columns(INPUT_CONSTANTS.RESOURCES, resources),
+        INPUT_CONSTANTS.UNITS: UpdateTable.from_columns(INPUT_CONSTANTS.UNITS, units),
+        INPUT_CONSTANTS.CITY: UpdateTable.from_columns(INPUT_CONSTANTS.CITY, cities),
+        INPUT_CONSTANTS.CITY_TILES: UpdateTable.from_columns(INPUT_CONSTANTS.CITY_TILES, citytiles),
+        INPUT_CONSTANTS.ROADS: UpdateTable.from_columns(INPUT_CONSTANTS.ROADS, roads),
+    })
+
+
+def _team_state(team_states, team):
+    # the team keys are strings once the state went through JSON
+    state = team_states.get(team)
+    return state if state is not None else team_states[str(team)]
+
+
+def _light_upkeep(cells, team_cells, parameters) -> float:
+    """
+    the light upkeep of a city with the given cells, for states that leave it out
+    """
+    adjacent = sum(
+        (x + dx, y + dy) in team_cells for x, y in cells for dx, dy in ((0, -1), (1, 0), (0, 1), (-1, 0))
+    )
+    return float(len(cells) * parameters["LIGHT_UPKEEP"]["CITY"] - adjacent * parameters["CITY_ADJACENCY_BONUS"])
+
+
+def parse_serialized_state(state, parameters=None) -> ParsedUpdates:
+    """
+    the ParsedUpdates of the engine's SerializedState, a dict of turn, teamStates, map and cities
+    """
+    parameters = parameters if parameters is not None else GAME_CONSTANTS["PARAMETERS"]
+    research_points = [[], []]
+    units = [[], [], [], [], [], [], [], [], []]
+    for team in TEAMS:
+        team_state = _team_state(state["teamStates"], team)
+        research_points[0].append(team)
+        research_points[1].append(int(team_state["researchPoints"]))
+        for unitid, unit in team_state["units"].items():
+            cargo = unit["cargo"]
+            for column, value in zip(units, (
+                int(unit["type"]), team, unitid, unit["x"], unit["y"], float(unit["cooldown"]),
+                int(cargo[RESOURCE_TYPES.WOOD]), int(cargo[RESOURCE_TYPES.COAL]), int(cargo[RESOURCE_TYPES.URANIUM]),
+            )):
+                column.append(value)
+
+    resources = [[], [], [], []]
+    roads = [[], [], []]
+    for y, row in enumerate(state["map"]):
+        for x, cell in enumerate(row):
+            resource = cell.get("resource")
+            if resource is not None:
+                resources[0].append(resource["type"])
+                resources[1].append(x)
+                resources[2].append(y)
+                resources[3].append(int(resource["amount"]))
+            if cell["road"] != 0:
+                roads[0].append(x)
+                roads[1].append(y)
+                roads[2].append(float(cell["road"]))
+
+    team_cells = {team: set() for team in TEAMS}
+    for city in state["cities"].values():
+        team_cells[city["team"]].update((cell["x"], cell["y"]) for cell in city["cityCells"])
+    cities = [[], [], [], []]
+    citytiles = [[], [], [], [], []]
+    for city in state["cities"].values():
+        team = city["team"]
+        cells = city["cityCells"]
+        light_upkeep = city.get("lightupkeep")
+        if light_upkeep is None:
+            light_upkeep = _light_upkeep([(cell["x"], cell["y"]) for cell in cells], team_cells[team], parameters)
+        cities[0].append(team)
+        cities[1].append(city["id"])
+        cities[2].append(float(city["fuel"]))
+        cities[3].append(float(light_upkeep))
+        for cell in cells:
+            for column, value in zip(citytiles, (team, city["id"], cell["x"], cell["y"], float(cell["cooldown"]))):
+                column.append(value)
+    return _tables(research_points, resources, units, cities, citytiles, roads)
+
+
+def parse_sim(sim) -> ParsedUpdates:
+    """
+    the ParsedUpdates of the current turn of a lux.sim SimGame, what parsing sim.to_updates() would give
+    """
+    research_points = [list(TEAMS), [int(sim.research_points[team]) for team in TEAMS]]
+    resources = [[], [], [], []]
+    for x, y in sim.resources:
+        resources[0].append(sim.resource_type[y][x])
+        resources[1].append(x)
+        resources[2].append(y)
+        resources[3].append(int(sim.resource_amount[y][x]))
+    units = [[], [], [], [], [], [], [], [], []]
+    for team in TEAMS:
+        for unit in sim.units[team].values():
+            cargo = unit.cargo
+            for column, value in zip(units, (
+                unit.type, team, unit.id, unit.x, unit.y, float(unit.cooldown),
+                int(cargo[RESOURCE_TYPES.WOOD]), int(cargo[RESOURCE_TYPES.COAL]), int(cargo[RESOURCE_TYPES.URANIUM]),
+            )):
+                column.append(value)
+    cities = [[], [], [], []]
+    citytiles = [[], [], [], [], []]
+    for city in sim.cities.values():
+        cities[0].append(city.team)
+        cities[1].append(city.id)
+        cities[2].append(float(city.fuel))
+        cities[3].append(float(sim.city_light_upkeep(city)))
+        for citytile in city.citycells:
+            for column, value in zip(citytiles, (city.team, city.id, citytile.x, citytile.y,
+                                                 float(citytile.cooldown))):
+                column.append(value)
+    roads = [[], [], []]
+    for y in range(sim.height):
+        for x in range(sim.width):
+            # city tiles count as roads of the highest level
+            road = sim.get_road(x, y)
+            if road != 0:
+                roads[0].append(x)
+                roads[1].append(y)
+                roads[2].append(float(road))
+    return _tables(research_points, resources, units, cities, citytiles, roads)
+
+
+def state_updates(state, parameters=None) -> ParsedUpdates:
+    """
+    the ParsedUpdates of a SerializedState dict or a SimGame
+    """
+    if isinstance(state, dict):
+        return parse_serialized_state(state, parameters)
+    return parse_sim(state)
+
+
+def map_size(state):
+    """
+    (width, height) of a SerializedState dict or a SimGame
+    """
+    if isinstance(state, dict):
+        return len(state["map"][0]), len(state["map"])
+    return state.width, state.height
+
+
+def game_from_state(state, player=0, **game_options) -> Game:
+    """
+    the Game the agent of player holds at the turn of state, built without update lines. game_options are
+    those of Game, e.g. incremental=True
+    """
+    width, height = map_size(state)
+    game = Game(**game_options)
+    game._initialize([str(player), "{} {}".format(width, height)])
+    game.turn = state["turn"] - 1 if isinstance(state, dict) else state.turn - 1
+    game._update_from_state(state)
+    return game
@@ -0,0 +1,303 @@
+"""
+How long a player's cities and units last through the nights ahead, for all of them at once (requires numpy).
+SurvivalForecast keeps the fuel and light upkeep of every city and the cargo of every unit in arrays and
+answers, as arrays in the order of city_ids and unit_ids: the nights each one survives, the turns until it
+goes dark, the fuel it lacks to reach the next dawn and, for cities, the fuel it lacks to reach the end of the
+game. A city survives a night turn when its fuel covers its upkeep, a unit outside a city burns its wood, then
+coal, then uranium like the engine does, and units in a city burn nothing until the city goes dark.
+
+Forecasts assume nothing is delivered or built from now on. update(game) follows a Game(incremental=True)
+through its delta and only refreshes the cities and units that changed, and add_fuel plays planned deliveries
+
+    forecast = SurvivalForecast()
+    forecast.update(game_state)                      # every turn
+    dying = forecast.city_turns_to_death() < 10
+"""
+import numpy as np
+
+from .constants import Constants
+from .game_constants import GAME_CONSTANTS
+
+UNIT_TYPES = Constants.UNIT_TYPES
+
+# the columns of the city and unit tables
+(FUEL, CITY_UPKEEP) = range(2)
+(UNIT_UPKEEP, WOOD, COAL, URANIUM, X, Y, IN_CITY, CARGO_NIGHTS) = range(8)
+
+
+class _Table:
+    """
+    rows of float values keyed by id, removed by moving the last row into the gap so rows stay packed
+    """
+    def __init__(self, columns):
+        self.ids = []
+        self.rows = {}
+        self._values = np.zeros((16, columns))
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:len(self.ids)]
+
+    def clear(self):
+        self.ids = []
+        self.rows = {}
+
+    def set(self, key, values):
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.ids)
+            if row == len(self._values):
+                self._values = np.concatenate([self._values, np.zeros_like(self._values)])
+            self.ids.append(key)
+            self.rows[key] = row
+        self._values[row] = values
+
+    def remove(self, key):
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.ids[row] = moved
+            self.rows[moved] = row
+            self._values[row] = self._values[last]
+        self.ids.pop()
+
+
+class SurvivalForecast:
+    """
+    the survival of the cities and units of team, by default the player the Game belongs to. Turns count from
+    game.turn, the turn the agent is choosing actions for, and night turns past the end of the game are never
+    reached, so whatever lasts until then has inf nights and turns to death
+    """
+    def __init__(self, team=None, parameters=None):
+        self.team = team
+        parameters = parameters if parameters is not None else GAME_CONSTANTS["PARAMETERS"]
+        self._day_length = parameters["DAY_LENGTH"]
+        self._night_length = parameters["NIGHT_LENGTH"]
+        self._cycle_length = parameters["DAY_LENGTH"] + parameters["NIGHT_LENGTH"]
+        self._max_days = parameters["MAX_DAYS"]
+        self._unit_upkeep = {
+            UNIT_TYPES.WORKER: parameters["LIGHT_UPKEEP"]["WORKER"],
+            UNIT_TYPES.CART: parameters["LIGHT_UPKEEP"]["CART"],
+        }
+        fuel_rates = parameters["RESOURCE_TO_FUEL_RATE"]
+        self._fuel_rates = (fuel_rates["WOOD"], fuel_rates["COAL"], fuel_rates["URANIUM"])
+        self._cities = _Table(2)
+        self._units = _Table(8)
+        self._game = None
+        self._team = None
+        # cities given fuel by add_fuel, read again on the next update
+        self._planned = set()
+        # the nights of cities and units until the next update or add_fuel
+        self._city_nights = None
+        self._unit_nights = None
+        self.turn = 0
+
+    @property
+    def city_ids(self):
+        return self._cities.ids
+
+    @property
+    def unit_ids(self):
+        return self._units.ids
+
+    def update(self, game):
+        """
+        takes in the cities and units of the turn game is at. Incremental Games updated once since the last
+        call are patched through game.delta, any other Game is read in whole
+        """
+        team = self.team if self.team is not None else game.id
+        if (
+            game.incremental and game.delta is not None and game is self._game and game.turn == self.turn + 1
+            and team == self._team
+        ):
+            self._patch(game, team)
+        else:
+            self._rebuild(game, team)
+        self._game = game
+        self._team = team
+        self._planned = set()
+        self._city_nights = None
+        self._unit_nights = None
+        self.turn = game.turn
+        return self
+
+    def _set_city(self, city):
+        self._cities.set(city.cityid, (city.fuel, city.light_upkeep))
+
+    def _cargo_nights(self, upkeep, cargo) -> int:
+        """
+        the night turns a cargo covers outside a city, burnt the way the engine does
+        """
+        nights = 0
+        # fuel burnt towards the night the resources so far could not cover
+        paid = 0
+        for amount, rate in zip((cargo.wood, cargo.coal, cargo.uranium), self._fuel_rates):
+            first = -(-(upkeep - paid) // rate)
+            if amount >= first:
+                full = -(-upkeep // rate)
+                more = (amount - first) // full
+                nights += 1 + more
+                paid = (amount - first - more * full) * rate
+            else:
+                paid += amount * rate
+        return nights
+
+    def _set_unit(self, unit, game_map):
+        cargo = unit.cargo
+        x, y = unit.pos.x, unit.pos.y
+        upkeep = self._unit_upkeep[unit.type]
+        in_city = game_map.get_cell(x, y).citytile is not None
+        self._units.set(unit.id, (
+            upkeep, cargo.wood, cargo.coal, cargo.uranium, x, y, in_city, self._cargo_nights(upkeep, cargo),
+        ))
+
+    def _rebuild(self, game, team):
+        player = game.players[team]
+        self._cities.clear()
+        self._units.clear()
+        for city in player.cities.values():
+            self._set_city(city)
+        for unit in player.units:
+            self._set_unit(unit, game.map)
+
+    def _patch(self, game, team):
+        delta = game.delta
+        cities = game.players[team].cities
+        for cityid in delta.cities_removed:
+            self._cities.remove(cityid)
+        for cityid in delta.cities_added | delta.cities_changed | self._planned:
+            city = cities.get(cityid)
+            if city is not None:
+                self._set_city(city)
+        for unitid in delta.units_removed:
+            self._units.remove(unitid)
+        for unitid in delta.units_added | delta.units_changed:
+            unit = game._units[unitid]
+            if unit.team == team:
+                self._set_unit(unit, game.map)
+        # units that stayed put under a city tile that was built or went dark
+        values = self._units.values
+        for x, y in delta.citytiles_added | delta.citytiles_removed:
+            here = (values[:, X] == x) & (values[:, Y] == y)
+            if here.any():
+                values[here, IN_CITY] = game.map.get_cell(x, y).citytile is not None
+
+    def add_fuel(self, cityid, fuel):
+        """
+        adds fuel to a city, e.g. to see how far a planned delivery gets it. The next update sets it back to
+        the fuel the engine reports
+        """
+        self._cities.values[self._cities.rows[cityid], FUEL] += fuel
+        self._planned.add(cityid)
+        self._city_nights = None
+        self._unit_nights = None
+
+    # the night turns, counted from the first turn of the game
+
+    def _nights_before(self, turn):
+        """
+        the number of night turns before turn
+        """
+        return (turn // self._cycle_length) * self._night_length + max(turn % self._cycle_length - self._day_length, 0)
+
+    def _night_turn(self, night):
+        """
+        the turns of the nights with the given indices
+        """
+        cycles, night_turn = np.divmod(night, self._night_length)
+        return cycles * self._cycle_length + (self._day_length + night_turn)
+
+    def _turns_to_death(self, nights):
+        """
+        the turns from now until the night turn that nights of fuel do not cover, inf past the end of the game
+        """
+        death = self._night_turn(np.minimum(nights, self._max_days) + self._nights_before(self.turn))
+        death -= self.turn
+        death[death >= self._max_days - self.turn] = np.inf
+        return death
+
+    def nights_to_dawn(self) -> int:
+        """
+        the night turns left until the next dawn, those of the coming night during the day
+        """
+        dawn = min((self.turn // self._cycle_length + 1) * self._cycle_length, self._max_days)
+        return self._nights_before(dawn) - self._nights_before(self.turn)
+
+    def nights_to_end(self) -> int:
+        """
+        the night turns left until the end of the game
+        """
+        return self._nights_before(self._max_days) - self._nights_before(self.turn)
+
+    # cities
+
+    def city_nights(self) -> np.ndarray:
+        """
+        the night turns each city's fuel covers
+        """
+        if self._city_nights is None:
+            values = self._cities.values
+            upkeep = values[:, CITY_UPKEEP]
+            self._city_nights = np.where(upkeep > 0, values[:, FUEL] // np.maximum(upkeep, 1e-9), np.inf)
+        return self._city_nights
+
+    def city_turns_to_death(self) -> np.ndarray:
+        """
+        the turns until each city goes dark, 0 when it does on this turn's night
+        """
+        return self._turns_to_death(self.city_nights())
+
+    def city_dawn_deficit(self) -> np.ndarray:
+        """
+        the fuel each city lacks to last until the next dawn
+        """
+        values = self._cities.values
+        return np.maximum(self.nights_to_dawn() * values[:, CITY_UPKEEP] - values[:, FUEL], 0)
+
+    def city_end_deficit(self) -> np.ndarray:
+        """
+        the fuel each city lacks to last until the end of the game
+        """
+        values = self._cities.values
+        return np.maximum(self.nights_to_end() * values[:, CITY_UPKEEP] - values[:, FUEL], 0)
+
+    # units
+
+    def unit_nights(self) -> np.ndarray:
+        """
+        the night turns each unit lasts where it is: those its cargo covers, after those of its city for units
+        in a city
+        """
+        if self._unit_nights is not None:
+            return self._unit_nights
+        values = self._units.values
+        nights = values[:, CARGO_NIGHTS].copy()
+        in_city = np.flatnonzero(values[:, IN_CITY] > 0)
+        if len(in_city):
+            game_map = self._game.map
+            city_rows = self._cities.rows
+            rows = [
+                city_rows.get(game_map.get_cell(int(x), int(y)).citytile.cityid, -1)
+                for x, y in values[in_city][:, [X, Y]].tolist()
+            ]
+            # units on a city tile of the other team, whose fuel is not tracked here, count as safe
+            nights[in_city] += np.append(self.city_nights(), np.inf)[rows]
+        self._unit_nights = nights
+        return nights
+
+    def unit_turns_to_death(self) -> np.ndarray:
+        """
+        the turns until each unit dies if it stays where it is
+        """
+        return self._turns_to_death(self.unit_nights())
+
+    def unit_dawn_deficit(self) -> np.ndarray:
+        """
+        the upkeep of the nights until the next dawn that each unit's cargo (and city) does not cover
+        """
+        nights = self.unit_nights()
+        missing = np.maximum(self.nights_to_dawn() - np.minimum(nights, self._max_days), 0)
+        return missing * self._units.values[:, UNIT_UPKEEP]
@@ -0,0 +1,195 @@
+"""
+Where the time of each turn goes in main.py: reading the input, Game._update, the rest of agent() and printing
+the actions, with an estimate of the time bank the engine has left for the agent. Off unless the LUX_TIMING
+environment variable is set, to 1 or stderr for a summary on stderr at the end of the game or to a file path
+for one written there (JSON if the path ends in .json). Agents reach the running timer through get_timer()
+"""
+import atexit
+import bisect
+import os
+import sys
+import time
+
+PHASES = ("read", "update", "agent", "write")
+# seconds a turn may take before the engine draws on the time bank, and the bank a game starts with
+ACT_TIMEOUT = 3.0
+OVERAGE_TIME = 60.0
+# upper bounds in seconds of the buckets of the histograms, the last bucket holding everything slower
+HISTOGRAM_BOUNDS = (0.0001, 0.0003, 0.001, 0.003, 0.01, 0.03, 0.1, 0.3, 1.0, 3.0)
+
+_timer = None
+
+
+def get_timer():
+    """
+    the TurnTimer of the running main loop, None when timing is off
+    """
+    return _timer
+
+
+def _stats(samples):
+    ordered = sorted(samples)
+    count = len(ordered)
+    histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+    for value in ordered:
+        histogram[bisect.bisect_left(HISTOGRAM_BOUNDS, value)] += 1
+    return {
+        "total": sum(ordered),
+        "mean": sum(ordered) / count if count else 0.0,
+        "p50": ordered[(count - 1) // 2] if count else 0.0,
+        "p95": ordered[(count - 1) * 95 // 100] if count else 0.0,
+        "max": ordered[-1] if count else 0.0,
+        "histogram": histogram,
+    }
+
+
+class TurnTimer:
+    """
+    times the phases of each turn. line_read() starts a turn when its first bytes come in, begin(phase) moves
+    on to the next phase and end_turn() closes the turn once the actions are printed. The time spent waiting for
+    the engine between turns is not counted.
+
+    A turn draws on the time bank for as long as it runs past act_timeout, so remaining_overage estimates what
+    the engine still grants; the engine also counts the time the lines take to travel, which is not seen here
+    """
+    def __init__(self, act_timeout=ACT_TIMEOUT, overage_time=OVERAGE_TIME, output=None, clock=time.perf_counter):
+        self.act_timeout = act_timeout
+        self.overage_time = overage_time
+        self.remaining_overage = overage_time
+        # "stderr", a file path or None to not write a summary
+        self.output = output
+        self.clock = clock
+        # the seconds of each phase and of the whole turn, one entry per turn
+        self.samples = {phase: [] for phase in PHASES}
+        self.turn_times = []
+        self.turns_over_timeout = 0
+        self._phases = None
+        self._phase = None
+        self._mark = 0.0
+        self._turn_start = 0.0
+
+    @classmethod
+    def from_environment(cls, environ=None):
+        """
+        a timer writing its summary where LUX_TIMING says, or None when it is not set. LUX_ACT_TIMEOUT
+        overrides the seconds a turn may take
+        """
+        environ = os.environ if environ is None else environ
+        output = environ.get("LUX_TIMING", "")
+        if output in ("", "0"):
+            return None
+        act_timeout = float(environ.get("LUX_ACT_TIMEOUT", ACT_TIMEOUT))
+        return cls(act_timeout=act_timeout, output="stderr" if output == "1" else output)
+
+    def install(self):
+        """
+        makes this the timer get_timer() returns and writes its summary when the process exits
+        """
+        global _timer
+        _timer = self
+        if self.output is not None:
+            atexit.register(self.dump)
+        return self
+
+    def line_read(self):
+        """
+        starts the turn. main.py calls it once per turn, through StdioTransport's on_turn_start, when the first
+        bytes of the turn come in. Calls before end_turn() after that do nothing
+        """
+        if self._phases is None:
+            now = self.clock()
+            self._phases = dict.fromkeys(PHASES, 0.0)
+            self._phase = "read"
+            self._mark = now
+            self._turn_start = now
+
+    def begin(self, phase):
+        """
+        ends the current phase and starts phase, returning the phase that ended
+        """
+        now = self.clock()
+        previous = self._phase
+        if self._phases is not None:
+            self._phases[previous] += now - self._mark
+        self._phase = phase
+        self._mark = now
+        return previous
+
+    def end_turn(self):
+        if self._phases is None:
+            return
+        self.begin(None)
+        total = 0.0
+        for phase, seconds in self._phases.items():
+            self.samples[phase].append(seconds)
+            total += seconds
+        self.turn_times.append(total)
+        if total > self.act_timeout:
+            self.turns_over_timeout += 1
+            self.remaining_overage = max(self.remaining_overage - (total - self.act_timeout), 0.0)
+        self._phases = None
+
+    @property
+    def phase(self):
+        """
+        the phase running now, None between turns
+        """
+        return self._phase if self._phases is not None else None
+
+    def elapsed(self) -> float:
+        """
+        seconds since the current turn started, 0 between turns
+        """
+        if self._phases is None:
+            return 0.0
+        return self.clock() - self._turn_start
+
+    def remaining(self) -> float:
+        """
+        seconds the current turn can still take before the engine times the agent out, time bank included
+        """
+        return self.act_timeout - self.elapsed() + self.remaining_overage
+
+    def summary(self):
+        """
+        the statistics of every phase and of whole turns, in seconds, as a dict
+        """
+        return {
+            "turns": len(self.turn_times),
+            "act_timeout": self.act_timeout,
+            "turns_over_timeout": self.turns_over_timeout,
+            "remaining_overage": self.remaining_overage,
+            "histogram_bounds": list(HISTOGRAM_BOUNDS),
+            "phases": {phase: _stats(samples) for phase, samples in self.samples.items()},
+            "turn": _stats(self.turn_times),
+        }
+
+    def report(self) -> str:
+        summary = self.summary()
+        lines = [
+            "{} turns, {} over {:g}s, {:.3f}s of time bank left".format(
+                summary["turns"], summary["turns_over_timeout"], self.act_timeout, self.remaining_overage),
+            "{:<7}{:>10}{:>10}{:>10}{:>10}{:>10}".format("phase", "total", "mean", "p50", "p95", "max"),
+        ]
+        for name, stats in list(summary["phases"].items()) + [("turn", summary["turn"])]:
+            lines.append("{:<7}{:>9.3f}s{:>8.2f}ms{:>8.2f}ms{:>8.2f}ms{:>8.2f}ms".format(
+                name, stats["total"], stats["mean"] * 1e3, stats["p50"] * 1e3, stats["p95"] * 1e3,
+                stats["max"] * 1e3))
+        bounds = ["<{:g}ms".format(bound * 1e3) for bound in HISTOGRAM_BOUNDS] + ["slower"]
+        lines.append("turns by duration: " + ", ".join(
+            "{} {}".format(bound, count) for bound, count in zip(bounds, summary["turn"]["histogram"]) if count))
+        return "\n".join(lines)
+
+    def dump(self):
+        """
+        writes the summary to stderr or to the output file
+        """
+        if self.output == "stderr":
+            print(self.report(), file=sys.stderr)
+        elif self.output is not None:
+            import json
+            with open(self.output, "w") as f:
+                if self.output.endswith(".json"):
+                    json.dump(self.summary(), f, indent=2)
+                else:
+                    f.write(self.report() + "\n")
@@ -0,0 +1,174 @@
+"""
+A vectorized environment over lux.sim for training: one reset/step interface for N matches, which returns their
+state as stacked NumPy tensors from each team's point of view (requires numpy). The matches are not stepped
+together, VecEnv plays them one after the other with SimGame.step in this process, so stepping costs the same
+per match whatever N is. Run several processes to step more matches at once
+"""
+import numpy as np
+
+from .constants import Constants
+from .game_constants import GAME_CONSTANTS
+from .mapgen import generate_map
+from .sim import TEAMS
+
+RESOURCE_TYPES = Constants.RESOURCE_TYPES
+UNIT_TYPES = Constants.UNIT_TYPES
+
+# the layers of an observation, seen by one team. Cells outside a map smaller than map_size are 0 in every layer
+OBSERVATION_LAYERS = (
+    "wood", "coal", "uranium", "road", "in_map",
+    "own_citytile", "own_city_fuel", "own_citytile_cooldown", "own_worker", "own_cart", "own_cargo",
+    "opponent_citytile", "opponent_city_fuel", "opponent_citytile_cooldown", "opponent_worker", "opponent_cart",
+    "opponent_cargo",
+)
+# the per match values of an observation, seen by one team
+OBSERVATION_FEATURES = ("turn", "night", "own_research_points", "opponent_research_points")
+
+# the layers written per match are the shared ones followed by those of team 0 and team 1
+_SHARED_LAYERS = 5
+_TEAM_LAYERS = 6
+_WOOD, _COAL, _URANIUM, _ROAD, _IN_MAP = range(_SHARED_LAYERS)
+_CITYTILE, _CITY_FUEL, _CITYTILE_COOLDOWN, _WORKER, _CART, _CARGO = range(_TEAM_LAYERS)
+_RESOURCE_LAYERS = {RESOURCE_TYPES.WOOD: _WOOD, RESOURCE_TYPES.COAL: _COAL, RESOURCE_TYPES.URANIUM: _URANIUM}
+# where each of the layers above lands in each team's observation: own layers first, then the opponent's
+_PERSPECTIVE_LAYERS = np.array([
+    list(range(_SHARED_LAYERS)) + [
+        _SHARED_LAYERS + _TEAM_LAYERS * (team != own) + layer for team in TEAMS for layer in range(_TEAM_LAYERS)
+    ]
+    for own in TEAMS
+])
+
+
+class VecEnv:
+    """
+    N matches behind one interface. reset(seeds) starts a match per seed with the engine's map generation and
+    step(actions_batch) plays a turn of every running match, where actions_batch[i] is [team_0_actions,
+    team_1_actions] for match i. The matches are stepped sequentially with SimGame.step, so a step costs N times
+    a single match. Only the observations are stacked: every match is written into the returned arrays with a
+    few NumPy calls.
+
+    Both return (observations, features, rewards, dones):
+
+    observations - float32 [N, 2, len(OBSERVATION_LAYERS), map_size, map_size], indexed [match, team, layer, y, x]
+    features - float32 [N, 2, len(OBSERVATION_FEATURES)]
+    rewards - int64 [N, 2], the kaggle-environments reward of city tiles * 10000 + units
+    dones - bool [N], whether the match is over. Finished matches are not stepped until they are reset
+
+    The returned arrays are reused by the next call. The SimGame of each match is in games, e.g. to hand
+    games[i].to_game(team) to a scripted agent
+    """
+    def __init__(self, num_envs, map_size=32, parameters=None):
+        self.num_envs = num_envs
+        self.map_size = map_size
+        self.parameters = parameters if parameters is not None else GAME_CONSTANTS["PARAMETERS"]
+        self.games = [None] * num_envs
+        self._in_map = np.zeros((num_envs, map_size, map_size), dtype=np.float32)
+        self.observations = np.zeros((num_envs, 2, len(OBSERVATION_LAYERS), map_size, map_size), dtype=np.float32)
+        self.features = np.zeros((num_envs, 2, len(OBSERVATION_FEATURES)), dtype=np.float32)
+        self.rewards = np.zeros((num_envs, 2), dtype=np.int64)
+        self.dones = np.ones(num_envs, dtype=bool)
+
+    def reset(self, seeds, indices=None, width=None, height=None):
+        """
+        starts a new match from each seed in the matches at indices (all of them by default). The map size
+        comes from the seed unless width and height are given
+        """
+        if indices is None:
+            indices = range(self.num_envs)
+        indices = list(indices)
+        seeds = list(seeds)
+        if len(seeds) != len(indices):
+            raise ValueError("got {} seeds for {} matches".format(len(seeds), len(indices)))
+        for i, seed in zip(indices, seeds):
+            game = generate_map(seed, width, height, self.parameters)
+            if game.width > self.map_size or game.height > self.map_size:
+                raise ValueError("seed {} generated a {}x{} map, larger than map_size {}".format(
+                    seed, game.width, game.height, self.map_size))
+            self.games[i] = game
+            self._in_map[i] = 0
+            self._in_map[i, :game.height, :game.width] = 1
+            self.dones[i] = False
+        return self._observe()
+
+    def step(self, actions_batch):
+        """
+        plays one turn of every running match with actions_batch[i] = [team_0_actions, team_1_actions], one
+        match after the other
+        """
+        for i, game in enumerate(self.games):
+            if game is None or self.dones[i]:
+                continue
+            self.dones[i] = game.step(actions_batch[i])
+        return self._observe()
+
+    def _observe(self):
+        size = self.map_size
+        # (match, layer, y, x, value) of every non-zero cell, added to both teams' views with one np.add.at
+        cells = []
+        citytile_cells = []
+        max_road = self.parameters["MAX_ROAD"]
+        day_length = self.parameters["DAY_LENGTH"]
+        cycle_length = day_length + self.parameters["NIGHT_LENGTH"]
+
+        for i, game in enumerate(self.games):
+            if game is None:
+                continue
+            resource_type = game.resource_type
+            resource_amount = game.resource_amount
+            cells.extend([
+                (i, _RESOURCE_LAYERS[resource_type[y][x]], y, x, resource_amount[y][x])
+                for x, y in game.resources if resource_amount[y][x] > 0
+            ])
+            unit_count = [0, 0]
+            for team in TEAMS:
+                offset = _SHARED_LAYERS + _TEAM_LAYERS * team
+                units = game.units[team]
+                unit_count[team] = len(units)
+                for unit in units.values():
+                    cargo = unit.cargo
+                    cells.append((i, offset + (_WORKER if unit.type == UNIT_TYPES.WORKER else _CART), unit.y, unit.x, 1))
+                    cells.append((
+                        i, offset + _CARGO, unit.y, unit.x,
+                        cargo[RESOURCE_TYPES.WOOD] + cargo[RESOURCE_TYPES.COAL] + cargo[RESOURCE_TYPES.URANIUM],
+                    ))
+            citytile_count = [0, 0]
+            for city in game.cities.values():
+                offset = _SHARED_LAYERS + _TEAM_LAYERS * city.team
+                citytile_count[city.team] += len(city.citycells)
+                for citytile in city.citycells:
+                    y, x = citytile.y, citytile.x
+                    cells.append((i, offset + _CITYTILE, y, x, 1))
+                    cells.append((i, offset + _CITY_FUEL, y, x, city.fuel))
+                    cells.append((i, offset + _CITYTILE_COOLDOWN, y, x, citytile.cooldown))
+                    citytile_cells.append((i, y, x))
+
+            night = game.turn % cycle_length >= day_length
+            for team in TEAMS:
+                self.features[i, team] = (
+                    game.turn, night, game.research_points[team], game.research_points[1 - team],
+                )
+                self.rewards[i, team] = citytile_count[team] * 10000 + unit_count[team]
+
+        table = np.array(cells, dtype=np.float64).reshape(-1, 5)
+        matches, layers, ys, xs = table[:, :4].T.astype(np.intp)
+        observations = self.observations
+        observations.fill(0)
+        # each team sees the layers in its own order, cells are added to both views at once
+        flat = np.concatenate([
+            (((matches * 2 + team) * len(OBSERVATION_LAYERS) + _PERSPECTIVE_LAYERS[team][layers]) * size + ys) * size + xs
+            for team in TEAMS
+        ])
+        np.add.at(observations.reshape(-1), flat, np.concatenate([table[:, 4], table[:, 4]]))
+        for i, game in enumerate(self.games):
+            if game is None:
+                continue
+            # most of the map has no road, so only rows with one are copied
+            road = observations[i, :, _ROAD]
+            for y, row in enumerate(game.road):
+                if any(row):
+                    road[:, y, :game.width] = row
+        if citytile_cells:
+            matches, ys, xs = np.array(citytile_cells, dtype=np.intp).T
+            observations[matches, :, _ROAD, ys, xs] = max_road
+        observations[:, :, _IN_MAP] = self._in_map[:, None]
+        return observations, self.features, self.rewards, self.dones
@@ -1,37 +1,51 @@
-from typing import Dict
-import sys
 from agent import agent
 if __name__ == "__main__":
-    
-    def read_input():
-        """
-        Reads input from stdin
-        """
-        try:
-            return input()
-        except EOFError as eof:
-            raise SystemExit(eof)
-    step = 0
-    class Observation(Dict[str, any]):
-        def __init__(self, player=0) -> None:
-            self.player = player
-            # self.updates = []
-            # self.step = 0
+    # kaggle-environments takes the last callable main.py defines as the agent, so agent stays the only one
+    # defined outside of this block
+    from lux.anytime import AnytimeRunner, is_anytime_agent
+    from lux.protocol import NEW_MATCH, Observation, StdioTransport
+    from lux.timing import TurnTimer
+
     observation = Observation()
-    observation["updates"] = []
-    observation["step"] = 0
-    player_id = 0
+    # per turn timings and a time bank estimate, set LUX_TIMING to turn them on (see lux/timing.py)
+    timer = TurnTimer.from_environment()
+    if timer is not None:
+        timer.install()
+
+    # reads the lines of each turn in one go and writes the actions in one write (see lux/protocol.py)
+    transport = StdioTransport(on_turn_start=timer.line_read if timer is not None else None)
+
+    # agents written as generators yield better and better actions and get the best one sent before the
+    # deadline, see lux/anytime.py
+    runner = None
+    if is_anytime_agent(agent):
+        runner = AnytimeRunner.from_environment(agent, transport.write_actions, input_ready=transport.input_ready)
     while True:
-        inputs = read_input()
-        observation["updates"].append(inputs)
-        
-        if step == 0:
-            player_id = int(observation["updates"][0])
-            observation.player = player_id
-        if inputs == "D_DONE":
+        updates = transport.read_turn()
+        if updates is None:
+            break
+        if updates[0] == NEW_MATCH:
+            # the process is kept for another match, which starts over from step 0 (see tools/tournament.py)
+            updates = updates[1:]
+            observation["step"] = 0
+            if timer is not None:
+                timer.remaining_overage = timer.overage_time
+            if runner is not None:
+                runner.new_match()
+        observation["updates"] = updates
+
+        if observation["step"] == 0:
+            observation.player = int(updates[0])
+        if timer is not None:
+            timer.begin("agent")
+            observation["remainingOverageTime"] = timer.remaining_overage
+        if runner is not None:
+            runner.run(observation, None, transport.turn_start)
+        else:
             actions = agent(observation, None)
-            observation["updates"] = []
-            step += 1
-            observation["step"] = step
-            print(",".join(actions))
-            print("D_FINISH")
\ No newline at end of file
+            if timer is not None:
+                timer.begin("write")
+            transport.write_actions(actions)
+        observation["step"] += 1
+        if timer is not None:
+            timer.end_turn()
@@ -0,0 +1,5 @@
+import sys
+from os import path
+
+# the kit is not an installed package, so make `lux` importable the same way main.py does
+sys.path.insert(0, path.abspath(path.join(path.dirname(__file__), "..", "simple")))
@@ -0,0 +1,93 @@
+"""
+Tests for lux/action_masks.py, checked against the command validation of lux.sim on turns of the recorded replays
+"""
+import random
+from glob import glob
+from os import path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from lux.action_masks import (  # noqa: E402
+    BUILD_CITY, BUILD_WORKER, CITYTILE_ACTIONS, NONE, PILLAGE, RESEARCH, UNIT_ACTIONS, action_masks,
+)
+from lux.replay import Replay  # noqa: E402
+from lux.sim import InvalidCommand, SimGame  # noqa: E402
+
+REPLAYS = sorted(glob(path.join(path.dirname(__file__), "replays", "*.json.gz")))
+
+
+def _accepted(sim, team, command):
+    try:
+        sim.validate_command(team, command)
+    except InvalidCommand:
+        return False
+    return True
+
+
+def _turns():
+    for replay_path in REPLAYS:
+        with Replay(replay_path, index_path=False) as replay:
+            for step in range(1, len(replay), 23):
+                for player in (0, 1):
+                    yield replay.game(step, player)
+
+
+@pytest.mark.parametrize("game", list(_turns()), ids=lambda game: "{}_{}".format(game.turn, game.id))
+def test_masks_follow_the_engine(game):
+    masks = action_masks(game)
+    sim = SimGame.from_game(game)
+    team = game.id
+    assert masks.unit_mask.shape == (len(game.players[team].units), len(UNIT_ACTIONS))
+    for n, (unit, mask, xy) in enumerate(zip(masks.units, masks.unit_mask, masks.unit_xy)):
+        assert tuple(xy) == (unit.pos.x, unit.pos.y)
+        for action, direction in zip(range(1, 5), "nesw"):
+            assert mask[action] == _accepted(sim, team, unit.move(direction))
+            if mask[action]:
+                unit_actions = [NONE] * len(masks.units)
+                unit_actions[n] = action
+                assert masks.commands(unit_actions) == [unit.move(direction)]
+        cell = game.map.get_cell_by_pos(unit.pos)
+        assert mask[BUILD_CITY] == (unit.is_worker() and _accepted(sim, team, unit.build_city()))
+        assert mask[PILLAGE] == (
+            unit.is_worker() and unit.can_act() and cell.road > 0 and cell.citytile is None)
+    assert masks.citytile_mask.shape == (game.players[team].city_tile_count, len(CITYTILE_ACTIONS))
+    for citytile, mask in zip(masks.citytiles, masks.citytile_mask):
+        assert mask[RESEARCH] == _accepted(sim, team, citytile.research())
+        assert mask[BUILD_WORKER] == _accepted(sim, team, citytile.build_worker())
+
+
+def test_commands_of_random_legal_actions_are_accepted():
+    choices = random.Random(0)
+    tested = 0
+    for game in _turns():
+        masks = action_masks(game)
+        unit_actions = [choices.choice(np.flatnonzero(mask)) for mask in masks.unit_mask]
+        # build wherever possible, to run into the unit cap
+        citytile_actions = [BUILD_WORKER if mask[BUILD_WORKER] else NONE for mask in masks.citytile_mask]
+        commands = masks.commands(unit_actions, citytile_actions)
+        sim = SimGame.from_game(game)
+        accumulated = sim._initial_accumulated_stats()
+        for command in commands:
+            sim.validate_command(game.id, command, accumulated)
+        builds = sum(command.startswith("bw ") for command in commands)
+        assert builds == min(citytile_actions.count(BUILD_WORKER), max(masks.units_left, 0))
+        tested += len(commands)
+    assert tested > 50
+
+
+def test_illegal_choices_are_rejected():
+    game = next(game for game in _turns() if game.players[game.id].units)
+    masks = action_masks(game)
+    illegal = np.argwhere(~masks.unit_mask)
+    with pytest.raises(ValueError):
+        masks.commands([NONE] * (len(masks.units) + 1))
+    with pytest.raises(ValueError):
+        masks.commands([len(UNIT_ACTIONS)] * len(masks.units))
+    if len(illegal):
+        unit_actions = [NONE] * len(masks.units)
+        unit_actions[illegal[0][0]] = illegal[0][1]
+        with pytest.raises(ValueError):
+            masks.commands(unit_actions)
+    assert masks.commands([NONE] * len(masks.units), [NONE] * len(masks.citytiles)) == []
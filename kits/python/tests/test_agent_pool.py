@@ -0,0 +1,274 @@
+"""
+Tests for agent_pool.py, the process pool shared by the kaggle-environments wrappers of the other kits
+"""
+import gc
+import importlib.util
+import shutil
+import sys
+import threading
+import time
+from glob import glob
+from os import path
+
+import pytest
+
+KITS_DIR = path.join(path.dirname(__file__), "..", "..")
+WRAPPERS = sorted(
+    wrapper for wrapper in glob(path.join(KITS_DIR, "*", "*", "main.py"))
+    if path.basename(path.dirname(path.dirname(wrapper))) != "python"
+)
+sys.path.insert(0, KITS_DIR)
+
+import agent_pool
+from agent_pool import AgentProcessPool, StderrLog
+
+from lux.sim import SimGame
+
+# replies with one action naming its pid, the match it is in and the turn of that match. A "crash" line makes it
+# exit, "sleep" makes it hang and "flood" writes 5000 lines to stderr
+PROTOCOL_AGENT = """
+import os
+import sys
+import time
+
+def read():
+    return sys.stdin.readline().rstrip("\\n")
+
+match = 0
+read()
+read()
+turn = 0
+while True:
+    line = read()
+    if line == "D_NEW_MATCH":
+        read()
+        read()
+        match += 1
+        turn = 0
+        continue
+    if line == "crash":
+        sys.exit(1)
+    if line == "sleep":
+        time.sleep(60)
+    if line == "flood":
+        sys.stderr.write("".join("line {}\\n".format(i) for i in range(5000)))
+    if line == "D_DONE":
+        print("{} {} {}".format(os.getpid(), match, turn))
+        print("D_FINISH", flush=True)
+        turn += 1
+"""
+
+
+class Observation(dict):
+    def __getattr__(self, name):
+        return self[name]
+
+
+class Configuration(dict):
+    pass
+
+
+def _observation(player, step, updates=()):
+    if step == 0:
+        updates = ["0", "12 12"] + list(updates)
+    return Observation(player=player, step=step, updates=list(updates) + ["D_DONE"])
+
+
+def _reply(actions):
+    pid, match, turn = actions[0].split(" ")
+    return int(pid), int(match), int(turn)
+
+
+@pytest.fixture
+def agent_dir(tmp_path):
+    (tmp_path / "agent.py").write_text(PROTOCOL_AGENT)
+    return str(tmp_path)
+
+
+def _play(pool, agent_dir, configuration, turns, players=(0, 1)):
+    return [
+        [_reply(pool.act(_observation(player, step), configuration, agent_dir)) for player in players]
+        for step in range(turns)
+    ]
+
+
+@pytest.mark.parametrize("wrapper", WRAPPERS, ids=lambda wrapper: path.relpath(path.dirname(wrapper), KITS_DIR))
+def test_wrappers_share_one_pool_module_and_do_not_reuse_processes(wrapper, monkeypatch):
+    # without a packaged copy next to main.py, the wrapper finds the one in kits/
+    monkeypatch.setattr(sys, "path", [entry for entry in sys.path if entry != KITS_DIR])
+    monkeypatch.delitem(sys.modules, "agent_pool")
+    spec = importlib.util.spec_from_file_location("wrapper_main", wrapper)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.pool.close()
+    assert path.samefile(sys.modules["agent_pool"].__file__, path.join(KITS_DIR, "agent_pool.py"))
+    assert not module.pool.reusable and module.pool.standby == 0
+
+
+def test_reusable_processes_play_the_next_match(agent_dir):
+    pool = AgentProcessPool([sys.executable, "agent.py"], reusable=True, standby=0)
+    configuration = Configuration()
+    first = _play(pool, agent_dir, configuration, 3)
+    second = _play(pool, agent_dir, configuration, 3)
+    pool.close()
+
+    assert first[0][0][0] != first[0][1][0]
+    for player in (0, 1):
+        assert [reply[player] for reply in first] == [(first[0][player][0], 0, turn) for turn in range(3)]
+        # same process, told about the new match, counting turns from 0 again
+        assert [reply[player] for reply in second] == [(first[0][player][0], 1, turn) for turn in range(3)]
+
+
+def test_standby_process_replaces_an_agent_without_the_handshake(agent_dir):
+    pool = AgentProcessPool([sys.executable, "agent.py"], standby=1)
+    configuration = Configuration()
+    first = _play(pool, agent_dir, configuration, 2, players=(0,))
+    assert len(pool.idle) == 1
+    standby_pid = pool.idle[0].process.pid
+    old_process = pool.sessions[(id(configuration), 0)].agent_process
+
+    second = _play(pool, agent_dir, configuration, 2, players=(0,))
+    pool.close()
+    assert second[0][0] == (standby_pid, 0, 0)
+    assert second[0][0][0] != first[0][0][0]
+    assert not old_process.alive()
+
+
+def test_agent_that_died_is_restarted_mid_match(agent_dir):
+    pool = AgentProcessPool([sys.executable, "agent.py"], reusable=True, standby=0)
+    configuration = Configuration()
+    pid, _, _ = _reply(pool.act(_observation(0, 0), configuration, agent_dir))
+    with pytest.raises(BrokenPipeError):
+        pool.act(_observation(0, 1, ["crash"]), configuration, agent_dir)
+    new_pid, match, turn = _reply(pool.act(_observation(0, 2), configuration, agent_dir))
+    pool.close()
+    assert new_pid != pid
+    # the replacement is sent the id and map size before the updates of the turn
+    assert (match, turn) == (0, 0)
+
+
+def test_dead_idle_processes_are_not_handed_out(agent_dir):
+    pool = AgentProcessPool([sys.executable, "agent.py"], reusable=True, standby=0)
+    configuration = Configuration()
+    first = _play(pool, agent_dir, configuration, 1, players=(0,))
+    pool.end_match(_observation(0, 1), configuration)
+    pool.idle[0].kill()
+    second = _play(pool, agent_dir, configuration, 1, players=(0,))
+    pool.close()
+    assert second[0][0][0] != first[0][0][0]
+    assert second[0][0][1:] == (0, 0)
+
+
+def test_discarded_environment_gives_its_processes_back(agent_dir):
+    pool = AgentProcessPool([sys.executable, "agent.py"], reusable=True, standby=0)
+    configuration = Configuration()
+    _play(pool, agent_dir, configuration, 2)
+    del configuration
+    gc.collect()
+    assert pool.sessions == {}
+    assert len(pool.idle) == 2
+    pool.close()
+
+
+def test_concurrent_environments(agent_dir):
+    pool = AgentProcessPool([sys.executable, "agent.py"], reusable=True, standby=0)
+    results = [None] * 4
+
+    def run(i):
+        configuration = Configuration()
+        results[i] = _play(pool, agent_dir, configuration, 5) + _play(pool, agent_dir, configuration, 5)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.close()
+
+    # processes move between environments, but each plays one match at a time from its first turn
+    matches = set()
+    for replies in results:
+        for player in (0, 1):
+            for match in (replies[:5], replies[5:]):
+                side = [reply[player] for reply in match]
+                pid, match_number, _ = side[0]
+                assert side == [(pid, match_number, turn) for turn in range(5)]
+                matches.add((pid, match_number))
+    assert len(matches) == 4 * len(results)
+
+
+def test_hung_agent_times_out_and_is_restarted(agent_dir):
+    pool = AgentProcessPool([sys.executable, "agent.py"], reusable=True, standby=0)
+    configuration = Configuration(actTimeout=0.5)
+    pid, _, _ = _reply(pool.act(_observation(0, 0), configuration, agent_dir))
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        pool.act(_observation(0, 1, ["sleep"]), configuration, agent_dir)
+    assert time.perf_counter() - start < 5
+    new_pid, _, turn = _reply(pool.act(_observation(0, 2), configuration, agent_dir))
+    pool.close()
+    assert new_pid != pid and turn == 0
+
+
+def test_stderr_is_kept_in_a_bounded_log(agent_dir, capsys):
+    pool = AgentProcessPool([sys.executable, "agent.py"], standby=0)
+    configuration = Configuration()
+    pool.act(_observation(0, 0, ["flood"]), configuration, agent_dir)
+    agent_process = pool.sessions[(id(configuration), 0)].agent_process
+    pool.close()
+    assert list(agent_process.stderr.lines)[-1] == b"line 4999"
+    assert len(agent_process.stderr.lines) == agent_pool.STDERR_LINES
+    err = capsys.readouterr().err
+    assert "[4000 lines of stderr dropped]" in err and err.endswith("line 4999\n")
+
+
+def test_stderr_log_joins_partial_lines():
+    log = StderrLog(max_lines=3)
+    log.write(b"a\nb")
+    log.write(b"c\nd\ne\n")
+    assert log.unforwarded() == (1, [b"bc", b"d", b"e"])
+    log.write(b"f\n")
+    assert log.unforwarded() == (0, [b"f"])
+
+
+def test_latency_of_every_turn_is_recorded(agent_dir):
+    pool = AgentProcessPool([sys.executable, "agent.py"], reusable=True, standby=0)
+    configuration = Configuration()
+    _play(pool, agent_dir, configuration, 4, players=(0,))
+    _play(pool, agent_dir, configuration, 2, players=(0,))
+    agent_process = pool.sessions[(id(configuration), 0)].agent_process
+    pool.close()
+    assert [(match, turn) for match, turn, _ in agent_process.latencies] == [
+        (1, 0), (1, 1), (1, 2), (1, 3), (2, 0), (2, 1),
+    ]
+    stats = agent_process.latency_stats()
+    assert stats["turns"] == 6 and 0 < stats["mean"] <= stats["max"]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_js_kit_handles_the_new_match_handshake():
+    js_dir = path.join(KITS_DIR, "js", "simple")
+    pool = AgentProcessPool(["node", "main.js"], reusable=True, standby=0)
+    configuration = Configuration()
+    for _ in range(2):
+        game = SimGame(12, 12)
+        game.add_resource(3, 3, "wood", 500)
+        for team, x in ((0, 1), (1, 10)):
+            game.spawn_worker(team, x, 5)
+            game.spawn_city_tile(team, x, 6)
+        moves = []
+        for step in range(3):
+            updates = game.to_updates()
+            if step == 0:
+                updates = ["0", "12 12"] + updates
+            actions = [
+                pool.act(Observation(player=team, step=step, updates=updates + ["D_DONE"]), configuration, js_dir)
+                for team in (0, 1)
+            ]
+            moves.append(actions)
+            game.step(actions)
+        # the simple agent walks its worker towards the wood and waits out the cooldown, in both matches
+        assert moves == [[["m u_1 n"], ["m u_2 n"]], [[], []], [["m u_1 n"], ["m u_2 n"]]]
+    agent_processes = [session.agent_process for session in pool.sessions.values()]
+    pool.close()
+    assert [agent_process.matches for agent_process in agent_processes] == [2, 2]
@@ -0,0 +1,173 @@
+"""
+Tests for lux/anytime.py, with agents that sleep to run past short deadlines
+"""
+import io
+import time
+
+from lux.anytime import AnytimeRunner, fallback_actions, is_anytime_agent
+
+
+class Observation(dict):
+    def __init__(self, player, step, updates):
+        super().__init__(step=step, updates=updates)
+        self.player = player
+
+
+OBSERVATION = Observation(1, 5, [
+    "rp 0 0", "u 0 0 u_1 1 1 0 0 0 0", "c 0 c_1 10 23", "c 1 c_2 10 23",
+    "ct 0 c_1 2 2 0", "ct 1 c_2 3 3 0", "ct 1 c_2 3 4 5", "D_DONE",
+])
+
+
+def _runner(agent, act_timeout=0.3):
+    sent = []
+    log = io.StringIO()
+    runner = AnytimeRunner(agent, sent.append, act_timeout=act_timeout, safety_margin=0.1, log=log)
+    return runner, sent, log
+
+
+def test_fallback_researches_with_the_players_city_tiles_that_can_act():
+    assert fallback_actions(OBSERVATION) == ["r 3 3"]
+
+
+def test_plain_agents_are_called_as_usual():
+    runner, sent, log = _runner(lambda observation, configuration: ["m u_1 n"])
+    assert runner.run(OBSERVATION, None) == ["m u_1 n"]
+    assert sent == [["m u_1 n"]] and log.getvalue() == ""
+
+
+def test_last_actions_of_a_finished_search_are_sent():
+    def agent(observation, configuration):
+        for depth in range(3):
+            yield ["m u_1 {}".format("nsw"[depth])]
+
+    runner, sent, log = _runner(agent)
+    assert runner.run(OBSERVATION, None) == ["m u_1 w"]
+    assert sent == [["m u_1 w"]] and log.getvalue() == ""
+
+
+def test_search_is_stopped_at_the_deadline():
+    closed = []
+
+    def agent(observation, configuration):
+        try:
+            depth = 0
+            while True:
+                depth += 1
+                time.sleep(0.02)
+                yield ["depth {}".format(depth)]
+        finally:
+            closed.append(True)
+
+    runner, sent, log = _runner(agent)
+    start = time.perf_counter()
+    actions = runner.run(OBSERVATION, None, start)
+    assert time.perf_counter() - start < 0.3
+    assert len(sent) == 1 and sent[0] == actions and actions[0].startswith("depth ")
+    assert closed == [True]
+
+
+def test_long_step_is_cut_short_by_the_watchdog():
+    def agent(observation, configuration):
+        yield ["m u_1 n"]
+        time.sleep(0.5)
+        yield ["m u_1 s"]
+
+    runner, sent, log = _runner(agent)
+    start = time.perf_counter()
+    assert runner.run(OBSERVATION, None, start) == ["m u_1 n"]
+    assert sent == [["m u_1 n"]]
+    assert "ran past the 0.20s deadline in agent, after 1 action lists, sent its last actions" in log.getvalue()
+    assert runner.overruns == 1
+    # the agent ran 0.5s, but the actions left in time and the time bank is untouched
+    assert runner.remaining_overage == 60.0
+
+
+def test_fallback_is_sent_when_nothing_is_ready():
+    def agent(observation, configuration):
+        time.sleep(0.5)
+        yield ["m u_1 n"]
+
+    runner, sent, log = _runner(agent)
+    assert runner.run(OBSERVATION, None) == ["r 3 3"]
+    assert sent == [["r 3 3"]]
+    assert "before its first actions, sent fallback actions" in log.getvalue()
+
+
+def test_time_bank_extends_the_deadline():
+    runner, _, _ = _runner(None, act_timeout=3.0)
+    assert runner.deadline(10.0) == 12.9
+    runner.overage_share = 0.1
+    assert runner.deadline(10.0) == 12.9 + 6.0
+
+
+def test_generator_agents_are_anytime_agents():
+    def agent(observation, configuration):
+        yield []
+
+    assert is_anytime_agent(agent)
+    assert not is_anytime_agent(lambda observation, configuration: [])
+    assert not is_anytime_agent(print)
+
+
+
+def _overrun(runner):
+    """
+    runs a turn whose agent sleeps past the deadline after its first actions
+    """
+    def agent(observation, configuration):
+        yield ["m u_1 n"]
+        time.sleep(0.5)
+        yield ["m u_1 s"]
+
+    runner.agent = agent
+    runner.run(OBSERVATION, None, time.perf_counter())
+
+
+def _searching(observation, configuration):
+    depth = 0
+    while True:
+        depth += 1
+        time.sleep(0.01)
+        yield ["depth {}".format(depth)]
+
+
+def test_next_turn_counts_from_input_that_came_in_during_an_overrun():
+    sent_at = []
+
+    def emit(actions):
+        sent_at.append(time.perf_counter())
+
+    def input_ready(timeout):
+        # the engine sends the next turn 0.05s after the late actions
+        time.sleep(timeout)
+        return bool(sent_at) and time.perf_counter() - sent_at[0] > 0.05
+
+    runner = AnytimeRunner(None, emit, act_timeout=0.3, safety_margin=0.1, log=io.StringIO(), input_ready=input_ready)
+    _overrun(runner)
+    # the next turn was read 0.3s after it came in, past its 0.2s budget, so its search stops at once
+    runner.agent = _searching
+    start = time.perf_counter()
+    runner.run(OBSERVATION, None, start)
+    assert time.perf_counter() - start < 0.1
+    # the turn after that, read in time, gets its full budget again
+    start = time.perf_counter()
+    runner.run(OBSERVATION, None, start)
+    assert time.perf_counter() - start > 0.15
+
+
+def test_next_turn_counts_from_the_late_send_without_input_ready():
+    runner, sent, _ = _runner(None)
+    _overrun(runner)
+    runner.agent = _searching
+    start = time.perf_counter()
+    runner.run(OBSERVATION, None, start)
+    assert time.perf_counter() - start < 0.1
+
+
+def test_new_match_restores_the_time_bank():
+    runner, _, _ = _runner(None)
+    runner.remaining_overage = 12.5
+    runner._next_turn_start = 1.0
+    runner.new_match()
+    assert runner.remaining_overage == 60.0 and runner._next_turn_start is None
@@ -0,0 +1,119 @@
+"""
+Tests for lux/array_map.py, checked against the plain GameMap of a Game decoded from the same replay turns
+"""
+from glob import glob
+from os import path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from lux.array_map import ArrayGameMap  # noqa: E402
+from lux.constants import Constants  # noqa: E402
+from lux.game import Game  # noqa: E402
+from lux.game_constants import GAME_CONSTANTS  # noqa: E402
+from lux.game_map import Resource  # noqa: E402
+from lux.game_objects import CityTile  # noqa: E402
+from lux.replay import Replay  # noqa: E402
+
+RESOURCE_TYPES = Constants.RESOURCE_TYPES
+FUEL_RATES = GAME_CONSTANTS["PARAMETERS"]["RESOURCE_TO_FUEL_RATE"]
+REPLAYS = sorted(glob(path.join(path.dirname(__file__), "replays", "*.json.gz")))
+
+
+def _mineable(player, cell):
+    if not cell.has_resource():
+        return False
+    r_type = cell.resource.type
+    if r_type == RESOURCE_TYPES.COAL:
+        return player.researched_coal()
+    if r_type == RESOURCE_TYPES.URANIUM:
+        return player.researched_uranium()
+    return True
+
+
+def _check_map(game, plain):
+    game_map = game.map
+    width, height = game.map_width, game.map_height
+    mineable = [np.zeros((height, width), dtype=bool) for _ in plain.players]
+    fuel = np.zeros((height, width))
+    owners = np.full((height, width), -1)
+    for y in range(height):
+        for x in range(width):
+            view = game_map.get_cell(x, y)
+            cell = plain.map.get_cell(x, y)
+            assert view.pos == cell.pos and view.road == cell.road
+            assert view.has_resource() == cell.has_resource()
+            if cell.resource is None:
+                assert view.resource is None
+            else:
+                assert (view.resource.type, view.resource.amount) == (cell.resource.type, cell.resource.amount)
+                fuel[y, x] = FUEL_RATES[cell.resource.type.upper()] * cell.resource.amount
+            if cell.citytile is not None:
+                assert (view.citytile.team, view.citytile.cityid) == (cell.citytile.team, cell.citytile.cityid)
+                owners[y, x] = cell.citytile.team
+            else:
+                assert view.citytile is None
+            for team, player in enumerate(plain.players):
+                mineable[team][y, x] = _mineable(player, cell)
+    for team, player in enumerate(game.players):
+        assert np.array_equal(game_map.mineable_mask(player), mineable[team])
+        assert np.array_equal(game_map.fuel_values(player), np.where(mineable[team], fuel, 0))
+        assert game_map.mineable_positions(player).tolist() == [
+            [x, y] for y, x in zip(*np.nonzero(mineable[team]))]
+        assert np.array_equal(game_map.citytile_mask(team), owners == team)
+        counts = np.zeros((height, width))
+        for unit in plain.players[team].units:
+            counts[unit.pos.y, unit.pos.x] += 1
+        assert np.array_equal(game_map.unit_count[team], counts)
+    assert np.array_equal(game_map.fuel_values(), fuel)
+    assert np.array_equal(game_map.citytile_mask(), owners >= 0)
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+@pytest.mark.parametrize("replay_path", REPLAYS, ids=path.basename)
+def test_views_and_masks_match_the_plain_map(replay_path, incremental):
+    with Replay(replay_path) as replay:
+        steps = [replay.updates(step) for step in range(len(replay))]
+        size = replay.map_size()
+    header = ["0", "{} {}".format(*size)]
+    game = Game(incremental=incremental, array_map=True)
+    game._initialize(header)
+    plain = Game()
+    plain._initialize(header)
+    assert isinstance(game.map, ArrayGameMap)
+    steps[0] = steps[0][2:]
+    for step, updates in enumerate(steps):
+        game._update(updates)
+        plain._update(updates)
+        if step % 10 == 0 or step == len(steps) - 1:
+            _check_map(game, plain)
+
+
+def test_views_write_through_to_the_layers():
+    game_map = ArrayGameMap(4, 3)
+    cell = game_map.get_cell(2, 1)
+    assert game_map.get_cell_by_pos(cell.pos) is cell and cell.resource is None and not cell.has_resource()
+
+    cell.resource = Resource(RESOURCE_TYPES.COAL, 40)
+    assert game_map.resource_amount[1, 2] == 40 and cell.has_resource()
+    assert game_map.fuel_values()[1, 2] == 40 * FUEL_RATES["COAL"]
+    cell.resource.amount = 0
+    # an emptied cell keeps its type but holds nothing to mine
+    assert cell.resource.type == RESOURCE_TYPES.COAL and not cell.has_resource()
+    assert not game_map.resource_mask().any() and not game_map.fuel_values().any()
+    cell.resource = None
+    assert game_map.resource_amount[1, 2] == 0 and cell.resource is None
+
+    cell.road = 2.5
+    assert game_map.road[1, 2] == 2.5 and cell.road == 2.5
+
+    citytile = CityTile(1, "c_1", 2, 1, 0)
+    cell.citytile = citytile
+    assert cell.citytile is citytile and game_map.citytile_owner[1, 2] == 1
+    assert np.array_equal(np.argwhere(game_map.citytile_mask(1)), [[1, 2]]) and not game_map.citytile_mask(0).any()
+    cell.citytile = None
+    assert cell.citytile is None and not game_map.citytile_mask().any()
+    # the layers are indexed [y, x]
+    assert game_map.resource_type.shape == game_map.road.shape == (3, 4)
+    assert game_map.unit_count.shape == (2, 3, 4)
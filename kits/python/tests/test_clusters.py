@@ -0,0 +1,125 @@
+"""
+Tests for lux/clusters.py, checked against clusters searched from scratch on every turn of recorded matches
+"""
+from glob import glob
+from os import path
+
+import pytest
+
+from lux.clusters import ClusterIndex
+from lux.constants import Constants
+from lux.replay import Replay
+from lux.sim import SimGame
+
+RESOURCE_TYPES = Constants.RESOURCE_TYPES
+REPLAYS = sorted(glob(path.join(path.dirname(__file__), "replays", "*.json.gz")))
+
+
+def _expected(game, radius):
+    """
+    the clusters of a Game by type, as (cells, amount, perimeter, citytiles) searched with a plain flood fill
+    """
+    game_map = game.map
+    width, height = game.map_width, game.map_height
+    resources = {}
+    citytiles = {}
+    for y in range(height):
+        for x in range(width):
+            cell = game_map.get_cell(x, y)
+            if cell.has_resource():
+                resources[(x, y)] = cell.resource
+            if cell.citytile is not None:
+                citytiles[(x, y)] = cell.citytile.team
+    clusters = {r_type: set() for r_type in (RESOURCE_TYPES.WOOD, RESOURCE_TYPES.COAL, RESOURCE_TYPES.URANIUM)}
+    seen = set()
+    for start, resource in resources.items():
+        if start in seen:
+            continue
+        cells = {start}
+        stack = [start]
+        while stack:
+            x, y = stack.pop()
+            for key in ((x, y - 1), (x + 1, y), (x, y + 1), (x - 1, y)):
+                if key not in cells and key in resources and resources[key].type == resource.type:
+                    cells.add(key)
+                    stack.append(key)
+        seen |= cells
+        perimeter = {
+            (x, y) for x in range(width) for y in range(height)
+            if (x, y) not in resources and (x, y) not in citytiles
+            and any(abs(x - cx) + abs(y - cy) == 1 for cx, cy in cells)
+        }
+        near = [0, 0]
+        for (x, y), team in citytiles.items():
+            if any(abs(x - cx) + abs(y - cy) <= radius for cx, cy in cells):
+                near[team] += 1
+        clusters[resource.type].add((
+            frozenset(cells), sum(resources[key].amount for key in cells), frozenset(perimeter), tuple(near),
+        ))
+    return clusters
+
+
+def _found(index):
+    return {
+        r_type: {
+            (frozenset(cluster.cells), cluster.amount, frozenset(cluster.perimeter), tuple(cluster.citytiles))
+            for cluster in clusters.values()
+        }
+        for r_type, clusters in index.clusters.items()
+    }
+
+
+def _games(replay_path, **game_options):
+    """
+    yields the Game of every turn of a recorded match, one Game updated turn after turn
+    """
+    with Replay(replay_path, index_path=False) as replay:
+        observation = replay[0][0]["observation"]
+        sim = SimGame.from_game(replay.game(0), observation["globalUnitIDCount"], observation["globalCityIDCount"])
+        actions = [replay.actions(step) for step in range(1, len(replay))]
+    game = sim.to_game(0, **game_options)
+    yield game
+    for turn_actions in actions:
+        sim.step(turn_actions)
+        game._update_from_state(sim)
+        yield game
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+@pytest.mark.parametrize("replay_path", REPLAYS, ids=path.basename)
+def test_clusters_follow_the_map(replay_path, incremental):
+    index = ClusterIndex()
+    for game in _games(replay_path, incremental=incremental):
+        index.update(game)
+        if game.turn % 10 == 0 or game.turn < 10:
+            assert _found(index) == _expected(game, index.pressure_radius)
+        for cluster in index.all_clusters():
+            for key in cluster.cells:
+                assert index.cluster_at(*key) is cluster
+
+
+def test_largest_part_keeps_the_id():
+    sim = SimGame(8, 8)
+    for x in range(6):
+        sim.add_resource(x, 3, RESOURCE_TYPES.WOOD, 100)
+    sim.add_resource(2, 4, RESOURCE_TYPES.WOOD, 100)
+    sim.spawn_city_tile(0, 0, 0)
+    sim.spawn_city_tile(1, 3, 5)
+    game = sim.to_game(0, incremental=True)
+    index = ClusterIndex(pressure_radius=2).update(game)
+    (cluster,) = index.clusters[RESOURCE_TYPES.WOOD].values()
+    assert cluster.amount == 700 and cluster.citytiles == [0, 1]
+    assert (3, 4) in cluster.perimeter and (2, 5) in cluster.perimeter and (3, 5) not in cluster.perimeter
+
+    sim.resource_amount[3][3] = 0
+    sim.resources.remove((3, 3))
+    sim.resource_amount[3][0] = 40
+    sim.spawn_city_tile(0, 1, 2)
+    game._update_from_state(sim)
+    index.update(game)
+    largest, smallest = sorted(index.clusters[RESOURCE_TYPES.WOOD].values(), key=len, reverse=True)
+    assert largest.id == cluster.id and largest.cells == {(0, 3), (1, 3), (2, 3), (2, 4)}
+    assert largest.amount == 340 and largest.citytiles == [1, 1]
+    assert smallest.cells == {(4, 3), (5, 3)} and smallest.citytiles == [0, 0]
+    assert (3, 3) in largest.perimeter and (3, 3) in smallest.perimeter
+    assert (1, 2) not in largest.perimeter
@@ -0,0 +1,109 @@
+"""
+Tests for lux/columnar.py, the columnar replay format
+"""
+import json
+import zipfile
+from glob import glob
+from os import path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from lux.columnar import ColumnarReplay, convert_replay
+from lux.replay import Replay
+
+REPLAYS = sorted(glob(path.join(path.dirname(__file__), "replays", "*.json.gz")))
+
+
+def _expected_updates(replay, step):
+    updates = replay.updates(step)
+    return (updates[2:] if step == 0 else updates)[:-1]
+
+
+@pytest.mark.parametrize("keyframe_interval", [32, 7])
+@pytest.mark.parametrize("replay_path", REPLAYS)
+def test_updates_and_actions_round_trip(replay_path, keyframe_interval, tmp_path):
+    columnar_path = str(tmp_path / "replay.npz")
+    convert_replay(replay_path, columnar_path, keyframe_interval=keyframe_interval)
+    with Replay(replay_path, index_path=False) as replay, ColumnarReplay(columnar_path) as columnar:
+        assert len(columnar) == len(replay)
+        assert (columnar.width, columnar.height) == replay.map_size()
+        assert columnar.meta["info"] == replay.header
+        for step in range(len(replay)):
+            assert columnar.updates(step) == _expected_updates(replay, step)
+            expected_actions = replay.actions(step + 1) if step + 1 < len(replay) else [[], []]
+            assert columnar.actions(step) == expected_actions
+        with pytest.raises(IndexError):
+            columnar.updates(len(replay))
+
+
+def test_columns_are_views_of_the_file(tmp_path):
+    columnar_path = str(tmp_path / "replay.npz")
+    convert_replay(REPLAYS[0], columnar_path)
+    with ColumnarReplay(columnar_path) as columnar:
+        for array in columnar.columns.values():
+            assert not array.flags.owndata and not array.flags.writeable
+        state = columnar.state(100)
+        assert set(state) == {"resources", "units", "cities", "citytiles", "roads", "research_points"}
+        units = state["units"]
+        assert list(units["key"]) == sorted(units["key"])
+        game = columnar.game(100, player=1)
+        assert game.id == 1 and game.turn == 100
+        assert len(game.players[0].units) + len(game.players[1].units) == len(units["key"])
+
+
+@pytest.mark.parametrize("keyframe_interval", [32, 5])
+def test_history_equals_the_table_of_each_step(keyframe_interval, tmp_path):
+    columnar_path = str(tmp_path / "replay.npz")
+    convert_replay(REPLAYS[-1], columnar_path, keyframe_interval=keyframe_interval)
+    with ColumnarReplay(columnar_path) as columnar:
+        for name in ("resources", "units", "cities", "citytiles", "roads"):
+            history = columnar.history(name)
+            window = columnar.history(name, 100, 140)
+            assert set(window["step"].tolist()) <= set(range(100, 140))
+            for step in range(len(columnar)):
+                table = columnar.table(name, step)
+                for column, values in table.items():
+                    assert np.array_equal(history[column][history["step"] == step], values)
+                    if 100 <= step < 140:
+                        assert np.array_equal(window[column][window["step"] == step], values)
+
+
+def test_compressed_files_are_loaded_into_memory(tmp_path):
+    columnar_path = str(tmp_path / "replay.npz")
+    convert_replay(REPLAYS[0], columnar_path, compressed=True)
+    with Replay(REPLAYS[0], index_path=False) as replay, ColumnarReplay(columnar_path) as columnar:
+        assert columnar.columns["units/key"].flags.writeable
+        assert columnar.updates(50) == _expected_updates(replay, 50)
+
+
+@pytest.mark.parametrize("extension", [".json", ".luxr"])
+def test_engine_replays_are_played_again(extension, tmp_path):
+    # the engine records only the seed and the commands, so write the Kaggle match as an engine replay
+    replay_path = [replay_path for replay_path in REPLAYS if "12x12" in replay_path][0]
+    with Replay(replay_path, index_path=False) as replay:
+        configuration = replay.header["configuration"]
+        all_commands = [
+            [{"command": command, "agentID": team}
+             for team, actions in enumerate(replay.actions(step)) for command in actions]
+            for step in range(1, len(replay))
+        ]
+        engine_replay = {
+            "seed": configuration["seed"], "allCommands": all_commands, "mapType": "random",
+            "width": configuration["width"], "height": configuration["height"], "teamDetails": [], "version": "3.0.0",
+        }
+        engine_path = str(tmp_path / ("engine" + extension))
+        if extension == ".luxr":
+            with zipfile.ZipFile(engine_path, "w", zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr("engine.json", json.dumps(engine_replay))
+        else:
+            with open(engine_path, "w") as f:
+                json.dump(engine_replay, f)
+        columnar_path = str(tmp_path / "replay.npz")
+        convert_replay(engine_path, columnar_path)
+        with ColumnarReplay(columnar_path) as columnar:
+            assert columnar.meta["source"] == "engine"
+            assert len(columnar) == len(replay)
+            for step in range(0, len(replay), 10):
+                assert columnar.updates(step) == _expected_updates(replay, step)
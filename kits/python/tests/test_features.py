@@ -0,0 +1,110 @@
+"""
+Tests for lux/features.py, checked against the objects of Games decoded from the recorded replays
+"""
+from glob import glob
+from os import path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from lux.features import LAYERS, FeatureEncoder  # noqa: E402
+from lux.replay import Replay  # noqa: E402
+
+REPLAYS = sorted(glob(path.join(path.dirname(__file__), "replays", "*.json.gz")))
+
+
+def _expected_planes(game, player, map_size=32):
+    planes = {layer: np.zeros((map_size, map_size)) for layer in LAYERS}
+    width, height = game.map_width, game.map_height
+    planes["in_map"][:height, :width] = 1
+    for y in range(height):
+        for x in range(width):
+            cell = game.map.get_cell(x, y)
+            if cell.resource is not None:
+                planes[cell.resource.type][y, x] = cell.resource.amount
+            planes["road"][y, x] = cell.road
+    for prefix, team in (("own_", player), ("opponent_", 1 - player)):
+        for unit in game.players[team].units:
+            x, y = unit.pos.x, unit.pos.y
+            planes[prefix + ("worker" if unit.is_worker() else "cart")][y, x] += 1
+            planes[prefix + "unit_cooldown"][y, x] = max(planes[prefix + "unit_cooldown"][y, x], unit.cooldown)
+            for r_type in ("wood", "coal", "uranium"):
+                planes[prefix + "cargo_" + r_type][y, x] += getattr(unit.cargo, r_type)
+        for city in game.players[team].cities.values():
+            for citytile in city.citytiles:
+                x, y = citytile.pos.x, citytile.pos.y
+                planes[prefix + "citytile"][y, x] = 1
+                planes[prefix + "city_fuel"][y, x] = city.fuel
+                planes[prefix + "city_upkeep"][y, x] = city.light_upkeep
+                planes[prefix + "citytile_cooldown"][y, x] = citytile.cooldown
+        planes[prefix + "research_points"][:height, :width] = game.players[team].research_points
+    planes["turn"][:height, :width] = game.turn
+    planes["night"][:height, :width] = game.turn % 40 >= 30
+    planes["cycle_phase"][:height, :width] = (game.turn % 40) / 40
+    return planes
+
+
+@pytest.mark.parametrize("replay_path", REPLAYS, ids=path.basename)
+@pytest.mark.parametrize("array_map", [False, True])
+def test_layers_match_the_game(replay_path, array_map):
+    encoder = FeatureEncoder()
+    with Replay(replay_path, index_path=False) as replay:
+        for step in (0, 35, 150, len(replay) - 1):
+            for player in (0, 1):
+                game = replay.game(step, player, array_map=array_map)
+                planes = encoder.encode(game)
+                assert planes.shape == (len(LAYERS), 32, 32) and planes.dtype == np.float32
+                expected = _expected_planes(game, player)
+                for channel, layer in enumerate(LAYERS):
+                    assert np.array_equal(planes[channel], expected[layer].astype(np.float32)), layer
+
+
+def test_buffers_are_reused():
+    encoder = FeatureEncoder(["own_worker", "wood", "turn"])
+    with Replay(REPLAYS[0], index_path=False) as replay:
+        games = replay.games(0)
+        first = next(games)
+        planes = encoder.encode(first)
+        first_sum = planes.sum()
+        for _ in range(100):
+            later = next(games)
+            assert encoder.encode(later) is planes
+        assert planes.sum() != first_sum
+        out = encoder.new_buffer()
+        assert encoder.encode(later, out) is out
+        assert np.array_equal(out, planes)
+        expected = _expected_planes(later, 0)
+        for channel, layer in enumerate(encoder.layers):
+            assert np.array_equal(out[channel], expected[layer])
+
+
+def test_batches_stack_single_games():
+    encoder = FeatureEncoder(LAYERS[::-1], map_size=40)
+    games = []
+    for replay_path in REPLAYS:
+        with Replay(replay_path, index_path=False) as replay:
+            games += [replay.game(100, 0), replay.game(200, 1)]
+    out = encoder.new_buffer(len(games))
+    assert encoder.encode_batch(games, out) is out
+    for n, game in enumerate(games):
+        assert np.array_equal(out[n], FeatureEncoder(LAYERS[::-1], map_size=40).encode(game))
+    # seen by the other player, own and opponent layers trade places
+    swapped = encoder.encode_batch(games, players=[1 - game.id for game in games])
+    assert np.array_equal(
+        swapped[:, encoder.layers.index("own_worker")], out[:, encoder.layers.index("opponent_worker")])
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        FeatureEncoder(["wood", "lava"])
+    with Replay(REPLAYS[-1], index_path=False) as replay:
+        game = replay.game(10)
+    encoder = FeatureEncoder(["wood"], map_size=16)
+    with pytest.raises(ValueError):
+        encoder.encode(game)
+    encoder = FeatureEncoder(["wood"])
+    with pytest.raises(ValueError):
+        encoder.encode_batch([game], encoder.new_buffer(2))
+    with pytest.raises(ValueError):
+        encoder.encode_batch([game, game], encoder.new_buffer(4)[::2])
@@ -0,0 +1,77 @@
+"""
+Tests for the entity classes of lux/game_map.py and lux/game_objects.py
+"""
+import copy
+import pickle
+
+import pytest
+
+from lux.constants import Constants
+from lux.game_constants import GAME_CONSTANTS
+from lux.game_map import Cell, GameMap, Position, Resource, get_position
+from lux.game_objects import Cargo, City, CityTile, Player, Unit
+
+DIRECTIONS = Constants.DIRECTIONS
+UNIT_TYPES = Constants.UNIT_TYPES
+
+
+def test_positions_are_values():
+    assert Position(3, 4) == get_position(3, 4)
+    assert Position(3, 4) != Position(4, 3)
+    assert Position(3, 4) != (3, 4)
+    assert {Position(3, 4), get_position(3, 4), Position(40, 40), Position(40, 40)} == {
+        Position(3, 4), Position(40, 40),
+    }
+    assert {get_position(0, 0): "origin"}[Position(0, 0)] == "origin"
+
+
+def test_positions_are_interned():
+    pos = get_position(5, 5)
+    assert pos.translate(DIRECTIONS.NORTH, 1) is get_position(5, 4)
+    assert pos.translate(DIRECTIONS.CENTER, 1) is pos
+    # one step off the largest map is interned too, far away positions are not
+    assert get_position(0, 0).translate(DIRECTIONS.WEST, 1) is get_position(-1, 0)
+    assert get_position(32, 32) is get_position(32, 32)
+    assert get_position(100, 0) == Position(100, 0)
+    game_map = GameMap(12, 12)
+    unit = Unit(0, UNIT_TYPES.WORKER, "u_1", 2, 7, 0, 0, 0, 0)
+    assert game_map.get_cell(2, 7).pos is unit.pos is CityTile(0, "c_1", 2, 7, 0).pos
+
+
+def test_positions_are_immutable():
+    pos = get_position(5, 5)
+    with pytest.raises(AttributeError):
+        pos.x = 6
+    with pytest.raises(AttributeError):
+        del pos.y
+    assert pos == Position(5, 5) and get_position(5, 5) is pos
+    assert copy.deepcopy(pos) == pos and pickle.loads(pickle.dumps(Position(40, 2))) == Position(40, 2)
+
+
+@pytest.mark.parametrize("entity", [
+    Position(0, 0), Resource("wood", 10), Cell(0, 0), Cargo(), Unit(0, UNIT_TYPES.CART, "u_1", 0, 0, 0, 0, 0, 0),
+    City(0, "c_1", 0, 0), CityTile(0, "c_1", 0, 0, 0), Player(0),
+])
+def test_entities_have_no_instance_dict(entity):
+    assert not hasattr(entity, "__dict__")
+
+
+def test_cached_constants_in_accessors():
+    parameters = GAME_CONSTANTS["PARAMETERS"]
+    worker = Unit(0, UNIT_TYPES.WORKER, "u_1", 1, 1, 0, 10, 20, 30)
+    cart = Unit(0, UNIT_TYPES.CART, "u_2", 1, 1, 0, 10, 20, 30)
+    assert worker.get_cargo_space_left() == parameters["RESOURCE_CAPACITY"]["WORKER"] - 60
+    assert cart.get_cargo_space_left() == parameters["RESOURCE_CAPACITY"]["CART"] - 60
+
+    game_map = GameMap(3, 3)
+    builder = Unit(0, UNIT_TYPES.WORKER, "u_3", 1, 1, 0, parameters["CITY_BUILD_COST"], 0, 0)
+    assert builder.can_build(game_map)
+    assert not worker.can_build(game_map)
+    game_map._setResource("wood", 1, 1, 100)
+    assert not builder.can_build(game_map)
+    busy = Unit(0, UNIT_TYPES.WORKER, "u_4", 2, 2, 1, parameters["CITY_BUILD_COST"], 0, 0)
+    assert not busy.can_build(game_map)
+
+    player = Player(0)
+    player.research_points = parameters["RESEARCH_REQUIREMENTS"]["COAL"]
+    assert player.researched_coal() and not player.researched_uranium()
@@ -0,0 +1,175 @@
+"""
+Tests for Game(incremental=True): the patched Game matches one rebuilt from the same lines on every turn, and
+game.delta lists what differs from the turn before
+"""
+from glob import glob
+from os import path
+
+import pytest
+
+from lux.constants import Constants
+from lux.game import Game
+from lux.replay import Replay
+from lux.sim import SimGame
+
+RESOURCE_TYPES = Constants.RESOURCE_TYPES
+REPLAYS = sorted(glob(path.join(path.dirname(__file__), "replays", "*.json.gz")))
+
+
+def _snapshot(game):
+    """
+    the state of a Game as plain values: units, cities, city tiles and cells keyed like GameDelta
+    """
+    units = {}
+    cities = {}
+    citytiles = {}
+    for player in game.players:
+        for unit in player.units:
+            cargo = unit.cargo
+            units[unit.id] = (
+                unit.team, unit.type, unit.pos.x, unit.pos.y, unit.cooldown, cargo.wood, cargo.coal, cargo.uranium,
+            )
+        for cityid, city in player.cities.items():
+            assert city.cityid == cityid and city.team == player.team
+            tiles = frozenset((citytile.pos.x, citytile.pos.y) for citytile in city.citytiles)
+            cities[cityid] = (city.team, city.fuel, city.light_upkeep, tiles)
+            for citytile in city.citytiles:
+                assert citytile.cityid == cityid
+                citytiles[(citytile.pos.x, citytile.pos.y)] = (citytile.team, citytile.cityid, citytile.cooldown)
+        assert player.city_tile_count == sum(len(city.citytiles) for city in player.cities.values())
+    cells = {}
+    for y in range(game.map_height):
+        for x in range(game.map_width):
+            cell = game.map.get_cell(x, y)
+            assert (cell.pos.x, cell.pos.y) == (x, y)
+            resource = (cell.resource.type, cell.resource.amount) if cell.has_resource() else None
+            citytile = cell.citytile
+            if citytile is not None:
+                # the cell holds the city tile of its city
+                assert citytiles[(x, y)] == (citytile.team, citytile.cityid, citytile.cooldown)
+            cells[(x, y)] = (resource, cell.road, citytile.team if citytile is not None else None)
+    assert {key for key, cell in cells.items() if cell[2] is not None} == set(citytiles)
+    research = tuple(player.research_points for player in game.players)
+    return {"units": units, "cities": cities, "citytiles": citytiles, "cells": cells, "research": research}
+
+
+def _differences(before, after):
+    """
+    (added, changed, removed) between two dicts
+    """
+    added = after.keys() - before.keys()
+    removed = before.keys() - after.keys()
+    changed = {key for key in before.keys() & after.keys() if before[key] != after[key]}
+    return added, changed, removed
+
+
+def _check_delta(delta, before, after):
+    assert (delta.units_added, delta.units_changed, delta.units_removed) == _differences(
+        before["units"], after["units"])
+    assert (delta.cities_added, delta.cities_changed, delta.cities_removed) == _differences(
+        before["cities"], after["cities"])
+    added, changed, removed = _differences(before["citytiles"], after["citytiles"])
+    assert delta.citytiles_added == added and delta.citytiles_removed == removed
+    # a city tile changes with its cooldown, moving to another city shows in cities_changed
+    assert delta.citytiles_changed == {
+        key for key in changed if before["citytiles"][key][2] != after["citytiles"][key][2]}
+    assert delta.cells_changed == _differences(before["cells"], after["cells"])[1]
+    assert delta.is_empty() == (before == after)
+
+
+def _play(steps, size, array_map):
+    """
+    feeds the update lines of each turn to an incremental Game and to one rebuilt every turn, checking them
+    """
+    header = ["0", "{} {}".format(*size)]
+    incremental = Game(incremental=True, array_map=array_map)
+    incremental._initialize(header)
+    full = Game(array_map=array_map)
+    full._initialize(header)
+    before = None
+    for updates in steps:
+        incremental._update(updates)
+        full._update(updates)
+        after = _snapshot(incremental)
+        assert incremental.turn == full.turn
+        assert after == _snapshot(full)
+        if before is not None:
+            _check_delta(incremental.delta, before, after)
+        before = after
+    return incremental
+
+
+@pytest.mark.parametrize("array_map", [False, True])
+@pytest.mark.parametrize("replay_path", REPLAYS, ids=path.basename)
+def test_incremental_matches_full_rebuild(replay_path, array_map):
+    if array_map:
+        pytest.importorskip("numpy")
+    with Replay(replay_path) as replay:
+        steps = [replay.updates(step) for step in range(len(replay))]
+        size = replay.map_size()
+    steps[0] = steps[0][2:]
+    _play(steps, size, array_map)
+
+
+def _sim_steps(sim, changes):
+    """
+    the update lines of the turn of sim and of the turns after each change, a function applied to sim
+    """
+    steps = [sim.to_updates() + ["D_DONE"]]
+    for change in changes:
+        change(sim)
+        steps.append(sim.to_updates() + ["D_DONE"])
+    return steps
+
+
+@pytest.mark.parametrize("array_map", [False, True])
+def test_city_merges(array_map):
+    if array_map:
+        pytest.importorskip("numpy")
+    sim = SimGame(8, 8)
+    sim.add_resource(7, 7, RESOURCE_TYPES.WOOD, 100)
+    sim.spawn_city_tile(0, 1, 1, "c_1")
+    sim.spawn_city_tile(0, 3, 1, "c_2")
+    sim.spawn_city_tile(1, 6, 6, "c_3")
+    sim.cities["c_1"].fuel = 100
+    sim.cities["c_2"].fuel = 50
+    sim.spawn_worker(0, 2, 2, "u_1")
+
+    def merge(sim):
+        # the tile between them joins the two cities into one, adding their fuel
+        sim.spawn_city_tile(0, 2, 1)
+        sim.get_unit(0, "u_1").y = 1
+
+    def grow(sim):
+        sim.spawn_city_tile(0, 2, 0)
+        sim.citytiles[1][3].cooldown = 5
+
+    game = _play(_sim_steps(sim, [merge, grow]), (8, 8), array_map)
+    (city,) = game.players[0].cities.values()
+    assert city.fuel == 150
+    assert game.players[0].city_tile_count == 4
+    assert game.delta.citytiles_added == {(2, 0)} and game.delta.citytiles_changed == {(3, 1)}
+
+
+@pytest.mark.parametrize("array_map", [False, True])
+def test_city_deaths(array_map):
+    if array_map:
+        pytest.importorskip("numpy")
+    sim = SimGame(8, 8)
+    sim.turn = 30
+    sim.spawn_city_tile(0, 1, 1, "c_1")
+    sim.spawn_city_tile(0, 1, 2, "c_1")
+    sim.spawn_city_tile(1, 5, 5, "c_2")
+    sim.cities["c_1"].fuel = 10
+    sim.cities["c_2"].fuel = 10 ** 4
+    sim.spawn_worker(0, 1, 1, "u_1")
+    sim.spawn_worker(0, 4, 4, "u_2")
+
+    def night(sim):
+        # c_1 goes dark, then both empty handed workers die, the one inside having lost its shelter
+        sim.step([[], []])
+
+    game = _play(_sim_steps(sim, [night, night]), (8, 8), array_map)
+    assert set(game.players[0].cities) == set()
+    assert [unit.id for unit in game.players[0].units] == []
+    assert game.map.get_cell(1, 1).citytile is None and game.map.get_cell(1, 1).road == 0
@@ -0,0 +1,98 @@
+"""
+Tests for lux/keyframes.py, seeking to any turn of a match played again from its commands
+"""
+import json
+import random
+from glob import glob
+from os import path
+
+import pytest
+
+from lux.keyframes import KeyframeIndex
+from lux.replay import Replay
+
+REPLAYS = sorted(glob(path.join(path.dirname(__file__), "replays", "*.json.gz")))
+
+
+def _expected_updates(replay, step):
+    updates = replay.updates(step)
+    return (updates[2:] if step == 0 else updates)[:-1]
+
+
+@pytest.mark.parametrize("replay_path", REPLAYS)
+def test_random_seeks_match_the_replay(replay_path):
+    index = KeyframeIndex.from_kaggle_replay(replay_path, keyframe_interval=16)
+    with Replay(replay_path, index_path=False) as replay:
+        assert len(index) == len(replay)
+        steps = random.Random(0).sample(range(len(replay)), 40) + [0, len(replay) - 1, 17, 18, 19, 5]
+        for step in steps:
+            assert index.updates(step) == _expected_updates(replay, step)
+        game = index.game(200, player=1)
+        assert (game.id, game.turn) == (1, 200)
+
+
+def test_seeking_costs_at_most_one_keyframe_interval():
+    index = KeyframeIndex.from_kaggle_replay(REPLAYS[0], keyframe_interval=10, cache_size=1000)
+    index.warm()
+    assert index.steps_simulated == len(index) - 1
+    assert sorted(index.keyframes) == list(range(10, len(index), 10))
+    for step in random.Random(1).sample(range(len(index)), 30):
+        before = index.steps_simulated
+        index.sim(step)
+        assert index.steps_simulated - before < 10
+    # scrubbing forward continues from the last turn instead of the keyframe
+    index.sim(101)
+    before = index.steps_simulated
+    index.sim(102)
+    index.sim(103)
+    assert index.steps_simulated - before == 2
+
+
+def test_sims_are_copies():
+    index = KeyframeIndex.from_kaggle_replay(REPLAYS[0])
+    updates = index.updates(40)
+    sim = index.sim(40)
+    sim.step([[], []])
+    assert index.updates(40) == updates
+
+
+def test_lru_keeps_the_recent_keyframes():
+    index = KeyframeIndex.from_kaggle_replay(REPLAYS[0], keyframe_interval=10, cache_size=3)
+    index.warm()
+    assert list(index.keyframes) == [340, 350, 360]
+    index.sim(5)
+    before = index.steps_simulated
+    index.sim(125)
+    # keyframe 120 was evicted, so the seek starts over from the start of the match
+    assert index.steps_simulated - before == 125
+
+
+def test_keyframes_on_disk_are_shared_between_indexes(tmp_path):
+    cache_dir = str(tmp_path / "keyframes")
+    first = KeyframeIndex.from_kaggle_replay(REPLAYS[0], keyframe_interval=20, cache_size=2, cache_dir=cache_dir)
+    first.warm()
+    second = KeyframeIndex.from_kaggle_replay(REPLAYS[0], keyframe_interval=20, cache_size=2, cache_dir=cache_dir)
+    assert second.updates(305) == first.updates(305)
+    assert second.steps_simulated == 5
+    assert len(glob(path.join(cache_dir, "*.pickle"))) == (len(first) - 1) // 20
+
+
+def test_engine_replays(tmp_path):
+    replay_path = [replay_path for replay_path in REPLAYS if "12x12" in replay_path][0]
+    with Replay(replay_path, index_path=False) as replay:
+        configuration = replay.header["configuration"]
+        engine_replay = {
+            "seed": configuration["seed"], "mapType": "random",
+            "width": configuration["width"], "height": configuration["height"],
+            "allCommands": [
+                [{"command": command, "agentID": team}
+                 for team, actions in enumerate(replay.actions(step)) for command in actions]
+                for step in range(1, len(replay))
+            ],
+        }
+        engine_path = str(tmp_path / "engine.json")
+        with open(engine_path, "w") as f:
+            json.dump(engine_replay, f)
+        index = KeyframeIndex.from_engine_replay(engine_path)
+        assert (index.initial.width, index.initial.height) == replay.map_size()
+        assert index.updates(250) == _expected_updates(replay, 250)
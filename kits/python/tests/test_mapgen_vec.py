@@ -0,0 +1,82 @@
+"""
+Tests for lux/mapgen_vec.py, checked map by map against lux.mapgen
+"""
+import os
+import random
+
+import pytest
+
+from lux.mapgen import SeedRandom, generate_map
+
+np = pytest.importorskip("numpy")
+from lux.mapgen_vec import GeneratedMap, _KeyStreams, _StreamRandom, generate_maps  # noqa: E402
+
+
+def _assert_same_maps(generated_maps, width=None, height=None):
+    for generated_map in generated_maps:
+        expected = generate_map(generated_map.seed, width, height)
+        sim = generated_map.to_sim()
+        assert (sim.width, sim.height) == (expected.width, expected.height)
+        assert sim.to_updates() == expected.to_updates()
+
+
+def test_stream_random_matches_seed_random():
+    seeds = ["gen_{}".format(seed) for seed in range(5)] + ["hello."]
+    streams = _KeyStreams(seeds)
+    choices = random.Random(0)
+    for row, seed in enumerate(seeds):
+        expected = SeedRandom(seed)
+        rng = _StreamRandom(streams, row)
+        for _ in range(300):
+            count = choices.choice([1, 1, 7, 64, 500])
+            if count == 1:
+                assert rng() == expected()
+            else:
+                assert rng.draws(count).tolist() == [expected() for _ in range(count)]
+
+
+def test_maps_match_generate_map():
+    _assert_same_maps(generate_maps(range(120), batch_size=50))
+
+
+@pytest.mark.parametrize("width,height", [(12, 12), (32, 32), (13, 17)])
+def test_maps_of_a_given_size_match_generate_map(width, height):
+    generated_maps = generate_maps(range(500, 530), width, height)
+    assert {(generated_map.width, generated_map.height) for generated_map in generated_maps} == {(width, height)}
+    _assert_same_maps(generated_maps, width, height)
+
+
+def test_processes_give_the_same_maps():
+    seeds = list(range(40))
+    expected = generate_maps(seeds)
+    generated_maps = generate_maps(seeds, processes=2, batch_size=10)
+    for generated_map, expected_map in zip(generated_maps, expected):
+        assert generated_map.seed == expected_map.seed
+        assert np.array_equal(generated_map.to_array(), expected_map.to_array())
+
+
+def test_maps_are_cached_on_disk(tmp_path):
+    cache_dir = str(tmp_path)
+    generated_maps = generate_maps(range(10), 16, 16, cache_dir=cache_dir)
+    assert sorted(os.listdir(cache_dir)) == sorted("{}_16x16.npy".format(seed) for seed in range(10))
+    # a cached map is loaded, not generated again
+    cached_path = os.path.join(cache_dir, "3_16x16.npy")
+    array = np.load(cached_path)
+    array[6:6 + 16 * 16] = -1
+    np.save(cached_path, array)
+    cached_maps = generate_maps(range(10), 16, 16, cache_dir=cache_dir)
+    assert (cached_maps[3].resource_type == -1).all()
+    for n in (0, 9):
+        assert np.array_equal(cached_maps[n].to_array(), generated_maps[n].to_array())
+    # the automatic size is cached apart from forced sizes
+    generate_maps([3], cache_dir=cache_dir)
+    assert os.path.exists(os.path.join(cache_dir, "3_auto.npy"))
+
+
+def test_array_round_trip():
+    generated_map = generate_maps([7], 13, 17)[0]
+    loaded = GeneratedMap.from_array(7, generated_map.to_array())
+    assert (loaded.width, loaded.height, loaded.spawns) == (13, 17, generated_map.spawns)
+    assert loaded.resource_type.dtype == np.int8
+    assert np.array_equal(loaded.resource_type, generated_map.resource_type)
+    assert np.array_equal(loaded.resource_amount, generated_map.resource_amount)
@@ -0,0 +1,153 @@
+"""
+Tests for lux/parser.py, checked against decoding the update lines one field at a time like Game._update used to
+"""
+from glob import glob
+from os import path
+
+import pytest
+
+from lux.constants import Constants
+from lux.parser import UPDATE_SCHEMAS, UpdateTable, parse_updates
+from lux.replay import Replay
+
+INPUT_CONSTANTS = Constants.INPUT_CONSTANTS
+REPLAYS = sorted(glob(path.join(path.dirname(__file__), "replays", "*.json.gz")))
+TABLES = {
+    INPUT_CONSTANTS.RESEARCH_POINTS: "research_points",
+    INPUT_CONSTANTS.RESOURCES: "resources",
+    INPUT_CONSTANTS.UNITS: "units",
+    INPUT_CONSTANTS.CITY: "cities",
+    INPUT_CONSTANTS.CITY_TILES: "citytiles",
+    INPUT_CONSTANTS.ROADS: "roads",
+}
+
+
+def _per_line(messages):
+    """
+    the rows of each identifier, decoded the way the original Game._update did
+    """
+    rows = {identifier: [] for identifier in UPDATE_SCHEMAS}
+    for update in messages:
+        if update == INPUT_CONSTANTS.DONE:
+            break
+        strs = update.split(" ")
+        identifier = strs[0]
+        if identifier == INPUT_CONSTANTS.RESEARCH_POINTS:
+            row = (int(strs[1]), int(strs[2]))
+        elif identifier == INPUT_CONSTANTS.RESOURCES:
+            row = (strs[1], int(strs[2]), int(strs[3]), int(float(strs[4])))
+        elif identifier == INPUT_CONSTANTS.UNITS:
+            row = (
+                int(strs[1]), int(strs[2]), strs[3], int(strs[4]), int(strs[5]), float(strs[6]),
+                int(strs[7]), int(strs[8]), int(strs[9]),
+            )
+        elif identifier == INPUT_CONSTANTS.CITY:
+            row = (int(strs[1]), strs[2], float(strs[3]), float(strs[4]))
+        elif identifier == INPUT_CONSTANTS.CITY_TILES:
+            row = (int(strs[1]), strs[2], int(strs[3]), int(strs[4]), float(strs[5]))
+        elif identifier == INPUT_CONSTANTS.ROADS:
+            row = (int(strs[1]), int(strs[2]), float(strs[3]))
+        else:
+            continue
+        rows[identifier].append(row)
+    return rows
+
+
+def _check(messages):
+    parsed = parse_updates(messages)
+    expected = _per_line(messages)
+    for identifier, attribute in TABLES.items():
+        table = getattr(parsed, attribute)
+        assert table.identifier == identifier and len(table) == len(expected[identifier])
+        rows = list(table.rows())
+        assert rows == expected[identifier]
+        # equal values of another type (1 == 1.0) would pass the comparison above
+        assert [tuple(map(type, row)) for row in rows] == [tuple(map(type, row)) for row in expected[identifier]]
+    return parsed
+
+
+LINES = [
+    "rp 0 12",
+    "rp 1 2000",
+    "r wood 0 1 500",
+    "r coal 10 11 350.0",
+    "r uranium 31 31 4096",
+    "u 0 0 u_1 3 4 0 100 0 0",
+    "u 1 1 u_12 5 6 2.5 0 2000 7",
+    "c 0 c_1 1234.5 23",
+    "c 1 c_2 0 46",
+    "ct 0 c_1 3 4 0",
+    "ct 1 c_2 5 6 9",
+    "ccd 3 4 6",
+    "ccd 5 6 0.75",
+]
+
+
+def test_every_identifier():
+    parsed = _check(LINES + [INPUT_CONSTANTS.DONE])
+    assert parsed.units.id == ["u_1", "u_12"] and parsed.units.cooldown == [0.0, 2.5]
+    # values beyond the decode tables are decoded too
+    assert parsed.research_points.points == [12, 2000] and parsed.resources.amount == [500, 350, 4096]
+    assert parsed.roads.road == [6.0, 0.75]
+
+
+def test_lines_after_done_and_unknown_identifiers_are_ignored():
+    parsed = _check(["ab 1 2"] + LINES[:4] + ["x y", INPUT_CONSTANTS.DONE, "rp 0 99", "u 0 0 u_9 0 0 0 0 0 0"])
+    assert parsed.research_points.points == [12, 2000] and len(parsed.units) == 0
+
+
+def test_groups_out_of_order():
+    # the engine sends each identifier in one run, but runs split apart still land in one table
+    _check(LINES[::-1] + [INPUT_CONSTANTS.DONE])
+    _check(LINES[::2] + LINES[1::2] + [INPUT_CONSTANTS.DONE])
+
+
+@pytest.mark.parametrize("messages", [[], [INPUT_CONSTANTS.DONE], ["rp 0 0", "rp 1 0", INPUT_CONSTANTS.DONE]])
+def test_empty_groups(messages):
+    parsed = _check(messages)
+    for attribute in ("resources", "units", "cities", "citytiles", "roads"):
+        table = getattr(parsed, attribute)
+        assert len(table) == 0 and list(table.rows()) == []
+        assert all(getattr(table, name) == [] for name in table.columns)
+
+
+def test_malformed_lines_raise():
+    with pytest.raises(ValueError):
+        parse_updates(["u 0 0 u_1 3 4 0 100 0", INPUT_CONSTANTS.DONE])
+
+
+@pytest.mark.parametrize("replay_path", REPLAYS, ids=path.basename)
+def test_replay_turns(replay_path):
+    with Replay(replay_path) as replay:
+        for step in range(0, len(replay), 7):
+            # the first turn opens with the player id and map size, which Game reads before the updates
+            updates = replay.updates(step)
+            _check(updates[2:] if step == 0 else updates)
+
+
+def test_from_columns_matches_the_lines():
+    parsed = parse_updates(LINES)
+    for attribute in TABLES.values():
+        table = getattr(parsed, attribute)
+        rebuilt = UpdateTable.from_columns(table.identifier, [getattr(table, name) for name in table.columns])
+        assert len(rebuilt) == len(table) and rebuilt.columns == table.columns
+        assert list(rebuilt.rows()) == list(table.rows())
+
+
+def test_to_numpy():
+    np = pytest.importorskip("numpy")
+    parsed = parse_updates(LINES)
+    units = parsed.units.to_numpy()
+    assert units.dtype.names == parsed.units.columns
+    assert units.dtype["id"] == object and units.dtype["x"] == np.int32 and units.dtype["cooldown"] == np.float64
+    assert parsed.resources.to_numpy().dtype["amount"] == np.int32
+    assert parsed.resources.to_numpy().dtype["type"] == object
+    assert parsed.cities.to_numpy().dtype["fuel"] == np.float64
+    assert parsed.roads.to_numpy().dtype["road"] == np.float64
+    for attribute in TABLES.values():
+        table = getattr(parsed, attribute)
+        array = table.to_numpy()
+        assert array.shape == (len(table),)
+        assert [tuple(row) for row in array.tolist()] == list(table.rows())
+    empty = parse_updates([]).citytiles.to_numpy()
+    assert empty.shape == (0,) and empty.dtype.names == ("team", "cityid", "x", "y", "cooldown")
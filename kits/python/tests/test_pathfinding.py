@@ -0,0 +1,170 @@
+"""
+Tests for lux/pathfinding.py, checked against brute force searches on small maps and against lux.sim
+"""
+import math
+import random
+
+import pytest
+
+from lux.constants import Constants
+from lux.game_map import GameMap, Position
+from lux.pathfinding import Pathfinder, blocked_cells, move_turns
+from lux.sim import SimGame
+
+DIRECTIONS = Constants.DIRECTIONS
+STEPS = {DIRECTIONS.NORTH: (0, -1), DIRECTIONS.EAST: (1, 0), DIRECTIONS.SOUTH: (0, 1), DIRECTIONS.WEST: (-1, 0)}
+ROADS = [0, 0.5, 1, 1.5, 2, 3, 3.75, 6]
+
+
+def _brute_move_turns(cooldown, road):
+    """
+    the turns until a unit that moved onto a cell with road can act again, played one turn at a time
+    """
+    turns = 0
+    while True:
+        turns += 1
+        cooldown = max(cooldown - road - 1, 0)
+        if cooldown < 1:
+            return turns
+
+
+def _random_map(rng, width, height):
+    game_map = GameMap(width, height)
+    for y in range(height):
+        for x in range(width):
+            game_map.get_cell(x, y).road = rng.choice(ROADS) if rng.random() < 0.4 else 0
+    blocked = {(x, y) for y in range(height) for x in range(width) if rng.random() < 0.25}
+    sources = {(rng.randrange(width), rng.randrange(height)) for _ in range(rng.randint(1, 3))}
+    return game_map, blocked, sources
+
+
+def _brute_distances(game_map, blocked, sources, cost):
+    """
+    relaxes every cell until nothing changes: a cell is as far as the cheapest neighbour it can move onto,
+    plus the cost of moving there. Paths only pass through cells that are sources or not blocked
+    """
+    width, height = game_map.width, game_map.height
+    distances = {(x, y): math.inf for y in range(height) for x in range(width)}
+    for key in sources:
+        distances[key] = 0
+    changed = True
+    while changed:
+        changed = False
+        for (x, y), dist in distances.items():
+            for dx, dy in STEPS.values():
+                key = (x + dx, y + dy)
+                if key not in distances or (key in blocked and key not in sources):
+                    continue
+                if distances[key] + cost(key) < dist:
+                    dist = distances[key] + cost(key)
+                    distances[(x, y)] = dist
+                    changed = True
+    return distances
+
+
+def _check_field(field, game_map, blocked, sources, cost):
+    expected = _brute_distances(game_map, blocked, sources, cost)
+    for (x, y), dist in expected.items():
+        pos = Position(x, y)
+        assert field.distance(pos) == dist
+        if dist == 0 or dist == math.inf:
+            assert field.next_direction(pos) == DIRECTIONS.CENTER
+            continue
+        # following the directions reaches a target in as many moves or turns as the distance
+        spent = 0
+        while (x, y) not in sources:
+            dx, dy = STEPS[field.next_direction(Position(x, y))]
+            x, y = x + dx, y + dy
+            assert (x, y) not in blocked or (x, y) in sources
+            spent += cost((x, y))
+        assert spent == dist
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_bfs_matches_brute_force(seed):
+    rng = random.Random(seed)
+    game_map, blocked, sources = _random_map(rng, rng.randint(1, 7), rng.randint(1, 7))
+    pathfinder = Pathfinder(game_map, blocked)
+    field = pathfinder.distance_field(sources)
+    _check_field(field, game_map, blocked, sources, lambda key: 1)
+    # targets given as Positions share the cached field
+    assert pathfinder.distance_field([Position(x, y) for x, y in sources]) is field
+
+
+@pytest.mark.parametrize("cooldown", [2, 3, 4, 6])
+@pytest.mark.parametrize("seed", range(6))
+def test_dijkstra_matches_brute_force(seed, cooldown):
+    rng = random.Random(seed)
+    game_map, blocked, sources = _random_map(rng, rng.randint(2, 7), rng.randint(2, 7))
+    field = Pathfinder(game_map, blocked).distance_field(sources, cooldown)
+
+    def cost(key):
+        return _brute_move_turns(cooldown, game_map.get_cell(*key).road)
+
+    _check_field(field, game_map, blocked, sources, cost)
+
+
+def test_roads_make_longer_paths_cheaper():
+    game_map = GameMap(5, 3)
+    # the straight row is bare, the detour through the bottom row has roads
+    for x in range(5):
+        game_map.get_cell(x, 2).road = 6
+    game_map.get_cell(0, 2).road = 0
+    pathfinder = Pathfinder(game_map)
+    # a worker at night spends 4 turns on each move onto a bare cell and 1 onto a road of 6
+    assert pathfinder.distance_field([(4, 1)], cooldown=4).distance(Position(0, 1)) == 4 + 4 * 1 + 4
+    assert pathfinder.distance_field([(4, 1)]).distance(Position(0, 1)) == 4
+    assert pathfinder.distance_field([(4, 0)], cooldown=4).distance(Position(0, 0)) == 4 * 4
+    assert pathfinder.next_direction(Position(0, 1), [(4, 1)], cooldown=4) == DIRECTIONS.SOUTH
+    assert pathfinder.next_direction(Position(0, 1), [(4, 1)]) == DIRECTIONS.EAST
+    assert pathfinder.next_direction(Position(0, 2), [(4, 1)], cooldown=4) == DIRECTIONS.EAST
+
+
+@pytest.mark.parametrize("cooldown", [0, 0.5, 1, 2, 3, 4, 6, 7.5])
+def test_move_turns(cooldown):
+    for road in ROADS:
+        assert move_turns(cooldown, road) == _brute_move_turns(cooldown, road)
+
+
+@pytest.mark.parametrize("night", [False, True])
+def test_move_turns_follow_the_engine(night):
+    for road in ROADS:
+        sim = SimGame(4, 4)
+        sim.turn = 30 if night else 0
+        sim.spawn_city_tile(1, 3, 3)
+        sim.cities["c_1"].fuel = 10 ** 4
+        unit = sim.spawn_worker(0, 0, 0)
+        unit.cargo[Constants.RESOURCE_TYPES.URANIUM] = 100
+        sim.road[0][1] = road
+        sim.step([["m {} {}".format(unit.id, DIRECTIONS.EAST)], []])
+        turns = 1
+        while not sim.get_unit(0, unit.id).can_act():
+            sim.step([[], []])
+            turns += 1
+        assert sim.get_unit(0, unit.id).x == 1
+        assert turns == move_turns(4 if night else 2, road)
+
+
+def test_blocked_cells():
+    sim = SimGame(6, 6)
+    sim.spawn_city_tile(0, 0, 0)
+    sim.spawn_city_tile(0, 1, 0)
+    sim.spawn_city_tile(1, 5, 5)
+    sim.spawn_city_tile(1, 4, 5)
+    sim.spawn_worker(0, 0, 0)
+    sim.spawn_worker(0, 2, 2)
+    sim.spawn_cart(1, 3, 3)
+    sim.spawn_worker(1, 5, 5)
+    game = sim.to_game(0)
+    units = {(2, 2), (3, 3)}
+    assert blocked_cells(game, 0) == {(5, 5), (4, 5)} | units
+    assert blocked_cells(game, 0, include_units=False) == {(5, 5), (4, 5)}
+    # a unit on one of the team's own city tiles does not block it, the opponent's city tiles stay blocked
+    assert blocked_cells(game, 1) == {(0, 0), (1, 0)} | units
+    assert blocked_cells(game, 1, include_units=False) == {(0, 0), (1, 0)}
+
+    # units standing on blocked cells still find their way out, around the other blocked cells
+    field = Pathfinder(game.map, blocked_cells(game, 0)).distance_field([(5, 0)])
+    assert field.distance(Position(2, 2)) == 3 + 2 and field.distance(Position(3, 4)) == 2 + 4
+    assert field.distance(Position(4, 5)) == 6 and field.distance(Position(5, 5)) == 5
+    assert field.next_direction(Position(5, 4)) == DIRECTIONS.NORTH
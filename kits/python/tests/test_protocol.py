@@ -0,0 +1,115 @@
+"""
+Tests for lux/protocol.py, with turns cut into reads of every size
+"""
+import io
+import os
+import subprocess
+import sys
+from os import path
+
+import pytest
+
+import agent as sample_agent
+from lux.protocol import InProcessTransport, StdioTransport
+from lux.replay import Replay
+
+KIT_PATH = path.join(path.dirname(__file__), "..", "simple")
+REPLAY = path.join(path.dirname(__file__), "replays", "seed13_12x12.json.gz")
+
+TURNS = [
+    ["0", "12 12", "rp 0 0", "rp 1 0", "u 0 0 u_1 1 1 0 0 0 0", "D_DONE"],
+    ["rp 0 1", "rp 1 0", "D_DONE"],
+    # a line that merely starts with D_DONE does not end the turn
+    ["rp 0 2", "dt D_DONE", "D_DONEX", "D_DONE"],
+]
+
+
+class ChunkedReader:
+    """
+    a stream handing out at most size bytes per read, like a pipe the lines trickle into
+    """
+    def __init__(self, data, size):
+        self.data = data
+        self.size = size
+
+    def read1(self, size):
+        chunk, self.data = self.data[:min(size, self.size)], self.data[min(size, self.size):]
+        return chunk
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.writes = []
+        self.flushes = 0
+
+    def write(self, data):
+        self.writes.append(data)
+
+    def flush(self):
+        self.flushes += 1
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 7, 64, 1 << 16])
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_turns_are_read_whole_whatever_the_reads(size, newline):
+    data = "".join(newline.join(turn) + newline for turn in TURNS).encode()
+    started = []
+    transport = StdioTransport(ChunkedReader(data, size), RecordingWriter(), on_turn_start=lambda: started.append(1))
+    assert [transport.read_turn() for _ in TURNS] == TURNS
+    assert transport.read_turn() is None
+    assert len(started) == len(TURNS)
+
+
+def test_last_turn_may_miss_its_newline_and_cut_turns_are_dropped():
+    transport = StdioTransport(io.BytesIO(b"rp 0 0\nD_DONE"), RecordingWriter())
+    assert transport.read_turn() == ["rp 0 0", "D_DONE"]
+    assert transport.read_turn() is None
+    transport = StdioTransport(io.BytesIO(b"rp 0 0\nD_DONE\nrp 0 1\n"), RecordingWriter())
+    assert transport.read_turn() == ["rp 0 0", "D_DONE"]
+    assert transport.read_turn() is None
+
+
+def test_input_ready_polls_the_pipe():
+    read_end, write_end = os.pipe()
+    with os.fdopen(read_end, "rb", buffering=0) as stdin, os.fdopen(write_end, "wb", buffering=0) as stdout:
+        transport = StdioTransport(stdin, RecordingWriter())
+        assert not transport.input_ready(0.01)
+        stdout.write(b"rp 0 0\nD_DONE\nrp 0 1\n")
+        assert transport.input_ready(0.01)
+        assert transport.read_turn() == ["rp 0 0", "D_DONE"]
+        # the rest of the write is buffered already
+        assert transport.input_ready(0)
+
+
+def test_actions_are_sent_in_one_write():
+    stdout = RecordingWriter()
+    transport = StdioTransport(io.BytesIO(b""), stdout)
+    transport.write_actions(["m u_1 n", "r 1 1"])
+    transport.write_actions([])
+    assert stdout.writes == [b"m u_1 n,r 1 1\nD_FINISH\n", b"\nD_FINISH\n"]
+    assert stdout.flushes == 2
+
+
+def test_in_process_transport_matches_main():
+    with Replay(REPLAY, index_path=False) as replay:
+        turns = [replay.updates(step) for step in range(30)]
+    stdin = "".join("\n".join(turn) + "\n" for turn in turns)
+    result = subprocess.run([sys.executable, "main.py"], cwd=KIT_PATH, input=stdin, capture_output=True,
+                            text=True, timeout=60, env={"PATH": ""})
+    sent = result.stdout.split("\n")
+    expected = sent[0::2][:len(turns)]
+    assert sent[1::2][:len(turns)] == ["D_FINISH"] * len(turns)
+
+    transport = InProcessTransport(sample_agent.agent)
+    assert [",".join(transport.turn(turn)) for turn in turns] == expected
+    assert transport.observation.player == 0
+
+
+def test_in_process_transport_runs_generators_to_the_end():
+    def agent(observation, configuration):
+        yield ["m u_1 n"]
+        yield ["m u_1 {}".format(observation["step"])]
+
+    transport = InProcessTransport(agent)
+    assert transport.turn(TURNS[0]) == ["m u_1 0"]
+    assert transport.turn(TURNS[1]) == ["m u_1 1"]
@@ -0,0 +1,142 @@
+"""
+Tests for lux/replay.py, the lazy Kaggle replay reader
+"""
+import gzip
+import json
+from glob import glob
+from os import path
+
+import pytest
+
+from lux import replay as replay_module
+from lux.game import Game
+from lux.replay import Replay, ReplayFormatError, scan_steps
+
+REPLAYS = sorted(glob(path.join(path.dirname(__file__), "replays", "*.json.gz")))
+
+
+def _load(replay_path):
+    with gzip.open(replay_path, "rt") as f:
+        return json.load(f)
+
+
+def _summary(game):
+    """
+    the state of a Game as plain values
+    """
+    cells = [
+        (x, y, cell.resource.type if cell.resource else None, cell.resource.amount if cell.resource else 0, cell.road)
+        for row in game.map.map for cell in row for x, y in [(cell.pos.x, cell.pos.y)]
+    ]
+    players = [
+        (
+            player.research_points, player.city_tile_count,
+            sorted((u.id, u.type, u.pos.x, u.pos.y, u.cooldown, u.cargo.wood, u.cargo.coal, u.cargo.uranium)
+                   for u in player.units),
+            sorted((c.cityid, c.fuel, c.light_upkeep, sorted((t.pos.x, t.pos.y, t.cooldown) for t in c.citytiles))
+                   for c in player.cities.values()),
+        )
+        for player in game.players
+    ]
+    return game.id, game.turn, cells, players
+
+
+@pytest.mark.parametrize("replay_path", REPLAYS)
+def test_steps_match_json_load(replay_path):
+    replay_json = _load(replay_path)
+    with Replay(replay_path, index_path=False) as replay:
+        assert len(replay) == len(replay_json["steps"])
+        for step in (0, 1, len(replay) // 2, len(replay) - 1):
+            assert replay[step] == replay_json["steps"][step]
+        assert replay[-1] == replay_json["steps"][-1]
+        assert replay[10:13] == replay_json["steps"][10:13]
+        assert list(replay.steps(100, 103)) == replay_json["steps"][100:103]
+        assert replay.actions(5) == [agent["action"] or [] for agent in replay_json["steps"][5]]
+        del replay_json["steps"]
+        assert replay.header == replay_json
+        with pytest.raises(IndexError):
+            replay[len(replay)]
+
+
+@pytest.mark.parametrize("replay_path", REPLAYS)
+def test_games_are_what_agent_py_sees(replay_path):
+    steps = _load(replay_path)["steps"]
+    with Replay(replay_path, index_path=False) as replay:
+        for player in (0, 1):
+            # the same calls as the "Do not edit" block of agent.py
+            game_state = Game()
+            game_state._initialize(steps[0][0]["observation"]["updates"])
+            game_state._update(steps[0][0]["observation"]["updates"][2:])
+            game_state.id = player
+            games = replay.games(player)
+            for step in range(len(steps)):
+                if step > 0:
+                    game_state._update(steps[step][0]["observation"]["updates"])
+                expected = _summary(game_state)
+                assert _summary(next(games)) == expected
+                if step % 60 == 0:
+                    assert _summary(replay.game(step, player)) == expected
+                    assert _summary(replay.game(step, player, incremental=True)) == expected
+
+
+def test_index_is_saved_and_reused(tmp_path, monkeypatch):
+    replay_path = str(tmp_path / "replay.json")
+    with open(replay_path, "w") as f:
+        json.dump(_load(REPLAYS[0]), f)
+    with Replay(replay_path) as replay:
+        offsets = replay.offsets
+    # nothing is written unless asked for
+    assert not path.exists(replay_path + ".idx")
+    with Replay(replay_path, index_path=True) as replay:
+        assert replay.offsets == offsets
+    assert path.exists(replay_path + ".idx")
+
+    def scan_steps(data):
+        raise AssertionError("the saved index was not used")
+
+    monkeypatch.setattr(replay_module, "scan_steps", scan_steps)
+    with Replay(replay_path, index_path=True) as replay:
+        assert replay.offsets == offsets
+        assert replay[3] == _load(REPLAYS[0])["steps"][3]
+
+
+def test_strings_and_nesting_do_not_confuse_the_scan(tmp_path):
+    replay_json = {
+        "name": "steps",
+        "info": {"steps": [1, 2], "note": "a \"quoted\" [bracket] {brace} \\"},
+        "steps"  :  [[{"action": ["m u_1 n"], "observation": {"updates": ["]", "[", "\"}"]}}], [{"action": None}]],
+        "rewards": [1, 2],
+    }
+    replay_path = str(tmp_path / "replay.json")
+    with open(replay_path, "w") as f:
+        f.write(json.dumps(replay_json, indent=2))
+    with Replay(replay_path, index_path=False) as replay:
+        assert replay[:] == replay_json["steps"]
+        assert replay.header == {key: value for key, value in replay_json.items() if key != "steps"}
+        assert replay.actions(1) == [[]]
+
+
+def test_file_without_steps(tmp_path):
+    replay_path = str(tmp_path / "replay.json")
+    with open(replay_path, "w") as f:
+        json.dump({"name": "lux_ai_2021", "info": {"steps": []}}, f)
+    with pytest.raises(ReplayFormatError):
+        Replay(replay_path, index_path=False)
+
+
+@pytest.mark.parametrize("cut", [0.5, 0.9, 0.999])
+def test_truncated_replay(tmp_path, cut):
+    with gzip.open(REPLAYS[0], "rb") as f:
+        data = f.read()
+    replay_path = str(tmp_path / "replay.json")
+    with open(replay_path, "wb") as f:
+        f.write(data[:int(len(data) * cut)])
+    with pytest.raises(ReplayFormatError):
+        Replay(replay_path)
+
+
+def test_unclosed_steps_array():
+    # the nested quantifier this used to have took exponential time on these
+    for data in (b'{"steps": [[' + b"1," * 40, b'{"steps": [["' + b"1," * 40, b'{"steps": [[1, "]' + b"1," * 40):
+        with pytest.raises(ReplayFormatError):
+            scan_steps(data)
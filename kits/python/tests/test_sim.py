@@ -0,0 +1,518 @@
+"""
+Conformance tests for lux.sim. The scenarios and expected values are ported from the engine's own
+tests (tests/*.spec.ts) so the simulator is held to the same behaviour as src/
+"""
+import glob
+import gzip
+import json
+from os import path
+
+import pytest
+
+from lux.game import Game
+from lux.game_constants import GAME_CONSTANTS
+from lux.sim import InvalidCommand, SimGame
+
+PARAMETERS = GAME_CONSTANTS["PARAMETERS"]
+RATES = PARAMETERS["WORKER_COLLECTION_RATE"]
+CAPACITY = PARAMETERS["RESOURCE_CAPACITY"]
+FUEL_RATES = PARAMETERS["RESOURCE_TO_FUEL_RATE"]
+# kaggle-environments replays recorded with the current engine, trimmed to the fields the tests read
+REPLAYS = sorted(glob.glob(path.join(path.dirname(__file__), "replays", "*.json.gz")))
+
+
+def validate(sim, team, command):
+    return sim.validate_command(team, command)
+
+
+def move_ids(actions):
+    return [action.unitid for action in actions]
+
+
+# mining.spec.ts
+
+def test_distribute_evenly_with_abundant_resource():
+    sim = SimGame(16, 16)
+    sim.add_resource(4, 4, "wood", RATES["WOOD"] * 10)
+    w1 = sim.spawn_worker(0, 4, 4)
+    w2 = sim.spawn_worker(1, 4, 5)
+    sim.distribute_all_resources()
+    assert w1.cargo["wood"] == RATES["WOOD"]
+    assert w2.cargo["wood"] == RATES["WOOD"]
+    assert sim.resource_amount[4][4] == RATES["WOOD"] * 8
+
+
+@pytest.mark.parametrize("amount", [RATES["WOOD"], RATES["WOOD"] + 1])
+def test_distribute_evenly_with_limited_resource(amount):
+    sim = SimGame(16, 16)
+    sim.add_resource(4, 4, "wood", amount)
+    w1 = sim.spawn_worker(0, 4, 4)
+    w2 = sim.spawn_worker(1, 4, 5)
+    sim.distribute_all_resources()
+    assert w1.cargo["wood"] == RATES["WOOD"] // 2
+    assert w2.cargo["wood"] == RATES["WOOD"] // 2
+    assert sim.resource_amount[4][4] == 0
+
+
+def test_distribute_with_limited_space_and_abundant_resource():
+    sim = SimGame(16, 16)
+    sim.add_resource(4, 4, "wood", RATES["WOOD"] * 10)
+    w1 = sim.spawn_worker(0, 4, 4)
+    w1.cargo["wood"] = CAPACITY["WORKER"] - RATES["WOOD"] // 2
+    w2 = sim.spawn_worker(1, 4, 5)
+    w3 = sim.spawn_worker(1, 4, 3)
+    sim.distribute_all_resources()
+    assert w1.cargo["wood"] == CAPACITY["WORKER"]
+    assert w2.cargo["wood"] == RATES["WOOD"]
+    assert w3.cargo["wood"] == RATES["WOOD"]
+    assert sim.resource_amount[4][4] == RATES["WOOD"] * 7.5
+
+
+def test_distribute_with_limited_space_and_limited_resource():
+    sim = SimGame(16, 16)
+    sim.add_resource(4, 4, "wood", RATES["WOOD"])
+    w1 = sim.spawn_worker(0, 4, 4)
+    w1.cargo["wood"] = CAPACITY["WORKER"] - RATES["WOOD"] // 6
+    w2 = sim.spawn_worker(1, 4, 5)
+    w3 = sim.spawn_worker(1, 4, 3)
+    sim.distribute_all_resources()
+    assert w1.cargo["wood"] == CAPACITY["WORKER"]
+    assert w2.cargo["wood"] == (5 * RATES["WOOD"]) // 12
+    assert w3.cargo["wood"] == (5 * RATES["WOOD"]) // 12
+    assert sim.resource_amount[4][4] == 0
+
+
+def test_distribute_equally_to_cargo_capacity():
+    sim = SimGame(16, 16)
+    for x, y in ((4, 4), (4, 3), (4, 5)):
+        sim.add_resource(x, y, "wood", RATES["WOOD"])
+    w1 = sim.spawn_worker(0, 4, 4)
+    w1.cargo["wood"] = CAPACITY["WORKER"] - RATES["WOOD"] * 2
+    sim.distribute_all_resources()
+    assert w1.cargo["wood"] == CAPACITY["WORKER"]
+    assert [sim.resource_amount[y][x] for x, y in ((4, 4), (4, 3), (4, 5))] == [6, 6, 6]
+
+
+def test_distribute_between_units_with_varying_space_left():
+    sim = SimGame(16, 16)
+    for x, y in ((4, 4), (4, 3), (4, 5)):
+        sim.add_resource(x, y, "wood", RATES["WOOD"])
+    w1 = sim.spawn_worker(0, 4, 4)
+    w2 = sim.spawn_worker(0, 4, 5)
+    w1.cargo["wood"] = CAPACITY["WORKER"] - RATES["WOOD"] * 2
+    sim.distribute_all_resources()
+    assert w1.cargo["wood"] == 94
+    assert w2.cargo["wood"] == 20
+    assert sim.resource_amount[4][4] == 0
+    assert sim.resource_amount[3][4] == 6
+    assert sim.resource_amount[5][4] == 0
+
+
+def test_distribute_equally_over_all_directions():
+    sim = SimGame(16, 16)
+    cells = ((4, 4), (4, 3), (3, 4), (5, 4), (4, 5))
+    for x, y in cells:
+        sim.add_resource(x, y, "wood", RATES["WOOD"])
+    w1 = sim.spawn_worker(0, 4, 4)
+    w1.cargo["wood"] = CAPACITY["WORKER"] - RATES["WOOD"] * 2
+    sim.distribute_all_resources()
+    assert w1.cargo["wood"] == CAPACITY["WORKER"]
+    assert [sim.resource_amount[y][x] for x, y in cells] == [12] * 5
+
+
+def _city_with_resources(sim):
+    sim.add_resource(4, 3, "wood", RATES["WOOD"] * 2)
+    sim.add_resource(3, 4, "wood", RATES["WOOD"])
+    sim.add_resource(5, 4, "uranium", RATES["URANIUM"] * 2)
+    sim.add_resource(4, 5, "coal", RATES["COAL"])
+    sim.resources.sort()
+    citytile = sim.spawn_city_tile(0, 4, 4)
+    sim._set_research_points(0, 60)
+    return citytile
+
+
+def test_distribute_to_city_tile_with_a_worker_on_it():
+    sim = SimGame(16, 16)
+    citytile = _city_with_resources(sim)
+    w1 = sim.spawn_worker(0, 4, 4)
+    w2 = sim.spawn_worker(0, 4, 4)
+    w1.cargo["wood"] = RATES["WOOD"]
+    sim.distribute_all_resources()
+    assert w1.cargo["wood"] == RATES["WOOD"]
+    assert sim.cargo_space_left(w2) == CAPACITY["WORKER"]
+    assert sim.resource_amount[3][4] == RATES["WOOD"]
+    assert sim.resource_amount[4][3] == 0
+    assert sim.resource_amount[4][5] == RATES["URANIUM"] * 2
+    assert sim.resource_amount[5][4] == 0
+    assert sim.cities[citytile.cityid].fuel == RATES["WOOD"] * 2 + RATES["COAL"] * FUEL_RATES["COAL"]
+    sim.handle_resource_deposit(w1)
+    assert sim.cargo_space_left(w1) == CAPACITY["WORKER"]
+
+
+def test_no_distribution_to_empty_city_tiles_or_carts():
+    sim = SimGame(16, 16)
+    citytile = _city_with_resources(sim)
+    citytile_with_cart = sim.spawn_city_tile(0, 3, 3)
+    cart = sim.spawn_cart(0, 3, 3)
+    sim.distribute_all_resources()
+    assert sim.resource_amount[3][4] == RATES["WOOD"] * 2
+    assert sim.resource_amount[4][3] == RATES["WOOD"]
+    assert sim.resource_amount[4][5] == RATES["URANIUM"] * 2
+    assert sim.resource_amount[5][4] == RATES["COAL"]
+    assert sim.cities[citytile.cityid].fuel == 0
+    assert sim.cities[citytile_with_cart.cityid].fuel == 0
+    assert sim.cargo_space_left(cart) == CAPACITY["CART"]
+
+
+# cooldown.spec.ts
+
+@pytest.mark.parametrize("road, cooldown, expected", [(3, 4, 0), (0, 2, 1), (6, 2, 0), (0.5, 2, 0.5)])
+def test_cooldown_reduced_by_road(road, cooldown, expected):
+    sim = SimGame(16, 16)
+    sim.road[4][4] = road
+    w1 = sim.spawn_worker(0, 4, 4)
+    w1.cooldown = cooldown
+    sim.handle_unit_turn(w1, None)
+    sim.run_cooldowns()
+    assert w1.cooldown == expected
+
+
+def test_cooldown_for_moving_cart():
+    sim = SimGame(16, 16)
+    sim.road[3][4] = 0.5
+    cart = sim.spawn_cart(0, 4, 4)
+    action = validate(sim, 0, "m {} n".format(cart.id))
+    cart.cooldown = 0.5
+    sim.handle_unit_turn(cart, [action])
+    sim.run_cooldowns()
+    assert cart.cooldown == 1.25
+    assert sim.road[4][4] == 0
+    assert sim.road[3][4] == 1.25
+
+    sim.handle_unit_turn(cart, None)
+    sim.run_cooldowns()
+    assert cart.cooldown == 0
+    assert sim.road[3][4] == 2
+
+    sim.handle_unit_turn(cart, None)
+    sim.run_cooldowns()
+    assert cart.cooldown == 0
+    assert sim.road[3][4] == 2.75
+
+
+def test_cooldown_for_cart_leaving_city():
+    sim = SimGame(16, 16)
+    sim.road[4][4] = 6
+    cart = sim.spawn_cart(0, 4, 4)
+    action = validate(sim, 0, "m {} n".format(cart.id))
+    cart.cooldown = 0.5
+    sim.handle_unit_turn(cart, [action])
+    sim.run_cooldowns()
+    assert cart.cooldown == 1.75
+    assert sim.road[4][4] == 6
+    assert sim.road[3][4] == 0.75
+
+    sim.handle_unit_turn(cart, None)
+    sim.run_cooldowns()
+    assert cart.cooldown == 0
+    assert sim.road[3][4] == 1.5
+
+
+# lightupkeep.spec.ts
+
+def test_units_spend_wood_then_coal_then_uranium_at_night():
+    sim = SimGame(16, 16)
+    w1 = sim.spawn_worker(0, 1, 1)
+    w1.cargo["wood"] = PARAMETERS["LIGHT_UPKEEP"]["WORKER"] * FUEL_RATES["WOOD"] * PARAMETERS["NIGHT_LENGTH"]
+    for _ in range(PARAMETERS["NIGHT_LENGTH"]):
+        assert sim.spend_fuel_to_survive(w1)
+    assert w1.cargo["wood"] == 0
+
+    w2 = sim.spawn_worker(0, 1, 3)
+    w2.cargo.update(wood=1, coal=1, uranium=1)
+    assert sim.spend_fuel_to_survive(w2)
+    assert sim.spend_fuel_to_survive(w2)
+    assert not sim.spend_fuel_to_survive(w2)
+    assert w2.cargo == {"wood": 0, "coal": 0, "uranium": 0}
+
+
+def test_adjacency_bonuses():
+    sim = SimGame(16, 16)
+    c1 = sim.spawn_city_tile(0, 1, 1)
+    c2 = sim.spawn_city_tile(0, 1, 2)
+    sim.spawn_city_tile(0, 1, 3)
+    sim.spawn_city_tile(0, 2, 2)
+    assert c1.adjacent_city_tiles == 1
+    assert c2.adjacent_city_tiles == 3
+    assert sim.city_light_upkeep(sim.cities[c1.cityid]) == (
+        PARAMETERS["LIGHT_UPKEEP"]["CITY"] * 4 - 6 * PARAMETERS["CITY_ADJACENCY_BONUS"]
+    )
+
+
+# transfer.spec.ts
+
+@pytest.mark.parametrize("cart_wood, worker_uranium, amount, expected", [
+    (300, 20, 100, (220, 80)),
+    (20, 20, 100, (0, 20)),
+])
+def test_transfer_limited_by_space_and_cargo(cart_wood, worker_uranium, amount, expected):
+    sim = SimGame(16, 16)
+    cart = sim.spawn_cart(0, 14, 14)
+    worker = sim.spawn_worker(0, 14, 15)
+    cart.cargo["wood"] = cart_wood
+    worker.cargo["uranium"] = worker_uranium
+    sim.transfer_resources(0, cart.id, worker.id, "wood", amount)
+    assert (cart.cargo["wood"], worker.cargo["wood"]) == expected
+    assert worker.cargo["uranium"] == worker_uranium
+
+
+def test_transfer_between_carts():
+    sim = SimGame(16, 16)
+    cart1 = sim.spawn_cart(0, 14, 14)
+    cart2 = sim.spawn_cart(0, 14, 15)
+    cart1.cargo["wood"] = 300
+    sim.transfer_resources(0, cart1.id, cart2.id, "wood", 200)
+    assert cart1.cargo["wood"] == 100
+    assert cart2.cargo["wood"] == 200
+
+
+# movement.spec.ts
+
+def test_move_unit():
+    sim = SimGame(8, 8)
+    w1 = sim.spawn_worker(0, 4, 4)
+    sim.handle_unit_turn(w1, [validate(sim, 0, "m {} s".format(w1.id))])
+    assert (w1.x, w1.y) == (4, 5)
+    assert not sim.cell_units[4][4]
+    assert sim.cell_units[5][4][w1.id] is w1
+
+
+def test_all_moves_into_one_cell_collide():
+    sim = SimGame(8, 8)
+    w1 = sim.spawn_worker(0, 4, 4)
+    w2 = sim.spawn_worker(0, 4, 6)
+    w3 = sim.spawn_worker(0, 5, 5)
+    actions = [validate(sim, 0, command) for command in (
+        "m {} s".format(w1.id), "m {} n".format(w2.id), "m {} w".format(w3.id),
+    )]
+    assert sim.handle_movement_actions(actions) == []
+
+
+def test_move_onto_still_unit_is_reverted():
+    sim = SimGame(8, 8)
+    w1 = sim.spawn_worker(0, 4, 4)
+    sim.spawn_worker(0, 4, 5)
+    assert sim.handle_movement_actions([validate(sim, 0, "m {} s".format(w1.id))]) == []
+
+
+def test_collisions_revert_chains_of_moves():
+    sim = SimGame(8, 8)
+    units = [sim.spawn_worker(0, x, y) for x, y in ((4, 4), (4, 6), (5, 5), (3, 4), (2, 4), (0, 0), (1, 0))]
+    directions = ("s", "n", "w", "e", "e", "e", "e")
+    actions = [validate(sim, 0, "m {} {}".format(unit.id, d)) for unit, d in zip(units, directions)]
+    assert move_ids(sim.handle_movement_actions(actions)) == [units[5].id, units[6].id]
+
+
+def test_units_rotating_do_not_collide():
+    sim = SimGame(8, 8)
+    units = [sim.spawn_worker(0, x, y) for x, y in ((4, 4), (5, 4), (5, 5), (4, 5))]
+    actions = [validate(sim, 0, "m {} {}".format(unit.id, d)) for unit, d in zip(units, "eswn")]
+    assert sim.handle_movement_actions(actions) == actions
+
+
+def test_units_stack_on_own_city_tile():
+    sim = SimGame(8, 8)
+    units = [sim.spawn_worker(0, x, y) for x, y in ((4, 4), (4, 6), (5, 5))]
+    w4 = sim.spawn_worker(1, 3, 5)
+    sim.spawn_city_tile(0, 4, 5)
+    actions = [validate(sim, 0, "m {} {}".format(unit.id, d)) for unit, d in zip(units, "snw")]
+    with pytest.raises(InvalidCommand):
+        validate(sim, 1, "m {} e".format(w4.id))
+    assert move_ids(sim.handle_movement_actions(actions)) == [unit.id for unit in units]
+
+
+def test_colliding_units_revert_onto_city_tile():
+    sim = SimGame(8, 8)
+    units = [sim.spawn_worker(0, 4, 4) for _ in range(3)] + [sim.spawn_worker(0, 3, 4)]
+    sim.spawn_city_tile(0, 4, 4)
+    actions = [validate(sim, 0, "m {} {}".format(unit.id, d)) for unit, d in zip(units, "ssne")]
+    assert move_ids(sim.handle_movement_actions(actions)) == [units[2].id, units[3].id]
+
+
+# game.spec.ts
+
+def test_merge_city_tiles():
+    sim = SimGame(16, 16)
+    c1 = sim.spawn_city_tile(0, 1, 1)
+    sim.cities[c1.cityid].fuel = 500
+    c2 = sim.spawn_city_tile(0, 3, 1)
+    sim.cities[c2.cityid].fuel = 500
+    sim.spawn_city_tile(0, 2, 2)
+    c3 = sim.spawn_city_tile(0, 2, 1)
+    assert sim.cities[c3.cityid].fuel == 1000
+
+    for x, y in ((14, 14), (12, 14), (13, 14), (13, 13)):
+        sim.spawn_city_tile(0, x, y)
+    for x, y in ((11, 10), (10, 10), (4, 10), (4, 11)):
+        sim.spawn_city_tile(1, x, y)
+    assert len(sim.cities) == 4
+    for (x, y), size in (((1, 1), 4), ((13, 13), 4), ((11, 10), 2), ((4, 10), 2)):
+        assert len(sim.cities[sim.citytiles[y][x].cityid].citycells) == size
+
+
+@pytest.mark.parametrize("cargo, expected", [
+    ((90, 100, 40), (0, 90, 40)),
+    ((20, 10, 90), (0, 0, 20)),
+    ((20, 79, 1), (0, 0, 0)),
+])
+def test_expend_resources_for_city(cargo, expected):
+    sim = SimGame(16, 16)
+    worker = sim.spawn_worker(0, 14, 14)
+    worker.cargo.update(zip(("wood", "coal", "uranium"), cargo))
+    sim.expend_resources_for_city(worker)
+    assert tuple(worker.cargo.values()) == expected
+
+
+def test_validate_build_city():
+    sim = SimGame(16, 16)
+    worker = sim.spawn_worker(0, 4, 5)
+    worker.cargo["wood"] = 100
+    sim.spawn_city_tile(0, 1, 5)
+    worker_on_city = sim.spawn_worker(0, 1, 5)
+    worker_on_city.cargo["wood"] = 100
+    sim.add_resource(6, 6, "coal", 100)
+    worker_on_resource = sim.spawn_worker(0, 6, 6)
+    worker_on_resource.cargo["wood"] = 100
+    poor_worker = sim.spawn_worker(0, 8, 8)
+    assert validate(sim, 0, "bcity {}".format(worker.id)) is not None
+    for unit in (worker_on_city, worker_on_resource, poor_worker):
+        with pytest.raises(InvalidCommand):
+            validate(sim, 0, "bcity {}".format(unit.id))
+    with pytest.raises(InvalidCommand):
+        validate(sim, 1, "bcity {}".format(worker.id))
+
+
+def test_duplicate_commands_are_rejected():
+    sim = SimGame(16, 16)
+    sim.spawn_city_tile(0, 2, 2)
+    sim.spawn_city_tile(0, 2, 3)
+    worker = sim.spawn_worker(0, 5, 5)
+    accumulated = sim._initial_accumulated_stats()
+    sim.validate_command(0, "m {} n".format(worker.id), accumulated)
+    with pytest.raises(InvalidCommand):
+        sim.validate_command(0, "p {}".format(worker.id), accumulated)
+    sim.validate_command(0, "r 2 2", accumulated)
+    with pytest.raises(InvalidCommand):
+        sim.validate_command(0, "bw 2 2", accumulated)
+    # two city tiles and one unit leave room for a single new unit
+    sim.validate_command(0, "bw 2 3", accumulated)
+
+
+# full turns
+
+def _small_game():
+    sim = SimGame(12, 12)
+    for x, y in ((5, 2), (5, 3), (6, 2)):
+        sim.add_resource(x, y, "wood", 400)
+    sim.add_resource(9, 9, "coal", 300)
+    sim.spawn_city_tile(0, 2, 2)
+    sim.spawn_city_tile(1, 9, 2)
+    sim.spawn_worker(0, 2, 2)
+    sim.spawn_worker(1, 9, 2)
+    return sim
+
+
+def test_step_builds_moves_and_mines():
+    sim = _small_game()
+    over = sim.step([["bw 2 2", "m u_1 e"], ["r 9 2"]])
+    assert not over
+    assert sim.turn == 1
+    assert sim.warnings == ["Agent 0 tried to build unit on tile (2, 2) but unit cap reached; turn 0; cmd: bw 2 2"]
+    assert sim.research_points == [0, 1]
+    assert (sim.units[0]["u_1"].x, sim.units[0]["u_1"].y) == (3, 2)
+    assert sim.citytiles[2][9].cooldown == PARAMETERS["CITY_ACTION_COOLDOWN"] - 1
+
+    for _ in range(3):
+        sim.step([["m u_1 e"], []])
+    worker = sim.units[0]["u_1"]
+    assert (worker.x, worker.y) == (4, 2)
+    assert worker.cargo["wood"] == RATES["WOOD"] * 2
+
+
+def test_night_consumes_fuel_and_destroys_unlit_cities():
+    sim = _small_game()
+    sim.turn = PARAMETERS["DAY_LENGTH"]
+    sim.cities["c_1"].fuel = PARAMETERS["LIGHT_UPKEEP"]["CITY"]
+    sim.units[1]["u_2"].x = 10
+    sim.cell_units[2][9].clear()
+    sim.cell_units[2][10]["u_2"] = sim.units[1]["u_2"]
+    sim.step([[], []])
+    assert sim.cities["c_1"].fuel == 0
+    assert "c_2" not in sim.cities
+    assert sim.citytiles[2][9] is None
+    # the team 1 worker had no cargo to burn outside its city
+    assert not sim.units[1]
+    assert sim.is_over()
+    assert sim.get_results() == [(1, 0), (2, 1)]
+
+
+def test_trees_regrow_after_mining():
+    sim = SimGame(8, 8)
+    sim.add_resource(3, 3, "wood", 100)
+    sim.add_resource(5, 5, "wood", 500)
+    sim.spawn_city_tile(0, 0, 0)
+    sim.spawn_city_tile(1, 7, 7)
+    sim.step([[], []])
+    assert sim.resource_amount[3][3] == 103
+    assert sim.resource_amount[5][5] == 500
+
+
+def test_copy_is_independent():
+    sim = _small_game()
+    rollout = sim.copy()
+    for _ in range(5):
+        rollout.step([["m u_1 e"], ["bw 9 2"]])
+    assert sim.turn == 0
+    assert (sim.units[0]["u_1"].x, sim.units[0]["u_1"].y) == (2, 2)
+    assert len(sim.units[1]) == 1
+    assert rollout.to_updates() != sim.to_updates()
+
+
+def test_game_round_trip():
+    sim = _small_game()
+    for _ in range(4):
+        sim.step([["m u_1 e"], ["m u_2 s"]])
+    game = sim.to_game(player_id=1)
+    assert game.id == 1
+    assert game.turn == sim.turn
+    rebuilt = SimGame.from_game(game)
+    assert rebuilt.to_updates() == sim.to_updates()
+    assert rebuilt.global_unit_id_count == sim.global_unit_id_count
+    assert rebuilt.global_city_id_count == sim.global_city_id_count
+
+
+# replays
+
+def _load_replay(replay_path):
+    with gzip.open(replay_path, "rt") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("replay_path", REPLAYS, ids=path.basename)
+def test_replay_conformance(replay_path):
+    steps = _load_replay(replay_path)["steps"]
+    observation = steps[0][0]["observation"]
+    game = Game()
+    game._initialize(observation["updates"])
+    game._update(observation["updates"][2:])
+    sim = SimGame.from_game(game, observation["globalUnitIDCount"], observation["globalCityIDCount"])
+    assert sim.to_updates() == observation["updates"][2:-1]
+
+    for turn, step in enumerate(steps[1:], 1):
+        over = sim.step([step[team]["action"] or [] for team in (0, 1)])
+        observation = step[0]["observation"]
+        # the engine sends D_DONE last
+        assert sim.to_updates() == observation["updates"][:-1], "turn {}".format(turn)
+        assert sim.global_unit_id_count == observation["globalUnitIDCount"]
+        assert sim.global_city_id_count == observation["globalCityIDCount"]
+        assert over == (turn == len(steps) - 1)
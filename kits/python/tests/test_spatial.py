@@ -0,0 +1,118 @@
+"""
+Tests for lux/spatial.py, checked against a linear scan over the items in the order they were added
+"""
+import random
+
+import pytest
+
+from lux.game_map import Position
+from lux.spatial import SpatialIndex
+
+
+class _Item:
+    def __init__(self, n):
+        self.n = n
+
+    def __repr__(self):
+        return "_Item({})".format(self.n)
+
+
+def _scan(items, pos, k=None, max_distance=None):
+    """
+    the (distance, item) pairs of a linear scan, items holding [x, y, item] in the order they were added
+    """
+    found = [
+        (abs(x - pos.x) + abs(y - pos.y), n, item) for n, (x, y, item) in enumerate(items)
+        if max_distance is None or abs(x - pos.x) + abs(y - pos.y) <= max_distance
+    ]
+    found.sort(key=lambda entry: entry[:2])
+    return [(dist, item) for dist, _, item in found[:k]]
+
+
+def _check_queries(index, items, width, height, rng):
+    assert len(index) == len(items)
+    for _ in range(20):
+        # queries may start one step off the map
+        pos = Position(rng.randint(-1, width), rng.randint(-1, height))
+        k = rng.randint(1, 6)
+        radius = rng.randint(0, 8)
+        assert index.nearest(pos) == _scan(items, pos, 1)
+        assert index.nearest(pos, k) == _scan(items, pos, k)
+        assert index.nearest(pos, k, radius) == _scan(items, pos, k, radius)
+        assert index.within(pos, radius) == _scan(items, pos, None, radius)
+        closest = _scan(items, pos, 1, radius)
+        assert index.closest(pos, radius) is (closest[0][1] if closest else None)
+        closest = _scan(items, pos, 1)
+        assert index.closest(pos) is (closest[0][1] if closest else None)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_matches_a_linear_scan(seed):
+    rng = random.Random(seed)
+    width, height = rng.choice([(12, 12), (16, 16), (32, 32), (7, 13)])
+    index = SpatialIndex(width, height, bucket_size=rng.choice([1, 3, 4, 5]))
+    items = []
+    for n in range(rng.randint(0, 60)):
+        # few distinct cells, so many items share a cell or a distance
+        x, y = rng.randrange(0, width, 3), rng.randrange(0, height, 2)
+        item = _Item(n)
+        index.add(x, y, item)
+        items.append([x, y, item])
+    _check_queries(index, items, width, height, rng)
+
+    for _ in range(40):
+        if not items:
+            break
+        entry = rng.choice(items)
+        if rng.random() < 0.3:
+            index.remove(entry[0], entry[1], entry[2])
+            items.remove(entry)
+        else:
+            # moves cross buckets as often as not and keep the item's place among ties
+            new_x, new_y = rng.randrange(width), rng.randrange(height)
+            index.move(entry[0], entry[1], new_x, new_y, entry[2])
+            entry[:2] = new_x, new_y
+    _check_queries(index, items, width, height, rng)
+
+
+def test_empty_index():
+    index = SpatialIndex(12, 12)
+    pos = Position(3, 3)
+    assert len(index) == 0
+    assert index.nearest(pos) == [] and index.nearest(pos, 5, 3) == []
+    assert index.closest(pos) is None and index.within(pos, 24) == []
+    item = _Item(0)
+    index.add(11, 11, item)
+    index.remove(11, 11, item)
+    assert len(index) == 0 and index.closest(pos) is None
+
+
+def test_ties_go_to_the_item_added_first():
+    index = SpatialIndex(16, 16, bucket_size=4)
+    first, second, third = _Item(0), _Item(1), _Item(2)
+    # the same distance from (5, 5), in three buckets
+    index.add(9, 5, first)
+    index.add(5, 1, second)
+    index.add(1, 5, third)
+    pos = Position(5, 5)
+    assert index.closest(pos) is first
+    assert index.nearest(pos, 2) == [(4, first), (4, second)]
+    # a move keeps the place of first in the tie breaking order
+    index.move(9, 5, 5, 9, first)
+    assert index.within(pos, 4) == [(4, first), (4, second), (4, third)]
+    index.remove(5, 9, first)
+    assert index.closest(pos) is second
+    assert index.within(pos, 3) == []
+
+
+def test_missing_items_raise():
+    index = SpatialIndex(8, 8)
+    item = _Item(0)
+    index.add(1, 1, item)
+    with pytest.raises(ValueError):
+        index.remove(2, 1, item)
+    with pytest.raises(ValueError):
+        index.move(1, 2, 3, 3, item)
+    with pytest.raises(ValueError):
+        index.remove(1, 1, _Item(1))
+    assert len(index) == 1 and index.closest(Position(0, 0)) is item
@@ -0,0 +1,84 @@
+"""
+Tests for the cold start of the kit: the frozen game constants of tools/freeze_kit.py and the modules main.py
+leaves unimported
+"""
+import importlib.util
+import json
+import shutil
+import subprocess
+import sys
+from os import path
+
+from lux.constants import Constants
+from lux.game_constants import GAME_CONSTANTS
+
+KIT_DIR = path.join(path.dirname(__file__), "..")
+KIT_PATH = path.join(KIT_DIR, "simple")
+_spec = importlib.util.spec_from_file_location("freeze_kit", path.join(KIT_DIR, "tools", "freeze_kit.py"))
+freeze_kit = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(freeze_kit)
+
+CONSTANTS_PATH = path.join(KIT_PATH, "lux", "game_constants.json")
+
+
+def test_frozen_constants_are_up_to_date():
+    with open(CONSTANTS_PATH) as f:
+        assert GAME_CONSTANTS == json.load(f)
+    with open(path.join(KIT_PATH, "lux", "frozen_constants.py")) as f:
+        assert f.read() == freeze_kit.frozen_source(CONSTANTS_PATH), "run tools/freeze_kit.py"
+
+
+def test_constants_agree_with_game_constants():
+    for name in ("UNIT_TYPES", "RESOURCE_TYPES", "DIRECTIONS"):
+        group = getattr(Constants, name)
+        assert {key: getattr(group, key) for key in GAME_CONSTANTS[name]} == GAME_CONSTANTS[name]
+
+
+def test_main_imports_stay_light():
+    script = (
+        "import sys, agent, lux.anytime, lux.timing\n"
+        "print(' '.join(m for m in ('typing', 'json', 'inspect', 'threading') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=KIT_PATH, capture_output=True, text=True,
+                            env={"PATH": ""}, check=True)
+    assert result.stdout.strip() == ""
+
+
+def test_main_defines_agent_last():
+    # kaggle-environments execs main.py and calls the last callable of its namespace (get_last_callable)
+    import agent
+    with open(path.join(KIT_PATH, "main.py")) as f:
+        source = f.read()
+    env = {}
+    exec(compile(source, path.join(KIT_PATH, "main.py"), "exec"), env)
+    assert [value for value in env.values() if callable(value)][-1] is agent.agent
+
+
+def test_game_leaves_unused_modules_unimported():
+    script = (
+        "import sys\n"
+        "from lux.game import Game\n"
+        "game = Game()\n"
+        "game._initialize(['0', '12 12'])\n"
+        "print(' '.join(m for m in ('lux.spatial', 'lux.parser', 'lux.timing', 'lux.sim') if m in sys.modules))\n"
+        "game._update(['rp 0 0', 'rp 1 0', 'D_DONE'])\n"
+        "game.map.resource_index()\n"
+        "import lux\n"
+        "print(' '.join(m for m in ('lux.spatial', 'lux.parser', 'lux.timing', 'lux.sim') if m in sys.modules))\n"
+        "print(lux.sim.SimGame.__name__)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=KIT_PATH, capture_output=True, text=True,
+                            env={"PATH": ""}, check=True)
+    # the parser and the spatial index come in when first used, and the rest of the package on attribute access
+    assert result.stdout.split("\n") == ["", "lux.spatial lux.parser", "SimGame", ""]
+
+
+def test_precompiled_kit_runs_without_writing_bytecode(tmp_path):
+    kit_path = str(tmp_path / "simple")
+    shutil.copytree(KIT_PATH, kit_path, ignore=shutil.ignore_patterns("__pycache__"))
+    assert freeze_kit.compile_kit(kit_path)
+    assert path.exists(path.join(kit_path, "lux", "__pycache__"))
+    stdin = "0\n12 12\nrp 0 0\nrp 1 0\nu 0 0 u_1 1 1 0 0 0 0\nc 0 c_1 0 23\nct 0 c_1 1 1 0\nD_DONE\n"
+    result = subprocess.run([sys.executable, "-B", "main.py"], cwd=kit_path, input=stdin, capture_output=True,
+                            text=True, env={"PATH": ""})
+    assert result.stdout.count("D_FINISH") == 1
@@ -0,0 +1,112 @@
+"""
+Tests for lux/state.py: a Game built from structured state matches the one parsed from the update lines
+"""
+import json
+from os import path
+
+import pytest
+
+from lux.game import Game
+from lux.parser import UPDATE_SCHEMAS, parse_updates
+from lux.replay import Replay
+from lux.sim import SimGame
+from lux.state import game_from_state, parse_serialized_state, parse_sim
+
+REPLAYS = path.join(path.dirname(__file__), "replays")
+
+
+def _matches(replay_name):
+    """
+    yields the SimGame of every turn of a recorded match, stepped with its actions
+    """
+    with Replay(path.join(REPLAYS, replay_name), index_path=False) as replay:
+        observation = replay[0][0]["observation"]
+        sim = SimGame.from_game(replay.game(0), observation["globalUnitIDCount"], observation["globalCityIDCount"])
+        actions = [replay.actions(step) for step in range(1, len(replay))]
+    yield sim
+    for turn_actions in actions:
+        sim.step(turn_actions)
+        yield sim
+
+
+def _columns(updates, identifier):
+    table = getattr(updates, {
+        "rp": "research_points", "r": "resources", "u": "units", "c": "cities", "ct": "citytiles", "ccd": "roads",
+    }[identifier])
+    return [getattr(table, name) for name, _ in UPDATE_SCHEMAS[identifier]]
+
+
+def _typed_rows(updates, identifier):
+    return [tuple((type(value), value) for value in row) for row in zip(*_columns(updates, identifier))]
+
+
+def _snapshot(game: Game):
+    game_map = game.map
+    cells = []
+    for y in range(game_map.height):
+        for x in range(game_map.width):
+            cell = game_map.get_cell(x, y)
+            resource = None if cell.resource is None else (cell.resource.type, cell.resource.amount)
+            citytile = None if cell.citytile is None else (cell.citytile.cityid, cell.citytile.cooldown)
+            cells.append((resource, citytile, cell.road))
+    players = [
+        (player.research_points, player.city_tile_count,
+         [(unit.id, unit.type, unit.pos.x, unit.pos.y, unit.cooldown, str(unit.cargo)) for unit in player.units],
+         [(city.cityid, city.fuel, city.light_upkeep, len(city.citytiles)) for city in player.cities.values()])
+        for player in game.players
+    ]
+    return game.turn, cells, players
+
+
+@pytest.mark.parametrize("replay_name", ["seed13_12x12.json.gz", "seed23_32x32.json.gz"])
+def test_structured_state_parses_like_the_update_lines(replay_name):
+    for sim in _matches(replay_name):
+        if sim.turn % 7:
+            continue
+        from_lines = parse_updates(sim.to_updates() + ["D_DONE"])
+        from_sim = parse_sim(sim)
+        # through JSON, as a stateful replay stores it, with string team keys
+        from_state = parse_serialized_state(json.loads(json.dumps(sim.to_state())))
+        for identifier in UPDATE_SCHEMAS:
+            expected = _typed_rows(from_lines, identifier)
+            assert _typed_rows(from_sim, identifier) == expected
+            # the serialized map is read row by row rather than in the engine's order of resources
+            if identifier == "r":
+                assert sorted(_typed_rows(from_state, identifier), key=repr) == sorted(expected, key=repr)
+            else:
+                assert _typed_rows(from_state, identifier) == expected
+
+
+def test_game_from_state_matches_the_replay():
+    with Replay(path.join(REPLAYS, "seed13_12x12.json.gz"), index_path=False) as replay:
+        for step, sim in enumerate(_matches("seed13_12x12.json.gz")):
+            if step in (0, 100, 200, 300, 359):
+                expected = _snapshot(replay.game(step, 1))
+                assert _snapshot(game_from_state(sim.to_state(), 1)) == expected
+                assert _snapshot(game_from_state(sim, 1)) == expected
+                assert _snapshot(game_from_state(sim, 1, array_map=False, incremental=True)) == expected
+
+
+def test_incremental_updates_from_state_match_the_lines():
+    from_lines = None
+    from_state = None
+    for sim in _matches("seed23_32x32.json.gz"):
+        if from_lines is None:
+            from_lines = sim.to_game(0, incremental=True)
+            from_state = game_from_state(sim.to_state(), 0, incremental=True)
+            continue
+        from_lines._update(sim.to_updates() + ["D_DONE"])
+        from_state._update_from_state(sim.to_state())
+        assert _snapshot(from_state) == _snapshot(from_lines)
+        assert vars(from_state.delta) == vars(from_lines.delta)
+
+
+def test_light_upkeep_is_computed_when_left_out():
+    sim = SimGame(5, 5)
+    for x, y in ((1, 1), (2, 1), (2, 2), (4, 4)):
+        sim.spawn_city_tile(0, x, y)
+    sim.spawn_city_tile(1, 3, 2)
+    state = sim.to_state()
+    for city in state["cities"].values():
+        del city["lightupkeep"]
+    assert _columns(parse_serialized_state(state), "c")[3] == _columns(parse_sim(sim), "c")[3]
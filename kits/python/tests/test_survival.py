@@ -0,0 +1,125 @@
+"""
+Tests for lux/survival.py, checked against cities and units left to the nights of lux.sim
+"""
+import random
+from glob import glob
+from os import path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from lux.constants import Constants  # noqa: E402
+from lux.game_constants import GAME_CONSTANTS  # noqa: E402
+from lux.replay import Replay  # noqa: E402
+from lux.sim import SimGame  # noqa: E402
+from lux.survival import SurvivalForecast  # noqa: E402
+
+RESOURCE_TYPES = Constants.RESOURCE_TYPES
+MAX_DAYS = GAME_CONSTANTS["PARAMETERS"]["MAX_DAYS"]
+REPLAYS = sorted(glob(path.join(path.dirname(__file__), "replays", "*.json.gz")))
+
+
+def _sim(seed, turn):
+    """
+    a map without resources holding cities of every size and fuel and units with every mix of cargo
+    """
+    rng = random.Random(seed)
+    sim = SimGame(16, 16)
+    sim.turn = turn
+    # a city of the other team that outlasts the game, so the match goes on
+    sim.spawn_city_tile(1, 15, 15)
+    sim.cities["c_1"].fuel = 10 ** 6
+    for n in range(6):
+        x = 2 * n
+        for y in range(rng.randint(1, 3)):
+            sim.spawn_city_tile(0, x, y)
+        sim.cities[sim.citytiles[0][x].cityid].fuel = rng.choice([0, 22, 23, 100, 450, rng.randint(0, 3000)])
+    sim.spawn_worker(0, 0, 0)
+    for n in range(24):
+        unit = (sim.spawn_worker if n % 2 else sim.spawn_cart)(0, n % 12, 8 + n // 12)
+        unit.cargo[RESOURCE_TYPES.WOOD] = rng.choice([0, 3, 4, 9, rng.randint(0, 100)])
+        unit.cargo[RESOURCE_TYPES.COAL] = rng.choice([0, 1, 2, rng.randint(0, 50)])
+        unit.cargo[RESOURCE_TYPES.URANIUM] = rng.choice([0, 1, rng.randint(0, 20)])
+    return sim
+
+
+def _deaths(sim):
+    """
+    the turns, counted from now, at which each city and unit of team 0 goes dark when nothing is done
+    """
+    start = sim.turn
+    cities = {cityid: np.inf for cityid, city in sim.cities.items() if city.team == 0}
+    units = dict.fromkeys(sim.units[0], np.inf)
+    while sim.turn < MAX_DAYS:
+        turn = sim.turn
+        sim.step([[], []])
+        for deaths, alive in ((cities, sim.cities), (units, sim.units[0])):
+            for key, death in deaths.items():
+                if death == np.inf and key not in alive:
+                    deaths[key] = turn - start
+    return cities, units
+
+
+@pytest.mark.parametrize("turn", [0, 25, 30, 37, 39, 40, 200, 329, 355, 359])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_forecast_follows_the_nights(seed, turn):
+    sim = _sim(seed, turn)
+    forecast = SurvivalForecast().update(sim.to_game(0))
+    city_deaths, unit_deaths = _deaths(sim.copy())
+    assert dict(zip(forecast.city_ids, forecast.city_turns_to_death().tolist())) == city_deaths
+    assert dict(zip(forecast.unit_ids, forecast.unit_turns_to_death().tolist())) == unit_deaths
+    # u_1 stands in a city and lasts as long as it does
+    assert forecast.unit_nights()[0] == forecast.city_nights()[forecast.city_ids.index("c_2")]
+
+
+@pytest.mark.parametrize("turn", [0, 35, 355])
+def test_deficits_are_the_fuel_missing(turn):
+    sim = _sim(3, turn)
+    forecast = SurvivalForecast().update(sim.to_game(0))
+    nights_to_dawn = forecast.nights_to_dawn()
+    nights_to_end = forecast.nights_to_end()
+    for cityid, dawn, end in zip(forecast.city_ids, forecast.city_dawn_deficit(), forecast.city_end_deficit()):
+        row = forecast.city_ids.index(cityid)
+        for deficit, nights in ((dawn, nights_to_dawn), (end, nights_to_end)):
+            forecast.add_fuel(cityid, deficit)
+            assert forecast.city_nights()[row] >= nights
+            if deficit > 0:
+                forecast.add_fuel(cityid, -1)
+                assert forecast.city_nights()[row] < nights
+                forecast.add_fuel(cityid, 1)
+            forecast.add_fuel(cityid, -deficit)
+        if end == 0:
+            assert forecast.city_turns_to_death()[row] == np.inf
+    units_short = forecast.unit_dawn_deficit() > 0
+    assert (units_short == (forecast.unit_nights() < nights_to_dawn)).all()
+
+
+def _rows(forecast):
+    return (
+        {cityid: row.tolist() for cityid, row in zip(forecast.city_ids, forecast._cities.values)},
+        {unitid: row.tolist() for unitid, row in zip(forecast.unit_ids, forecast._units.values)},
+    )
+
+
+def test_incremental_updates_match_rebuilds():
+    with Replay(REPLAYS[0], index_path=False) as replay:
+        observation = replay[0][0]["observation"]
+        sim = SimGame.from_game(replay.game(0), observation["globalUnitIDCount"], observation["globalCityIDCount"])
+        actions = [replay.actions(step) for step in range(1, len(replay))]
+    for team in (0, 1):
+        game = sim.to_game(team, incremental=True)
+        played = sim.copy()
+        forecast = SurvivalForecast().update(game)
+        for turn_actions in actions:
+            # planned fuel only lasts until the next update
+            if forecast.city_ids:
+                forecast.add_fuel(forecast.city_ids[0], 1000)
+            played.step(turn_actions)
+            game._update_from_state(played)
+            forecast.update(game)
+            rebuilt = SurvivalForecast().update(played.to_game(team))
+            assert forecast.turn == rebuilt.turn == played.turn
+            assert _rows(forecast) == _rows(rebuilt)
+            assert forecast.unit_nights().tolist() == [
+                rebuilt.unit_nights()[rebuilt.unit_ids.index(unitid)] for unitid in forecast.unit_ids]
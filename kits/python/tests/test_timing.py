@@ -0,0 +1,110 @@
+"""
+Tests for lux/timing.py and the timings of main.py
+"""
+import json
+import subprocess
+import sys
+from os import path
+
+import pytest
+
+from lux import timing
+from lux.game import Game
+from lux.replay import Replay
+from lux.timing import HISTOGRAM_BOUNDS, PHASES, TurnTimer
+
+KIT_PATH = path.join(path.dirname(__file__), "..", "simple")
+REPLAY = path.join(path.dirname(__file__), "replays", "seed13_12x12.json.gz")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def installed_timer():
+    clock = FakeClock()
+    timer = TurnTimer(act_timeout=3.0, overage_time=10.0, clock=clock).install()
+    yield timer, clock
+    timing._timer = None
+
+
+def _turn(timer, clock, read, update, agent, write):
+    timer.line_read()
+    clock.now += read
+    timer.begin("agent")
+    clock.now += agent / 2
+    previous = timer.begin("update")
+    clock.now += update
+    timer.begin(previous)
+    clock.now += agent / 2
+    timer.begin("write")
+    clock.now += write
+    timer.end_turn()
+
+
+def test_phases_and_time_bank(installed_timer):
+    timer, clock = installed_timer
+    assert timing.get_timer() is timer
+    _turn(timer, clock, 0.5, 1.0, 1.0, 0.25)
+    assert timer.remaining_overage == 10.0
+    _turn(timer, clock, 0.5, 1.0, 4.0, 0.5)
+    assert timer.remaining_overage == 7.0
+    # waiting for the engine between turns is not counted
+    clock.now += 100
+    timer.line_read()
+    clock.now += 2.0
+    assert timer.elapsed() == 2.0
+    assert timer.remaining() == 8.0
+    timer.line_read()
+    assert timer.elapsed() == 2.0
+
+    summary = timer.summary()
+    assert summary["turns"] == 2 and summary["turns_over_timeout"] == 1
+    assert [summary["phases"][phase]["total"] for phase in PHASES] == [1.0, 2.0, 5.0, 0.75]
+    assert summary["turn"]["max"] == 6.0
+    assert summary["turn"]["histogram"] == [0] * (len(HISTOGRAM_BOUNDS) - 1) + [1, 1]
+    assert "2 turns, 1 over 3s, 7.000s of time bank left" in timer.report()
+
+
+def test_game_update_counts_as_update(installed_timer):
+    timer, clock = installed_timer
+    with Replay(REPLAY, index_path=False) as replay:
+        updates = replay.updates(0)
+    timer.line_read()
+    timer.begin("agent")
+    game = Game()
+    game._initialize(updates)
+    game._update(updates[2:])
+    assert timer._phase == "agent"
+    timer.end_turn()
+    assert timer.samples["update"] == [0.0]
+
+
+def test_off_unless_asked_for():
+    assert TurnTimer.from_environment({}) is None
+    assert TurnTimer.from_environment({"LUX_TIMING": "0"}) is None
+    assert TurnTimer.from_environment({"LUX_TIMING": "1"}).output == "stderr"
+    assert TurnTimer.from_environment({"LUX_TIMING": "t.json"}).output == "t.json"
+
+
+def test_main_writes_a_summary(tmp_path):
+    with Replay(REPLAY, index_path=False) as replay:
+        turns = [replay.updates(step) for step in range(10)]
+    # the first turn starts with the player id and the map size, like the engine sends it
+    stdin = "".join("\n".join(turn) + "\n" for turn in turns)
+    summary_path = str(tmp_path / "timing.json")
+    result = subprocess.run(
+        [sys.executable, "main.py"], cwd=KIT_PATH, input=stdin, capture_output=True, text=True, timeout=60,
+        env={"LUX_TIMING": summary_path, "PATH": ""},
+    )
+    assert result.stdout.count("D_FINISH") == 10
+    with open(summary_path) as f:
+        summary = json.load(f)
+    assert summary["turns"] == 10
+    assert summary["remaining_overage"] == 60.0
+    assert all(summary["phases"][phase]["total"] > 0 for phase in PHASES)
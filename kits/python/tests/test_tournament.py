@@ -0,0 +1,167 @@
+"""
+Tests for tools/tournament.py, run on short matches
+"""
+import importlib.util
+import json
+import signal
+import sys
+import time
+from os import path
+
+import pytest
+
+KIT_DIR = path.join(path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("tournament", path.join(KIT_DIR, "tools", "tournament.py"))
+tournament = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(tournament)
+
+SIMPLE_AGENT = path.join(KIT_DIR, "simple", "agent.py")
+PARAMETERS = {"MAX_DAYS": 12}
+
+IDLE_AGENT = """
+def agent(observation, configuration):
+    return []
+"""
+CRASHING_AGENT = """
+import os
+
+def agent(observation, configuration):
+    if observation["step"] == 3:
+        os._exit(3)
+    return []
+"""
+SLOW_AGENT = """
+import time
+
+def agent(observation, configuration):
+    time.sleep(60)
+    return []
+"""
+RAISING_AGENT = """
+def agent(observation, configuration):
+    if observation["step"] == 2:
+        raise ValueError("broken")
+    return []
+"""
+
+
+def _write_agent(tmp_path, name, source):
+    agent_path = tmp_path / "{}.py".format(name)
+    agent_path.write_text(source)
+    return {"name": name, "agent": str(agent_path)}
+
+
+def _read_results(results_path):
+    with open(results_path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_schedule_round_robin_with_swapped_sides():
+    config = {
+        "agents": [{"name": name} for name in ("a", "b", "c")],
+        "seeds": {"start": 5, "count": 2},
+        "map_sizes": [12, 16],
+    }
+    matches = tournament.schedule(config)
+    assert len(matches) == 3 * 2 * 2 * 2
+    assert [match["id"] for match in matches] == list(range(len(matches)))
+    assert {"id": 1, "agents": ["b", "a"], "seed": 5, "size": 12} in matches
+    self_play = tournament.schedule(dict(config, pairings=[["a", "a"]], seeds=[0], map_sizes=None))
+    assert self_play == [{"id": 0, "agents": ["a", "a"], "seed": 0, "size": None}]
+
+
+def test_standings_elo_and_win_rates():
+    standings = tournament.Standings(["a", "b"])
+    standings.add({"agents": ["a", "b"], "ranks": [1, 2], "errors": [None, None]})
+    standings.add({"agents": ["b", "a"], "ranks": [1, 1], "errors": [None, "turn 3: boom"]})
+    standings.add({"agents": ["a", "b"], "error": "worker crashed"})
+    summary = standings.summary()
+    assert summary["agents"]["a"]["wins"] == 1
+    assert summary["agents"]["a"]["draws"] == 1
+    assert summary["agents"]["a"]["errors"] == 1
+    assert summary["agents"]["a"]["win_rate"] == 0.75
+    assert summary["agents"]["a"]["elo"] > 1500 > summary["agents"]["b"]["elo"]
+    assert summary["pairings"] == [{"agents": ["a", "b"], "draws": 1, "wins": [1, 0]}]
+    assert summary["failed_matches"] == 1
+
+
+def test_play_match_with_in_process_and_command_agents():
+    agents = [
+        tournament.ModuleAgent(SIMPLE_AGENT),
+        tournament.CommandAgent([sys.executable, "main.py"], cwd=path.join(KIT_DIR, "simple")),
+    ]
+    results = [
+        tournament.play_match({"id": 0, "agents": ["a", "b"], "seed": seed, "size": 12},
+                              agents, dict(tournament.GAME_CONSTANTS["PARAMETERS"], **PARAMETERS))
+        for seed in (1, 2)
+    ]
+    for result in results:
+        assert result["turns"] == PARAMETERS["MAX_DAYS"]
+        assert result["errors"] == [None, None]
+        # the same agent on a mirrored map
+        assert result["ranks"] == [1, 1]
+
+
+@pytest.mark.parametrize("reusable", [False, True])
+def test_command_agents_reuse_their_process(reusable):
+    agents = [
+        tournament.ModuleAgent(SIMPLE_AGENT),
+        tournament.CommandAgent([sys.executable, "main.py"], cwd=path.join(KIT_DIR, "simple"), reusable=reusable),
+    ]
+    pids = []
+    for seed in (1, 2, 3):
+        result = tournament.play_match({"id": 0, "agents": ["a", "b"], "seed": seed, "size": 12},
+                                       agents, dict(tournament.GAME_CONSTANTS["PARAMETERS"], **PARAMETERS))
+        # the kit's main.py starts over after D_NEW_MATCH and plays the mirrored match like the in-process agent
+        assert result["errors"] == [None, None] and result["ranks"] == [1, 1]
+        pids.append(agents[1].process.pid)
+    agents[1].close()
+    assert agents[1].process is None
+    # a new process is started for the next match as soon as one ends, unless the agent is reusable
+    assert len(set(pids)) == (1 if reusable else 3)
+
+
+@pytest.mark.skipif(not hasattr(signal, "setitimer"), reason="needs SIGALRM")
+def test_module_agents_are_stopped_at_the_turn_timeout(tmp_path):
+    agent = tournament.ModuleAgent(_write_agent(tmp_path, "slow", SLOW_AGENT)["agent"])
+    agent.start_match(0)
+    previous = signal.getsignal(signal.SIGALRM)
+    start = time.perf_counter()
+    with pytest.raises(tournament.AgentError, match="timed out"):
+        agent.act(0, ["0", "12 12", "D_DONE"], 0.2)
+    assert time.perf_counter() - start < 5
+    assert signal.getsignal(signal.SIGALRM) is previous
+
+
+def test_run_tournament_survives_crashes_and_timeouts(tmp_path):
+    config = {
+        "agents": [
+            {"name": "simple", "agent": SIMPLE_AGENT},
+            _write_agent(tmp_path, "idle", IDLE_AGENT),
+            _write_agent(tmp_path, "crashing", CRASHING_AGENT),
+            _write_agent(tmp_path, "slow", SLOW_AGENT),
+            _write_agent(tmp_path, "raising", RAISING_AGENT),
+        ],
+        "pairings": [["simple", "idle"], ["simple", "crashing"], ["simple", "slow"], ["simple", "raising"]],
+        "seeds": [1],
+        "map_sizes": [12],
+        "swap_sides": False,
+        "parameters": PARAMETERS,
+        # the slow agent sleeps past match_timeout before its turn times out
+        "turn_timeout": 30,
+        "match_timeout": 5,
+    }
+    results_path = str(tmp_path / "results.jsonl")
+    standings = tournament.run_tournament(config, results_path, workers=2)
+
+    results = {result["agents"][1]: result for result in _read_results(results_path)}
+    assert len(results) == 4
+    assert results["idle"]["errors"] == [None, None]
+    assert "crashed" in results["crashing"]["error"]
+    assert "timed out" in results["slow"]["error"]
+    assert results["raising"]["errors"][1].startswith("turn 2: ValueError")
+    summary = standings.summary()
+    assert summary["failed_matches"] == 2
+    assert summary["agents"]["simple"]["matches"] == 2
+    with open(str(tmp_path / "results_summary.json")) as f:
+        assert json.load(f) == summary
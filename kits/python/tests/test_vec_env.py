@@ -0,0 +1,99 @@
+"""
+Tests for lux.mapgen and lux.vec_env. Generated maps are checked against the first turn of the recorded replays
+"""
+import glob
+import gzip
+import json
+from os import path
+
+import pytest
+
+from lux.mapgen import SeedRandom, generate_map
+from lux.sim import SimGame
+
+np = pytest.importorskip("numpy")
+from lux.vec_env import OBSERVATION_FEATURES, OBSERVATION_LAYERS, VecEnv  # noqa: E402
+
+REPLAYS = sorted(glob.glob(path.join(path.dirname(__file__), "replays", "*.json.gz")))
+
+
+def test_seed_random_matches_seedrandom():
+    # seedrandom("hello.")() from the seedrandom README
+    assert SeedRandom("hello.")() == 0.9282578795792454
+
+
+@pytest.mark.parametrize("replay_path", REPLAYS, ids=path.basename)
+def test_generate_map_matches_replay(replay_path):
+    with gzip.open(replay_path, "rt") as f:
+        replay = json.load(f)
+    configuration = replay["configuration"]
+    updates = replay["steps"][0][0]["observation"]["updates"]
+    sim = generate_map(configuration["seed"], configuration["width"], configuration["height"])
+    assert updates[1] == "{} {}".format(sim.width, sim.height)
+    assert sim.to_updates() == updates[2:-1]
+
+
+def test_generate_map_draws_the_size_from_the_seed():
+    sizes = {generate_map(seed).width for seed in range(20)}
+    assert sizes <= {12, 16, 24, 32}
+    assert len(sizes) > 1
+
+
+def _layer(observations, match, team, name):
+    return observations[match, team, OBSERVATION_LAYERS.index(name)]
+
+
+def test_reset_and_step_follow_the_simulator():
+    env = VecEnv(3)
+    observations, features, rewards, dones = env.reset([1, 2, 3], width=12, height=12)
+    assert observations.shape == (3, 2, len(OBSERVATION_LAYERS), 32, 32)
+    assert features.shape == (3, 2, len(OBSERVATION_FEATURES))
+    assert not dones.any()
+    assert (rewards == 10001).all()
+    assert _layer(observations, 0, 0, "in_map").sum() == 144
+
+    expected = [generate_map(seed, 12, 12) for seed in (1, 2, 3)]
+    actions = [[["m u_1 n"], ["m u_2 s"]] for _ in range(3)]
+    for _ in range(3):
+        observations, features, rewards, dones = env.step(actions)
+        for sim in expected:
+            sim.step(actions[0])
+    for i, sim in enumerate(expected):
+        assert env.games[i].to_updates() == sim.to_updates()
+        assert features[i, 0, OBSERVATION_FEATURES.index("turn")] == 3
+        unit = sim.units[0]["u_1"]
+        assert _layer(observations, i, 0, "own_worker")[unit.y, unit.x] == 1
+        assert _layer(observations, i, 1, "opponent_worker")[unit.y, unit.x] == 1
+        wood = np.zeros((12, 12))
+        for x, y in sim.resources:
+            if sim.resource_type[y][x] == "wood":
+                wood[y, x] = sim.resource_amount[y][x]
+        assert (_layer(observations, i, 0, "wood")[:12, :12] == wood).all()
+
+
+def test_team_observations_mirror_each_other():
+    env = VecEnv(1, map_size=16)
+    observations, _, _, _ = env.reset([7], width=16, height=16)
+    for own, opponent in (("own_citytile", "opponent_citytile"), ("own_worker", "opponent_worker")):
+        assert (_layer(observations, 0, 0, own) == _layer(observations, 0, 1, opponent)).all()
+        assert (_layer(observations, 0, 1, own) == _layer(observations, 0, 0, opponent)).all()
+
+
+def test_finished_matches_wait_for_reset():
+    env = VecEnv(2, map_size=12)
+    env.reset([1, 2], width=12, height=12)
+    env.games[0] = SimGame(12, 12)
+    _, _, rewards, dones = env.step([[[], []], [[], []]])
+    assert dones.tolist() == [True, False]
+    assert rewards[0].tolist() == [0, 0]
+    env.step([[[], []], [[], []]])
+    assert env.games[0].turn == 1
+    assert env.games[1].turn == 2
+    _, _, _, dones = env.reset([5], indices=[0], width=12, height=12)
+    assert dones.tolist() == [False, False]
+
+
+def test_reset_rejects_maps_larger_than_map_size():
+    env = VecEnv(1, map_size=12)
+    with pytest.raises(ValueError):
+        env.reset([1], width=16, height=16)
@@ -0,0 +1,71 @@
+"""
+Prepares the kit for a fast first turn. Writes lux/frozen_constants.py, GAME_CONSTANTS as a Python literal
+generated from lux/game_constants.json, which lux/game_constants.py imports instead of parsing the JSON. With
+--compile it also precompiles every module of the kit to __pycache__, so a submission unpacked where Python
+cannot write its bytecode cache does not compile the kit again on every start. The bytecode is checked against
+the hash of its source rather than the file's modification time, which unpacking an archive may change.
+
+Run it again whenever game_constants.json changes; tests/test_startup.py fails while the two differ.
+
+usage: python freeze_kit.py [--compile] [--kit ../simple]
+"""
+import argparse
+import compileall
+import json
+import pprint
+import py_compile
+import sys
+from os import path
+
+KIT_PATH = path.abspath(path.join(path.dirname(__file__), "..", "simple"))
+
+HEADER = '''"""
+GAME_CONSTANTS of game_constants.json, generated by tools/freeze_kit.py. Do not edit, run it again instead
+"""
+'''
+
+
+def frozen_source(constants_path) -> str:
+    """
+    the source of lux/frozen_constants.py for the game constants JSON at constants_path
+    """
+    with open(constants_path) as f:
+        constants = json.load(f)
+    return HEADER + "GAME_CONSTANTS = " + pprint.pformat(constants, width=100, sort_dicts=False) + "\n"
+
+
+def freeze(kit_path=KIT_PATH):
+    """
+    writes lux/frozen_constants.py of the kit at kit_path and returns its path
+    """
+    lux_path = path.join(kit_path, "lux")
+    frozen_path = path.join(lux_path, "frozen_constants.py")
+    source = frozen_source(path.join(lux_path, "game_constants.json"))
+    with open(frozen_path, "w") as f:
+        f.write(source)
+    return frozen_path
+
+
+def compile_kit(kit_path=KIT_PATH) -> bool:
+    """
+    precompiles the modules of the kit at kit_path, returning whether all of them compiled
+    """
+    return compileall.compile_dir(
+        kit_path, quiet=1, force=True, invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--compile", action="store_true")
+    parser.add_argument("--kit", default=KIT_PATH)
+    args = parser.parse_args()
+
+    print("wrote {}".format(freeze(args.kit)))
+    if args.compile:
+        if not compile_kit(args.kit):
+            sys.exit(1)
+        print("compiled {}".format(args.kit))
+
+
+if __name__ == "__main__":
+    main()
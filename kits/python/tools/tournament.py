@@ -0,0 +1,538 @@
+"""
+Runs a local tournament between agents on the Python forward model (lux/sim.py), with matches sharded over a
+pool of worker processes. Every finished match is appended to a JSON lines results file and the standings
+(win rates, Elo and, if the trueskill package is installed, TrueSkill) are rewritten next to it.
+
+usage: python tournament.py config.json [--workers N] [--results results.jsonl]
+
+The config is a JSON object:
+
+    {
+        "agents": [
+            {"name": "simple", "agent": "../simple/agent.py"},
+            {"name": "js", "command": ["node", "main.js"], "cwd": "../../js/simple", "reusable": true}
+        ],
+        "pairings": "round_robin",
+        "seeds": {"start": 0, "count": 50},
+        "map_sizes": [12, 16, 24, 32],
+        "swap_sides": true,
+        "workers": 4,
+        "turn_timeout": 3.0,
+        "match_timeout": 600,
+        "rating": ["elo", "trueskill"],
+        "results": "results.jsonl"
+    }
+
+"agent" agents are the agent(observation, configuration) function of an agent.py, loaded once per worker and
+called in process. They share the worker's lux package, so agents with their own modified copy of lux should
+run as "command" agents, processes speaking the engine's stdin protocol like the kits' main.py. A "reusable"
+command agent handles the kits' D_NEW_MATCH handshake and keeps its process from one match to the next, other
+command agents get a new process for every match, started as the previous match ends. Relative paths are
+relative to the config file. pairings is "round_robin" or a list of [name, name] pairs, seeds a list or a
+{"start", "count"} range and map_sizes a list of sizes (by default the seed picks the size, like the engine).
+"parameters" overrides entries of GAME_CONSTANTS["PARAMETERS"], e.g. {"MAX_DAYS": 40} for short test runs.
+
+A match whose worker crashes or runs past match_timeout is recorded with an error and the worker is replaced.
+An agent that raises, exits or misses turn_timeout sends no more actions for the rest of the match, like the
+engine does with agents that error out. In-process agents are stopped at turn_timeout by SIGALRM, so only where
+signals are available (POSIX) and only in Python code: an agent stuck in a C call, or that catches the interrupt,
+is only stopped by match_timeout.
+"""
+import argparse
+import collections
+import importlib.util
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import selectors
+import signal
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.connection import wait
+
+KIT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simple")
+sys.path.insert(0, KIT_PATH)
+
+from lux.game_constants import GAME_CONSTANTS
+from lux.mapgen import generate_map
+from lux.sim import TEAMS
+
+NEW_MATCH = "D_NEW_MATCH"
+DEFAULT_TURN_TIMEOUT = 3.0
+DEFAULT_MATCH_TIMEOUT = 600.0
+ELO_START = 1500.0
+ELO_K = 32.0
+
+
+class AgentError(Exception):
+    """
+    raised when an agent fails to answer a turn
+    """
+    pass
+
+
+class _TurnTimeout(BaseException):
+    """
+    raised in an in-process agent by SIGALRM, a BaseException so the agent's own except Exception lets it through
+    """
+    pass
+
+
+def _turn_timeout(signum, frame):
+    raise _TurnTimeout()
+
+
+class Observation(dict):
+    """
+    the observation handed to in-process agents, a dict with a player attribute like kaggle-environments gives
+    """
+    def __init__(self, player, step, updates):
+        super().__init__(player=player, step=step, updates=updates, remainingOverageTime=60)
+        self.player = player
+
+
+class ModuleAgent:
+    """
+    the agent function of an agent.py, imported once and reused for every match a worker plays. Agents start
+    over when they see step 0, as they do in kaggle-environments. Turns past timeout are interrupted where
+    SIGALRM is available, in the main thread of the worker
+    """
+    def __init__(self, path):
+        self.path = path
+        agent_dir = os.path.dirname(os.path.abspath(path))
+        if agent_dir not in sys.path:
+            sys.path.insert(0, agent_dir)
+        module_name = "tournament_agent_{}".format(abs(hash(os.path.abspath(path))))
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self.agent = module.agent
+        self.team = None
+
+    def start_match(self, team):
+        self.team = team
+
+    def act(self, step, updates, timeout):
+        observation = Observation(self.team, step, updates)
+        if not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+            return self.agent(observation, None)
+        previous = signal.signal(signal.SIGALRM, _turn_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            return self.agent(observation, None)
+        except _TurnTimeout:
+            raise AgentError("agent timed out after {}s".format(timeout))
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+    def end_match(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class CommandAgent:
+    """
+    an agent process speaking the engine's stdin protocol. Each turn the updates are written followed by D_DONE
+    and the actions are read back up to D_FINISH, with timeout seconds to answer. A reusable agent keeps its
+    process for the next match, which starts with a D_NEW_MATCH line before the player id and map size. Other
+    agents, and agents that failed a turn, get a new process, started as the match ends so that it boots while
+    the worker moves on to the next one
+    """
+    def __init__(self, command, cwd=None, reusable=False):
+        self.command = command
+        self.cwd = cwd
+        self.reusable = reusable
+        self.process = None
+        self.selector = None
+        self.buffer = b""
+        # matches the running process played, and whether the current one has failed a turn
+        self.matches = 0
+        self.failed = False
+        self.new_match = False
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            self.command, cwd=self.cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.process.stdout, selectors.EVENT_READ)
+        self.buffer = b""
+        self.matches = 0
+
+    def _stop(self):
+        if self.process is not None:
+            self.selector.close()
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def start_match(self, team):
+        if self.process is not None and self.process.poll() is not None:
+            self._stop()
+        if self.process is None:
+            self._start()
+        self.new_match = self.matches > 0
+        self.failed = False
+
+    def act(self, step, updates, timeout):
+        if self.new_match:
+            updates = [NEW_MATCH] + updates
+            self.new_match = False
+        try:
+            return self._exchange(updates, timeout)
+        except AgentError:
+            self.failed = True
+            raise
+
+    def _exchange(self, updates, timeout):
+        try:
+            self.process.stdin.write(("\n".join(updates) + "\n").encode())
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as err:
+            raise AgentError("agent process exited: {}".format(err))
+        deadline = time.perf_counter() + timeout
+        lines = []
+        while True:
+            newline = self.buffer.find(b"\n")
+            if newline >= 0:
+                line = self.buffer[:newline].decode().rstrip("\r")
+                self.buffer = self.buffer[newline + 1:]
+                if line == "D_FINISH":
+                    break
+                lines.append(line)
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or not self.selector.select(remaining):
+                raise AgentError("agent timed out after {}s".format(timeout))
+            data = os.read(self.process.stdout.fileno(), 65536)
+            if not data:
+                raise AgentError("agent process exited with code {}".format(self.process.poll()))
+            self.buffer += data
+        return [cmd for cmd in (lines[0].split(",") if lines else []) if cmd != ""]
+
+    def end_match(self):
+        if self.process is None:
+            return
+        self.matches += 1
+        if not self.reusable or self.failed:
+            self._stop()
+            self._start()
+
+    def close(self):
+        self._stop()
+
+
+def make_agent(spec):
+    if "agent" in spec:
+        return ModuleAgent(spec["agent"])
+    return CommandAgent(spec["command"], spec.get("cwd"), spec.get("reusable", False))
+
+
+def play_match(match, agents, parameters=None, turn_timeout=DEFAULT_TURN_TIMEOUT):
+    """
+    plays one match between agents[0] (team 0) and agents[1] (team 1) and returns its result
+    """
+    start = time.perf_counter()
+    sim = generate_map(match["seed"], match.get("size"), match.get("size"), parameters)
+    errors = [None, None]
+    agent_time = [0.0, 0.0]
+    for team in TEAMS:
+        try:
+            agents[team].start_match(team)
+        except Exception as err:
+            errors[team] = "failed to start: {}".format(err)
+
+    while True:
+        updates = sim.to_updates()
+        actions = [[], []]
+        for team in TEAMS:
+            if errors[team] is not None:
+                continue
+            lines = updates + ["D_DONE"]
+            if sim.turn == 0:
+                lines = [str(team), "{} {}".format(sim.width, sim.height)] + lines
+            turn_start = time.perf_counter()
+            try:
+                actions[team] = agents[team].act(sim.turn, lines, turn_timeout)
+            except Exception as err:
+                errors[team] = "turn {}: {}: {}".format(sim.turn, type(err).__name__, err)
+            agent_time[team] += time.perf_counter() - turn_start
+        if sim.step(actions):
+            break
+
+    for team in TEAMS:
+        agents[team].end_match()
+    ranks = [0, 0]
+    for rank, team in sim.get_results():
+        ranks[team] = rank
+    return dict(
+        match,
+        ranks=ranks,
+        rewards=[sim.city_tile_count(team) * 10000 + len(sim.units[team]) for team in TEAMS],
+        turns=sim.turn,
+        wall_time=time.perf_counter() - start,
+        agent_time=agent_time,
+        errors=errors,
+    )
+
+
+def _worker(conn, agent_specs, parameters, turn_timeout):
+    """
+    worker process loop: plays the matches sent over conn until it receives None, keeping its agents loaded
+    """
+    agents = {}
+    while True:
+        match = conn.recv()
+        if match is None:
+            break
+        try:
+            first, second = match["agents"]
+            # an agent playing itself needs a second instance for the other side
+            keys = (first, second) if first != second else (first, (second, "mirror"))
+            pair = []
+            for name, key in zip(match["agents"], keys):
+                if key not in agents:
+                    agents[key] = make_agent(agent_specs[name])
+                pair.append(agents[key])
+            result = play_match(match, pair, parameters, turn_timeout)
+        except Exception:
+            result = dict(match, error=traceback.format_exc())
+        conn.send(result)
+    for agent in agents.values():
+        agent.close()
+
+
+def schedule(config):
+    """
+    returns the list of matches described by a config, each a dict with an id, agents, seed and size
+    """
+    names = [spec["name"] for spec in config["agents"]]
+    pairings = config.get("pairings", "round_robin")
+    if pairings == "round_robin":
+        pairings = list(itertools.combinations(names, 2))
+    seeds = config.get("seeds", [0])
+    if isinstance(seeds, dict):
+        seeds = range(seeds.get("start", 0), seeds.get("start", 0) + seeds["count"])
+    sizes = config.get("map_sizes") or [None]
+    swap_sides = config.get("swap_sides", True)
+
+    matches = []
+    for seed in seeds:
+        for size in sizes:
+            for first, second in pairings:
+                sides = [(first, second), (second, first)] if swap_sides and first != second else [(first, second)]
+                for pair in sides:
+                    matches.append({"id": len(matches), "agents": list(pair), "seed": seed, "size": size})
+    return matches
+
+
+class Standings:
+    """
+    win/draw/loss counts and ratings of every agent, updated one result at a time in the order they finish
+    """
+    def __init__(self, names, rating=("elo",), elo_k=ELO_K):
+        self.stats = {name: {"matches": 0, "wins": 0, "draws": 0, "losses": 0, "errors": 0} for name in names}
+        self.elo = {name: ELO_START for name in names}
+        self.elo_k = elo_k
+        self.trueskill = None
+        if "trueskill" in rating:
+            import trueskill
+            self._trueskill_env = trueskill.TrueSkill(draw_probability=0.1)
+            self.trueskill = {name: self._trueskill_env.create_rating() for name in names}
+        self.pairings = collections.defaultdict(lambda: [0, 0, 0])
+        self.failed_matches = 0
+
+    def add(self, result):
+        if "error" in result:
+            self.failed_matches += 1
+            return
+        first, second = result["agents"]
+        ranks = result["ranks"]
+        for name, error in zip(result["agents"], result["errors"]):
+            if error is not None:
+                self.stats[name]["errors"] += 1
+        score = 0.5 if ranks[0] == ranks[1] else (1.0 if ranks[0] < ranks[1] else 0.0)
+        for name, own_score in ((first, score), (second, 1 - score)):
+            stats = self.stats[name]
+            stats["matches"] += 1
+            stats["wins" if own_score == 1 else "losses" if own_score == 0 else "draws"] += 1
+        if first != second:
+            key = tuple(sorted((first, second)))
+            self.pairings[key][0 if score == 0.5 else key.index(first if score == 1 else second) + 1] += 1
+
+        expected = 1 / (1 + 10 ** ((self.elo[second] - self.elo[first]) / 400))
+        self.elo[first] += self.elo_k * (score - expected)
+        self.elo[second] -= self.elo_k * (score - expected)
+        if self.trueskill is not None and first != second:
+            (rating_first,), (rating_second,) = self._trueskill_env.rate(
+                [(self.trueskill[first],), (self.trueskill[second],)], ranks=ranks,
+            )
+            self.trueskill[first] = rating_first
+            self.trueskill[second] = rating_second
+
+    def summary(self):
+        agents = {}
+        for name, stats in self.stats.items():
+            entry = dict(stats)
+            entry["win_rate"] = (stats["wins"] + 0.5 * stats["draws"]) / stats["matches"] if stats["matches"] else None
+            entry["elo"] = round(self.elo[name], 1)
+            if self.trueskill is not None:
+                rating = self.trueskill[name]
+                entry["trueskill"] = {"mu": rating.mu, "sigma": rating.sigma, "score": rating.mu - 3 * rating.sigma}
+            agents[name] = entry
+        pairings = [
+            {"agents": list(key), "draws": counts[0], "wins": [counts[1], counts[2]]}
+            for key, counts in sorted(self.pairings.items())
+        ]
+        return {"agents": agents, "pairings": pairings, "failed_matches": self.failed_matches}
+
+
+class _Worker:
+    def __init__(self, context, agent_specs, parameters, turn_timeout):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker, args=(child_conn, agent_specs, parameters, turn_timeout), daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.match = None
+        self.started = None
+
+    def assign(self, match):
+        self.match = match
+        self.started = time.perf_counter()
+        self.conn.send(match)
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+def run_tournament(config, results_path, workers=None, summary_path=None, on_result=None):
+    """
+    plays every match of config over a pool of worker processes, appending each result to results_path as
+    a JSON line and rewriting the standings to summary_path after each one. Returns the final standings
+    """
+    agent_specs = {spec["name"]: spec for spec in config["agents"]}
+    parameters = dict(GAME_CONSTANTS["PARAMETERS"], **config.get("parameters", {}))
+    turn_timeout = config.get("turn_timeout", DEFAULT_TURN_TIMEOUT)
+    match_timeout = config.get("match_timeout", DEFAULT_MATCH_TIMEOUT)
+    rating = config.get("rating", ["elo"])
+    if isinstance(rating, str):
+        rating = [rating]
+    standings = Standings(list(agent_specs), rating, config.get("elo_k", ELO_K))
+    if summary_path is None:
+        summary_path = os.path.splitext(results_path)[0] + "_summary.json"
+
+    pending = collections.deque(schedule(config))
+    workers = min(workers or config.get("workers") or os.cpu_count() or 1, max(len(pending), 1))
+    context = multiprocessing.get_context()
+    pool = [_Worker(context, agent_specs, parameters, turn_timeout) for _ in range(workers)]
+
+    def record(out, result):
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+        standings.add(result)
+        with open(summary_path + ".tmp", "w") as f:
+            json.dump(standings.summary(), f, indent=2)
+        os.replace(summary_path + ".tmp", summary_path)
+        if on_result is not None:
+            on_result(result, standings)
+
+    try:
+        with open(results_path, "a") as out:
+            while True:
+                for worker in pool:
+                    if worker.match is None and pending:
+                        worker.assign(pending.popleft())
+                busy = [worker for worker in pool if worker.match is not None]
+                if not busy:
+                    break
+                now = time.perf_counter()
+                wait_for = max(min(worker.started + match_timeout - now for worker in busy), 0)
+                ready = wait([worker.conn for worker in busy] + [worker.process.sentinel for worker in busy], wait_for)
+                for i, worker in enumerate(pool):
+                    if worker.match is None:
+                        continue
+                    error = None
+                    if worker.conn in ready:
+                        try:
+                            result = worker.conn.recv()
+                        except EOFError:
+                            error = "worker crashed with exit code {}".format(worker.process.exitcode)
+                        else:
+                            worker.match = None
+                            record(out, result)
+                            continue
+                    elif worker.process.sentinel in ready:
+                        error = "worker crashed with exit code {}".format(worker.process.exitcode)
+                    elif time.perf_counter() - worker.started > match_timeout:
+                        error = "match timed out after {}s".format(match_timeout)
+                    if error is not None:
+                        match = worker.match
+                        worker.kill()
+                        pool[i] = _Worker(context, agent_specs, parameters, turn_timeout)
+                        record(out, dict(match, error=error, wall_time=time.perf_counter() - worker.started))
+    finally:
+        for worker in pool:
+            if worker.process.is_alive():
+                try:
+                    worker.conn.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+                worker.process.join(timeout=5)
+                if worker.process.is_alive():
+                    worker.kill()
+    return standings
+
+
+def load_config(path):
+    """
+    reads a tournament config, resolving agent paths and working directories relative to the config file
+    """
+    with open(path) as f:
+        config = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    for spec in config["agents"]:
+        if "agent" in spec:
+            spec["agent"] = os.path.join(base, spec["agent"])
+        else:
+            spec["cwd"] = os.path.join(base, spec.get("cwd", "."))
+    if "results" in config:
+        config["results"] = os.path.join(base, config["results"])
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("config")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--results", default=None, help="results file, overrides the config")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    results_path = args.results or config.get("results", "results.jsonl")
+    total = len(schedule(config))
+    finished = itertools.count(1)
+
+    def progress(result, standings):
+        outcome = result.get("error") or "ranks {}".format(result["ranks"])
+        print("[{}/{}] match {} {} vs {} seed {}: {} ({:.1f}s)".format(
+            next(finished), total, result["id"], result["agents"][0], result["agents"][1], result["seed"],
+            outcome.strip().splitlines()[-1], result.get("wall_time", math.nan)), file=sys.stderr)
+
+    standings = run_tournament(config, results_path, args.workers, on_result=progress)
+    print(json.dumps(standings.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
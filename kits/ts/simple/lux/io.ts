@@ -1,6 +1,7 @@
 /** all constants related to any input from match engine */
 export const INPUT_CONSTANTS = {
   DONE: 'D_DONE',
+  NEW_MATCH: 'D_NEW_MATCH',
   RESEARCH_POINTS: 'rp',
   RESOURCES: 'r',
   UNITS: 'u',
@@ -3,9 +3,10 @@ SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )"
 
 (cd $SCRIPT_DIR && sh $SCRIPT_DIR/clean.sh)
 
-(cd $SCRIPT_DIR/kits/cpp/simple && tar -czvf simple.tar.gz *)
-(cd $SCRIPT_DIR/kits/cpp/simple-transpiled && tar -czvf simple-transpiled.tar.gz *)
+# the wrappers of the kits other than python share kits/agent_pool.py, which goes next to their main.py
+(cd $SCRIPT_DIR/kits/cpp/simple && tar -czvf simple.tar.gz * -C ../.. agent_pool.py)
+(cd $SCRIPT_DIR/kits/cpp/simple-transpiled && tar -czvf simple-transpiled.tar.gz * -C ../.. agent_pool.py)
 (cd $SCRIPT_DIR/kits/python/simple && tar -czvf simple.tar.gz *)
-(cd $SCRIPT_DIR/kits/java/simple && tar -czvf simple.tar.gz *)
-(cd $SCRIPT_DIR/kits/js/simple && tar -czvf simple.tar.gz *)
-(cd $SCRIPT_DIR/kits/ts/simple && tar -czvf simple.tar.gz *)
\ No newline at end of file
+(cd $SCRIPT_DIR/kits/java/simple && tar -czvf simple.tar.gz * -C ../.. agent_pool.py)
+(cd $SCRIPT_DIR/kits/js/simple && tar -czvf simple.tar.gz * -C ../.. agent_pool.py)
+(cd $SCRIPT_DIR/kits/ts/simple && tar -czvf simple.tar.gz * -C ../.. agent_pool.py)
\ No newline at end of file